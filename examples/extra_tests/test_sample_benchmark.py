@@ -0,0 +1,56 @@
+import numpy as np
+import time
+import unittest
+
+import geosoft.gxapi as gxapi
+import geosoft.gxpy.gx as gx
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_utility as gxgrdu
+import geosoft.gxpy.vv as gxvv
+
+
+class Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gx = gx.GXpy(log=print)
+
+    def start(self):
+        self._func = self.id().split('.')[-1]
+        gx.gx().log('\n' + self._func)
+
+    def test_sample(self):
+        self.start()
+
+        npts = 5000000
+        with gxgrd.Grid.new(properties={'nx': 4000, 'ny': 4000, 'x0': 0., 'y0': 0., 'dx': 1., 'dy': 1.,
+                                        'dtype': np.float32}) as g:
+            yy, xx = np.mgrid[0:g.ny, 0:g.nx].astype(np.float32)
+            g.write_rows(np.sin(xx / 50.) * np.cos(yy / 70.))
+            del xx, yy
+
+            xyz = np.zeros((npts, 3))
+            xyz[:, 0] = np.random.uniform(0, g.nx - 1, npts)
+            xyz[:, 1] = np.random.uniform(0, g.ny - 1, npts)
+
+            t = time.time()
+            vvx, vvy, vvz = gxvv.vvset_from_np(xyz)
+            gxapi.GXIMU.get_zvv(g.gximg, vvx.gxvv, vvy.gxvv, vvz.gxvv)
+            gx_values = vvz.np
+            print('GXIMU.get_zvv: {:.2f} s'.format(time.time() - t))
+
+            for method, name in ((gxgrdu.SAMPLE_NEAREST, 'nearest'),
+                                 (gxgrdu.SAMPLE_LINEAR, 'linear'),
+                                 (gxgrdu.SAMPLE_CUBIC, 'cubic')):
+                for threads in (1, None):
+                    t = time.time()
+                    values = gxgrdu.sample(g, xyz, method=method, threads=threads)
+                    print('sample {} threads={}: {:.2f} s'.format(name, threads, time.time() - t))
+                    if method == gxgrdu.SAMPLE_LINEAR:
+                        self.assertTrue(np.allclose(values, gx_values, atol=1e-5, equal_nan=True))
+
+
+##############################################################################################
+if __name__ == '__main__':
+
+    unittest.main()
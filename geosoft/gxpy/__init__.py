@@ -10,8 +10,24 @@ from . import coordinate_system
 from . import geometry
 from . import geometry_utility
 from . import grid
+from . import grid_blend
+from . import grid_contour
+from . import grid_derivative
+from . import grid_ers
+from . import grid_expression
 from . import grid_fft
+from . import grid_fill
+from . import grid_geotiff
+from . import grid_grd
+from . import grid_local
+from . import grid_mincurv
+from . import grid_overview
+from . import grid_render
+from . import grid_sample
+from . import grid_statistics
+from . import grid_surfer
 from . import grid_utility
+from . import grid_warp
 from . import gdb
 from . import agg
 from . import map
@@ -23,6 +39,7 @@ from . import vox_display
 from . import metadata
 from . import spatialdata
 from . import surface
+from . import tin
 from . import dap_client
 
 __all__ = ['agg',
@@ -33,8 +50,25 @@ __all__ = ['agg',
            'geometry_utility',
            'gdb',
            'grid',
+           'grid_blend',
+           'grid_contour',
+           'grid_convert',
+           'grid_derivative',
+           'grid_ers',
+           'grid_expression',
            'grid_fft',
+           'grid_fill',
+           'grid_geotiff',
+           'grid_grd',
+           'grid_local',
+           'grid_mincurv',
+           'grid_overview',
+           'grid_render',
+           'grid_sample',
+           'grid_statistics',
+           'grid_surfer',
            'grid_utility',
+           'grid_warp',
            'group',
            'gx',
            'map',
@@ -43,6 +77,7 @@ __all__ = ['agg',
            'spatialdata',
            'surface',
            'system',
+           'tin',
            'utility',
            'va',
            'view',
@@ -25,6 +25,7 @@ import geosoft.gxapi as gxapi
 from . import gx
 from . import vv as gxvv
 from . import grid as gxgrd
+from . import grid_overview as gxgrdovr
 from . import map as gxmap
 from . import view as gxview
 from . import group as gxgroup
@@ -248,7 +249,8 @@ class Aggregate_image(gxgm.Geometry):
                   shade=False,
                   minimum=None,
                   maximum=None,
-                  contour=None):
+                  contour=None,
+                  pix_width=None):
         """
         Add an image layer to an aggregate
 
@@ -279,9 +281,13 @@ class Aggregate_image(gxgm.Geometry):
                                 will be assigned the last color in the table.  The default is calculated from
                                 the data.
         :param contour:         Break colors on this interval, colors will be thinned if necessary.
-                                
+        :param pix_width:       Image width in pixels. If the grid has overviews (see
+                                `geosoft.gxpy.grid.Grid.build_overviews`) the smallest overview that is
+                                at least this wide is added instead of the grid.
 
         .. versionadded:: 9.2
+
+        .. versionchanged:: 9.6 added `pix_width`
         """
 
         if color_map is None:
@@ -290,6 +296,8 @@ class Aggregate_image(gxgm.Geometry):
         if (color_map is None) or (isinstance(color_map, str)):
             color_map = geosoft.gxpy.group.Color_map(color_map)
         color_map_file = color_map.save_file()
+        if grid_file is not None:
+            grid_file = gxgrdovr.select(grid_file, pix_width)
 
         try:
             if grid_file is not None:
@@ -1539,6 +1539,30 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         return va
 
+    def lazy_va(self, line, channel, dtype=None):
+        """
+        Return a `Lazy_va` instance to access a window of rows and columns in a VA channel without
+        reading the whole array.
+
+        :param line:    line name or symbol
+        :param channel: channel name or symbol
+        :param dtype:   type wanted, default same as the channel data
+
+        :returns:       `Lazy_va` instance
+
+        .. code::
+
+            import geosoft.gxpy.gdb as gxdb
+
+            with gxdb.Geosoft_gdb.open('spectra.gdb') as gdb:
+                spectra = gdb.lazy_va('L100', 'spectrum')
+                k_window = spectra[:, 110:130]          # only columns 110 to 129 are read
+                total_k = spectra.window_sum(110, 20)   # reduced in chunks of rows
+
+        .. versionadded:: 9.6
+        """
+        return Lazy_va(self, line, channel, dtype=dtype)
+
     def read_channel(self, line, channel, dtype=None):
         """
         Read data from a single channel.
@@ -2921,3 +2945,247 @@ class Line:
         if bearing == gxapi.rDUMMY:
             return None
         return bearing
+
+
+class Lazy_va:
+    """
+    Lazy access to the data in a VA channel of a line. Data is only read from the database when
+    sliced, and only the requested block of rows and columns is transferred. Use `Geosoft_gdb.lazy_va`
+    to create an instance.
+
+    Indexing follows numpy conventions for a 2D array shaped (length, width):
+
+    .. code::
+
+        va = gdb.lazy_va('L100', 'spectrum')
+        va[100:200, 10:20]      # rows 100 to 199, columns 10 to 19
+        va[:, 5]                # column 5 of all rows, returned as a 1D array
+        va[10]                  # all columns of row 10, returned as a 1D array
+
+    Reductions over the width of the array, `window_sum` and `argmax`, work through the data
+    in chunks of rows so that very long lines can be processed in a fixed amount of memory.
+
+    :param gdb:     `Geosoft_gdb` instance
+    :param line:    line name or symbol
+    :param channel: VA channel name or symbol
+    :param dtype:   numpy data type wanted, default is the channel type. Float dummies are `numpy.nan`.
+
+    .. versionadded:: 9.6
+    """
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self.__dict__)
+
+    def __str__(self):
+        return '{}/{}{}'.format(self._line, self._channel, self.shape)
+
+    def __init__(self, gdb, line, channel, dtype=None):
+
+        self.gdb = gdb
+        self._line, self._ls = gdb.line_name_symb(line)
+        self._channel, self._cs = gdb.channel_name_symb(channel)
+        self._width = gdb.channel_width(self._cs)
+        if dtype is None:
+            dtype = gdb.channel_dtype(self._cs)
+        self._dtype = np.dtype(dtype)
+        if gxu.gx_dtype(self._dtype) < 0:
+            raise GdbException(_t('VA string elements are not supported.'))
+
+        gdb.lock_read_(self._cs)
+        try:
+            self._length = gdb.gxdb.get_channel_length(self._ls, self._cs)
+            self._fid = (gdb.gxdb.get_fid_start(self._ls, self._cs), gdb.gxdb.get_fid_incr(self._ls, self._cs))
+        finally:
+            gdb.unlock_(self._cs)
+
+        self._element_symbols = {}
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def length(self):
+        """number of rows (fiducials) in the channel"""
+        return self._length
+
+    @property
+    def width(self):
+        """array width of the channel"""
+        return self._width
+
+    @property
+    def shape(self):
+        """array shape (length, width)"""
+        return self._length, self._width
+
+    @property
+    def dtype(self):
+        """numpy data type of returned data"""
+        return self._dtype
+
+    @property
+    def fid(self):
+        """fid tuple (start, increment)"""
+        return self._fid
+
+    def _element_symbol(self, col):
+        symb = self._element_symbols.get(col)
+        if symb is None:
+            symb = self.gdb.channel_name_symb('{}[{}]'.format(self._channel, col))[1]
+            self._element_symbols[col] = symb
+        return symb
+
+    def _read_column(self, col, start, n):
+        vv = gxvv.GXvv(dtype=self._dtype)
+        es = self._element_symbol(col)
+        self.gdb.lock_read_(es)
+        try:
+            self.gdb.gxdb.get_va_chan_vv(self._ls, es, vv.gxvv, start, n)
+        finally:
+            self.gdb.unlock_(es)
+        return vv.np
+
+    def read(self, start=0, n=None, start_col=0, n_col=None):
+        """
+        Read a contiguous block of data from the channel.
+
+        :param start:       index of the first row
+        :param n:           number of rows, default to the end of the channel
+        :param start_col:   index of the first column
+        :param n_col:       number of columns, default to the width of the channel
+        :returns:           numpy array shaped (n, n_col)
+
+        .. versionadded:: 9.6
+        """
+
+        if n is None:
+            n = self._length - start
+        n = min(n, self._length - start)
+        if n_col is None:
+            n_col = self._width - start_col
+        n_col = min(n_col, self._width - start_col)
+        if (start < 0) or (n < 0) or (start_col < 0) or (n_col <= 0):
+            raise GdbException(_t('Cannot read rows ({},{}), columns ({},{}) from VA shaped {}').
+                               format(start, n, start_col, n_col, self.shape))
+
+        block = np.empty((n, n_col), dtype=self._dtype)
+        if n > 0:
+            for i in range(n_col):
+                block[:, i] = self._read_column(start_col + i, start, n)
+        return block
+
+    def __getitem__(self, item):
+
+        if isinstance(item, tuple):
+            if len(item) != 2:
+                raise GdbException(_t('VA indexing requires (rows, columns)'))
+            rows, cols = item
+        else:
+            rows = item
+            cols = slice(None)
+
+        squeeze_row = isinstance(rows, (int, np.integer))
+        squeeze_col = isinstance(cols, (int, np.integer))
+
+        if squeeze_row:
+            if rows < 0:
+                rows += self._length
+            if not (0 <= rows < self._length):
+                raise IndexError(_t('Row {} out of range for length {}').format(rows, self._length))
+            rows = slice(rows, rows + 1)
+        if not isinstance(rows, slice):
+            raise GdbException(_t('VA rows must be an integer or a slice'))
+        r_start, r_stop, r_step = rows.indices(self._length)
+        if r_step < 0:
+            r_start, r_stop = r_stop + 1, r_start + 1
+        n = max(0, r_stop - r_start)
+
+        if squeeze_col:
+            if cols < 0:
+                cols += self._width
+            if not (0 <= cols < self._width):
+                raise IndexError(_t('Column {} out of range for width {}').format(cols, self._width))
+            col_index = [cols]
+        elif isinstance(cols, slice):
+            col_index = list(range(*cols.indices(self._width)))
+        else:
+            col_index = [int(c) + self._width if c < 0 else int(c) for c in cols]
+
+        block = np.empty((n, len(col_index)), dtype=self._dtype)
+        if n > 0:
+            for i, c in enumerate(col_index):
+                block[:, i] = self._read_column(c, r_start, n)
+        block = block[::r_step] if r_step > 0 else block[::-1][::-r_step]
+
+        if squeeze_row and squeeze_col:
+            return block[0, 0]
+        if squeeze_row:
+            return block[0]
+        if squeeze_col:
+            return block[:, 0]
+        return block
+
+    def iter_chunks(self, rows=4096, start_col=0, n_col=None):
+        """
+        Iterate through the channel data in chunks of rows.
+
+        :param rows:        number of rows in each chunk
+        :param start_col:   first column to read
+        :param n_col:       number of columns to read, default is to the width of the channel
+        :returns:           yields (first_row_index, numpy array shaped (chunk_rows, n_col))
+
+        .. versionadded:: 9.6
+        """
+
+        rows = max(1, int(rows))
+        for start in range(0, self._length, rows):
+            yield start, self.read(start, rows, start_col, n_col)
+
+    def window_sum(self, start_col=0, n_col=None, rows=4096):
+        """
+        Sum a window of columns for each row. Dummies are ignored, and rows in which the whole
+        window is dummy will be `numpy.nan`.
+
+        :param start_col:   first column of the window
+        :param n_col:       number of columns in the window, default is to the width of the channel
+        :param rows:        number of rows to read at a time
+        :returns:           1D float64 numpy array of the window sums, one for each row.
+
+        .. versionadded:: 9.6
+        """
+
+        result = np.empty(self._length, dtype=np.float64)
+        for start, block in self.iter_chunks(rows, start_col, n_col):
+            block = block.astype(np.float64)
+            if not np.issubdtype(self._dtype, np.floating):
+                block[block == gxu.gx_dummy(self._dtype)] = np.nan
+            valid = ~np.isnan(block)
+            s = np.where(valid, block, 0.).sum(axis=1)
+            s[~valid.any(axis=1)] = np.nan
+            result[start: start + len(s)] = s
+        return result
+
+    def argmax(self, start_col=0, n_col=None, rows=4096):
+        """
+        Index of the maximum value across a window of columns for each row. Dummies are ignored,
+        and rows in which the whole window is dummy return -1.
+
+        :param start_col:   first column of the window
+        :param n_col:       number of columns in the window, default is to the width of the channel
+        :param rows:        number of rows to read at a time
+        :returns:           1D int numpy array of the column index of the maximum, relative to column 0.
+
+        .. versionadded:: 9.6
+        """
+
+        result = np.empty(self._length, dtype=np.int64)
+        for start, block in self.iter_chunks(rows, start_col, n_col):
+            block = block.astype(np.float64)
+            if not np.issubdtype(self._dtype, np.floating):
+                block[block == gxu.gx_dummy(self._dtype)] = np.nan
+            valid = ~np.isnan(block)
+            block[~valid] = -np.inf
+            imax = np.argmax(block, axis=1) + start_col
+            imax[~valid.any(axis=1)] = -1
+            result[start: start + len(imax)] = imax
+        return result
@@ -3,7 +3,8 @@ Geosoft grid and image handling, including all
 `supported file formats <https://geosoftgxdev.atlassian.net/wiki/display/GXDEV92/Grid+File+Name+Decorations>`_ .
 
 :Classes:
-    :`Grid`: grid dataset
+    :`Grid`:        grid dataset
+    :`Tile_cache`:  LRU cache of grid tiles for random access
 
 :Constants:
    :FILE_READ:       0 open for read, files are not changed
@@ -22,6 +23,10 @@ Geosoft grid and image handling, including all
 import os
 import numpy as np
 import math
+import threading
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 import geosoft
 import geosoft.gxapi as gxapi
@@ -35,6 +40,14 @@ from . import map as gxmap
 from . import grid_utility as gxgrdu
 from . import view as gxview
 from . import gdb as gxgdb
+from . import grid_grd as gxgrdgrd
+from . import grid_sample as gxgrdsmp
+from . import grid_statistics as gxgrdst
+from . import grid_overview as gxgrdovr
+from . import grid_geotiff as gxgrdtif
+from . import grid_mincurv as gxgrdmc
+from . import grid_local as gxgrdlcl
+from . import grid_render as gxrndr
 
 __version__ = geosoft.__version__
 
@@ -181,17 +194,789 @@ def delete_files(file_name):
             for i in range(16):
                 gxu.delete_file(file_name + str(i))
 
+        # overviews
+        level = 1
+        while os.path.exists(gxgrdovr.file_name(file_name, level)):
+            ovr = gxgrdovr.file_name(file_name, level)
+            gxu.delete_file(ovr)
+            gxu.delete_file(ovr + '.gi')
+            gxu.delete_file(ovr + '.xml')
+            level += 1
+
 
 def _transform_color_int_to_rgba(np_values):
+    np_values = np.array(np_values, dtype='<i4')
     np_values[np_values == gxapi.iDUMMY] = 0
-    a = (np.right_shift(np_values, 24) & 0xFF).astype(np.uint8)
-    b = (np.right_shift(np_values, 16) & 0xFF).astype(np.uint8)
-    g = (np.right_shift(np_values, 8) & 0xFF).astype(np.uint8)
-    r = (np_values & 0xFF).astype(np.uint8)
+    rgba = np_values.view(np.uint8).reshape(np_values.shape + (4,))
     # the values for color grids actually do not contain alphas but just
     # 0 or 1 to indicate if the color is valid or not
+    a = rgba[..., 3]
     a[a > 0] = 255
-    return np.array([r, g, b, a]).transpose()
+    return rgba
+
+
+def _point_value(value, fx, fy, nx, ny, is_color):
+    """
+    Grid value at a fractional grid index with the semantics of `geosoft.gxapi.GXIMG.get_z`: `None` outside
+    the extent of the grid points or where a point needed for bi-linear interpolation is dummy. Color grids
+    return the nearest color int. `value(ix, iy)` returns the value at a grid index.
+    """
+
+    tol = 1.0e-6
+    fx = float(fx)
+    fy = float(fy)
+    if (fx < -tol) or (fy < -tol) or (fx > nx - 1 + tol) or (fy > ny - 1 + tol):
+        return None
+    fx = min(max(fx, 0.), nx - 1.)
+    fy = min(max(fy, 0.), ny - 1.)
+
+    if is_color:
+        v = value(int(round(fx)), int(round(fy)))
+        return None if v == gxapi.iDUMMY else int(v)
+
+    ix = min(int(math.floor(fx)), max(nx - 2, 0))
+    iy = min(int(math.floor(fy)), max(ny - 2, 0))
+    tx = fx - ix
+    ty = fy - iy
+    v = 0.
+    for cx, cy, w in ((ix, iy, (1. - tx) * (1. - ty)), (ix + 1, iy, tx * (1. - ty)),
+                      (ix, iy + 1, (1. - tx) * ty), (ix + 1, iy + 1, tx * ty)):
+        if w > 0.:
+            c = float(value(cx, cy))
+            if np.isnan(c):
+                return None
+            v += c * w
+    return v
+
+
+def _located_data(data):
+    """ (x, y, value) array, database and value channel from located data of `Grid.minimum_curvature`"""
+
+    if callable(data):
+        segments = []
+        il = 0
+        xyz_list = data(il)
+        while xyz_list is not None:
+            segments.append(np.asarray(xyz_list, dtype=np.float64).reshape(-1, 3))
+            il += 1
+            xyz_list = data(il)
+        if not segments:
+            return np.empty((0, 3)), None, None
+        return np.vstack(segments), None, None
+
+    if isinstance(data, tuple):
+        gdb = data[0]
+        vc = data[1]
+        if len(data) == 4:
+            x, y, v = gxgrdlcl.read_gdb(gdb, vc, data[2], data[3])
+        else:
+            x, y, v = gxgrdlcl.read_gdb(gdb, vc)
+        return np.column_stack((x, y, v)), gdb, vc
+
+    return np.asarray(data, dtype=np.float64).reshape(-1, 3), None, None
+
+
+def _sample_threads(cache, fx, fy, nx, ny, x0=0, y0=0, threads=None):
+    """
+    Load the cache tiles needed to interpolate at fractional indexes of an (x0, y0, nx, ny) grid window on
+    the calling thread, which has the Geosoft context. Returns `threads` if all the tiles are held, or 1 if
+    the tiles exceed the cache budget, in which case the tiles are loaded as they are needed on the
+    calling thread.
+    """
+
+    if threads == 1:
+        return 1
+    fx = np.asarray(fx, dtype=np.float64).ravel()
+    fy = np.asarray(fy, dtype=np.float64).ravel()
+    valid = np.isfinite(fx) & np.isfinite(fy)
+    if not valid.any():
+        return threads
+    ix = np.floor(fx[valid]).astype(np.int64)
+    iy = np.floor(fy[valid]).astype(np.int64)
+
+    # corners of the cubic stencil of each point, a stencil spans at most two tiles in each direction
+    xa = np.clip(ix - 1, 0, nx - 1) + x0
+    xb = np.clip(ix + 2, 0, nx - 1) + x0
+    ya = np.clip(iy - 1, 0, ny - 1) + y0
+    yb = np.clip(iy + 2, 0, ny - 1) + y0
+    cx = np.concatenate((xa, xb, xa, xb))
+    cy = np.concatenate((ya, ya, yb, yb))
+    cache.prefetch(cx, cy)
+    if cache.holds(cx, cy):
+        return threads
+    return 1
+
+
+class Tile_cache:
+    """
+    Least-recently-used cache of square grid tiles for random access to grid values.
+
+    Tiles are loaded from the grid by `Grid.np` windows and held as numpy arrays until the memory budget is
+    exceeded, at which point the least-recently used tiles are released. Scalar grids are cached as float64
+    with dummies as `numpy.nan`, color grids as int32 color values. A cache is normally obtained from
+    `Grid.tile_cache`, which is used by `Grid.get_value`, `Grid.__getitem__` and
+    `geosoft.gxpy.grid_utility.sample`.
+
+    :param grid:        `Grid` instance
+    :param tile_size:   tile dimension in grid cells, default 256
+    :param memory_mb:   memory budget in megabytes, default 64. At least one tile is always held.
+    :param prefetch:    `True` (default) to load the next tile ahead when single-point access moves from
+                        one tile to its neighbour, which is the access pattern of a sequential profile.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, grid, tile_size=256, memory_mb=64, prefetch=True):
+        self._grid = grid
+        self._tile_size = max(1, int(tile_size))
+        self._max_bytes = int(memory_mb * 1024 * 1024)
+        self._prefetch = bool(prefetch)
+        self._tiles = OrderedDict()
+        self._bytes = 0
+        self._last_tile = None
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'prefetched': 0, 'evicted': 0}
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self.statistics)
+
+    @property
+    def tile_size(self):
+        """tile dimension in grid cells"""
+        return self._tile_size
+
+    @property
+    def memory_mb(self):
+        """memory budget in megabytes, can be set"""
+        return self._max_bytes / (1024 * 1024)
+
+    @memory_mb.setter
+    def memory_mb(self, mb):
+        with self._lock:
+            self._max_bytes = int(mb * 1024 * 1024)
+            self._evict()
+
+    @property
+    def statistics(self):
+        """
+        Cache statistics dictionary:
+
+            ============ ===============================================
+            'hits'       tile requests satisfied from the cache
+            'misses'     tile requests that loaded a tile from the grid
+            'prefetched' tiles loaded ahead of a sequential profile
+            'evicted'    tiles released to stay within the budget
+            'tiles'      tiles currently held
+            'bytes'      bytes currently held
+            'max_bytes'  memory budget in bytes
+            ============ ===============================================
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tiles'] = len(self._tiles)
+            stats['bytes'] = self._bytes
+            stats['max_bytes'] = self._max_bytes
+            return stats
+
+    def clear(self):
+        """Release all tiles. Statistics are not reset."""
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
+            self._last_tile = None
+
+    def _evict(self):
+        while (self._bytes > self._max_bytes) and (len(self._tiles) > 1):
+            _, data = self._tiles.popitem(last=False)
+            self._bytes -= data.nbytes
+            self._stats['evicted'] += 1
+
+    def _load(self, key):
+        g = self._grid
+        ix0 = key[0] * self._tile_size
+        iy0 = key[1] * self._tile_size
+        window = (ix0, iy0, min(self._tile_size, g.nx - ix0), min(self._tile_size, g.ny - iy0))
+        if g.is_color:
+            data = g._pager_data(np.int32, window, rgba=False)
+        else:
+            data = g.np(dtype=np.float64, window=window)
+        self._tiles[key] = data
+        self._bytes += data.nbytes
+        self._evict()
+        return data
+
+    def _valid_tile(self, key):
+        ntx = (self._grid.nx + self._tile_size - 1) // self._tile_size
+        nty = (self._grid.ny + self._tile_size - 1) // self._tile_size
+        return (0 <= key[0] < ntx) and (0 <= key[1] < nty)
+
+    def tile(self, tx, ty):
+        """
+        Return a tile array, loading it if necessary.
+
+        :param tx:  tile index in x
+        :param ty:  tile index in y
+        :returns:   numpy array shaped (ny, nx) of the tile, which is smaller than `tile_size` at the
+                    top and right edges of the grid.
+        """
+        key = (int(tx), int(ty))
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+                self._stats['hits'] += 1
+                return data
+            self._stats['misses'] += 1
+            return self._load(key)
+
+    def prefetch(self, ix, iy):
+        """
+        Load the tiles that cover grid indexes, in order of first use, up to the memory budget.
+
+        :param ix:  grid x indexes, int or array
+        :param iy:  grid y indexes, int or array
+        :returns:   number of tiles loaded
+        """
+        tx = np.atleast_1d(np.asarray(ix, dtype=np.int64)) // self._tile_size
+        ty = np.atleast_1d(np.asarray(iy, dtype=np.int64)) // self._tile_size
+        keys = tx * (1 << 32) + ty
+        _, first = np.unique(keys, return_index=True)
+        loaded = 0
+        tile_bytes = self._tile_size * self._tile_size * 8
+        with self._lock:
+            for i in np.sort(first):
+                key = (int(tx[i]), int(ty[i]))
+                if key in self._tiles or not self._valid_tile(key):
+                    continue
+                if (self._bytes + tile_bytes > self._max_bytes) and self._tiles:
+                    break
+                self._load(key)
+                self._stats['prefetched'] += 1
+                loaded += 1
+        return loaded
+
+    def holds(self, ix, iy):
+        """
+        `True` if the tiles that cover grid indexes are all held in the cache.
+
+        :param ix:  grid x indexes, int or array
+        :param iy:  grid y indexes, int or array
+        """
+        tx = np.atleast_1d(np.asarray(ix, dtype=np.int64)) // self._tile_size
+        ty = np.atleast_1d(np.asarray(iy, dtype=np.int64)) // self._tile_size
+        keys = np.unique(tx * (1 << 32) + ty)
+        with self._lock:
+            return all((int(k >> 32), int(k & 0xFFFFFFFF)) in self._tiles for k in keys)
+
+    def value(self, ix, iy):
+        """
+        Return the value at a grid index.
+
+        :param ix:  grid x index
+        :param iy:  grid y index
+        :returns:   value, `numpy.nan` for a dummy in a scalar grid
+        """
+        key = (ix // self._tile_size, iy // self._tile_size)
+        with self._lock:
+            data = self.tile(*key)
+            if self._prefetch and (self._last_tile is not None) and (key != self._last_tile):
+                step = (key[0] - self._last_tile[0], key[1] - self._last_tile[1])
+                if (abs(step[0]) <= 1) and (abs(step[1]) <= 1):
+                    ahead = (key[0] + step[0], key[1] + step[1])
+                    if (ahead not in self._tiles) and self._valid_tile(ahead):
+                        self._load(ahead)
+                        self._tiles.move_to_end(key)
+                        self._stats['prefetched'] += 1
+            self._last_tile = key
+            return data[iy - key[1] * self._tile_size, ix - key[0] * self._tile_size]
+
+    def values(self, ix, iy):
+        """
+        Return values at arrays of grid indexes.
+
+        :param ix:  numpy int array of grid x indexes, all must be valid
+        :param iy:  numpy int array of grid y indexes, all must be valid
+        :returns:   numpy array of values shaped like `ix`
+        """
+        ix = np.asarray(ix, dtype=np.int64)
+        iy = np.asarray(iy, dtype=np.int64)
+        dtype = np.int32 if self._grid.is_color else np.float64
+        result = np.empty(ix.shape, dtype=dtype)
+        if ix.size == 0:
+            return result
+
+        ts = self._tile_size
+        tx = ix // ts
+        ty = iy // ts
+        keys = (tx * (1 << 32) + ty).ravel()
+        order = np.argsort(keys, kind='stable')
+        skeys = keys[order]
+        bounds = np.flatnonzero(np.diff(skeys)) + 1
+        rix = ix.ravel()
+        riy = iy.ravel()
+        rres = result.reshape(-1)
+        for group in np.split(order, bounds):
+            i = group[0]
+            key = (int(tx.flat[i]), int(ty.flat[i]))
+            data = self.tile(*key)
+            rres[group] = data[riy[group] - key[1] * ts, rix[group] - key[0] * ts]
+        return result
+
+
+class Grid_xyzv:
+    """
+    Read-only (x, y, z, v) array of grid points, returned by `Grid.xyzv`.
+
+    The array behaves like a numpy float64 array shaped (ny, nx, 4) for indexing, but only the indexed
+    points are calculated. Locations (x, y, z) are calculated from the grid geometry, and the grid values are
+    read once and held in the grid dtype, so the array needs the memory of the grid values rather than 32
+    bytes per grid point. Use `numpy.asarray` to get the whole array, or `chunks` to get it in blocks of rows.
+
+    Rows and columns may be indexed by integers, slices, integer lists or boolean arrays. Lists index the
+    rows and columns independently, as in `numpy.ix_`.
+
+    :param grid: `Grid` instance
+
+    .. code::
+
+        import numpy as np
+        import geosoft.gxpy.grid as gxgrd
+
+        with gxgrd.Grid.open('mag.grd') as g:
+            xyzv = g.xyzv()
+            x = xyzv[:, :, 0]
+            row = xyzv[10]
+            for iy0, block in xyzv.chunks(rows=128):
+                print(iy0, np.nanmean(block[:, :, 3]))
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, grid):
+        self._grid = grid
+        self._shape = (grid.ny, grid.nx, 4)
+        self._values = None
+
+    def __repr__(self):
+        return '{}(shape={})'.format(self.__class__.__name__, self._shape)
+
+    def __len__(self):
+        return self._shape[0]
+
+    @property
+    def shape(self):
+        """Array shape (ny, nx, 4)"""
+        return self._shape
+
+    @property
+    def ndim(self):
+        """Number of dimensions, 3"""
+        return 3
+
+    @property
+    def size(self):
+        """Number of array elements"""
+        return self._shape[0] * self._shape[1] * 4
+
+    @property
+    def dtype(self):
+        """Array dtype, float64"""
+        return np.dtype(np.float64)
+
+    @property
+    def values(self):
+        """
+        Grid values as a numpy array shaped (ny, nx) in the grid dtype. Float grid dummies are `numpy.nan`,
+        and color grids are int32 color values.
+        """
+        if self._values is None:
+            g = self._grid
+            if g.is_color:
+                self._values = g._pager_data(np.int32, (0, 0, g.nx, g.ny), rgba=False)
+            else:
+                self._values = g.np()
+        return self._values
+
+    def _float_values(self, rows, cols):
+        v = self.values[rows][:, cols]
+        if v.dtype.kind == 'f':
+            return v.astype(np.float64)
+        f = v.astype(np.float64)
+        if not self._grid.is_color:
+            try:
+                f[v == gxu.gx_dummy(v.dtype)] = np.nan
+            except KeyError:
+                pass
+        return f
+
+    def __getitem__(self, item):
+        if not isinstance(item, tuple):
+            item = (item,)
+        if any(k is Ellipsis for k in item):
+            i = [k is Ellipsis for k in item].index(True)
+            item = item[:i] + (slice(None),) * (4 - len(item)) + item[i + 1:]
+        if len(item) > 3:
+            raise IndexError(_t('Too many indices for a Grid_xyzv array'))
+        item = item + (slice(None),) * (3 - len(item))
+
+        ny, nx, _ = self._shape
+        rk, ck, vk = item
+        rows = np.arange(ny)[rk]
+        cols = np.arange(nx)[ck]
+        components = np.arange(4)[vk]
+        squeeze = tuple(i for i, k in enumerate((rows, cols)) if np.ndim(k) == 0)
+        rows = np.atleast_1d(rows)
+        cols = np.atleast_1d(cols)
+        if not isinstance(rk, slice):
+            rk = rows
+        if not isinstance(ck, slice):
+            ck = cols
+
+        parts = {}
+        needed = set(np.atleast_1d(components).tolist())
+        if needed & {0, 1, 2}:
+            parts[0], parts[1], parts[2] = self._grid._xyz_index(cols, rows)
+        if 3 in needed:
+            parts[3] = self._float_values(rk, ck)
+
+        if np.ndim(components) == 0:
+            result = parts[int(components)]
+        else:
+            result = np.empty((len(rows), len(cols), len(components)))
+            for i, c in enumerate(components):
+                result[:, :, i] = parts[c]
+        if squeeze:
+            result = result.reshape(tuple(n for i, n in enumerate(result.shape) if i not in squeeze))
+        if result.ndim == 0:
+            return result[()]
+        return result
+
+    def __iter__(self):
+        for iy in range(self._shape[0]):
+            yield self[iy]
+
+    def __array__(self, dtype=None, copy=None):
+        data = np.empty(self._shape)
+        for iy0, block in self.chunks():
+            data[iy0: iy0 + block.shape[0]] = block
+        if dtype is not None:
+            return data.astype(dtype, copy=False)
+        return data
+
+    def chunks(self, rows=256):
+        """
+        Iterate over the array in blocks of rows.
+
+        :param rows:    number of rows in each block, default 256. The last block may have fewer rows.
+        :returns:       iterator of (iy0, block), where `iy0` is the first row of the block and `block` is a
+                        numpy float64 array shaped (rows, nx, 4).
+        """
+
+        rows = max(1, int(rows))
+        for iy0 in range(0, self._shape[0], rows):
+            yield iy0, self[iy0: iy0 + rows]
+
+    def reshape(self, *shape):
+        """
+        Return the whole array as a numpy array in a new shape, see `numpy.reshape`.
+        """
+        if len(shape) == 1:
+            shape = shape[0]
+        return np.asarray(self).reshape(shape)
+
+
+class Grid_window:
+    """
+    Index window view of a grid, returned by `Grid.index_window` with `view=True`.
+
+    A view shares the data of the grid it is a window into. Creating a view reads and copies nothing: data is
+    read from the grid window by `np` and `iter_blocks`, and values are sampled through the grid `tile_cache`,
+    so tiles loaded for one window are reused by neighbouring windows. The view has the geometry of the
+    window, such that point (0, 0) of the view is point (`x0`, `y0`) of the grid. Call `to_grid` to write
+    the window to a new grid.
+
+    :param grid:    `Grid` instance, or a `Grid_window` for a window of a window
+    :param x0:      integer index of the first X point
+    :param y0:      integer index of the first Y point
+    :param nx:      number of points in x, default is to the last point
+    :param ny:      number of points in y, default is to the last point
+
+    .. code::
+
+        import numpy as np
+        import geosoft.gxpy.grid as gxgrd
+
+        with gxgrd.Grid.open('mag.grd') as g:
+            for iy0 in range(0, g.ny, 512):
+                for ix0 in range(0, g.nx, 512):
+                    w = gxgrd.Grid.index_window(g, x0=ix0, y0=iy0, nx=min(512, g.nx - ix0),
+                                                ny=min(512, g.ny - iy0), view=True)
+                    print(w.extent_2d(), np.nanmean(w.np()))
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, grid, x0=0, y0=0, nx=None, ny=None):
+        if isinstance(grid, Grid_window):
+            wx0, wy0, gnx, gny = grid.window
+            grid = grid.grid
+        else:
+            wx0 = wy0 = 0
+            gnx = grid.nx
+            gny = grid.ny
+        if nx is None:
+            nx = gnx - x0
+        if ny is None:
+            ny = gny - y0
+        mx = x0 + nx
+        my = y0 + ny
+        if ((x0 >= gnx) or (y0 >= gny) or
+                (x0 < 0) or (y0 < 0) or
+                (nx <= 0) or (ny <= 0) or
+                (mx > gnx) or (my > gny)):
+            raise GridException(_t('Window x0,y0,mx,my({},{},{},{}) out of bounds ({},{})').
+                                format(x0, y0, mx, my, gnx, gny))
+
+        self._grid = grid
+        self._window = (int(wx0 + x0), int(wy0 + y0), int(nx), int(ny))
+
+    def __repr__(self):
+        return '{}({}, window={})'.format(self.__class__.__name__, self._grid.file_name_decorated, self._window)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        pass
+
+    @property
+    def grid(self):
+        """`Grid` that holds the data"""
+        return self._grid
+
+    @property
+    def window(self):
+        """(x0, y0, nx, ny) index window in `grid`"""
+        return self._window
+
+    @property
+    def nx(self):
+        """number of points in x"""
+        return self._window[2]
+
+    @property
+    def ny(self):
+        """number of points in y"""
+        return self._window[3]
+
+    @property
+    def x0(self):
+        """x location of the window origin"""
+        return self._grid.xy_from_index(self._window[0], self._window[1])[0]
+
+    @property
+    def y0(self):
+        """y location of the window origin"""
+        return self._grid.xy_from_index(self._window[0], self._window[1])[1]
+
+    @property
+    def dx(self):
+        """separation between points in x"""
+        return self._grid.dx
+
+    @property
+    def dy(self):
+        """separation between points in y"""
+        return self._grid.dy
+
+    @property
+    def rot(self):
+        """grid rotation angle in degrees azimuth"""
+        return self._grid.rot
+
+    @property
+    def rotation_cos_sine(self):
+        """grid rotation (cosine, sine)"""
+        return self._grid.rotation_cos_sine
+
+    @property
+    def is_color(self):
+        """`True` for a color grid"""
+        return self._grid.is_color
+
+    @property
+    def dtype(self):
+        """grid data dtype"""
+        return self._grid.dtype
+
+    @property
+    def coordinate_system(self):
+        """grid coordinate system"""
+        return self._grid.coordinate_system
+
+    @property
+    def unit_of_measure(self):
+        """grid data unit of measure"""
+        return self._grid.unit_of_measure
+
+    def properties(self):
+        """
+        Grid properties dictionary of the window, see `Grid.properties`.
+        """
+        p = self._grid.properties()
+        p['nx'] = self.nx
+        p['ny'] = self.ny
+        p['x0'], p['y0'] = self._grid.xy_from_index(self._window[0], self._window[1])
+        return p
+
+    def xy_from_index(self, ix, iy):
+        """
+        Return the location of window index ix, iy on the grid plane.
+
+        :param ix:  window index x, float or numpy array
+        :param iy:  window index y, float or numpy array
+        """
+        return self._grid.xy_from_index(ix + self._window[0], iy + self._window[1])
+
+    def index_from_xy(self, x, y):
+        """
+        Return the fractional window indexes of locations on the grid plane, the inverse of `xy_from_index`.
+
+        :param x:   x location, float or numpy array
+        :param y:   y location, float or numpy array
+        :returns:   (ix, iy) fractional window indexes
+        """
+        ix, iy = self._grid.index_from_xy(x, y)
+        return ix - self._window[0], iy - self._window[1]
+
+    def extent_2d(self):
+        """
+        Return the 2D extent of the window on the grid plane, to the outer edge of the grid cells.
+
+        :returns: (min_x, min_y, max_x, max_y)
+        """
+        x, y = self.xy_from_index(np.array([-0.5, self.nx - 0.5, self.nx - 0.5, -0.5]),
+                                  np.array([-0.5, -0.5, self.ny - 0.5, self.ny - 0.5]))
+        return x.min(), y.min(), x.max(), y.max()
+
+    def np(self, dtype=None, window=None, out=None):
+        """
+        Return a numpy array of the window values, see `Grid.np`.
+
+        :param dtype:   desired data type, default is the grid dtype
+        :param window:  (ix0, iy0, nx, ny) integer index window in this window, default is the whole window
+        :param out:     optional numpy array to receive the data
+        """
+
+        wx0, wy0, wnx, wny = self._window
+        if window is None:
+            window = (0, 0, wnx, wny)
+        ix0, iy0, nx, ny = window
+        if ((ix0 < 0) or (iy0 < 0) or (nx <= 0) or (ny <= 0) or
+                (ix0 + nx > wnx) or (iy0 + ny > wny)):
+            raise GridException(_t('Window ({},{},{},{}) out of bounds ({},{})').
+                                format(ix0, iy0, nx, ny, wnx, wny))
+        return self._grid.np(dtype=dtype, window=(wx0 + ix0, wy0 + iy0, nx, ny), out=out)
+
+    def xy_block(self, iy0=0, ny=None):
+        """
+        Return (x, y, z) location arrays of a block of window rows, see `Grid.xy_block`.
+
+        :param iy0: first row, default is 0
+        :param ny:  number of rows, default is to the last row
+        """
+        if ny is None:
+            ny = self.ny - iy0
+        wx0, wy0, wnx, _ = self._window
+        return self._grid._xyz_index(np.arange(wx0, wx0 + wnx), np.arange(wy0 + iy0, wy0 + iy0 + ny))
+
+    def iter_blocks(self, rows=256, with_coords=True, dtype=None):
+        """
+        Iterate over the window in blocks of rows as numpy arrays, see `Grid.iter_blocks`.
+
+        :param rows:        number of rows in each block, default 256
+        :param with_coords: `True` (default) to also return the locations of each point in the block.
+        :param dtype:       data type for the values, default is the grid dtype
+        :returns:           iterator of (iy0, data, x, y, z) if `with_coords` is `True`, otherwise (iy0, data).
+        """
+
+        rows = max(1, int(rows))
+        for iy0 in range(0, self.ny, rows):
+            ny = min(rows, self.ny - iy0)
+            data = self.np(dtype=dtype, window=(0, iy0, self.nx, ny))
+            if with_coords:
+                x, y, z = self.xy_block(iy0, ny)
+                yield iy0, data, x, y, z
+            else:
+                yield iy0, data
+
+    def statistics(self, percentiles=None, bins=None, threads=None, rows=256):
+        """
+        Return window data statistics as a dictionary, see `Grid.statistics`.
+
+        :param percentiles: list of percentiles (0 to 100) to calculate exactly, default none.
+        :param bins:        number of histogram bins on the data range, default no histogram.
+        :param threads:     maximum number of threads, default is the number of processors.
+        :param rows:        number of rows read together, default 256.
+        """
+
+        if self.is_color:
+            raise GridException(_t('Window statistics are not supported for color grids.'))
+
+        def blocks():
+            for _, data in self.iter_blocks(rows=rows, with_coords=False, dtype=np.float64):
+                yield data
+
+        return gxgrdst.statistics(blocks, percentiles=percentiles, bins=bins, threads=threads)
+
+    def sample(self, x, y, method=gxgrdsmp.SAMPLE_LINEAR, threads=None):
+        """
+        Return window values sampled at locations on the grid plane.
+
+        :param x:       x locations, numpy array
+        :param y:       y locations, numpy array
+        :param method:  `geosoft.gxpy.grid_sample.SAMPLE_NEAREST`, `SAMPLE_LINEAR` (default) or `SAMPLE_CUBIC`
+        :param threads: maximum number of threads, default is the number of processors
+        :returns:       numpy array of values shaped like `x`, `numpy.nan` outside the window. Color grids
+                        return int color values.
+
+        Values are read through the grid `tile_cache`, and points near the window edge are interpolated from
+        the window points only, as they would be from a grid of the window.
+        """
+
+        wx0, wy0, wnx, wny = self._window
+        values = self._grid.tile_cache.values
+
+        def gather(ix, iy):
+            return values(ix + wx0, iy + wy0)
+
+        fx, fy = self.index_from_xy(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        threads = _sample_threads(self._grid.tile_cache, fx, fy, wnx, wny, wx0, wy0, threads)
+        return gxgrdsmp.interpolate(gather, fx, fy, wnx, wny, method=method, is_color=self.is_color,
+                                    threads=threads)
+
+    def get_value(self, x, y):
+        """
+        Return a window value at a point, see `Grid.get_value`.
+
+        :param x: X location on the grid plane
+        :param y: Y location on the grid plane
+        :returns: grid value, or None if outside of the window or next to a dummy
+        """
+        wx0, wy0, wnx, wny = self._window
+        value = self._grid.tile_cache.value
+        fx, fy = self.index_from_xy(float(x), float(y))
+        return _point_value(lambda ix, iy: value(ix + wx0, iy + wy0), fx, fy, wnx, wny, self.is_color)
+
+    def to_grid(self, file_name=None, overwrite=False):
+        """
+        Write the window to a new grid.
+
+        :param file_name:   name for the new grid, default is constructed from the grid name
+        :param overwrite:   True to overwrite existing file, default is False
+        :returns:           `Grid` instance
+        """
+        return Grid.index_window(self._grid, file_name, *self._window, overwrite=overwrite)
 
 
 class Grid(gxgm.Geometry):
@@ -204,9 +989,10 @@ class Grid(gxgm.Geometry):
         :meth:`open`              open an existing grid/image
         :meth:`new`               create a new grid/image
         :meth:`copy`              create a copy
-        :meth:`index_window`      create a windowed grid based on grid indexes
+        :meth:`index_window`      create a windowed grid or view from grid indexes
         :meth:`from_data_array`   create a new grid from a 2d data array
         :meth:`minimum_curvature` create by fitting a minimum-curvature surface to located data.
+        :meth:`local_gridding`    create by local interpolation of the nearest located data.
         ========================= ==============================================================
 
     A grid instance supports iteration that yields (x, y, z, grid_value) by points along rows.
@@ -302,11 +1088,11 @@ class Grid(gxgm.Geometry):
                 if pop:
                     gx.pop_resource(self._open)
                 self._open = None
-                self._buffer_np = None
                 self._buffer_x = None
                 self._buffer_y = None
                 self._cs = None
                 self._gxpg = None
+                self._tile_cache = None
 
     def __repr__(self):
         return "{}({})".format(self.__class__, self.__dict__)
@@ -336,13 +1122,13 @@ class Grid(gxgm.Geometry):
         self._metadata_changed = False
         self._metadata_root = ''
         self._img = None
-        self._buffered_row = None
-        self._buffer_np = None
         self._buffered_xy = None
         self._buffer_x = None
         self._buffer_y = None
         self._cs = None
         self._gxpg = None
+        self._reprojected = False
+        self._tile_cache = None
 
         # build a file name
         if in_memory:
@@ -464,6 +1250,7 @@ class Grid(gxgm.Geometry):
             if not coordinate_system:
                 coordinate_system = grd.coordinate_system
             grd.gximg.create_projected3(coordinate_system.gxipj, cell_size, expand)
+            grd._reprojected = True
             grd._cs = None
             grd._cos_rot = 1.0
             grd._sin_rot = 0.0
@@ -503,7 +1290,7 @@ class Grid(gxgm.Geometry):
     def minimum_curvature(cls, data,
                           unit_of_measure=None,
                           file_name=None, overwrite=False,
-                          max_segments=1000,
+                          max_segments=None,
                           coordinate_system=None,
                           cs='',
                           area=('', '', '', ''),
@@ -519,7 +1306,8 @@ class Grid(gxgm.Geometry):
                           pastol='100',
                           itrmax='',
                           ti='',
-                          icgr=''):
+                          icgr='',
+                          rangrid=True):
         """
         Create a minimum-curvature surface grid from (x, y, value) located data.
 
@@ -532,7 +1320,7 @@ class Grid(gxgm.Geometry):
         :param file_name:   name of the grid file, None for a temporary grid. See `supported file formats
                             <https://geosoftgxdev.atlassian.net/wiki/display/GXDEV92/Grid+File+Name+Decorations>`_)
         :param overwrite:   True to overwrite existing file
-        :param max_segments:   Maximum number of line segments if using a callback, defaults to 1000.
+        :param max_segments:   Deprecated in 9.6, not used.
         :param coordinate_system:   coordinate system
 
         Gridding parameters follow the nomenclature of the rangrid.con file:
@@ -591,17 +1379,22 @@ class Grid(gxgm.Geometry):
                         factor close to half the nominal data spacing, although in most
                         situations the default is fine.  This parameter effects the
                         length of time it takes to find a solution.
+        :param rangrid: `True` (default) to grid with the Geosoft rangrid gridder, `geosoft.gxapi.GXRGRD`.
+                        `False` to grid in numpy by `geosoft.gxpy.grid_mincurv`, which does not create a
+                        temporary database or control file. The parameters are the same but the grids differ:
+                        rangrid stops iterating on the change of the grid values in an iteration, so its grids
+                        are usually smoother and less converged than the numpy grids, which stop on the
+                        estimated remaining correction.
 
         **The** `data` **parameter:**
 
         The data can be provided to the gridding algorithm either as a list array, a callback function that
-        returns list array segments, or a `geosoft.gxpy.gdb.Geosoft_database` instance. In the case of a list or
-        a callback, a temporary database is constructed internally.
+        returns list array segments, or a `geosoft.gxpy.gdb.Geosoft_database` instance. The data is read into
+        numpy arrays and written to a temporary database as a single line for rangrid, or gridded by
+        `geosoft.gxpy.grid_mincurv` if `rangrid` is `False`.
 
         A callback is passed a sequence number, 0, 1, 2, ... and is expected to return a list array with each call
-        or None when there is no more data.  See the example below. When a callback is used, the `max_segments`
-        parameter sets the maximum number of lines for the temporary database as each return from the
-        callback will create a new line in the internal temporary database.
+        or None when there is no more data.  See the example below.
 
         If a database instance is passed it must be the first item in a tuple of 2 or 4 items:
         (gdb_instance, value_channel) or (gdb_instance, value_channel, x_channel, y_channel).
@@ -637,37 +1430,66 @@ class Grid(gxgm.Geometry):
             grid = gxgrd.Grid.minimum_curvature(feed_data, cs=1.)
 
         .. versionadded:: 9.4
+
+        .. versionchanged:: 9.6 added `rangrid`, `False` to grid in numpy by `geosoft.gxpy.grid_mincurv`.
+
+        .. deprecated:: 9.6 `max_segments` is not used, data from a callback is gathered into a single
+            segment.
         """
 
-        def gdb_from_callback(callback):
-            _gdb = gxgdb.Geosoft_gdb.new(max_lines=max_segments)
-            channels = ('x', 'y', 'v')
-            il = 0
-            xyz_list = callback(il)
-            while xyz_list is not None:
-                _gdb.write_line('L{}'.format(il), xyz_list, channels=channels)
-                il += 1
-                xyz_list = callback(il)
-            _gdb.xyz_channels = channels[:2]
-            return _gdb
-
-        def gdb_from_data(_d):
-            def _data(i):
-                if i == 0:
-                    return _d
-                else:
-                    return None
-            return gdb_from_callback(_data)
+        def param(value, cast=float):
+            if value is None or (isinstance(value, str) and not value.strip()):
+                return None
+            return cast(value)
+
+        if max_segments is not None:
+            warnings.warn(_t('minimum_curvature max_segments is deprecated and not used.'), DeprecationWarning,
+                          stacklevel=2)
+
+        if rangrid:
+            return cls._rangrid(data, unit_of_measure, file_name, overwrite, coordinate_system,
+                                (cs, area, bclip, logopt, logmin, idsf, bkd, srd, iwt, edgclp,
+                                 tol, pastol, itrmax, ti, icgr))
+
+        xyv, gdb, vc = _located_data(data)
 
-        # create a database from the data
+        def default(value, d):
+            return d if value is None else value
+
+        try:
+            grid_data, properties = gxgrdmc.minimum_curvature(
+                xyv[:, 0], xyv[:, 1], xyv[:, 2],
+                cs=param(cs),
+                area=tuple(param(a) for a in area),
+                bclip=bool(param(bclip, int)),
+                logopt=default(param(logopt, int), 0),
+                logmin=default(param(logmin), 1.),
+                idsf=default(param(idsf, int), 1),
+                bkd=param(bkd),
+                srd=param(srd),
+                iwt=default(param(iwt), 2.),
+                edgclp=default(param(edgclp, int), -1),
+                tol=param(tol),
+                pastol=default(param(pastol), 100.),
+                itrmax=default(param(itrmax, int), 200),
+                ti=default(param(ti), 0.),
+                icgr=default(param(icgr, int), 8))
+        except gxgrdmc.MinimumCurvatureException as e:
+            raise GridException(str(e))
+
+        return cls._from_located(grid_data, properties, file_name, overwrite, coordinate_system, unit_of_measure,
+                                 gdb, vc)
+
+    @classmethod
+    def _rangrid(cls, data, unit_of_measure, file_name, overwrite, coordinate_system, parameters):
+        """ `minimum_curvature` by `geosoft.gxapi.GXRGRD` from a database and a rangrid control file"""
+
+        cs, area, bclip, logopt, logmin, idsf, bkd, srd, iwt, edgclp, tol, pastol, itrmax, ti, icgr = parameters
+
+        # a temporary database unless the data is in a database
         xc, yc = ('x', 'y')
         discard = False
-        if callable(data):
-            gdb = gdb_from_callback(data)
-            vc = 'v'
-            discard = True
-
-        elif isinstance(data, tuple):
+        if isinstance(data, tuple):
             gdb = data[0]
             vc = data[1]
             if len(data) == 4:
@@ -675,11 +1497,13 @@ class Grid(gxgm.Geometry):
                 yc = data[3]
             else:
                 xc, yc, _ = gdb.xyz_channels
-            discard = True
-
         else:
-            gdb = gdb_from_data(data)
+            xyv, _, _ = _located_data(data)
             vc = 'v'
+            gdb = gxgdb.Geosoft_gdb.new()
+            gdb.write_line('L0', xyv, channels=(xc, yc, vc))
+            gdb.xyz_channels = (xc, yc)
+            discard = True
 
         if tol and float(tol) <= 0.:
             tol = 1.0e-25
@@ -721,6 +1545,83 @@ class Grid(gxgm.Geometry):
 
         return grd
 
+    @classmethod
+    def _from_located(cls, grid_data, properties, file_name, overwrite, coordinate_system, unit_of_measure,
+                      gdb=None, value_channel=None):
+        """ new float grid from gridded located data"""
+
+        if file_name is None:
+            file_name = gx.gx().temp_file('grd(GRD)')
+        elif os.path.exists(file_name):
+            if overwrite:
+                gxu.delete_files_by_root(file_name)
+            else:
+                raise GridException(_t('Cannot overwrite existing file: {}').format(file_name))
+
+        properties['dtype'] = np.float32
+        grd = cls.new(file_name, properties=properties, overwrite=overwrite)
+        grd.write_rows(grid_data.astype(np.float32))
+        grd = reopen(grd)
+
+        if coordinate_system is None and gdb is not None:
+            coordinate_system = gdb.coordinate_system
+        if coordinate_system is not None:
+            grd.coordinate_system = coordinate_system
+        if unit_of_measure is None and gdb is not None:
+            unit_of_measure = gxgdb.Channel(gdb, value_channel).unit_of_measure
+        if unit_of_measure is not None:
+            grd.unit_of_measure = unit_of_measure
+
+        return grd
+
+    @classmethod
+    def local_gridding(cls, data, method=gxgrdlcl.METHOD_IDW, unit_of_measure=None, file_name=None,
+                       overwrite=False, coordinate_system=None, **kwargs):
+        """
+        Create a grid from (x, y, value) located data by local interpolation of the nearest data points.
+
+        :param data:        list of [(x, y, value), ...] or a callback that returns lists, or a tuple
+                            (gdb, value_channel, x_channel, y_channel), as for `minimum_curvature`. Database
+                            lines are read one at a time.
+        :param method:      gridding method:
+
+            ============================ ==================================================================
+            grid_local.METHOD_IDW        inverse-distance weighted mean of the nearest points (default)
+            grid_local.METHOD_NEAREST    value of the nearest point
+            grid_local.METHOD_NATURAL    discrete natural-neighbour (Sibson) interpolation
+            ============================ ==================================================================
+
+        :param unit_of_measure: string unit of measurement descriptor.
+        :param file_name:   name of the grid file, None for a temporary grid.
+        :param overwrite:   True to overwrite existing file
+        :param coordinate_system:   coordinate system, default is the database coordinate system
+        :param kwargs:      gridding parameters of the method, see `geosoft.gxpy.grid_local.idw`,
+                            `geosoft.gxpy.grid_local.nearest` and `geosoft.gxpy.grid_local.natural_neighbour`.
+                            For example `cs` is the cell size and `bkd` is the blanking distance.
+
+        Local interpolation is much faster than `minimum_curvature` for dense data, such as drone magnetic
+        surveys.
+
+        .. code::
+
+            import geosoft.gxpy.grid as gxgrd
+            import geosoft.gxpy.grid_local as gxgrdlcl
+
+            grid = gxgrd.Grid.local_gridding((gdb, 'tmi'), cs=5., power=2., max_neighbours=12, bkd=25.)
+            grid = gxgrd.Grid.local_gridding(xyv, method=gxgrdlcl.METHOD_NATURAL, cs=1.)
+
+        .. versionadded:: 9.6
+        """
+
+        xyv, gdb, vc = _located_data(data)
+        try:
+            grid_data, properties = gxgrdlcl.gridding(xyv[:, 0], xyv[:, 1], xyv[:, 2], method=method, **kwargs)
+        except gxgrdlcl.GridLocalException as e:
+            raise GridException(str(e))
+
+        return cls._from_located(grid_data, properties, file_name, overwrite, coordinate_system, unit_of_measure,
+                                 gdb, vc)
+
     def __iter__(self):
         return self
 
@@ -743,13 +1644,9 @@ class Grid(gxgm.Geometry):
 
         x, y, z = self.xyz((ix, iy))
 
-        if self._buffered_row != iy:
-            self._buffered_row = iy
-            self._buffer_np = self.read_row(self._buffered_row).np
-
-        v = self._buffer_np[ix]
+        v = self.tile_cache.value(ix, iy)
         if self._is_int:
-            v = int(v)
+            v = int(v) if np.isfinite(v) else gxapi.iDUMMY
             if v == gxapi.iDUMMY:
                 v = None
         elif np.isnan(v):
@@ -758,6 +1655,32 @@ class Grid(gxgm.Geometry):
             v = float(v)
         return x, y, z, v
 
+    @property
+    def tile_cache(self):
+        """
+        `Tile_cache` used for random access to grid values by `get_value`, indexing and
+        `geosoft.gxpy.grid_utility.sample`. A default cache is created on first use. Set to a new
+        `Tile_cache` to change the tile size or memory budget.
+
+        The cache is cleared when data is written through this class. If the grid pager from `gxpg` is
+        changed directly call `tile_cache.clear()`.
+
+        .. versionadded:: 9.6
+        """
+        if self._tile_cache is None:
+            self._tile_cache = Tile_cache(self)
+        return self._tile_cache
+
+    @tile_cache.setter
+    def tile_cache(self, cache):
+        if not isinstance(cache, Tile_cache):
+            raise GridException(_t('Expected a Tile_cache instance.'))
+        self._tile_cache = cache
+
+    def _tile_cache_clear(self):
+        if self._tile_cache is not None:
+            self._tile_cache.clear()
+
     def gxpg(self, copy=False):
         """
         Get a copy of the `geosoft.gxapi.GXPG` instance for the grid.
@@ -788,10 +1711,40 @@ class Grid(gxgm.Geometry):
         
         :param x: X location on the grid plane 
         :param y: Y location on the grid plane
-        :returns: grid value, or None if outside of grid area
-        
+        :returns: grid value, or None if outside of grid area or if a grid point used in the
+                  interpolation is dummy
+
+        .. versionchanged:: 9.6 values are read through the `tile_cache`. Use
+            `geosoft.gxpy.grid_utility.sample` to interpolate up to the edge of valid data.
+        """
+        fx, fy = self.index_from_xy(float(x), float(y))
+        return _point_value(self.tile_cache.value, fx, fy, self.nx, self.ny, self.is_color)
+
+    def _interpolate(self, fx, fy, method=gxgrdsmp.SAMPLE_LINEAR, chunk_size=gxgrdsmp.CHUNK_SIZE, threads=None):
+        """
+        Values at fractional grid indexes from the tile cache, see `geosoft.gxpy.grid_sample.interpolate`.
         """
-        return gxu.dummy_none(self.gximg.get_z(x, y))
+        threads = _sample_threads(self.tile_cache, fx, fy, self.nx, self.ny, threads=threads)
+        return gxgrdsmp.interpolate(self.tile_cache.values, fx, fy, self.nx, self.ny,
+                                    method=method, is_color=self.is_color,
+                                    chunk_size=chunk_size, threads=threads)
+
+    def index_from_xy(self, x, y):
+        """
+        Return the fractional grid indexes of locations on the grid plane, the inverse of `xy_from_index`.
+
+        :param x:   x location, float or numpy array
+        :param y:   y location, float or numpy array
+        :returns:   (ix, iy) fractional grid indexes
+
+        .. versionadded:: 9.6
+        """
+
+        x = x - self.x0
+        y = y - self.y0
+        if self.rot != 0.:
+            x, y = x * self._cos_rot - y * self._sin_rot, x * self._sin_rot + y * self._cos_rot
+        return x / self.dx, y / self.dy
 
     @classmethod
     def copy(cls, grd, file_name=None, dtype=None, overwrite=False, in_memory=False, mode=FILE_READWRITE):
@@ -843,39 +1796,38 @@ class Grid(gxgm.Geometry):
         return cls.open(file_name, dtype=dtype, mode=mode)
 
     @classmethod
-    def index_window(cls, grd, name=None, x0=0, y0=0, nx=None, ny=None, overwrite=False):
+    def index_window(cls, grd, name=None, x0=0, y0=0, nx=None, ny=None, overwrite=False, view=False):
         """
         Create a windowed instance of a grid.
         
-        :param grd:         :class:`Grid` instance
+        :param grd:         :class:`Grid` or :class:`Grid_window` instance
         :param name:        name for the windowed_grid, default is constructed from input grid
         :param x0:          integer index of the first X point
         :param y0:          integer index of the first Y point
         :param nx:          number of points in x
         :param ny:          number of points in y
         :param overwrite:   True to overwrite existing file, default is False
+        :param view:        True to return a :class:`Grid_window` view that shares the grid data. No file
+                            is created and `name` and `overwrite` are ignored. Use :meth:`Grid_window.to_grid`
+                            to write a view to a new grid.
+
+        Point (0, 0) of the window is located at point (`x0`, `y0`) of the grid, including for rotated grids.
 
         .. versionadded:: 9.2
+
+        .. versionchanged:: 9.6 added `view`, and the origin of windows of rotated grids is the grid point
+            location from `xy_from_index`.
         """
 
-        if not isinstance(grd, Grid):
+        if not isinstance(grd, (Grid, Grid_window)):
             grd = Grid.open(grd)
 
-        gnx = grd.nx
-        gny = grd.ny
-        if nx is None:
-            nx = gnx - x0
-        if ny is None:
-            ny = gny - y0
-        mx = x0 + nx
-        my = y0 + ny
-        if ((x0 >= gnx) or (y0 >= gny) or
-                (x0 < 0) or (y0 < 0) or
-                (nx <= 0) or (ny <= 0) or
-                (mx > gnx) or (my > gny)):
-            raise GridException(_t('Window x0,y0,mx,my({},{},{},{}) out of bounds ({},{})').
-                                format(x0, y0, mx, my, gnx, gny))
+        window = Grid_window(grd, x0, y0, nx, ny)
+        if view:
+            return window
 
+        grd = window.grid
+        x0, y0, nx, ny = window.window
         if name is None:
             path, file_name, root, ext, dec = name_parts(grd.file_name_decorated)
             name = '{}_({},{})({},{}){}'.format(root, x0, y0, nx, ny, ext)
@@ -883,20 +1835,7 @@ class Grid(gxgm.Geometry):
             overwrite = True
 
         # create new grid
-        p = grd.properties()
-        p['nx'] = nx
-        p['ny'] = ny
-        if grd.rot == 0.0:
-            p['x0'] = grd.x0 + grd.dx * x0
-            p['y0'] = grd.y0 + grd.dy * y0
-        else:
-            dx = grd.dx * x0
-            dy = grd.dy * y0
-            cos, sin = grd.rotation_cos_sine
-            p['x0'] = grd.x0 - dx * cos - dy * sin
-            p['y0'] = grd.y0 - dy * cos + dx * sin
-
-        window_grid = cls.new(name, p, overwrite=overwrite)
+        window_grid = cls.new(name, window.properties(), overwrite=overwrite)
         source_pager = grd.gxpg(copy=False)
         window_pager = window_grid.gxpg(copy=False)
         window_pager.copy_subset(source_pager, 0, 0, y0, x0, ny, nx)
@@ -1264,11 +2203,15 @@ class Grid(gxgm.Geometry):
 
         return properties
 
-    def statistics(self, gxst=None):
+    def statistics(self, gxst=None, percentiles=None, bins=None, threads=None, rows=256):
         """
         Calculate and return current grid data statistics as a dictionary.
 
-        :param gxst:    gxapi.GXST instance, to which stats will be accumulated, or None.
+        :param gxst:        gxapi.GXST instance, to which stats will be accumulated, or None.
+        :param percentiles: list of percentiles (0 to 100) to calculate exactly, default none.
+        :param bins:        number of histogram bins on the data range, default no histogram.
+        :param threads:     maximum number of threads, default is the number of processors.
+        :param rows:        number of grid rows read together, default 256.
 
         :returns: dictionary of grid data statistics:
 
@@ -1287,9 +2230,17 @@ class Grid(gxgm.Geometry):
         sum_power_4     sum of data**4
         num_data        number of valid data values
         num_dummy       number of dummy values
+        median          median, if `percentiles` are requested
+        percentiles     dictionary of values by percentile, if requested
+        histogram       (counts, edges) as `numpy.histogram`, if `bins` is requested
         =============== ============================
 
+        Statistics are calculated by `geosoft.gxpy.grid_statistics` from blocks of grid rows, except for
+        color grids and when `gxst` is provided, which accumulate the statistics in a `geosoft.gxapi.GXST`.
+
         .. versionadded:: 9.4
+
+        .. versionchanged:: 9.6 streaming statistics, added `percentiles`, `bins`, `threads` and `rows`
         """
 
         def get_st(what):
@@ -1298,6 +2249,14 @@ class Grid(gxgm.Geometry):
                 return None
             return v
 
+        if gxst is None and not self.is_color:
+
+            def blocks():
+                for _, data in self.iter_blocks(rows=rows, with_coords=False, dtype=np.float64):
+                    yield data
+
+            return gxgrdst.statistics(blocks, percentiles=percentiles, bins=bins, threads=threads)
+
         if gxst is None:
             gxst = gxapi.GXST.create()
         vv = gxvv.GXvv()
@@ -1425,6 +2384,7 @@ class Grid(gxgm.Geometry):
                 dvv.set_data(data[i, :])
             self._img.write_y(iy, ix0, 0, dvv.gxvv)
             iy += order
+        self._tile_cache_clear()
 
     def read_row(self, row=None, start=0, length=None):
         """
@@ -1501,6 +2461,7 @@ class Grid(gxgm.Geometry):
         if length is None:
             length = 0
         self._img.write_y(row, start, length, data.gxvv)
+        self._tile_cache_clear()
 
     def write_column(self, data, column=None, start=0, length=None):
         """
@@ -1527,6 +2488,7 @@ class Grid(gxgm.Geometry):
         if length is None:
             length = 0
         self._img.write_x(column, start, length, data.gxvv)
+        self._tile_cache_clear()
 
     def reset_read_write(self):
         """ Reset the default read/write to the grid row 0, column 0. """
@@ -1677,83 +2639,137 @@ class Grid(gxgm.Geometry):
         """
         return gxgm.Point2((self.extent_3d()), coordinate_system=self.coordinate_system)
 
-    def np(self, dtype=None):
+    def np(self, dtype=None, window=None, out=None):
         """
         Return a numpy array of grid values in the working dtype.
 
         :param dtype:   desired data type, default is the work_dtype, ignored for color grids
+        :param window:  (ix0, iy0, nx, ny) integer index window to read, default is the whole grid
+        :param out:     optional numpy array to receive the data, which must have the shape of the returned
+                        data. If `dtype` is not specified the dtype of `out` is used.
+
+        :returns: numpy array shape (ny, nx) or (ny, nx, 4) containing RGBA bytes in case of color grids.
+                  Dummies in float data are `numpy.nan`.
 
-        :returns: numpy array shape (nx, ny) or (nx, ny, 4) containing RGBA bytes in case of color grids
+        .. note:: The grid data is read from the grid pager in memory, one row or column of the window at a
+            time along its longer side.
+            Grids opened `FILE_READ` from a Geosoft GRD file are read directly from the file
+            by `geosoft.gxpy.grid_grd`, which memory-maps uncompressed grids.
 
         .. versionadded:: 9.3.1
+
+        .. versionchanged:: 9.6 read GRD files directly, added `window` and `out`
         """
 
-        nx = self.nx
-        ny = self.ny
-        if self.is_color:
-            data = np.zeros((ny, nx, 4), np.dtype(np.uint8))
-        else:
+        if window is None:
+            window = (0, 0, self.nx, self.ny)
+        ix0, iy0, nx, ny = window
+        if ((ix0 < 0) or (iy0 < 0) or (nx <= 0) or (ny <= 0) or
+                (ix0 + nx > self.nx) or (iy0 + ny > self.ny)):
+            raise GridException(_t('Window ({},{},{},{}) out of bounds ({},{})').
+                                format(ix0, iy0, nx, ny, self.nx, self.ny))
+
+        shape = (ny, nx, 4) if self.is_color else (ny, nx)
+        if out is not None:
+            if out.shape != shape:
+                raise GridException(_t('out shape {} does not match the data shape {}').format(out.shape, shape))
             if dtype is None:
-                dtype = self.dtype
-            data = np.zeros((ny, nx), dtype=dtype)
-        if self.gximg.query_kx() == -1:
-            for i in range(self.nx):
-                column = self.read_column(i).np
-                if self.is_color:
-                    column = _transform_color_int_to_rgba(column)
-                data[:, i] = column
-        else:
-            for i in range(self.ny):
-                row = self.read_row(i).np
-                if self.is_color:
-                    row = _transform_color_int_to_rgba(row)
-                data[i, :] = row
+                dtype = out.dtype
+        if dtype is None:
+            dtype = self.dtype
 
-        return data
+        data = self._grd_file_data(dtype, window)
+        if data is None:
+            data = self._pager_data(dtype, window)
 
-    def xyzv(self):
+        if out is None:
+            return data
+        out[...] = data
+        return out
+
+    def _grd_file_data(self, dtype=None, window=None, step=1):
+        """
+        Grid data read directly from an unchanged GRD file, or `None` if the grid cannot be read directly.
+        Every `step` point is read, see `geosoft.gxpy.grid_grd.read`.
         """
-        Return a numpy float array of (x, y, z, v) grid points.
 
-        x, y, z) is the location of each grid point in 3D space and v is the grid value at that location.
-        Dummies will be numpy.nan.
+        if (self._mode != FILE_READ or self._hgd or self._reprojected or
+                self._file_name is None or self.gridtype.upper() != 'GRD'):
+            return None
+        try:
+            hd = gxgrdgrd.read_header(self._file_name)
+            if (hd['nx'] != self.nx) or (hd['ny'] != self.ny):
+                return None
+            if self.is_color:
+                data, _ = gxgrdgrd.read(self._file_name, window=window, dtype=np.int32, step=step)
+                return _transform_color_int_to_rgba(data)
+            if dtype is None:
+                dtype = self.dtype
+            data, _ = gxgrdgrd.read(self._file_name, window=window, dtype=dtype, step=step)
+            return data
+        except (gxgrdgrd.GRDException, OSError, ValueError):
+            return None
+
+    def _pager_data(self, dtype, window, rgba=True, step=1):
+        """
+        Grid data read from the grid pager into a numpy array, every `step` point in x and y. The pager is
+        read a row or a column at a time along the longer side of the window, so the number of reads is the
+        shorter side. Color grids are returned as RGBA unless `rgba` is `False`.
+        """
+
+        ix0, iy0, nx, ny = window
+        pg = self.gxpg()
+        pg_dtype = gxu.dtype_gx(pg.e_type())
+        rows = range(iy0, iy0 + ny, step)
+        columns = range(ix0, ix0 + nx, step)
+        data = np.empty((len(rows), len(columns)), dtype=pg_dtype)
+        vv = gxvv.GXvv(dtype=pg_dtype)
+        if len(rows) <= len(columns):
+            vv.length = nx
+            for i, iy in enumerate(rows):
+                pg.read_row(iy, ix0, nx, vv.gxvv)
+                data[i, :] = vv.gxvv.get_data_np(0, nx, pg_dtype)[::step]
+        else:
+            vv.length = ny
+            for i, ix in enumerate(columns):
+                pg.read_col(ix, iy0, ny, vv.gxvv)
+                data[:, i] = vv.gxvv.get_data_np(0, ny, pg_dtype)[::step]
 
-        :returns: numpy array shape (nx, ny, 4)
+        if self.is_color:
+            if rgba:
+                return _transform_color_int_to_rgba(data)
+            return data.astype(dtype)
+
+        dtype = np.dtype(dtype)
+        if data.dtype.kind == 'f':
+            data = gxu.dummy_to_nan(data)
+        elif dtype.kind == 'f':
+            try:
+                dummy = data == gxu.gx_dummy(data.dtype)
+            except KeyError:
+                dummy = None
+            data = data.astype(dtype)
+            if dummy is not None:
+                data[dummy] = np.nan
+        return data.astype(dtype, copy=False)
 
-        .. versionadded:: 9.2
+    def xyzv(self):
         """
+        Return the (x, y, z, v) grid points as a `Grid_xyzv` array.
 
-        nx = self.nx
-        ny = self.ny
-        dx = self.dx
-        dy = self.dy
-        cs = self.coordinate_system
-        xyzv = np.zeros((ny, nx, 4))
-        xyzv[:, :, 0:2] = np.mgrid[0: (nx - 0.5) * dx: dx, 0: (ny - 0.5) * dy: dy].swapaxes(0, 2)
-
-        if self.rot != 0.:
-            x = xyzv[:, :, 0]
-            cosx = x * self._cos_rot
-            sinx = x * self._sin_rot
-            y = xyzv[:, :, 1]
-            cosy = y * self._cos_rot
-            siny = y * self._sin_rot
-            xyzv[:, :, 0] = cosx + siny
-            xyzv[:, :, 1] = cosy - sinx
+        (x, y, z) is the location of each grid point in 3D space and v is the grid value at that location.
+        Dummies will be numpy.nan. The array indexes like a numpy float array shaped (ny, nx, 4), but locations
+        are only calculated for the indexed points, and the values are held in the grid dtype.
 
-        xyzv += (self.x0, self.y0, 0, 0)
+        :returns: `Grid_xyzv` instance, shape (ny, nx, 4)
 
-        if cs.is_oriented:
-            xyzv[:, :, :3] = cs.xyz_from_oriented(xyzv[:, :, :3].reshape((-1, 3))).reshape((ny, nx, 3))
+        .. versionadded:: 9.2
 
-        if self.gximg.query_kx() == -1:
-            for i in range(self.nx):
-                xyzv[:, i, 3] = self.read_column(i).np
-        else:
-            for i in range(self.ny):
-                xyzv[i, :, 3] = self.read_row(i).np
+        .. versionchanged:: 9.6 values read by `np`, and returns a `Grid_xyzv`,
+                            use `numpy.asarray` or `Grid_xyzv.chunks` to get numpy arrays.
+        """
 
-        return xyzv
+        return Grid_xyzv(self)
 
     def xyz(self, item):
         """
@@ -1796,6 +2812,286 @@ class Grid(gxgm.Geometry):
 
         return ggx, ggy, ggz
 
+    def xy_block(self, iy0=0, ny=None):
+        """
+        Return (x, y, z) location arrays of a block of grid rows.
+
+        :param iy0: first row, default is 0
+        :param ny:  number of rows, default is to the last row
+        :returns:   (x, y, z) numpy float arrays, each shaped (ny, nx). For grids in an oriented coordinate
+                    system the locations are in the base coordinate system, otherwise z is 0.
+
+        .. versionadded:: 9.6
+        """
+
+        if ny is None:
+            ny = self.ny - iy0
+        return self._xyz_index(np.arange(self.nx), np.arange(iy0, iy0 + ny))
+
+    def _xyz_index(self, ix, iy):
+        """
+        (x, y, z) location arrays shaped (len(iy), len(ix)) of the grid points at column indexes `ix` in
+        rows `iy`.
+        """
+
+        x = np.asarray(ix, dtype=np.float64) * self.dx
+        y = (np.asarray(iy, dtype=np.float64) * self.dy).reshape((-1, 1))
+        if self.rot != 0.:
+            xx = x * self._cos_rot + y * self._sin_rot
+            yy = y * self._cos_rot - x * self._sin_rot
+        else:
+            xx, yy = np.broadcast_arrays(x, y)
+            xx = xx.copy()
+            yy = yy.copy()
+        xx += self.x0
+        yy += self.y0
+        zz = np.zeros(xx.shape)
+
+        cs = self.coordinate_system
+        if cs.is_oriented:
+            shape = xx.shape
+            xyz = cs.xyz_from_oriented(np.stack((xx, yy, zz), axis=-1).reshape((-1, 3))).reshape(shape + (3,))
+            xx, yy, zz = xyz[:, :, 0], xyz[:, :, 1], xyz[:, :, 2]
+
+        return xx, yy, zz
+
+    def iter_blocks(self, rows=256, with_coords=True, dtype=None):
+        """
+        Iterate over the grid in blocks of rows as numpy arrays.
+
+        Whole-grid calculations can stream through the blocks with bounded memory, replacing iteration
+        over the grid by cell.
+
+        :param rows:        number of rows in each block, default 256. The last block may have fewer rows.
+        :param with_coords: `True` (default) to also return the locations of each point in the block.
+        :param dtype:       data type for the values, default is the grid dtype
+        :returns:           iterator of (iy0, data, x, y, z) if `with_coords` is `True`, otherwise (iy0, data).
+                            `iy0` is the index of the first row in the block, `data` is the block of values
+                            as returned by `np`, and `x`, `y`, `z` are locations as returned by `xy_block`.
+
+        .. code::
+
+            import numpy as np
+            import geosoft.gxpy.grid as gxgrd
+
+            with gxgrd.Grid.open('mag.grd') as g:
+                total = 0.
+                for iy0, data, x, y, z in g.iter_blocks(with_coords=True):
+                    total += np.nansum(data)
+
+        .. versionadded:: 9.6
+        """
+
+        rows = max(1, int(rows))
+        for iy0 in range(0, self.ny, rows):
+            ny = min(rows, self.ny - iy0)
+            data = self.np(dtype=dtype, window=(0, iy0, self.nx, ny))
+            if with_coords:
+                x, y, z = self.xy_block(iy0, ny)
+                yield iy0, data, x, y, z
+            else:
+                yield iy0, data
+
+    def build_overviews(self, levels=None, method=gxgrdovr.METHOD_MEAN, rows=256, threads=None):
+        """
+        Write reduced-resolution overviews of the grid next to the grid file.
+
+        :param levels:  number of overview levels. Level `n` has grid points `2**n` times further apart
+                        than the grid. The default is enough levels to reduce the grid to 64 points or less.
+        :param method:  'mean' (default), 'nearest' or 'mode' (see `geosoft.gxpy.grid_overview`).
+                        Color grids require 'nearest' or 'mode'. Mean overviews ignore dummies.
+        :param rows:    number of grid rows read together, rounded up to a multiple of `2**levels`
+        :param threads: maximum number of threads, default is the number of processors
+        :returns:       list of overview file names, from level 1
+
+        Overviews are saved as GRD files named `<grid file>.ovr<level>.grd`. The grid is read once, and
+        each block of rows is reduced to all levels on a thread pool. Overviews that are older than the
+        grid file are ignored by `preview`, `image_file` and `geosoft.gxpy.agg.Aggregate_image`, which
+        use the smallest overview that meets the requested resolution.
+
+        .. versionadded:: 9.6
+        """
+
+        if self._file_name is None or self._hgd:
+            raise GridException(_t('Overviews require a grid file.'))
+        if method not in (gxgrdovr.METHOD_MEAN, gxgrdovr.METHOD_NEAREST, gxgrdovr.METHOD_MODE):
+            raise GridException(_t('Unknown overview method "{}"').format(method))
+        if self.is_color and method == gxgrdovr.METHOD_MEAN:
+            raise GridException(_t('Color grid overviews require the nearest or mode method.'))
+        if levels is None:
+            levels = gxgrdovr.default_levels(self.nx, self.ny)
+        levels = int(levels)
+        if levels <= 0:
+            return []
+
+        factor = 2 ** levels
+        rows = max(factor, ((int(rows) + factor - 1) // factor) * factor)
+        if threads is None:
+            threads = os.cpu_count() or 1
+        threads = max(1, threads)
+
+        properties = self.properties()
+        overviews = []
+        files = []
+        try:
+            for level in range(1, levels + 1):
+                ovr_file = gxgrdovr.file_name(self._file_name, level)
+                ovr = Grid.new(ovr_file + '(GRD)', gxgrdovr.properties(properties, level, method),
+                               overwrite=True)
+                overviews.append(ovr)
+                files.append(ovr_file)
+
+            def read(iy0):
+                window = (0, iy0, self.nx, min(rows, self.ny - iy0))
+                if self.is_color:
+                    data = self._pager_data(np.int32, window, rgba=False).astype(np.float64)
+                    data[data == gxapi.iDUMMY] = np.nan
+                    return data
+                return self.np(dtype=np.float64, window=window)
+
+            def write(iy0, reduced):
+                for level, (ovr, data) in enumerate(zip(overviews, reduced), 1):
+                    if not np.issubdtype(ovr.dtype, np.floating):
+                        data = np.where(np.isnan(data), gxgrdgrd.dummy_value(ovr.dtype), np.rint(data))
+                        data = data.astype(ovr.dtype)
+                    ovr.write_rows(data, 0, iy0 // 2 ** level)
+
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                pending = deque()
+                for iy0 in range(0, self.ny, rows):
+                    data = read(iy0)
+                    pending.append((iy0, pool.submit(gxgrdovr.reduce, data, levels, method)))
+                    if len(pending) > threads:
+                        iy, future = pending.popleft()
+                        write(iy, future.result())
+                while pending:
+                    iy, future = pending.popleft()
+                    write(iy, future.result())
+
+        finally:
+            for ovr in overviews:
+                ovr.close()
+
+        return files
+
+    @property
+    def overviews(self):
+        """
+        List of current overviews of this grid as (level, file name), see `build_overviews`.
+
+        .. versionadded:: 9.6
+        """
+        if self._file_name is None:
+            return []
+        return gxgrdovr.overview_files(self._file_name)
+
+    def preview(self, pix_width=None, pix_height=None, dtype=None):
+        """
+        Grid data at a reduced resolution, from the smallest overview that meets the resolution.
+
+        :param pix_width:   minimum number of grid points in x, default is the grid `nx`
+        :param pix_height:  minimum number of grid points in y, default is no requirement
+        :param dtype:       data type, default is the grid or overview dtype
+        :returns:           (data, properties) of the overview as returned by `np` and `properties`.
+                            Without a suitable overview the grid is decimated by the largest power of two
+                            that meets the resolution, and only the decimated rows are read.
+
+        .. versionadded:: 9.6
+        """
+
+        if self._file_name is not None:
+            ovr_file = gxgrdovr.select(self._file_name, pix_width, pix_height)
+            if ovr_file != self._file_name:
+                with Grid.open(ovr_file, dtype=dtype) as ovr:
+                    return ovr.np(dtype=dtype), ovr.properties()
+
+        level = 0
+        if pix_width or pix_height:
+            while 2 ** (level + 1) <= max(self.nx, self.ny):
+                f = 2 ** (level + 1)
+                if ((pix_width and (self.nx + f - 1) // f < pix_width) or
+                        (pix_height and (self.ny + f - 1) // f < pix_height)):
+                    break
+                level += 1
+        f = 2 ** level
+        if dtype is None:
+            dtype = self.dtype
+        window = (0, 0, self.nx, self.ny)
+        data = self._grd_file_data(dtype, window, step=f)
+        if data is None:
+            data = self._pager_data(dtype, window, step=f)
+        properties = self.properties()
+        if level:
+            properties = gxgrdovr.properties(properties, level, gxgrdovr.METHOD_NEAREST)
+        return data, properties
+
+    def thumbnail(self, image_file=None, pix_width=256, pix_height=None, **kwargs):
+        """
+        Render the grid as a PNG image in numpy, from the smallest overview that meets the image size.
+
+        :param image_file:  PNG file name, default is a temporary file
+        :param pix_width:   image width in pixels, default 256
+        :param pix_height:  image height in pixels, default keeps the grid aspect ratio
+        :param kwargs:      rendering options of `geosoft.gxpy.grid_render.render`, such as `color_map`, which
+                            may be a `geosoft.gxpy.group.Color_map`, a stretch `method`, and `shade`. The default
+                            colours are linearly stretched over the data range.
+        :returns:           PNG file name
+
+        Unlike `image_file` no map or aggregate is created. See `geosoft.gxpy.grid_render.thumbnail` to render
+        GRD files without the Geosoft runtime.
+
+        .. versionadded:: 9.6
+        """
+
+        width, height = gxrndr.image_size(self.properties(), pix_width, pix_height)
+        data, properties = self.preview(width, height, dtype=np.float64)
+        data, properties = gxrndr.resize(data, properties, width, height)
+        if image_file is None:
+            image_file = gx.gx().temp_file('.png')
+        return gxrndr.write_png(image_file, gxrndr.render(data, properties, **kwargs))
+
+    def to_geotiff(self, file_name, dtype=None, tile_size=gxgrdtif.TILE_SIZE, overviews=None, method='mean',
+                   compress_level=gxgrdtif.COMPRESS_LEVEL, threads=None, epsg=None, overwrite=False):
+        """
+        Export the grid to a tiled, deflate-compressed Cloud-Optimized GeoTIFF.
+
+        :param file_name:       GeoTIFF file name
+        :param dtype:           data type written, default is the grid dtype
+        :param tile_size:       tile dimension in pixels, a multiple of 16, default 256
+        :param overviews:       number of overviews, default is enough to fit the smallest overview in one tile
+        :param method:          overview method, 'mean' (default) or 'nearest'
+        :param compress_level:  zlib compression level 1 to 9, 0 for no compression
+        :param threads:         maximum number of compression threads, default is the number of processors
+        :param epsg:            EPSG code of the grid coordinate system. If not specified a known coordinate
+                                system is written as ESRI well-known-text, which GDAL understands.
+        :param overwrite:       `True` to overwrite an existing file
+        :returns:               GeoTIFF file name
+
+        The grid is read one band of tiles at a time and overviews are reduced as the grid is read, so the
+        grid is read once and memory does not depend on the grid size. Dummies are written as the GDAL
+        nodata value. See `geosoft.gxpy.grid_geotiff`, which also reads the file.
+
+        .. versionadded:: 9.6
+        """
+
+        if self.is_color:
+            raise GridException(_t('Color grids cannot be exported to GeoTIFF.'))
+
+        wkt = None
+        if epsg is None and gxcs.is_known(self.coordinate_system):
+            wkt = self.coordinate_system.esri_wkt or None
+
+        def source(window):
+            return self.np(dtype=np.float64, window=window)
+
+        try:
+            return gxgrdtif.write(file_name, source, self.properties(), dtype=dtype or self.dtype,
+                                  tile_size=tile_size, overviews=overviews, method=method,
+                                  compress_level=compress_level, threads=threads, epsg=epsg, wkt=wkt,
+                                  overwrite=overwrite)
+        except gxgrdtif.GeoTIFFException as e:
+            raise GridException(str(e))
+
     def image_file(self, image_file_name=None, image_type=gxmap.RASTER_FORMAT_PNG, pix_width=None,
                    shade=False, color_map=None, contour=None, display_area=None, pix_32_bit=False):
         """
@@ -1975,12 +3271,18 @@ def image_file(grid_file, image_file=None, image_type=gxmap.RASTER_FORMAT_PNG, p
 
     :return:            image file name.
 
+    If the grid has overviews (see `Grid.build_overviews`) the smallest overview that is at least
+    `pix_width` points wide is rendered.
+
     .. versionadded:: 9.3.1
+
+    .. versionchanged:: 9.6 renders from grid overviews
     """
 
     if color_map is None:
         with Grid.open(grid_file) as g:
             color_map = g.get_default_color_map()
+    grid_file = gxgrdovr.select(grid_file, pix_width)
 
     with gxagg.Aggregate_image.new(grid_file, shade=shade, color_map=color_map, contour=contour) as agg:
         return agg.image_file(image_file, image_type=image_type, pix_width=pix_width,
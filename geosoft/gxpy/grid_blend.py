@@ -0,0 +1,279 @@
+"""
+Blending of overlapping grid data for grid mosaics.
+
+A mosaic is built one output tile at a time. The values of each input grid that covers a tile are added to a
+`Blend` accumulator for the tile, and the blended tile is then written to the mosaic, so memory depends on the
+tile size and not on the size of the mosaic. This module does not require the Geosoft runtime.
+
+:Constants:
+    :BLEND_LAST:    0 the last valid input value
+    :BLEND_MEAN:    1 mean of the valid input values
+    :BLEND_FEATHER: 2 mean weighted by the distance from the edge of each input grid
+    :BLEND_MEDIAN:  3 median of the valid input values
+
+.. seealso:: `geosoft.gxpy.grid_utility.grid_mosaic`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_blend.py>`_
+
+.. versionadded:: 9.6
+"""
+import math
+import warnings
+import numpy as np
+
+import geosoft
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+BLEND_LAST = 0
+BLEND_MEAN = 1
+BLEND_FEATHER = 2
+BLEND_MEDIAN = 3
+
+# fractional index tolerance when snapping grid extents to the mosaic lattice
+_TOLERANCE = 1.0e-6
+
+# smallest feather weight, for points just outside the edge points
+_MIN_WEIGHT = 0.001
+
+# color grid dummy, same as geosoft.gxapi.iDUMMY
+_COLOR_DUMMY = -2147483647
+
+
+class BlendException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_blend`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _corners(properties):
+    """ locations of the corner grid points"""
+    ix = np.array([0., properties['nx'] - 1, 0., properties['nx'] - 1])
+    iy = np.array([0., 0., properties['ny'] - 1, properties['ny'] - 1])
+    return gxgrdsmp.xy_from_index(properties, ix, iy)
+
+
+def index_extent(frame, properties):
+    """
+    Extent of a grid in the fractional grid indexes of a frame grid.
+
+    :param frame:       properties of the frame grid, uses 'x0', 'y0', 'dx', 'dy' and 'rot'
+    :param properties:  properties of the grid
+    :returns:           (ix_min, iy_min, ix_max, iy_max) fractional indexes in the frame
+
+    .. versionadded:: 9.6
+    """
+
+    fx, fy = gxgrdsmp.index_from_xy(frame, *_corners(properties))
+    return fx.min(), fy.min(), fx.max(), fy.max()
+
+
+def mosaic_properties(frame, properties_list):
+    """
+    Properties of a mosaic grid that covers a list of grids on the lattice of a frame grid.
+
+    :param frame:           properties of the grid that defines the cell size, rotation and lattice
+                            of the mosaic, usually the first grid.
+    :param properties_list: properties of each grid in the mosaic
+    :returns:               copy of `frame` with 'x0', 'y0', 'nx' and 'ny' of the mosaic
+
+    .. versionadded:: 9.6
+    """
+
+    if not properties_list:
+        raise BlendException(_t('At least one grid is required'))
+
+    extents = np.array([index_extent(frame, p) for p in properties_list])
+    ix0 = math.floor(extents[:, 0].min() + _TOLERANCE)
+    iy0 = math.floor(extents[:, 1].min() + _TOLERANCE)
+    ix1 = math.ceil(extents[:, 2].max() - _TOLERANCE)
+    iy1 = math.ceil(extents[:, 3].max() - _TOLERANCE)
+
+    mosaic = dict(frame)
+    x0, y0 = gxgrdsmp.xy_from_index(frame, ix0, iy0)
+    mosaic['x0'] = float(x0)
+    mosaic['y0'] = float(y0)
+    mosaic['nx'] = ix1 - ix0 + 1
+    mosaic['ny'] = iy1 - iy0 + 1
+    return mosaic
+
+
+def aligned_offset(mosaic, properties):
+    """
+    Index offset of a grid that shares the lattice of a mosaic.
+
+    :param mosaic:      mosaic grid properties
+    :param properties:  grid properties
+    :returns:           (ix, iy) integer index in the grid of the mosaic origin, or `None` if the grid
+                        points do not coincide with mosaic grid points.
+
+    .. versionadded:: 9.6
+    """
+
+    for k in ('dx', 'dy', 'rot'):
+        if abs(mosaic.get(k, 0.) - properties.get(k, 0.)) > _TOLERANCE * max(1., abs(mosaic.get(k, 0.))):
+            return None
+    fx, fy = gxgrdsmp.index_from_xy(properties, mosaic['x0'], mosaic['y0'])
+    ix = round(float(fx))
+    iy = round(float(fy))
+    if abs(fx - ix) > _TOLERANCE or abs(fy - iy) > _TOLERANCE:
+        return None
+    return ix, iy
+
+
+def tiles(nx, ny, tile_size=256):
+    """
+    Tile windows that cover a grid, row by row from the grid origin.
+
+    :param nx:          grid x dimension
+    :param ny:          grid y dimension
+    :param tile_size:   tile dimension in cells, default 256
+    :returns:           iterator of (ix0, iy0, nx, ny) windows
+
+    .. versionadded:: 9.6
+    """
+
+    tile_size = max(1, int(tile_size))
+    for iy0 in range(0, ny, tile_size):
+        for ix0 in range(0, nx, tile_size):
+            yield ix0, iy0, min(tile_size, nx - ix0), min(tile_size, ny - iy0)
+
+
+def feather_weights(fx, fy, nx, ny):
+    """
+    Feather weights of grid points, the distance in cells from the outside edge of the grid cells.
+
+    :param fx:  fractional x grid indexes, numpy array
+    :param fy:  fractional y grid indexes, numpy array
+    :param nx:  grid x dimension
+    :param ny:  grid y dimension
+    :returns:   numpy array of weights shaped like `fx`, 0.5 at edge points and always positive.
+
+    .. versionadded:: 9.6
+    """
+
+    d = np.minimum(np.minimum(fx, nx - 1 - fx), np.minimum(fy, ny - 1 - fy)) + 0.5
+    return np.maximum(d, _MIN_WEIGHT)
+
+
+class Blend:
+    """
+    Accumulate the values of overlapping grids in a tile.
+
+    :param shape:       tile shape (ny, nx)
+    :param mode:        `BLEND_LAST` (default), `BLEND_MEAN`, `BLEND_FEATHER` or `BLEND_MEDIAN`
+    :param is_color:    `True` for int color values, which can only be blended by `BLEND_LAST`
+
+    Values are added with `add`, and `result` returns the blended tile. Scalar values are float with
+    dummies as `numpy.nan`, color values are int with dummies `geosoft.gxapi.iDUMMY`.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, shape, mode=BLEND_LAST, is_color=False):
+
+        if mode not in (BLEND_LAST, BLEND_MEAN, BLEND_FEATHER, BLEND_MEDIAN):
+            raise BlendException(_t('Unknown blend mode {}').format(mode))
+        if is_color and mode != BLEND_LAST:
+            raise BlendException(_t('Color grids can only be blended by BLEND_LAST'))
+
+        self._shape = tuple(shape)
+        self._mode = mode
+        self._is_color = is_color
+        self._count = 0
+        if is_color:
+            self._value = np.full(self._shape, _COLOR_DUMMY, dtype=np.int32)
+        elif mode == BLEND_MEDIAN:
+            self._stack = []
+        else:
+            self._value = np.full(self._shape, np.nan)
+            if mode != BLEND_LAST:
+                self._value[...] = 0.
+                self._weight = np.zeros(self._shape)
+
+    @property
+    def count(self):
+        """number of grids added"""
+        return self._count
+
+    def add(self, values, weights=None, window=None):
+        """
+        Add grid values to the tile.
+
+        :param values:  numpy array of values, dummies `numpy.nan`, or int `geosoft.gxapi.iDUMMY` for color
+        :param weights: feather weights of the values, required for `BLEND_FEATHER`, see `feather_weights`
+        :param window:  (ix0, iy0, nx, ny) window in the tile covered by the values, default is the whole tile
+
+        .. versionadded:: 9.6
+        """
+
+        if window is None:
+            sl = (slice(None), slice(None))
+        else:
+            ix0, iy0, nx, ny = window
+            sl = (slice(iy0, iy0 + ny), slice(ix0, ix0 + nx))
+
+        if self._is_color:
+            valid = values != _COLOR_DUMMY
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            valid = ~np.isnan(values)
+        self._count += 1
+
+        if self._mode == BLEND_LAST:
+            np.copyto(self._value[sl], values, where=valid)
+
+        elif self._mode == BLEND_MEDIAN:
+            if window is None:
+                self._stack.append(values.copy())
+            else:
+                layer = np.full(self._shape, np.nan)
+                layer[sl] = values
+                self._stack.append(layer)
+
+        else:
+            if self._mode == BLEND_FEATHER:
+                if weights is None:
+                    raise BlendException(_t('BLEND_FEATHER requires weights'))
+                w = np.where(valid, weights, 0.)
+            else:
+                w = valid.astype(np.float64)
+            self._value[sl] += np.where(valid, values, 0.) * w
+            self._weight[sl] += w
+
+    def result(self):
+        """
+        The blended tile.
+
+        :returns:   numpy array shaped `shape`, float with `numpy.nan` where no grid has a valid value,
+                    or int32 color values.
+
+        .. versionadded:: 9.6
+        """
+
+        if self._is_color or self._mode == BLEND_LAST:
+            return self._value
+
+        if self._mode == BLEND_MEDIAN:
+            if not self._stack:
+                return np.full(self._shape, np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                return np.nanmedian(np.stack(self._stack), axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = self._value / self._weight
+        result[self._weight <= 0.] = np.nan
+        return result
@@ -0,0 +1,331 @@
+"""
+Vectorized contouring of grid data in numpy.
+
+`contours` threads contour lines through a grid of values by marching squares. Each grid cell is classified
+by which of its corners are at or above the contour level, and the contour crosses the cell edges that join
+a corner above the level to a corner below, at the linearly interpolated location. Cells with a dummy corner
+are not contoured, so contours end at the edges of dummy areas. Saddle cells, which have diagonally opposite
+corners above the level, are resolved by the mean of the four corners.
+
+Cell segments are oriented with values above the level on the left, so each crossing has at most one
+segment leaving and one arriving, and the segments are stitched into polylines by list ranking, all in
+numpy. Blocks of grid rows are classified in parallel. This module does not require the Geosoft runtime.
+
+:Constants:
+    :TILE_ROWS: 256 number of grid cell rows classified together, tiles are processed in parallel
+
+.. seealso:: `geosoft.gxpy.grid_utility.contour_points`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_contour.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+TILE_ROWS = 256
+
+# cell corners are bits 0 to 3, counter-clockwise from the origin corner, and cell edges are numbered
+# counter-clockwise from the bottom edge
+_CORNERS = np.array([(0., 0.), (1., 0.), (1., 1.), (0., 1.)])
+_EDGES = np.array([(0.5, 0.), (1., 0.5), (0.5, 1.), (0., 0.5)])
+_EDGE_CORNERS = ((0, 1), (1, 2), (3, 2), (0, 3))
+
+
+class ContourException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_contour`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _orient(case, e0, e1, corner):
+    """ segment (from, to) between two cell edges with the corner on the left if it is above the level"""
+
+    p = _EDGES[e0]
+    d = _EDGES[e1] - p
+    k = _CORNERS[corner] - p
+    left = (d[0] * k[1] - d[1] * k[0]) > 0.
+    if left == bool(case & (1 << corner)):
+        return e0, e1
+    return e1, e0
+
+
+def _case_segments():
+    """
+    Oriented edge segments of each of the 16 cell cases. Saddle cases have two segments, which depend on
+    whether the cell centre is above the level, the table for which is returned separately.
+    """
+
+    table = []
+    for case in range(16):
+        crossed = [e for e, (c0, c1) in enumerate(_EDGE_CORNERS) if bool(case & (1 << c0)) != bool(case & (1 << c1))]
+        if len(crossed) == 2:
+            corner = next(c for c in range(4) if case & (1 << c))
+            table.append([_orient(case, crossed[0], crossed[1], corner)])
+        else:
+            table.append([])
+
+    # saddles: isolate the corners that are not joined through the cell centre
+    below = {5: [(0, 3, 0), (1, 2, 2)], 10: [(0, 1, 1), (2, 3, 3)]}
+    above = {5: [(0, 1, 1), (2, 3, 3)], 10: [(0, 3, 0), (1, 2, 2)]}
+    saddle_below = {case: [_orient(case, e0, e1, c) for e0, e1, c in s] for case, s in below.items()}
+    saddle_above = {case: [_orient(case, e0, e1, c) for e0, e1, c in s] for case, s in above.items()}
+    return table, saddle_below, saddle_above
+
+
+_CASES, _SADDLE_BELOW, _SADDLE_ABOVE = _case_segments()
+
+
+def _edge_nodes(edge, j, i, nx, nh):
+    """ crossing node numbers of cell edges, horizontal edges are numbered first, then vertical edges """
+
+    if edge == 0:
+        return j * (nx - 1) + i
+    if edge == 2:
+        return (j + 1) * (nx - 1) + i
+    if edge == 3:
+        return nh + j * nx + i
+    return nh + j * nx + i + 1
+
+
+def _segments(block, level, iy0, ny):
+    """
+    Oriented segments (from, to) as crossing node numbers of the cells of a block of grid rows that starts
+    at row iy0, and the fractional grid indexes (ix, iy) of the crossing nodes.
+    """
+
+    nx = block.shape[1]
+    nh = ny * (nx - 1)
+    above = block >= level
+    case = (above[:-1, :-1].astype(np.uint8) | (above[:-1, 1:] << 1) | (above[1:, 1:] << 2) |
+            (above[1:, :-1] << 3))
+    valid = ~np.isnan(block)
+    valid = valid[:-1, :-1] & valid[:-1, 1:] & valid[1:, 1:] & valid[1:, :-1]
+    case[~valid] = 0
+
+    src = []
+    dst = []
+
+    def add(segments, j, i):
+        for e0, e1 in segments:
+            src.append(_edge_nodes(e0, j, i, nx, nh))
+            dst.append(_edge_nodes(e1, j, i, nx, nh))
+
+    for c in range(1, 15):
+        j, i = np.nonzero(case == c)
+        if not len(j):
+            continue
+        if c in _SADDLE_BELOW:
+            centre = (block[j, i] + block[j, i + 1] + block[j + 1, i + 1] + block[j + 1, i]) * 0.25 >= level
+            add(_SADDLE_ABOVE[c], j[centre] + iy0, i[centre])
+            add(_SADDLE_BELOW[c], j[~centre] + iy0, i[~centre])
+        else:
+            add(_CASES[c], j + iy0, i)
+
+    if not src:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(0), np.zeros(0)
+    src = np.concatenate(src).astype(np.int64)
+    dst = np.concatenate(dst).astype(np.int64)
+    nodes = np.unique(np.concatenate((src, dst)))
+    ix, iy = _node_index(block, level, nodes, iy0, ny)
+    return src, dst, nodes, ix, iy
+
+
+def _node_index(block, level, nodes, iy0, ny):
+    """ fractional grid indexes (ix, iy) of crossing nodes in a block of grid rows that starts at row iy0 """
+
+    nx = block.shape[1]
+    nh = ny * (nx - 1)
+    ix = np.empty(len(nodes))
+    iy = np.empty(len(nodes))
+
+    h = nodes < nh
+    j, i = np.divmod(nodes[h], nx - 1)
+    v0 = block[j - iy0, i]
+    ix[h] = i + (level - v0) / (block[j - iy0, i + 1] - v0)
+    iy[h] = j
+
+    j, i = np.divmod(nodes[~h] - nh, nx)
+    v0 = block[j - iy0, i]
+    ix[~h] = i
+    iy[~h] = j + (level - v0) / (block[j - iy0 + 1, i] - v0)
+    return ix, iy
+
+
+def _stitch(src, dst):
+    """
+    Stitch oriented segments into polylines.
+
+    :returns: list of (nodes, closed), where `nodes` is an array of node numbers in order along the line and
+              closed lines return to the first node.
+    """
+
+    nodes, inverse = np.unique(np.concatenate((src, dst)), return_inverse=True)
+    n = len(nodes)
+    s = inverse[:len(src)]
+    d = inverse[len(src):]
+    succ = np.full(n, -1, dtype=np.int64)
+    pred = np.full(n, -1, dtype=np.int64)
+    succ[s] = d
+    pred[d] = s
+
+    # closed lines have no first node, the lowest node of each is found by pointer jumping and its
+    # incoming segment is cut
+    this = np.arange(n)
+    jump = np.where(pred >= 0, pred, this)
+    low = this.copy()
+    span = 1
+    while True:
+        low = np.minimum(low, low[jump])
+        nxt = jump[jump]
+        span *= 2
+        done = (span >= n) or np.array_equal(nxt, jump)
+        jump = nxt
+        if done:
+            break
+    closed = (pred[jump] >= 0) & (low == this)
+    succ[pred[closed]] = -1
+    pred[closed] = -1
+
+    # distance of each node from the start of its line by list ranking
+    rank = (pred >= 0).astype(np.int64)
+    jump = np.where(pred >= 0, pred, this)
+    while np.any(pred[jump] >= 0):
+        rank = rank + rank[jump]
+        jump = jump[jump]
+
+    order = np.lexsort((rank, jump))
+    starts = np.flatnonzero(pred[order] < 0)
+    is_closed = np.zeros(n, dtype=bool)
+    is_closed[closed] = True
+    return [(nodes[line], is_closed[line[0]]) for line in np.split(order, starts[1:])]
+
+
+def _lines(parts, properties):
+    """ polylines from the segments and crossing node locations of the blocks of a level """
+
+    src = np.concatenate([part[0] for part in parts])
+    if not len(src):
+        return []
+    dst = np.concatenate([part[1] for part in parts])
+    nodes, first = np.unique(np.concatenate([part[2] for part in parts]), return_index=True)
+    ix = np.concatenate([part[3] for part in parts])[first]
+    iy = np.concatenate([part[4] for part in parts])[first]
+
+    lines = []
+    for line, closed in _stitch(src, dst):
+        if closed:
+            line = np.append(line, line[0])
+        k = np.searchsorted(nodes, line)
+        lx, ly = ix[k], iy[k]
+        if properties is not None:
+            lx, ly = gxgrdsmp.xy_from_index(properties, lx, ly)
+        lines.append(np.column_stack((lx, ly)))
+    return lines
+
+
+def contours(data, levels, properties=None, tile_rows=TILE_ROWS, threads=None, shape=None):
+    """
+    Contour lines threaded through a grid.
+
+    :param data:        2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`, or a function
+                        `read(window)` that returns such an array for an (ix0, iy0, nx, ny) window. The grid is
+                        read in blocks of whole rows on the calling thread.
+    :param levels:      contour level, or a list of contour levels
+    :param properties:  grid properties dictionary (see `geosoft.gxpy.grid.Grid.properties`) to return
+                        locations on the grid plane. The default returns fractional grid indexes.
+    :param tile_rows:   number of grid cell rows processed together, default `TILE_ROWS`
+    :param threads:     maximum number of threads, default is the number of processors
+    :param shape:       (ny, nx) shape of the grid, required if `data` is a function
+    :returns:           list of polylines for a single level, or a list of lists of polylines for a list of
+                        levels. Each polyline is a numpy float64 array shaped (n, 2) of (x, y) locations, or
+                        (ix, iy) grid indexes if there are no `properties`. Lines are oriented with values above
+                        the level on the left, and closed lines end at their first point.
+
+    Only the blocks of rows being classified are in memory, together with the contour crossings, so grids
+    of any size can be contoured from a `read` function.
+
+    .. code::
+
+        import geosoft.gxpy.grid as gxgrd
+        import geosoft.gxpy.grid_contour as gxcntr
+
+        with gxgrd.Grid.open('mag.grd') as g:
+            for level, lines in zip((100., 200.), gxcntr.contours(g.np(), (100., 200.), g.properties())):
+                print(level, len(lines))
+
+    .. versionadded:: 9.6
+    """
+
+    if callable(data):
+        if shape is None:
+            raise ContourException(_t('The grid shape is required to read the grid by blocks.'))
+        read = data
+    else:
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 2:
+            raise ContourException(_t('Grid data must be 2-dimensional'))
+        shape = data.shape
+
+        def read(window):
+            x0, y0, nx, ny = window
+            return data[y0: y0 + ny, x0: x0 + nx]
+
+    single = np.ndim(levels) == 0
+    levels = [float(v) for v in np.atleast_1d(levels)]
+    ny, nx = shape
+    if (nx < 2) or (ny < 2):
+        lines = [[] for _ in levels]
+        return lines[0] if single else lines
+
+    tile_rows = max(1, int(tile_rows))
+    if threads is None:
+        threads = os.cpu_count() or 1
+    tiles = list(range(0, ny - 1, tile_rows))
+
+    def block(iy0):
+        rows = min(tile_rows, ny - 1 - iy0)
+        return np.asarray(read((0, iy0, nx, rows + 1)), dtype=np.float64)
+
+    def tile(iy0, values):
+        return [_segments(values, level, iy0, ny) for level in levels]
+
+    def level_lines(i):
+        return _lines([parts[i] for parts in segments], properties)
+
+    if threads <= 1 or len(tiles) == 1:
+        segments = [tile(iy0, block(iy0)) for iy0 in tiles]
+        lines = [level_lines(i) for i in range(len(levels))]
+    else:
+        # blocks are read on the calling thread, workers only classify cells
+        segments = []
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            pending = deque()
+            for iy0 in tiles:
+                pending.append(pool.submit(tile, iy0, block(iy0)))
+                if len(pending) > threads:
+                    segments.append(pending.popleft().result())
+            while pending:
+                segments.append(pending.popleft().result())
+            lines = list(pool.map(level_lines, range(len(levels))))
+
+    return lines[0] if single else lines
@@ -0,0 +1,526 @@
+"""
+Batch conversion of grids between formats and coordinate systems.
+
+Grids are converted in a pool of processes, each of which creates its own Geosoft context once when the
+process starts. A manifest file records each finished conversion as it completes, so an interrupted batch
+can be run again and will only convert the grids that are not yet finished.
+
+The module is also a command-line program:
+
+.. code::
+
+    python -m geosoft.gxpy.grid_convert "f:/survey/*.grd" --folder f:/tiff --format TIFF --manifest done.txt
+
+    python -m geosoft.gxpy.grid_convert --list grids.csv --cs "NAD83 / UTM zone 17N" --processes 8
+
+Run with `--help` for the options.
+
+:Constants:
+    :FORMAT_GRD:        'GRD', Geosoft grid
+    :FORMAT_HGD:        'HGD', Geosoft high-compression grid
+    :FORMAT_ERS:        'ERS', ER Mapper grid
+    :FORMAT_SURFER:     'SURFER', Surfer 7 binary grid
+    :FORMAT_TIFF:       'TIFF', Cloud-Optimized GeoTIFF
+    :REPORT_SECONDS:    10, default seconds between progress reports
+
+.. seealso:: `geosoft.gxpy.grid.Grid.copy`, `geosoft.gxpy.grid.Grid.to_geotiff`,
+             `geosoft.gxpy.grid_utility.reproject`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_convert.py>`_
+
+.. versionadded:: 9.6
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import geosoft
+from . import gx as gx
+from . import grid as gxgrd
+from . import grid_utility as gxgrdu
+from . import coordinate_system as gxcs
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+FORMAT_GRD = 'GRD'
+FORMAT_HGD = 'HGD'
+FORMAT_ERS = 'ERS'
+FORMAT_SURFER = 'SURFER'
+FORMAT_TIFF = 'TIFF'
+
+REPORT_SECONDS = 10
+
+# file extension and grid decoration of each format
+_FORMATS = {FORMAT_GRD: ('.grd', 'GRD'),
+            FORMAT_HGD: ('.hgd', 'HGD'),
+            FORMAT_ERS: ('.ers', 'ERM'),
+            FORMAT_SURFER: ('.grd', 'SRF;VER=V7'),
+            FORMAT_TIFF: ('.tif', None)}
+
+_METHODS = {'nearest': gxgrdu.SAMPLE_NEAREST,
+            'linear': gxgrdu.SAMPLE_LINEAR,
+            'cubic': gxgrdu.SAMPLE_CUBIC,
+            'average': gxgrdu.SAMPLE_AVERAGE}
+
+
+class GridConvertException(geosoft.GXRuntimeError):
+    """
+    Exceptions from :mod:`geosoft.gxpy.grid_convert`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _format(fmt):
+    fmt = str(fmt).upper()
+    if fmt not in _FORMATS:
+        raise GridConvertException(_t('Unknown grid format "{}", expected one of {}.')
+                                   .format(fmt, ', '.join(sorted(_FORMATS))))
+    return fmt
+
+
+def format_from_name(file_name):
+    """
+    Grid format of a destination file name from its decoration or extension.
+
+    :param file_name:   grid file name, optionally decorated
+    :returns:           format constant, `FORMAT_GRD` if the format cannot be determined
+
+    .. versionadded:: 9.6
+    """
+
+    _, _, _, ext, dec = gxgrd.name_parts(file_name)
+    dec = dec.split(';')[0].upper()
+    for fmt, (_, fmt_dec) in _FORMATS.items():
+        if dec and fmt_dec and dec == fmt_dec.split(';')[0]:
+            return fmt
+    if ext.lower() in ('.tif', '.tiff'):
+        return FORMAT_TIFF
+    for fmt in (FORMAT_HGD, FORMAT_ERS):
+        if ext.lower() == _FORMATS[fmt][0]:
+            return fmt
+    return FORMAT_GRD
+
+
+def _file_path(file_name):
+    """ undecorated file path, for comparing grid file names """
+    return os.path.normcase(os.path.realpath(os.path.join(*gxgrd.name_parts(file_name)[:2])))
+
+
+def destination_name(source, folder=None, fmt=FORMAT_GRD):
+    """
+    Destination file name for a source grid converted to a format.
+
+    :param source:  source grid file name, optionally decorated
+    :param folder:  destination folder, default is the folder of the source grid
+    :param fmt:     destination format, default `FORMAT_GRD`
+    :returns:       destination file name, decorated for the format
+
+    .. versionadded:: 9.6
+    """
+
+    fmt = _format(fmt)
+    path, _, root, _, _ = gxgrd.name_parts(source)
+    ext, dec = _FORMATS[fmt]
+    name = os.path.join(folder or path, root + ext)
+    if dec:
+        name = gxgrd.decorate_name(name, dec)
+    return name
+
+
+def jobs(sources=None, list_file=None, folder=None, fmt=FORMAT_GRD):
+    """
+    List of (source, destination) conversions from file name patterns and list files.
+
+    :param sources:     source grid file names or `glob` patterns, which may end in a grid decoration,
+                        for example "f:/grids/\\*.ers(ERM)"
+    :param list_file:   text file with one conversion per line as "source" or "source,destination".
+                        Blank lines and lines that start with '#' are ignored.
+    :param folder:      destination folder, default is the folder of each source grid
+    :param fmt:         destination format of conversions with no destination, default `FORMAT_GRD`
+    :returns:           list of (source, destination) tuples in the order found, without duplicates
+
+    Conversions whose destination is the source grid file are skipped, for example a GRD or Surfer grid
+    converted to the GRD format in its own folder.
+
+    .. versionadded:: 9.6
+    """
+
+    found = []
+
+    if sources:
+        if isinstance(sources, str):
+            sources = [sources]
+        for pattern in sources:
+            dec = ''
+            if pattern.endswith(')') and '(' in pattern:
+                pattern, dec = pattern[:pattern.rfind('(')], pattern[pattern.rfind('('):]
+            names = sorted(glob.glob(pattern))
+            if not names and not glob.has_magic(pattern):
+                names = [pattern]
+            for name in names:
+                source = name + dec
+                found.append((source, destination_name(source, folder, fmt)))
+
+    if list_file:
+        with open(list_file, newline='') as f:
+            for row in csv.reader(f):
+                row = [s.strip() for s in row]
+                if not row or not row[0] or row[0].startswith('#'):
+                    continue
+                if len(row) > 1 and row[1]:
+                    destination = row[1]
+                    if folder and not os.path.isabs(destination):
+                        destination = os.path.join(folder, destination)
+                else:
+                    destination = destination_name(row[0], folder, fmt)
+                found.append((row[0], destination))
+
+    conversions = []
+    unique = set()
+    for job in found:
+        if _file_path(job[0]) == _file_path(job[1]):
+            continue
+        if job not in unique:
+            unique.add(job)
+            conversions.append(job)
+    return conversions
+
+
+class Manifest:
+    """
+    Manifest file of finished conversions, one JSON record per line.
+
+    :param file_name:   manifest file name, created if it does not exist
+
+    Records are appended and flushed as each conversion finishes, so the manifest is complete up to
+    the last finished conversion if a batch is interrupted.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, file_name):
+        self._file_name = file_name
+        self._finished = {}
+        if os.path.exists(file_name):
+            with open(file_name) as f:
+                text = f.read()
+            for line in text.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a partial last line from an interrupted batch
+                    continue
+                self._finished[(record['source'], record['destination'])] = record
+            if text and not text.endswith('\n'):
+                with open(file_name, 'a') as f:
+                    f.write('\n')
+
+    def __len__(self):
+        return len(self._finished)
+
+    @property
+    def file_name(self):
+        """manifest file name"""
+        return self._file_name
+
+    def is_finished(self, source, destination):
+        """
+        `True` if the conversion is recorded as finished and the destination file exists.
+
+        :param source:      source grid file name
+        :param destination: destination grid file name
+        """
+
+        if (source, destination) not in self._finished:
+            return False
+        return os.path.exists(os.path.join(*gxgrd.name_parts(destination)[:2]))
+
+    def record(self, source, destination, **kwargs):
+        """
+        Record a finished conversion.
+
+        :param source:      source grid file name
+        :param destination: destination grid file name
+        :param kwargs:      other values to record, for example `cells=1000, seconds=0.5`
+        """
+
+        record = {'source': source, 'destination': destination}
+        record.update(kwargs)
+        self._finished[(source, destination)] = record
+        with open(self._file_name, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+
+
+def convert(source, destination, fmt=None, coordinate_system=None, cell_size=None,
+            method=gxgrdu.SAMPLE_LINEAR, dtype=None, overwrite=False):
+    """
+    Convert a grid to another format, and optionally another coordinate system or cell size.
+
+    :param source:              source grid file name, decorated if not a Geosoft grid
+    :param destination:         destination grid file name
+    :param fmt:                 destination format, default is determined from the destination name
+    :param coordinate_system:   destination coordinate system, default is the source coordinate system
+    :param cell_size:           destination cell size if the grid is reprojected, default preserves the
+                                cell area. Specifying a cell size reprojects the grid.
+    :param method:              reprojection method, see `geosoft.gxpy.grid_utility.reproject`
+    :param dtype:               destination data type, default is the source data type
+    :param overwrite:           `True` to overwrite an existing destination
+    :returns:                   number of cells in the destination grid
+
+    This requires a Geosoft context in the calling process. A grid cannot be converted to its own file.
+
+    .. versionadded:: 9.6
+    """
+
+    if _file_path(source) == _file_path(destination):
+        raise GridConvertException(_t('Destination "{}" is the source grid file.').format(destination))
+
+    fmt = _format(fmt) if fmt else format_from_name(destination)
+    if fmt != FORMAT_TIFF:
+        if not gxgrd.name_parts(destination)[4]:
+            destination = gxgrd.decorate_name(destination, _FORMATS[fmt][1])
+
+    if coordinate_system is not None and not isinstance(coordinate_system, gxcs.Coordinate_system):
+        coordinate_system = gxcs.Coordinate_system(coordinate_system)
+
+    with gxgrd.Grid.open(source, mode=gxgrd.FILE_READ) as grid:
+        reproject = cell_size is not None or \
+            (coordinate_system is not None and coordinate_system != grid.coordinate_system)
+        if not reproject:
+            if fmt == FORMAT_TIFF:
+                grid.to_geotiff(destination, dtype=dtype, overwrite=overwrite)
+            else:
+                gxgrd.Grid.copy(grid, destination, dtype=dtype, overwrite=overwrite).close()
+            return grid.nx * grid.ny
+
+        cs = coordinate_system or grid.coordinate_system
+        if fmt != FORMAT_TIFF and dtype is None:
+            with gxgrdu.reproject(grid, cs, file_name=destination, overwrite=overwrite, cell_size=cell_size,
+                                  method=method) as new_grid:
+                return new_grid.nx * new_grid.ny
+
+        with gxgrdu.reproject(grid, cs, cell_size=cell_size, method=method) as new_grid:
+            try:
+                if fmt == FORMAT_TIFF:
+                    new_grid.to_geotiff(destination, dtype=dtype, overwrite=overwrite)
+                else:
+                    gxgrd.Grid.copy(new_grid, destination, dtype=dtype, overwrite=overwrite).close()
+                return new_grid.nx * new_grid.ny
+            finally:
+                new_grid.delete_files()
+
+
+# per-process worker state, set by _init_worker
+_worker = {}
+
+
+def _init_worker(options):
+    """ create the Geosoft context and conversion options once in each worker process"""
+    _worker.clear()
+    _worker['gx'] = gx.GXpy(name='grid_convert', suppress_progress=True)
+    options = dict(options)
+    if options.get('coordinate_system') is not None:
+        options['coordinate_system'] = gxcs.Coordinate_system(options['coordinate_system'])
+    _worker['options'] = options
+
+
+def _convert_job(job):
+    """ convert one (source, destination) job in a worker, returns (source, destination, cells, seconds, error)"""
+    source, destination = job
+    start = time.perf_counter()
+    try:
+        os.makedirs(gxgrd.name_parts(destination)[0], exist_ok=True)
+        cells = convert(source, destination, **_worker['options'])
+        return source, destination, cells, time.perf_counter() - start, None
+    except Exception as e:
+        return source, destination, 0, time.perf_counter() - start, '{}: {}'.format(type(e).__name__, e)
+
+
+def _report_line(summary):
+    seconds = max(summary['seconds'], 1e-9)
+    return _t('{} of {} grids converted, {} skipped, {} failed, {:.1f} grids/s, {:.2f} Mcells/s') \
+        .format(summary['num_converted'], summary['num_jobs'], summary['num_skipped'], summary['num_failed'],
+                summary['num_converted'] / seconds, summary['cells'] / seconds / 1.0e6)
+
+
+def convert_batch(conversions, manifest=None, processes=None, fmt=None, coordinate_system=None, cell_size=None,
+                  method=gxgrdu.SAMPLE_LINEAR, dtype=None, overwrite=False, report=None,
+                  report_seconds=REPORT_SECONDS):
+    """
+    Convert a batch of grids in a pool of processes.
+
+    :param conversions:         list of (source, destination) conversions, see `jobs`
+    :param manifest:            manifest file name of finished conversions. Conversions already in the
+                                manifest are skipped, and conversions are added as they finish.
+    :param processes:           number of worker processes, default is the number of processors.
+                                1 converts in the calling process, which requires a Geosoft context.
+    :param fmt:                 destination format, default is determined from each destination name
+    :param coordinate_system:   destination coordinate system, default is the source coordinate system
+    :param cell_size:           destination cell size, see `convert`
+    :param method:              reprojection method, see `geosoft.gxpy.grid_utility.reproject`
+    :param dtype:               destination data type, default is the source data type
+    :param overwrite:           `True` to overwrite existing destinations
+    :param report:              callback that reports progress, for example `report=print`
+    :param report_seconds:      minimum seconds between progress reports, default 10
+    :returns:                   summary dictionary:
+
+        ============= =================================================================
+        num_jobs      number of conversions
+        num_converted number of grids converted
+        num_skipped   number of conversions skipped because they are in the manifest
+        num_failed    number of conversions that failed
+        failures      list of (source, destination, error message) of failed conversions
+        cells         number of cells converted
+        seconds       elapsed seconds
+        ============= =================================================================
+
+    A conversion that fails is reported and does not stop the batch. Failed conversions are not added
+    to the manifest, so they are tried again when the batch is run again.
+
+    .. versionadded:: 9.6
+    """
+
+    if isinstance(coordinate_system, gxcs.Coordinate_system):
+        coordinate_system = coordinate_system.name
+    options = {'fmt': fmt,
+               'coordinate_system': coordinate_system,
+               'cell_size': cell_size,
+               'method': method,
+               'dtype': dtype,
+               'overwrite': overwrite}
+
+    start = time.perf_counter()
+    summary = {'num_jobs': len(conversions),
+               'num_converted': 0,
+               'num_skipped': 0,
+               'num_failed': 0,
+               'failures': [],
+               'cells': 0,
+               'seconds': 0.}
+
+    if manifest is not None and not isinstance(manifest, Manifest):
+        manifest = Manifest(manifest)
+    todo = []
+    for source, destination in conversions:
+        if manifest is not None and manifest.is_finished(source, destination):
+            summary['num_skipped'] += 1
+        else:
+            todo.append((source, destination))
+
+    last_report = [start]
+
+    def finished(result):
+        source, destination, cells, seconds, error = result
+        if error:
+            summary['num_failed'] += 1
+            summary['failures'].append((source, destination, error))
+            if report:
+                report(_t('Failed: {} -> {}: {}').format(source, destination, error))
+        else:
+            summary['num_converted'] += 1
+            summary['cells'] += cells
+            if manifest is not None:
+                manifest.record(source, destination, cells=cells, seconds=round(seconds, 3))
+        now = time.perf_counter()
+        summary['seconds'] = now - start
+        if report and (now - last_report[0] >= report_seconds):
+            last_report[0] = now
+            report(_report_line(summary))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(int(processes), len(todo)))
+
+    if processes == 1:
+        if todo:
+            options = dict(options)
+            if options['coordinate_system'] is not None:
+                options['coordinate_system'] = gxcs.Coordinate_system(options['coordinate_system'])
+            _worker['options'] = options
+            for job in todo:
+                finished(_convert_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(options,)) as pool:
+            pending = deque()
+            for job in todo:
+                pending.append(pool.submit(_convert_job, job))
+                if len(pending) >= processes * 4:
+                    finished(pending.popleft().result())
+            while pending:
+                finished(pending.popleft().result())
+
+    summary['seconds'] = time.perf_counter() - start
+    if report:
+        report(_report_line(summary))
+    return summary
+
+
+def main(argv=None):
+    """
+    Command-line grid conversion, run as `python -m geosoft.gxpy.grid_convert`.
+
+    :param argv:    command-line arguments, default is `sys.argv[1:]`
+    :returns:       exit status, 0 if all conversions succeed, 1 if any fail
+
+    .. versionadded:: 9.6
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m geosoft.gxpy.grid_convert',
+                                     description=_t('Convert grids between formats and coordinate systems.'))
+    parser.add_argument('sources', nargs='*',
+                        help=_t('source grids or glob patterns, optionally decorated, e.g. "*.ers(ERM)"'))
+    parser.add_argument('-l', '--list', dest='list_file',
+                        help=_t('file of conversions, one "source" or "source,destination" per line'))
+    parser.add_argument('-o', '--folder', help=_t('destination folder, default is the source folder'))
+    parser.add_argument('-f', '--format', default=FORMAT_GRD, type=str.upper, choices=sorted(_FORMATS),
+                        help=_t('destination format, default GRD'))
+    parser.add_argument('--cs', dest='coordinate_system', help=_t('destination coordinate system'))
+    parser.add_argument('--cell-size', type=float, help=_t('destination cell size, reprojects the grid'))
+    parser.add_argument('--method', default='linear', choices=sorted(_METHODS),
+                        help=_t('reprojection method, default linear'))
+    parser.add_argument('--dtype', help=_t('destination data type, for example float32'))
+    parser.add_argument('-m', '--manifest', help=_t('manifest of finished conversions, to resume a batch'))
+    parser.add_argument('-p', '--processes', type=int,
+                        help=_t('number of processes, default is the number of processors'))
+    parser.add_argument('--overwrite', action='store_true', help=_t('overwrite existing destinations'))
+    parser.add_argument('--report-seconds', type=float, default=REPORT_SECONDS,
+                        help=_t('seconds between progress reports, default {}').format(REPORT_SECONDS))
+    parser.add_argument('-q', '--quiet', action='store_true', help=_t('do not report progress'))
+    args = parser.parse_args(argv)
+
+    if not (args.sources or args.list_file):
+        parser.error(_t('specify source grids or a --list file'))
+
+    conversions = jobs(args.sources, args.list_file, folder=args.folder, fmt=args.format)
+    report = None if args.quiet else print
+    summary = convert_batch(conversions, manifest=args.manifest, processes=args.processes,
+                            coordinate_system=args.coordinate_system, cell_size=args.cell_size,
+                            method=_METHODS[args.method], dtype=args.dtype, overwrite=args.overwrite,
+                            report=report, report_seconds=args.report_seconds)
+    return 1 if summary['num_failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+Derivatives of grid data in numpy.
+
+Horizontal derivatives are central differences between neighbouring grid points, or one-sided differences
+at the grid edges and at the edges of dummy areas. The vertical derivative is calculated in the wavenumber
+domain by an FFT, or in the space domain by convolution with a truncated vertical derivative operator. Large
+grids are processed in tiles that overlap so that each tile is calculated with the data around it, and tiles
+are processed in parallel. `derivatives` calculates any set of derivative products together in one pass
+over the grid, sharing the derivatives they have in common, and `derivative_tiles` does the same for grids
+that are read one tile at a time. Dummies are filled locally before the vertical derivative is calculated,
+and remain dummies in the result.
+
+`tilt_depth` combines these with `geosoft.gxpy.grid_contour` and `geosoft.gxpy.grid_sample` to estimate
+the depth of contact sources in memory, and `contact_depths` estimates the depths from a tilt angle that is
+read by blocks. This module does not require the Geosoft runtime.
+
+:Constants:
+    :TILE_SIZE:         2048 size of the tiles for the vertical derivative of large grids
+    :OVERLAP:           256 overlap of neighbouring tiles, in grid points
+    :SPACE_RADIUS:      8 radius of the space-domain vertical derivative operator, in grid points
+    :DERIVATIVE_X:      0 derivative in the grid x direction
+    :DERIVATIVE_Y:      1 derivative in the grid y direction
+    :DERIVATIVE_Z:      2 vertical derivative
+    :DERIVATIVE_XY:     3 horizontal gradient
+    :DERIVATIVE_XYZ:    4 total gradient (analytic signal)
+    :TILT_ANGLE:        5 tilt angle in radians
+
+.. seealso:: `geosoft.gxpy.grid_utility.derivative`, `geosoft.gxpy.grid_utility.tilt_depth`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_derivative.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+from . import grid_fill as gxfill
+from . import grid_contour as gxcntr
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+TILE_SIZE = 2048
+OVERLAP = 256
+SPACE_RADIUS = 8
+
+DERIVATIVE_X = 0
+DERIVATIVE_Y = 1
+DERIVATIVE_Z = 2
+DERIVATIVE_XY = 3
+DERIVATIVE_XYZ = 4
+TILT_ANGLE = 5
+
+
+class DerivativeException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_derivative`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _grid_data(data):
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim != 2:
+        raise DerivativeException(_t('Grid data must be 2-dimensional'))
+    return data
+
+
+def _difference(data, cell):
+    """ derivative along the last axis """
+
+    p = np.full((data.shape[0], data.shape[1] + 2), np.nan)
+    p[:, 1:-1] = data
+    forward = (p[:, 2:] - data) / cell
+    backward = (data - p[:, :-2]) / cell
+    d = (forward + backward) * 0.5
+    d = np.where(np.isnan(d), forward, d)
+    return np.where(np.isnan(d), backward, d)
+
+
+def x_derivative(data, dx):
+    """
+    Derivative in the grid x direction.
+
+    :param data:    2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`
+    :param dx:      grid point separation in the x direction
+    :returns:       numpy float64 array of the derivative, dummies where the data is dummy
+
+    .. versionadded:: 9.6
+    """
+    return _difference(_grid_data(data), dx)
+
+
+def y_derivative(data, dy):
+    """
+    Derivative in the grid y direction.
+
+    :param data:    2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`
+    :param dy:      grid point separation in the y direction
+    :returns:       numpy float64 array of the derivative, dummies where the data is dummy
+
+    .. versionadded:: 9.6
+    """
+    return _difference(_grid_data(data).T, dy).T
+
+
+def _tiles(n, tile_size, overlap):
+    """ (core start, core end, tile start, tile end) along an axis of length n """
+
+    if n <= tile_size + 2 * overlap:
+        return [(0, n, 0, n)]
+    return [(i, min(i + tile_size, n), max(0, i - overlap), min(n, i + tile_size + overlap))
+            for i in range(0, n, tile_size)]
+
+
+def _expand(data, pad):
+    """ expand by mirroring the data, tapered to the mean over the expansion """
+
+    mean = data.mean()
+    e = np.pad(data - mean, pad, mode='symmetric')
+    ny, nx = e.shape
+    ty = np.minimum(np.minimum(np.arange(ny), np.arange(ny)[::-1]), pad[0][0])
+    tx = np.minimum(np.minimum(np.arange(nx), np.arange(nx)[::-1]), pad[1][0])
+    e *= gxfill.taper(ty, pad[0][0])[:, np.newaxis] * gxfill.taper(tx, pad[1][0])[np.newaxis, :]
+    return e
+
+
+def _dz_fft(data, dx, dy):
+    ny, nx = data.shape
+    py = max(8, ny // 4)
+    px = max(8, nx // 4)
+    e = _expand(data, ((py, py), (px, px)))
+    ky = np.fft.fftfreq(e.shape[0], d=dy) * (2. * math.pi)
+    kx = np.fft.rfftfreq(e.shape[1], d=dx) * (2. * math.pi)
+    k = np.sqrt(ky[:, np.newaxis] ** 2 + kx[np.newaxis, :] ** 2)
+    dz = np.fft.irfft2(np.fft.rfft2(e) * k, s=e.shape)
+    return dz[py: py + ny, px: px + nx]
+
+
+def _space_operator(dx, dy, radius):
+    """
+    Space-domain vertical derivative operator, (1 / 2pi) * (f(0) - f(r)) / r**3 integrated over the plane,
+    with the plane beyond the operator included in the centre weight.
+    """
+
+    j, i = np.mgrid[-radius: radius + 1, -radius: radius + 1].astype(np.float64)
+    r = np.hypot(i * dx, j * dy)
+    r[radius, radius] = 1.
+    w = -(dx * dy) / (2. * math.pi * r ** 3)
+    w[radius, radius] = 0.
+    far = math.sqrt((2 * radius + 1) ** 2 * dx * dy / math.pi)
+    w[radius, radius] = -w.sum() + 1. / far
+    return w
+
+
+def _dz_space(data, dx, dy, mean, radius=SPACE_RADIUS):
+    ny, nx = data.shape
+    w = _space_operator(dx, dy, radius)
+    e = np.pad(data - mean, radius, mode='symmetric')
+    dz = np.zeros(data.shape)
+    for j in range(2 * radius + 1):
+        for i in range(2 * radius + 1):
+            dz += w[j, i] * e[j: j + ny, i: i + nx]
+    return dz
+
+
+def _block_derivatives(block, dx, dy, products, fft, mean):
+    """ derivative products of a block of grid data, sharing the intermediate derivatives """
+
+    dummy = np.isnan(block)
+    if dummy.all():
+        return {p: np.full(block.shape, np.nan) for p in products}
+
+    result = {}
+    if set(products) - {DERIVATIVE_Z}:
+        gx = _difference(block, dx)
+        gy = _difference(block.T, dy).T
+        result[DERIVATIVE_X] = gx
+        result[DERIVATIVE_Y] = gy
+        if set(products) & {DERIVATIVE_XY, DERIVATIVE_XYZ, TILT_ANGLE}:
+            result[DERIVATIVE_XY] = np.hypot(gx, gy)
+
+    if set(products) & {DERIVATIVE_Z, DERIVATIVE_XYZ, TILT_ANGLE}:
+        filled = gxfill.flood(block, max_iterations=0) if dummy.any() else block
+        if fft:
+            dz = _dz_fft(filled, dx, dy)
+        else:
+            dz = _dz_space(filled, dx, dy, mean)
+        dz[dummy] = np.nan
+        result[DERIVATIVE_Z] = dz
+        if DERIVATIVE_XYZ in products:
+            result[DERIVATIVE_XYZ] = np.hypot(result[DERIVATIVE_XY], dz)
+        if TILT_ANGLE in products:
+            result[TILT_ANGLE] = np.arctan2(dz, result[DERIVATIVE_XY])
+
+    return {p: result[p] for p in products}
+
+
+def _check_products(products):
+    products = list(products)
+    for p in products:
+        if p not in (DERIVATIVE_X, DERIVATIVE_Y, DERIVATIVE_Z, DERIVATIVE_XY, DERIVATIVE_XYZ, TILT_ANGLE):
+            raise DerivativeException(_t('Unknown derivative {}').format(p))
+    return products
+
+
+def derivative_tiles(source, dx, dy, products, shape=None, fft=True, mean=None, tile_size=TILE_SIZE,
+                     overlap=OVERLAP, threads=None):
+    """
+    Derivative products of potential field grid data, calculated tile by tile.
+
+    :param source:      grid values as a numpy array shaped (ny, nx) with dummies as `numpy.nan`, or a function
+                        `read(window)` that returns such an array for an (ix0, iy0, nx, ny) window. Each tile is
+                        read with the overlap around it, on the calling thread.
+    :param dx:          grid point separation in the x direction
+    :param dy:          grid point separation in the y direction
+    :param products:    list of products to calculate, see `derivatives`
+    :param shape:       (ny, nx) shape of the grid, required if `source` is a function
+    :param fft:         `True` (default) to calculate the vertical derivative in the wavenumber domain,
+                        `False` to convolve with a space-domain operator of radius `SPACE_RADIUS`.
+    :param mean:        mean of the grid data, which the space-domain operator uses beyond the grid edges.
+                        The default is the mean of the grid data. With a `read` function the mean of a grid
+                        of one tile comes from that tile, and for larger grids it is accumulated from the tile
+                        cores before the derivatives are calculated. The mean is only needed for the
+                        space-domain vertical derivative.
+    :param tile_size:   grids larger than tiles of this size plus the overlap are calculated in tiles
+    :param overlap:     overlap of neighbouring tiles, in grid points
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           iterator of (tile, products) in row order from the grid origin, where `tile` is an
+                        (ix0, iy0, nx, ny) window and `products` is a dictionary of numpy float64 arrays of the
+                        tile keyed by product.
+
+    Only the tiles being calculated are in memory, so grids of any size can be processed from a `read`
+    function. Tiles are read on the calling thread and the derivatives of each tile are calculated on
+    worker threads. See `derivatives` for details of the calculation.
+
+    .. versionadded:: 9.6
+    """
+
+    products = _check_products(products)
+    space_z = (not fft) and bool(set(products) & {DERIVATIVE_Z, DERIVATIVE_XYZ, TILT_ANGLE})
+    if callable(source):
+        if shape is None:
+            raise DerivativeException(_t('The grid shape is required to read the grid by tiles.'))
+        read = source
+    else:
+        data = _grid_data(source)
+        dummy = np.isnan(data)
+        if dummy.all():
+            raise DerivativeException(_t('The grid has no valid data.'))
+        if mean is None:
+            mean = data[~dummy].mean()
+        shape = data.shape
+
+        def read(window):
+            x0, y0, nx, ny = window
+            return data[y0: y0 + ny, x0: x0 + nx]
+
+    ny, nx = shape
+    tile_size = max(1, int(tile_size))
+    overlap = max(int(overlap), 1 if fft else SPACE_RADIUS + 1)
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = max(1, threads)
+    tiles = [(ty, tx) for ty in _tiles(ny, tile_size, overlap) for tx in _tiles(nx, tile_size, overlap)]
+
+    def block(job):
+        (cy0, cy1, ty0, ty1), (cx0, cx1, tx0, tx1) = job
+        return _grid_data(read((tx0, ty0, tx1 - tx0, ty1 - ty0)))
+
+    # the space-domain operator needs the grid mean before the first tile
+    first = None
+    if space_z and (mean is None):
+        if len(tiles) == 1:
+            first = block(tiles[0])
+            valid = first[~np.isnan(first)]
+            total, count = valid.sum(), valid.size
+        else:
+            total = 0.
+            count = 0
+            for (cy0, cy1, _, _), (cx0, cx1, _, _) in tiles:
+                core = _grid_data(read((cx0, cy0, cx1 - cx0, cy1 - cy0)))
+                valid = core[~np.isnan(core)]
+                total += valid.sum()
+                count += valid.size
+        if count == 0:
+            raise DerivativeException(_t('The grid has no valid data.'))
+        mean = total / count
+
+    def tile(job, values):
+        (cy0, cy1, ty0, ty1), (cx0, cx1, tx0, tx1) = job
+        values = _block_derivatives(values, dx, dy, products, fft, mean)
+        return ((cx0, cy0, cx1 - cx0, cy1 - cy0),
+                {p: d[cy0 - ty0: cy1 - ty0, cx0 - tx0: cx1 - tx0] for p, d in values.items()})
+
+    def tile_products():
+        if first is not None:
+            yield tile(tiles[0], first)
+            return
+
+        if threads == 1 or len(tiles) == 1:
+            for job in tiles:
+                yield tile(job, block(job))
+            return
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            pending = deque()
+            for job in tiles:
+                pending.append(pool.submit(tile, job, block(job)))
+                if len(pending) > threads:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    return tile_products()
+
+
+def derivatives(data, dx, dy, products, fft=True, tile_size=TILE_SIZE, overlap=OVERLAP, threads=None):
+    """
+    Derivative products of potential field grid data, calculated together.
+
+    :param data:        2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`
+    :param dx:          grid point separation in the x direction
+    :param dy:          grid point separation in the y direction
+    :param products:    list of products to calculate:
+
+        ========================== ====================================================================
+        DERIVATIVE_X               in the grid X direction
+        DERIVATIVE_Y               in the grid Y direction
+        DERIVATIVE_Z               in the vertical direction, positive over positive anomalies
+        DERIVATIVE_XY              the horizontal gradient sqrt(dx**2 + dy**2)
+        DERIVATIVE_XYZ             the total derivative sqrt(dx**2 + dy**2 + dz**2) (analytic signal)
+        TILT_ANGLE                 tilt angle, atan2(dz, sqrt(dx**2 + dy**2)) (radians)
+        ========================== ====================================================================
+
+    :param fft:         `True` (default) to calculate the vertical derivative in the wavenumber domain,
+                        `False` to convolve with a space-domain operator of radius `SPACE_RADIUS`.
+    :param tile_size:   grids larger than tiles of this size plus the overlap are calculated in tiles
+    :param overlap:     overlap of neighbouring tiles, in grid points
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           dictionary of numpy float64 arrays keyed by product, dummies where the data is dummy
+
+    The horizontal derivatives and the vertical derivative are calculated once for each tile and shared by
+    the products that need them. Dummies in each tile are filled from the surrounding data before the
+    vertical derivative is calculated. Before the FFT each tile is mirrored and tapered to its mean at the
+    edges. The FFT derivative is more accurate and preserves longer wavelengths, but tiles need to overlap
+    by more than the longest wavelength of interest. Use `derivative_tiles` for grids that are not in memory.
+
+    .. versionadded:: 9.6
+    """
+
+    data = _grid_data(data)
+    products = _check_products(products)
+    result = {p: np.empty(data.shape) for p in products}
+    for (x0, y0, nx, ny), block in derivative_tiles(data, dx, dy, products, fft=fft, tile_size=tile_size,
+                                                    overlap=overlap, threads=threads):
+        for p, d in block.items():
+            result[p][y0: y0 + ny, x0: x0 + nx] = d
+    return result
+
+
+def z_derivative(data, dx, dy, fft=True, tile_size=TILE_SIZE, overlap=OVERLAP, threads=None):
+    """
+    Vertical derivative of potential field grid data.
+
+    :param data:        2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`
+    :param dx:          grid point separation in the x direction
+    :param dy:          grid point separation in the y direction
+    :param fft:         `True` (default) to calculate in the wavenumber domain, `False` to convolve with a
+                        space-domain operator of radius `SPACE_RADIUS`.
+    :param tile_size:   grids larger than tiles of this size plus the overlap are calculated in tiles
+    :param overlap:     overlap of neighbouring tiles, in grid points
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           numpy float64 array of the derivative, which is positive over positive anomalies,
+                        dummies where the data is dummy
+
+    See `derivatives` for details.
+
+    .. versionadded:: 9.6
+    """
+
+    return derivatives(data, dx, dy, [DERIVATIVE_Z], fft=fft, tile_size=tile_size, overlap=overlap,
+                       threads=threads)[DERIVATIVE_Z]
+
+
+def tilt_angle(data, dx, dy, fft=True, tile_size=TILE_SIZE, overlap=OVERLAP, threads=None):
+    """
+    Tilt angle, atan2(dz, sqrt(dx**2 + dy**2)), of potential field grid data.
+
+    :param data:        2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`
+    :param dx:          grid point separation in the x direction
+    :param dy:          grid point separation in the y direction
+    :param fft:         `True` (default) for the FFT vertical derivative, see `derivatives`
+    :param tile_size:   tile size for the vertical derivative, see `derivatives`
+    :param overlap:     tile overlap for the vertical derivative, see `derivatives`
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           numpy float64 array of the tilt angle in radians, dummies where the data is dummy
+
+    .. versionadded:: 9.6
+    """
+
+    return derivatives(data, dx, dy, [TILT_ANGLE], fft=fft, tile_size=tile_size, overlap=overlap,
+                       threads=threads)[TILT_ANGLE]
+
+
+def _resample(xy, interval):
+    """ points at a constant separation along a polyline, by linear interpolation """
+
+    s = np.concatenate(([0.], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    if s[-1] <= 0.:
+        return xy[:1].copy()
+    t = np.arange(int(s[-1] / interval) + 1) * interval
+    return np.column_stack((np.interp(t, s, xy[:, 0]), np.interp(t, s, xy[:, 1])))
+
+
+def contact_depths(tilt, gradient, properties, resolution=None, shape=None, threads=None):
+    """
+    Depth of contact sources at the zero contour of the tilt angle.
+
+    :param tilt:        tilt angle as a 2D numpy array shaped (ny, nx) with dummies as `numpy.nan`, or a function
+                        `read(window)` that returns such an array for an (ix0, iy0, nx, ny) window, see
+                        `geosoft.gxpy.grid_contour.contours`.
+    :param gradient:    horizontal gradient of the tilt angle as a 2D numpy array shaped (ny, nx), or a function
+                        `sample(x, y)` that returns the gradient at grid plane locations
+    :param properties:  grid properties dictionary, uses 'x0', 'y0', 'dx', 'dy' and 'rot'
+    :param resolution:  separation of the depth estimates along the zero contour, see `tilt_depth`
+    :param shape:       (ny, nx) shape of the grid, required if `tilt` is a function
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           list of numpy float64 arrays shaped (n, 3) of (x, y, depth) along each zero contour
+
+    .. versionadded:: 9.6
+    """
+
+    if resolution is None:
+        resolution = min(properties['dx'], properties['dy']) * 4.
+    if not callable(gradient):
+        gradient_data = gradient
+
+        def gradient(x, y):
+            return gxgrdsmp.sample(gradient_data, properties, x, y, threads=threads)
+
+    lines = []
+    for xy in gxcntr.contours(tilt, 0., properties, threads=threads, shape=shape):
+        if resolution > 0.:
+            xy = _resample(xy, resolution)
+        g = np.array(gradient(xy[:, 0], xy[:, 1]), dtype=np.float64)
+        g[g == 0.] = np.nan
+        lines.append(np.column_stack((xy, np.reciprocal(g))))
+    return lines
+
+
+def tilt_depth(data, properties, resolution=None, fft=True, tile_size=TILE_SIZE, overlap=OVERLAP, threads=None):
+    """
+    Depth of contact sources of a potential field grid by the tilt-depth method.
+
+    :param data:        2D numpy array of grid values shaped (ny, nx), dummies are `numpy.nan`. Ideally the
+                        grid should be reduced to the pole.
+    :param properties:  grid properties dictionary (see `geosoft.gxpy.grid.Grid.properties`), uses 'x0', 'y0',
+                        'dx', 'dy' and 'rot'
+    :param resolution:  separation of the depth estimates along the zero contour of the tilt angle, default is
+                        4 times the smaller grid point separation, 0 for the contour crossings of grid cell edges
+    :param fft:         `True` (default) for the FFT vertical derivative, see `z_derivative`
+    :param tile_size:   tile size for the vertical derivative, see `z_derivative`
+    :param overlap:     tile overlap for the vertical derivative, see `z_derivative`
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           list of numpy float64 arrays shaped (n, 3) of (x, y, depth) along each zero contour
+
+    The tilt angle of the field over a vertical contact is 0 over the contact, and the source depth is the
+    reciprocal of the horizontal gradient of the tilt angle at the zero contour. Depths are dummy (`numpy.nan`)
+    where the gradient is 0. See `contact_depths` to calculate depths from a tilt angle that is not in memory.
+
+    .. versionadded:: 9.6
+    """
+
+    dx = properties['dx']
+    dy = properties['dy']
+    tilt = tilt_angle(data, dx, dy, fft=fft, tile_size=tile_size, overlap=overlap, threads=threads)
+    gradient = np.hypot(x_derivative(tilt, dx), y_derivative(tilt, dy))
+    return contact_depths(tilt, gradient, properties, resolution=resolution, threads=threads)
@@ -0,0 +1,305 @@
+"""
+Pure-Python reading of ER Mapper `.ers` grids.
+
+An ER Mapper grid is a text header file (`name.ers`) that describes a raw binary raster file (`name`).
+The functions in this module parse the header and memory-map the raster with numpy, without calling the
+Geosoft runtime.
+
+Arrays are returned shaped (ny, nx) with the first row at the grid origin (the bottom of the image),
+which is the same orientation as `geosoft.gxpy.grid.Grid.np`.
+
+.. seealso:: `geosoft.gxpy.grid`, `geosoft.gxpy.grid_grd`, `geosoft.gxpy.grid_surfer`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_ers.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+_CELL_TYPES = {'unsigned8bitinteger': 'u1',
+               'signed8bitinteger': 'i1',
+               'unsigned16bitinteger': 'u2',
+               'signed16bitinteger': 'i2',
+               'unsigned32bitinteger': 'u4',
+               'signed32bitinteger': 'i4',
+               'ieee4bytereal': 'f4',
+               'ieee8bytereal': 'f8'}
+
+
+class ERSException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_ers`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _ers_file(file_name):
+    """ header file name from a grid name, which may be decorated or refer to the data file"""
+    file_name = str(file_name)
+    if file_name.endswith(')') and '(' in file_name:
+        file_name = file_name[:file_name.rfind('(')]
+    if not file_name.lower().endswith('.ers'):
+        if os.path.exists(file_name + '.ers'):
+            file_name = file_name + '.ers'
+    return file_name
+
+
+def _parse_blocks(lines):
+    """ parse 'Name Begin ... Name End' blocks into a nested dictionary"""
+
+    root = {}
+    stack = [root]
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if '=' in line:
+            key, value = line.split('=', 1)
+            value = value.strip()
+            if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1]
+            stack[-1][key.strip()] = value
+            continue
+        words = line.split()
+        if len(words) == 2 and words[1] == 'Begin':
+            block = {}
+            existing = stack[-1].get(words[0])
+            if existing is None:
+                stack[-1][words[0]] = block
+            elif isinstance(existing, list):
+                existing.append(block)
+            else:
+                stack[-1][words[0]] = [existing, block]
+            stack.append(block)
+        elif len(words) == 2 and words[1] == 'End':
+            if len(stack) == 1:
+                raise ERSException(_t('Unbalanced block "{}"').format(line))
+            stack.pop()
+    return root
+
+
+def _angle(s):
+    """ degrees from an ER Mapper 'deg:min:sec' angle"""
+    parts = str(s).split(':')
+    sign = -1.0 if parts[0].strip().startswith('-') else 1.0
+    d = 0.
+    for i, p in enumerate(parts):
+        d += abs(float(p)) / (60. ** i)
+    return sign * d
+
+
+def read_header(file_name):
+    """
+    Read an ER Mapper header.
+
+    :param file_name:   grid file name, the `.ers` header or the raster data file
+    :returns:           dictionary of the header. The 'DatasetHeader' dictionary holds the parsed header
+                        blocks and values. The following keys are added:
+
+        ============== ================================================================
+        'file_name'    header file name
+        'data_file'    raster data file name
+        'offset'       byte offset to the first raster cell in the data file
+        'dtype'        numpy dtype of the cells, including byte order
+        'nx', 'ny'     cells per line and number of lines
+        'bands'        number of bands
+        'dx', 'dy'     cell size
+        'x0', 'y0'     location of the centre of the bottom-left cell
+        'rot'          rotation in degrees azimuth
+        'null'         null cell value, or `None`
+        ============== ================================================================
+
+    .. versionadded:: 9.6
+    """
+
+    file_name = _ers_file(file_name)
+    try:
+        with open(file_name, 'r', encoding='latin-1') as f:
+            hd = _parse_blocks(f.readlines())
+    except OSError:
+        raise ERSException(_t('Cannot read ER Mapper header "{}"').format(file_name))
+
+    ds = hd.get('DatasetHeader')
+    if not isinstance(ds, dict) or 'RasterInfo' not in ds:
+        raise ERSException(_t('"{}" is not an ER Mapper raster header.').format(file_name))
+    ri = ds['RasterInfo']
+    cs = ds.get('CoordinateSpace', {})
+
+    cell_type = ri.get('CellType', 'IEEE4ByteReal').lower()
+    if cell_type not in _CELL_TYPES:
+        raise ERSException(_t('Unsupported ER Mapper cell type "{}"').format(ri.get('CellType')))
+    order = '>' if ds.get('ByteOrder', 'LSBFirst').upper().startswith('MSB') else '<'
+    dtype = np.dtype(order + _CELL_TYPES[cell_type])
+
+    nx = int(ri['NrOfCellsPerLine'])
+    ny = int(ri['NrOfLines'])
+    bands = int(ri.get('NrOfBands', 1))
+    ci = ri.get('CellInfo', {})
+    dx = float(ci.get('Xdimension', 1.0))
+    dy = float(ci.get('Ydimension', dx))
+    rot = -_angle(cs.get('Rotation', '0:0:0.0')) or 0.0
+
+    reg = ri.get('RegistrationCoord', {})
+    if 'Eastings' in reg:
+        rx, ry = float(reg['Eastings']), float(reg.get('Northings', 0.))
+    elif 'Longitude' in reg:
+        rx, ry = _angle(reg['Longitude']), _angle(reg.get('Latitude', '0'))
+    else:
+        rx, ry = float(reg.get('MetersX', 0.)), float(reg.get('MetersY', 0.))
+    reg_cx = float(ri.get('RegistrationCellX', 0.))
+    reg_cy = float(ri.get('RegistrationCellY', 0.))
+
+    # registration is to the top-left corner of cell (RegistrationCellX, RegistrationCellY)
+    u = (0.5 - reg_cx) * dx
+    v = -((ny - 1) + 0.5 - reg_cy) * dy
+    if rot != 0.:
+        cos = math.cos(math.radians(rot))
+        sin = math.sin(math.radians(rot))
+        x0 = rx + u * cos + v * sin
+        y0 = ry - u * sin + v * cos
+    else:
+        x0 = rx + u
+        y0 = ry + v
+
+    null = ri.get('NullCellValue')
+    if null is not None:
+        null = float(null)
+
+    data_file = ds.get('DataFile')
+    if data_file:
+        data_file = os.path.join(os.path.dirname(file_name), data_file)
+    else:
+        data_file = os.path.splitext(file_name)[0]
+    if not os.path.exists(data_file):
+        raise ERSException(_t('ER Mapper data file "{}" not found.').format(data_file))
+
+    hd.update({'file_name': file_name,
+               'data_file': data_file,
+               'offset': int(ds.get('HeaderOffset', 0)),
+               'dtype': dtype,
+               'nx': nx,
+               'ny': ny,
+               'bands': bands,
+               'dx': dx,
+               'dy': dy,
+               'x0': x0,
+               'y0': y0,
+               'rot': rot,
+               'null': null,
+               'datum': cs.get('Datum', ''),
+               'projection': cs.get('Projection', ''),
+               'units': cs.get('Units', '')})
+    return hd
+
+
+def properties(file_name):
+    """
+    Grid properties dictionary, with the keys of `geosoft.gxpy.grid.Grid.properties`.
+
+    :param file_name:   grid file name, or a header dictionary returned from `read_header`
+    :returns:           properties dictionary. 'coordinate_system' is `None`. The ER Mapper datum and
+                        projection names are in the header 'datum' and 'projection'.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = file_name if isinstance(file_name, dict) else read_header(file_name)
+    return {'nx': hd['nx'],
+            'ny': hd['ny'],
+            'x0': hd['x0'],
+            'y0': hd['y0'],
+            'dx': hd['dx'],
+            'dy': hd['dy'],
+            'rot': hd['rot'],
+            'is_color': False,
+            'dtype': hd['dtype'].newbyteorder('='),
+            'gridtype': 'ERM',
+            'decoration': '',
+            'unit_of_measure': '',
+            'coordinate_system': None}
+
+
+def memmap(file_name, band=0):
+    """
+    Memory-map a band of an ER Mapper raster.
+
+    :param file_name:   grid file name
+    :param band:        band number, default 0
+    :returns:           (`numpy.memmap` view shaped (ny, nx), header). The view is flipped so that row 0
+                        is the bottom of the image. Values are as stored, including null cell values.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = read_header(file_name)
+    if not (0 <= band < hd['bands']):
+        raise ERSException(_t('Band {} not in range, there are {} bands').format(band, hd['bands']))
+    mm = np.memmap(hd['data_file'], dtype=hd['dtype'], mode='r', offset=hd['offset'],
+                   shape=(hd['ny'], hd['bands'], hd['nx']))
+    return mm[::-1, band, :], hd
+
+
+def read(file_name, window=None, band=0, dtype=None):
+    """
+    Read ER Mapper grid data.
+
+    :param file_name:   grid file name
+    :param window:      (ix0, iy0, nx, ny) window of grid indexes to read, where iy0 counts from the bottom
+                        row. The default reads the whole grid.
+    :param band:        band number, default 0
+    :param dtype:       numpy data type wanted, default is the cell type
+    :returns:           (numpy array shaped (ny, nx), properties dictionary). Null cells are `numpy.nan`
+                        for float types.
+
+    .. versionadded:: 9.6
+    """
+
+    mm, hd = memmap(file_name, band)
+    props = properties(hd)
+
+    if window is None:
+        window = (0, 0, hd['nx'], hd['ny'])
+    ix0, iy0, nx, ny = window
+    if (ix0 < 0) or (iy0 < 0) or (nx <= 0) or (ny <= 0) or (ix0 + nx > hd['nx']) or (iy0 + ny > hd['ny']):
+        raise ERSException(_t('Window {} out of bounds ({}, {})').format(window, hd['nx'], hd['ny']))
+
+    if dtype is None:
+        dtype = props['dtype']
+    dtype = np.dtype(dtype)
+
+    stored = mm[iy0: iy0 + ny, ix0: ix0 + nx]
+    data = stored.astype(dtype)
+    if hd['null'] is not None and np.issubdtype(dtype, np.floating):
+        data[stored == hd['null']] = np.nan
+    del mm
+
+    props['nx'] = nx
+    props['ny'] = ny
+    if ix0 or iy0:
+        ox = ix0 * props['dx']
+        oy = iy0 * props['dy']
+        if props['rot'] != 0.:
+            cos = math.cos(math.radians(props['rot']))
+            sin = math.sin(math.radians(props['rot']))
+            ox, oy = ox * cos + oy * sin, -ox * sin + oy * cos
+        props['x0'] += ox
+        props['y0'] += oy
+    props['dtype'] = dtype
+
+    return data, props
@@ -0,0 +1,457 @@
+"""
+Numpy evaluation of grid expressions.
+
+Expressions use the Python/C math expression syntax of `geosoft.gxpy.grid_utility.expression`, and are
+evaluated on numpy arrays, for example tiles of grid data. Dummies are `numpy.nan` and propagate through
+the expression. If the `numexpr <https://github.com/pydata/numexpr>`_ package is installed it is used
+to evaluate expressions, otherwise numpy is used. This module does not require the Geosoft runtime.
+
+Syntax:
+
+    ================================ =====================================================================
+    statements                       separated by ';' and may span lines. A statement is either an
+                                     assignment `name = expression` or an expression. As for
+                                     `geosoft.gxapi.GXIEXP`, the result `_` is the value of the first
+                                     statement, replaced by any later assignment to `_`.
+    operators                        `+ - * / % **`, comparisons `< <= > >= == !=`, logical `&& || !`
+                                     and the conditional `condition ? a : b`. Comparisons and logical
+                                     operators return 1 or 0.
+    `DUMMY`                          the dummy value. `a == DUMMY` is 1 where `a` is dummy.
+    functions                        `abs sqrt exp log log10 sin cos tan asin acos atan atan2 sinh cosh
+                                     tanh floor ceil round min max pow`
+    ================================ =====================================================================
+
+Any operation on a dummy returns a dummy, except testing for a dummy with `== DUMMY` or `!= DUMMY`.
+Infinite results, for example from division by zero, are dummy.
+
+.. seealso:: `geosoft.gxpy.grid_utility.expression`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_expression.py>`_
+
+.. versionadded:: 9.6
+"""
+import re
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+class ExpressionException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_expression`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+_TOKEN = re.compile(r'\s*(?:'
+                    r'(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|'
+                    r'(?P<name>[A-Za-z_@][A-Za-z0-9_@]*)|'
+                    r'(?P<op>\*\*|&&|\|\||==|!=|<=|>=|[-+*/%<>!?:(),=;]))')
+
+# function name: (numpy function, numexpr name or None, number of arguments)
+_FUNCTIONS = {
+    'abs': (np.abs, 'abs', 1),
+    'sqrt': (np.sqrt, 'sqrt', 1),
+    'exp': (np.exp, 'exp', 1),
+    'log': (np.log, 'log', 1),
+    'log10': (np.log10, 'log10', 1),
+    'sin': (np.sin, 'sin', 1),
+    'cos': (np.cos, 'cos', 1),
+    'tan': (np.tan, 'tan', 1),
+    'asin': (np.arcsin, 'arcsin', 1),
+    'acos': (np.arccos, 'arccos', 1),
+    'atan': (np.arctan, 'arctan', 1),
+    'atan2': (np.arctan2, 'arctan2', 2),
+    'sinh': (np.sinh, 'sinh', 1),
+    'cosh': (np.cosh, 'cosh', 1),
+    'tanh': (np.tanh, 'tanh', 1),
+    'floor': (np.floor, None, 1),
+    'ceil': (np.ceil, None, 1),
+    'round': (lambda a: np.trunc(a + np.copysign(0.5, a)), None, 1),
+    'min': (np.minimum, None, 2),
+    'max': (np.maximum, None, 2),
+    'pow': (np.power, None, 2),
+}
+
+_COMPARE = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+            '==': np.equal, '!=': np.not_equal}
+_ARITHMETIC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide, '%': np.fmod,
+               '**': np.power}
+
+
+def _tokenize(expr):
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        m = _TOKEN.match(expr, pos)
+        if m is None or m.end() == pos:
+            raise ExpressionException(_t('Invalid expression syntax at "{}"').format(expr[pos:pos + 20]))
+        pos = m.end()
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+    tokens.append(('end', None))
+    return tokens
+
+
+class _Parser:
+    """ recursive-descent parser that builds a tuple tree"""
+
+    def __init__(self, expr):
+        self.tokens = _tokenize(expr)
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i]
+
+    def take(self, value=None):
+        kind, v = self.tokens[self.i]
+        if value is not None and v != value:
+            raise ExpressionException(_t('Expected "{}" but found "{}"').format(value, v))
+        self.i += 1
+        return kind, v
+
+    def statements(self):
+        stmts = []
+        while self.peek()[0] != 'end':
+            if self.peek()[1] == ';':
+                self.take()
+                continue
+            target = None
+            if (self.peek()[0] == 'name') and (self.tokens[self.i + 1][1] == '='):
+                target = self.take()[1]
+                self.take('=')
+            stmts.append((target, self.conditional()))
+            if self.peek()[0] != 'end':
+                self.take(';')
+        if not stmts:
+            raise ExpressionException(_t('Empty expression'))
+        return stmts
+
+    def conditional(self):
+        c = self.binary(0)
+        if self.peek()[1] == '?':
+            self.take()
+            a = self.conditional()
+            self.take(':')
+            b = self.conditional()
+            return ('cond', c, a, b)
+        return c
+
+    _LEVELS = (('||',), ('&&',), ('==', '!='), ('<', '<=', '>', '>='), ('+', '-'), ('*', '/', '%'))
+
+    def binary(self, level):
+        if level == len(self._LEVELS):
+            return self.unary()
+        a = self.binary(level + 1)
+        while self.peek()[0] == 'op' and self.peek()[1] in self._LEVELS[level]:
+            op = self.take()[1]
+            a = ('bin', op, a, self.binary(level + 1))
+        return a
+
+    def unary(self):
+        if self.peek()[1] in ('-', '+', '!'):
+            op = self.take()[1]
+            return ('un', op, self.unary())
+        return self.power()
+
+    def power(self):
+        a = self.primary()
+        if self.peek()[1] == '**':
+            self.take()
+            return ('bin', '**', a, self.unary())
+        return a
+
+    def primary(self):
+        kind, v = self.take()
+        if kind == 'num':
+            return ('num', float(v))
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                self.take()
+                args = []
+                if self.peek()[1] != ')':
+                    args.append(self.conditional())
+                    while self.peek()[1] == ',':
+                        self.take()
+                        args.append(self.conditional())
+                self.take(')')
+                f = _FUNCTIONS.get(v.lower())
+                if f is None:
+                    raise ExpressionException(_t('Unknown function "{}"').format(v))
+                if len(args) != f[2]:
+                    raise ExpressionException(_t('Function "{}" expects {} arguments').format(v, f[2]))
+                return ('call', v.lower(), args)
+            if v.upper() == 'DUMMY':
+                return ('dummy',)
+            return ('var', v)
+        if v == '(':
+            a = self.conditional()
+            self.take(')')
+            return a
+        raise ExpressionException(_t('Unexpected "{}" in expression').format(v))
+
+
+def _names(node, names):
+    if node[0] == 'var':
+        names.append(node[1])
+    elif node[0] == 'un':
+        _names(node[2], names)
+    elif node[0] == 'bin':
+        _names(node[2], names)
+        _names(node[3], names)
+    elif node[0] == 'cond':
+        for n in node[1:]:
+            _names(n, names)
+    elif node[0] == 'call':
+        for n in node[2]:
+            _names(n, names)
+
+
+def _either_nan(a, b):
+    return np.isnan(a) | np.isnan(b)
+
+
+def _np_eval(node, env):
+
+    kind = node[0]
+    if kind == 'num':
+        return node[1]
+    if kind == 'dummy':
+        return np.nan
+    if kind == 'var':
+        return env[node[1]]
+
+    if kind == 'un':
+        a = _np_eval(node[2], env)
+        if node[1] == '-':
+            return np.negative(a)
+        if node[1] == '+':
+            return a
+        return np.where(np.isnan(a), np.nan, np.equal(a, 0.).astype(np.float64))
+
+    if kind == 'bin':
+        op = node[1]
+        left, right = node[2], node[3]
+        if op in ('==', '!=') and ('dummy',) in (left, right):
+            other = right if left == ('dummy',) else left
+            isdummy = np.isnan(_np_eval(other, env))
+            return (isdummy if op == '==' else ~isdummy).astype(np.float64)
+        a = _np_eval(left, env)
+        b = _np_eval(right, env)
+        if op in _ARITHMETIC:
+            return _ARITHMETIC[op](a, b)
+        if op in _COMPARE:
+            v = _COMPARE[op](a, b)
+        elif op == '&&':
+            v = np.not_equal(a, 0.) & np.not_equal(b, 0.)
+        else:
+            v = np.not_equal(a, 0.) | np.not_equal(b, 0.)
+        return np.where(_either_nan(a, b), np.nan, v.astype(np.float64))
+
+    if kind == 'cond':
+        c = _np_eval(node[1], env)
+        a = _np_eval(node[2], env)
+        b = _np_eval(node[3], env)
+        return np.where(np.isnan(c), np.nan, np.where(np.not_equal(c, 0.), a, b))
+
+    f = _FUNCTIONS[node[1]][0]
+    return f(*[_np_eval(n, env) for n in node[2]])
+
+
+def _ne_string(node):
+    """ numexpr expression string, or None if the expression cannot be evaluated by numexpr"""
+
+    kind = node[0]
+    if kind == 'num':
+        return repr(node[1])
+    if kind == 'dummy':
+        return '_nan'
+    if kind == 'var':
+        return node[1] if node[1].isidentifier() else None
+
+    def isnan(s):
+        return '({0} != {0})'.format(s)
+
+    if kind == 'un':
+        a = _ne_string(node[2])
+        if a is None:
+            return None
+        if node[1] == '!':
+            return 'where({}, _nan, where({} == 0.0, 1.0, 0.0))'.format(isnan(a), a)
+        return '({}({}))'.format(node[1], a)
+
+    if kind == 'bin':
+        op = node[1]
+        left, right = node[2], node[3]
+        if op in ('==', '!=') and ('dummy',) in (left, right):
+            other = _ne_string(right if left == ('dummy',) else left)
+            if other is None:
+                return None
+            return 'where({} {} {}, 1.0, 0.0)'.format(other, '!=' if op == '==' else '==', other)
+        a = _ne_string(left)
+        b = _ne_string(right)
+        if a is None or b is None:
+            return None
+        if op in _ARITHMETIC:
+            return '({} {} {})'.format(a, op, b)
+        if op in _COMPARE:
+            v = '({} {} {})'.format(a, op, b)
+        elif op == '&&':
+            v = '(({} != 0.0) & ({} != 0.0))'.format(a, b)
+        else:
+            v = '(({} != 0.0) | ({} != 0.0))'.format(a, b)
+        return 'where({} | {}, _nan, where({}, 1.0, 0.0))'.format(isnan(a), isnan(b), v)
+
+    if kind == 'cond':
+        c, a, b = [_ne_string(n) for n in node[1:]]
+        if None in (c, a, b):
+            return None
+        return 'where({}, _nan, where({} != 0.0, {}, {}))'.format(isnan(c), c, a, b)
+
+    name = _FUNCTIONS[node[1]][1]
+    args = [_ne_string(n) for n in node[2]]
+    if name is None or None in args:
+        return None
+    return '{}({})'.format(name, ', '.join(args))
+
+
+class Expression:
+    """
+    A parsed expression that can be evaluated on numpy arrays.
+
+    :param expr:    expression string, see the module documentation for the syntax.
+
+    *Example*
+
+    .. code::
+
+        import numpy as np
+        import geosoft.gxpy.grid_expression as gxexp
+
+        exp = gxexp.Expression('g1 > 0 ? sqrt(g1) : g2')
+        result = exp.evaluate({'g1': np.array([4., -1., np.nan]), 'g2': 5.})
+        # result is [2., 5., nan]
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, expr):
+        self._expr = expr
+        self._statements = _Parser(expr).statements()
+
+        operands = []
+        assigned = set()
+        for target, node in self._statements:
+            names = []
+            _names(node, names)
+            for n in names:
+                if n not in assigned and n not in operands:
+                    operands.append(n)
+            if target:
+                assigned.add(target)
+            # the first statement assigns the result
+            assigned.add('_')
+        self._operands = operands
+
+        self._ne = None
+        if numexpr is not None:
+            self._ne = [_ne_string(node) for _, node in self._statements]
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self._expr)
+
+    @property
+    def operands(self):
+        """list of operand names required by the expression, in order of use"""
+        return list(self._operands)
+
+    @property
+    def uses_numexpr(self):
+        """`True` if all statements are evaluated by numexpr"""
+        return bool(self._ne) and (None not in self._ne)
+
+    def evaluate(self, operands, dtype=None):
+        """
+        Evaluate the expression.
+
+        :param operands:    dictionary of operand values by name, numpy arrays that broadcast together,
+                            or scalars. Dummies are `numpy.nan`. Values are converted to float64.
+        :param dtype:       result dtype, default is float64. Integer results have dummies set to the
+                            Geosoft integer dummy for the type.
+        :returns:           numpy array result
+
+        .. versionadded:: 9.6
+        """
+
+        missing = [n for n in self._operands if n not in operands]
+        if missing:
+            raise ExpressionException(_t('Missing operands: {}').format(missing))
+
+        env = {n: np.asarray(operands[n], dtype=np.float64) for n in self._operands}
+        env['_nan'] = np.float64(np.nan)
+        with np.errstate(all='ignore'):
+            for i, (target, node) in enumerate(self._statements):
+                if self._ne and self._ne[i] is not None:
+                    names = []
+                    _names(node, names)
+                    local = {n: env[n] for n in names}
+                    local['_nan'] = env['_nan']
+                    value = numexpr.evaluate(self._ne[i], local_dict=local)
+                else:
+                    value = _np_eval(node, env)
+                value = np.asarray(value, dtype=np.float64)
+                if target:
+                    env[target] = value
+                if i == 0:
+                    env['_'] = value
+            result = np.where(np.isinf(env['_']), np.nan, env['_'])
+
+        return _to_dtype(result, dtype)
+
+
+def _to_dtype(data, dtype):
+    if dtype is None:
+        return data
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return data.astype(dtype)
+    if dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        # Geosoft integer dummies
+        dummy = info.max if dtype.kind == 'u' else info.min + 1
+        dummies = np.isnan(data)
+        data = np.clip(np.where(dummies, 0., data), info.min, info.max).astype(dtype)
+        data[dummies] = dummy
+        return data
+    raise ExpressionException(_t('Unsupported result dtype {}').format(dtype))
+
+
+def evaluate(expr, operands, dtype=None):
+    """
+    Evaluate an expression on numpy arrays.
+
+    :param expr:        expression string, see the module documentation for the syntax.
+    :param operands:    dictionary of operand arrays or scalars by name, dummies are `numpy.nan`
+    :param dtype:       result dtype, default is float64
+    :returns:           numpy array result
+
+    .. versionadded:: 9.6
+    """
+    return Expression(expr).evaluate(operands, dtype=dtype)
@@ -164,8 +164,7 @@ class GridFFT:
                                                        itrmax=buff_iterations,
                                                        pastol=99.,
                                                        tol=btol,
-                                                       icgr=16,
-                                                       max_segments=grid.ny)
+                                                       icgr=16)
 
             # expand for periodic function
             gxc.log(_t('Expand from ({}, {})').format(grid.nx, grid.ny))
@@ -0,0 +1,245 @@
+"""
+Filling and feathering of grid data in numpy.
+
+`flood` fills dummy areas of a grid, and `feather` tapers grid values to a constant value at the edges of
+the grid, and optionally at the edges of dummy areas. Both work on numpy arrays and are based on the exact Euclidean
+distance transform `distance`, which is computed in time proportional to the number of grid points. This
+module does not require the Geosoft runtime.
+
+.. seealso:: `geosoft.gxpy.grid_utility.flood`, `geosoft.gxpy.grid_utility.feather`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_fill.py>`_
+
+.. versionadded:: 9.6
+"""
+import math
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+class FillException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_fill`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _envelope(f):
+    """
+    Squared distance transform along the rows of f, the lower envelope of parabolas rooted at each finite
+    point (Felzenszwalb and Huttenlocher). The rows are processed together, one column at a time, and rows
+    without finite points remain `numpy.inf`.
+    """
+
+    rows, n = f.shape
+    k = np.full(rows, -1, dtype=np.int64)
+    v = np.zeros((rows, n), dtype=np.int64)
+    z = np.empty((rows, n + 1))
+
+    for q in range(n):
+        a = np.flatnonzero(np.isfinite(f[:, q]))
+        if not len(a):
+            continue
+        ka = k[a]
+        fq = f[a, q] + q * q
+        s = np.full(len(a), -np.inf)
+
+        # pop the parabolas hidden by the parabola at q
+        pending = np.flatnonzero(ka >= 0)
+        while len(pending):
+            rp = a[pending]
+            vk = v[rp, ka[pending]]
+            sp = (fq[pending] - (f[rp, vk] + vk * vk)) / (2. * (q - vk))
+            s[pending] = sp
+            pop = pending[sp <= z[rp, ka[pending]]]
+            ka[pop] -= 1
+            pending = pop[ka[pop] >= 0]
+        s[ka < 0] = -np.inf
+
+        ka += 1
+        v[a, ka] = q
+        z[a, ka] = s
+        z[a, ka + 1] = np.inf
+        k[a] = ka
+
+    d = np.full(f.shape, np.inf)
+    r = np.flatnonzero(k >= 0)
+    kr = np.zeros(len(r), dtype=np.int64)
+    for q in range(n):
+        while True:
+            beyond = z[r, kr + 1] < q
+            if not beyond.any():
+                break
+            kr[beyond] += 1
+        vk = v[r, kr]
+        d[r, q] = (q - vk) ** 2 + f[r, vk]
+    return d
+
+
+def distance(mask, sampling=(1., 1.)):
+    """
+    Exact Euclidean distance from each grid point to the nearest `True` point of a mask.
+
+    :param mask:        2D boolean numpy array shaped (ny, nx)
+    :param sampling:    (dx, dy) point separation, default (1., 1.) measures distance in cells
+    :returns:           numpy float array of distances shaped like `mask`, 0. at `True` points, and `numpy.inf`
+                        everywhere if the mask has no `True` points.
+
+    .. versionadded:: 9.6
+    """
+
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim != 2:
+        raise FillException(_t('Mask must be 2-dimensional'))
+    if not mask.any():
+        return np.full(mask.shape, np.inf)
+
+    dx, dy = sampling
+
+    # distance along columns, then the envelope along rows, in units scaled to make each pass unit spaced
+    f = np.where(mask, 0., np.inf).T
+    d = _envelope(np.ascontiguousarray(f)).T * (dy * dy)
+    d = _envelope(np.ascontiguousarray(d / (dx * dx))) * (dx * dx)
+    return np.sqrt(d)
+
+
+def taper(d, width):
+    """
+    Cosine taper of a distance from an edge, 0. at distance 0 and 1. at distance `width` and beyond.
+
+    :param d:       distance in cells, numpy array
+    :param width:   taper width in cells
+    :returns:       numpy array of taper factors
+
+    .. versionadded:: 9.6
+    """
+
+    if width <= 0:
+        return np.ones(np.shape(d))
+    d = np.clip(np.asarray(d, dtype=np.float64), 0., width)
+    return 0.5 - 0.5 * np.cos(d * (math.pi / width))
+
+
+def feather(data, width, edge_value=None, feather_blanks=False):
+    """
+    Feather grid values to a constant value at the grid edges.
+
+    :param data:            2D numpy array of grid values, dummies are `numpy.nan`
+    :param width:           feather width in cells
+    :param edge_value:      value at the edges, default is the mean of the valid values
+    :param feather_blanks:  `True` to also feather values to the edge value at the edges of dummy areas,
+                            default is `False`.
+    :returns:               feathered float64 numpy array, dummies remain dummies
+
+    Each value is tapered by the product of the cosine tapers (see `taper`) of its row and column distance
+    from the grid edges, so points on the grid edge have the edge value. If `feather_blanks` is `True`
+    values are also tapered by their Euclidean distance from the nearest dummy, and points next to a dummy
+    have the edge value.
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.array(data, dtype=np.float64)
+    if data.ndim != 2:
+        raise FillException(_t('Grid data must be 2-dimensional'))
+    ny, nx = data.shape
+    width = int(width)
+    dummy = np.isnan(data)
+    if edge_value is None:
+        edge_value = float(data[~dummy].mean()) if not dummy.all() else 0.
+
+    f = taper(np.minimum(np.arange(ny), np.arange(ny)[::-1]), width)[:, np.newaxis] * \
+        taper(np.minimum(np.arange(nx), np.arange(nx)[::-1]), width)[np.newaxis, :]
+    if feather_blanks and dummy.any():
+        f = f * taper(distance(dummy) - 1., width)
+
+    data -= edge_value
+    data *= f
+    data += edge_value
+    return data
+
+
+def _neighbours(ny, nx, iy, ix):
+    """ 8-neighbour indexes inside the grid and their distances, for points (iy, ix)"""
+    for oy in (-1, 0, 1):
+        for ox in (-1, 0, 1):
+            if oy or ox:
+                jy = iy + oy
+                jx = ix + ox
+                inside = (jy >= 0) & (jy < ny) & (jx >= 0) & (jx < nx)
+                yield np.where(inside, jy, 0), np.where(inside, jx, 0), inside, math.hypot(ox, oy)
+
+
+def flood(data, tolerance=None, max_iterations=250, pass_tol=99.):
+    """
+    Fill dummy areas of a grid.
+
+    :param data:            2D numpy array of grid values, dummies are `numpy.nan`
+    :param tolerance:       smoothing tolerance, default is 0.001 times the standard deviation of the data
+    :param max_iterations:  maximum number of smoothing iterations, 0 for no smoothing
+    :param pass_tol:        percentage of filled points that must change by less than the tolerance in a
+                            smoothing iteration to stop, default 99.
+    :returns:               filled float64 numpy array, with the valid values unchanged
+
+    Dummies are filled in priority order of their distance from valid data, which is found by the distance
+    transform. Each dummy is set to the inverse-distance weighted mean of its neighbours that are valid or
+    already filled, and the filled values are then smoothed by relaxation toward a harmonic surface that
+    honours the valid values. Filled values are always within the range of the valid values.
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.array(data, dtype=np.float64)
+    if data.ndim != 2:
+        raise FillException(_t('Grid data must be 2-dimensional'))
+    dummy = np.isnan(data)
+    if not dummy.any():
+        return data
+    if dummy.all():
+        raise FillException(_t('The grid has no valid data.'))
+    ny, nx = data.shape
+
+    # dummies in increasing distance from the data, in batches of half a cell, so that every dummy has a
+    # neighbour in an earlier batch
+    d = distance(~dummy)
+    iy, ix = np.nonzero(dummy)
+    batch = np.floor(d[iy, ix] * 2.).astype(np.int64)
+    order = np.argsort(batch, kind='stable')
+    iy, ix, batch = iy[order], ix[order], batch[order]
+    bounds = np.flatnonzero(np.diff(batch)) + 1
+    known = ~dummy
+    for by, bx in zip(np.split(iy, bounds), np.split(ix, bounds)):
+        s = np.zeros(len(by))
+        w = np.zeros(len(by))
+        for jy, jx, inside, dist in _neighbours(ny, nx, by, bx):
+            use = inside & known[jy, jx]
+            s += np.where(use, data[jy, jx], 0.) / dist
+            w += use / dist
+        data[by, bx] = s / w
+        known[by, bx] = True
+
+    if max_iterations > 0:
+        if tolerance is None:
+            tolerance = np.std(data[~dummy]) * 0.001
+        need = int(math.ceil(len(iy) * pass_tol / 100.))
+        for _ in range(int(max_iterations)):
+            p = np.pad(data, 1, mode='edge')
+            new = 0.25 * (p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:])[dummy]
+            passed = np.count_nonzero(np.abs(new - data[dummy]) < tolerance)
+            data[dummy] = new
+            if passed >= need:
+                break
+
+    return data
@@ -0,0 +1,762 @@
+"""
+Pure-Python writing and reading of tiled, deflate-compressed GeoTIFF grids.
+
+Grids are written as Cloud-Optimized GeoTIFF (COG): square tiles, deflate compression, reduced-resolution
+overviews in the same file, and all image file directories at the start of the file followed by the tile
+data of the smallest overview first and the full-resolution image last. Grid values are written as a single
+band, dummies are written as the GDAL nodata value, and the grid location, cell size and rotation are written
+as GeoTIFF georeferencing.
+
+Data is read from the source one band of tile rows at a time, tiles are compressed on a thread pool and
+spilled to temporary files, which are assembled into the GeoTIFF file at the end, so memory depends on the
+tile size and grid width rather than the grid size. This module does not require the Geosoft runtime.
+
+:Constants:
+    :TILE_SIZE:         256, default tile dimension in pixels
+    :COMPRESS_LEVEL:    6, default zlib compression level
+
+.. seealso:: `geosoft.gxpy.grid.Grid.to_geotiff`, `geosoft.gxpy.grid_overview`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_geotiff.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+import shutil
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+from . import grid_grd as gxgrdgrd
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+TILE_SIZE = 256
+COMPRESS_LEVEL = 6
+
+# TIFF tags
+_NEW_SUBFILE_TYPE = 254
+_IMAGE_WIDTH = 256
+_IMAGE_LENGTH = 257
+_BITS_PER_SAMPLE = 258
+_COMPRESSION = 259
+_PHOTOMETRIC = 262
+_SAMPLES_PER_PIXEL = 277
+_PLANAR_CONFIGURATION = 284
+_PREDICTOR = 317
+_TILE_WIDTH = 322
+_TILE_LENGTH = 323
+_TILE_OFFSETS = 324
+_TILE_BYTE_COUNTS = 325
+_SAMPLE_FORMAT = 339
+_MODEL_PIXEL_SCALE = 33550
+_MODEL_TIEPOINT = 33922
+_MODEL_TRANSFORMATION = 34264
+_GEO_KEY_DIRECTORY = 34735
+_GEO_DOUBLE_PARAMS = 34736
+_GEO_ASCII_PARAMS = 34737
+_GDAL_NODATA = 42113
+
+# TIFF field types: (struct format, size)
+_ASCII = 2
+_SHORT = 3
+_LONG = 4
+_DOUBLE = 12
+_LONG8 = 16
+_FIELD_TYPES = {1: ('B', 1), _ASCII: ('s', 1), _SHORT: ('H', 2), _LONG: ('I', 4), 6: ('b', 1), 7: ('B', 1),
+                8: ('h', 2), 9: ('i', 4), 11: ('f', 4), _DOUBLE: ('d', 8), _LONG8: ('Q', 8), 17: ('q', 8)}
+
+_COMPRESSION_NONE = 1
+_COMPRESSION_DEFLATE = (8, 32946)
+
+# GeoTIFF keys
+_GT_MODEL_TYPE = 1024
+_GT_RASTER_TYPE = 1025
+_GT_CITATION = 1026
+_GEOGRAPHIC_TYPE = 2048
+_GEOG_CITATION = 2049
+_PROJECTED_CS_TYPE = 3072
+_PCS_CITATION = 3073
+_MODEL_PROJECTED = 1
+_MODEL_GEOGRAPHIC = 2
+_RASTER_PIXEL_IS_AREA = 1
+_USER_DEFINED = 32767
+_ESRI_PE = 'ESRI PE String = '
+
+
+class GeoTIFFException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_geotiff`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _sample_format(dtype):
+    if np.issubdtype(dtype, np.floating):
+        return 3
+    if np.issubdtype(dtype, np.signedinteger):
+        return 2
+    return 1
+
+
+def _nodata(dtype):
+    """ nodata value written for dummies"""
+    if np.issubdtype(dtype, np.floating):
+        return np.nan
+    return gxgrdgrd.dummy_value(dtype)
+
+
+def _nodata_string(value):
+    if isinstance(value, float) and math.isnan(value):
+        return 'nan'
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+def default_overviews(nx, ny, tile_size=TILE_SIZE):
+    """
+    Number of overviews until the image fits in one tile.
+
+    .. versionadded:: 9.6
+    """
+
+    levels = 0
+    while max(nx, ny) > tile_size:
+        nx = (nx + 1) // 2
+        ny = (ny + 1) // 2
+        levels += 1
+    return levels
+
+
+def _geo_tags(properties, nx, ny, epsg, wkt):
+    """ GeoTIFF tags: list of (tag, type, values)"""
+
+    x0 = properties.get('x0', 0.)
+    y0 = properties.get('y0', 0.)
+    dx = properties.get('dx', 1.)
+    dy = properties.get('dy', dx)
+    rot = properties.get('rot', 0.)
+    tags = []
+
+    if rot:
+        cos = math.cos(math.radians(rot))
+        sin = math.sin(math.radians(rot))
+        a, b = dx * cos, -dy * sin
+        e, f = -dx * sin, -dy * cos
+        d = x0 - 0.5 * a - (ny - 0.5) * b
+        h = y0 - 0.5 * e - (ny - 0.5) * f
+        tags.append((_MODEL_TRANSFORMATION, _DOUBLE, (a, b, 0., d, e, f, 0., h, 0., 0., 0., 0., 0., 0., 0., 1.)))
+    else:
+        tags.append((_MODEL_PIXEL_SCALE, _DOUBLE, (dx, dy, 0.)))
+        tags.append((_MODEL_TIEPOINT, _DOUBLE, (0., 0., 0., x0 - 0.5 * dx, y0 + (ny - 0.5) * dy, 0.)))
+
+    keys = [(_GT_RASTER_TYPE, 0, 1, _RASTER_PIXEL_IS_AREA)]
+    ascii_params = ''
+    if epsg:
+        geographic = 4000 <= int(epsg) < 5000
+        if geographic:
+            keys.append((_GT_MODEL_TYPE, 0, 1, _MODEL_GEOGRAPHIC))
+            keys.append((_GEOGRAPHIC_TYPE, 0, 1, int(epsg)))
+        else:
+            keys.append((_GT_MODEL_TYPE, 0, 1, _MODEL_PROJECTED))
+            keys.append((_PROJECTED_CS_TYPE, 0, 1, int(epsg)))
+    elif wkt:
+        ascii_params = _ESRI_PE + wkt + '|'
+        if wkt.upper().startswith('PROJCS'):
+            keys.append((_GT_MODEL_TYPE, 0, 1, _MODEL_PROJECTED))
+            keys.append((_PROJECTED_CS_TYPE, 0, 1, _USER_DEFINED))
+            keys.append((_PCS_CITATION, _GEO_ASCII_PARAMS, len(ascii_params), 0))
+        else:
+            keys.append((_GT_MODEL_TYPE, 0, 1, _MODEL_GEOGRAPHIC))
+            keys.append((_GEOGRAPHIC_TYPE, 0, 1, _USER_DEFINED))
+            keys.append((_GEOG_CITATION, _GEO_ASCII_PARAMS, len(ascii_params), 0))
+
+    keys.sort()
+    directory = [1, 1, 0, len(keys)]
+    for k in keys:
+        directory.extend(k)
+    tags.append((_GEO_KEY_DIRECTORY, _SHORT, tuple(directory)))
+    if ascii_params:
+        tags.append((_GEO_ASCII_PARAMS, _ASCII, ascii_params))
+    return tags
+
+
+class _Layout:
+    """ classic or BigTIFF structure sizes and formats"""
+
+    def __init__(self, bigtiff):
+        self.bigtiff = bigtiff
+        if bigtiff:
+            self.header_size = 16
+            self.count_format = '<Q'
+            self.entry_format = '<HHQ'
+            self.entry_size = 20
+            self.inline = 8
+            self.offset_format = '<Q'
+            self.offset_type = _LONG8
+        else:
+            self.header_size = 8
+            self.count_format = '<H'
+            self.entry_format = '<HHI'
+            self.entry_size = 12
+            self.inline = 4
+            self.offset_format = '<I'
+            self.offset_type = _LONG
+
+    def header(self, first_ifd):
+        if self.bigtiff:
+            return b'II' + struct.pack('<HHHQ', 43, 8, 0, first_ifd)
+        return b'II' + struct.pack('<HI', 42, first_ifd)
+
+    @staticmethod
+    def _value_bytes(field_type, values):
+        if field_type == _ASCII:
+            return values.encode('latin-1') + b'\x00'
+        fmt, _ = _FIELD_TYPES[field_type]
+        return struct.pack('<{}{}'.format(len(values), fmt), *values)
+
+    def ifd_size(self, tags):
+        size = struct.calcsize(self.count_format) + len(tags) * self.entry_size + self.inline
+        for field_type, values in ((t[1], t[2]) for t in tags):
+            n = len(self._value_bytes(field_type, values))
+            if n > self.inline:
+                size += n + (n & 1)
+        return size
+
+    def ifd(self, tags, offset, next_ifd):
+        """ bytes of an IFD written at `offset`"""
+
+        tags = sorted(tags, key=lambda t: t[0])
+        entries = struct.pack(self.count_format, len(tags))
+        data_offset = offset + struct.calcsize(self.count_format) + len(tags) * self.entry_size + self.inline
+        extra = b''
+        for tag, field_type, values in tags:
+            value_bytes = self._value_bytes(field_type, values)
+            count = len(value_bytes) if field_type == _ASCII else len(values)
+            entries += struct.pack(self.entry_format, tag, field_type, count)
+            if len(value_bytes) <= self.inline:
+                entries += value_bytes.ljust(self.inline, b'\x00')
+            else:
+                entries += struct.pack(self.offset_format, data_offset + len(extra))
+                extra += value_bytes
+                if len(value_bytes) & 1:
+                    extra += b'\x00'
+        entries += struct.pack(self.offset_format, next_ifd)
+        return entries + extra
+
+
+class _Level:
+    """ tiles of one image level, with a spill file of compressed tiles"""
+
+    def __init__(self, nx, ny, tile_size, spill_file):
+        self.nx = nx
+        self.ny = ny
+        self.tile_size = tile_size
+        self.tiles_across = (nx + tile_size - 1) // tile_size
+        self.tiles_down = (ny + tile_size - 1) // tile_size
+        self.spill_file = spill_file
+        self.spill = open(spill_file, 'wb')
+        self.tiles = []  # (spill offset, byte count) in tile order
+        self.rows = []  # pending rows for the next band of tiles
+        self.n_rows = 0
+
+        # (sum, count) row waiting for its pair in the 2 x 2 reduction to the next level
+        self.carry = None
+
+
+def _reduce_rows(level_rows, method, carry, final):
+    """
+    Reduce (sum, count) rows by 2 x 2 for the next level.
+    Returns (reduced (sum, count) rows or None, new carry).
+    """
+
+    s, n = level_rows
+    if carry is not None:
+        s = np.vstack((carry[0], s))
+        n = np.vstack((carry[1], n))
+    rows = s.shape[0]
+    if rows % 2 and not final:
+        carry = (s[-1:], n[-1:])
+        s = s[:-1]
+        n = n[:-1]
+    else:
+        carry = None
+    if s.shape[0] == 0:
+        return None, carry
+
+    if s.shape[0] % 2:
+        s = np.vstack((s, np.zeros((1, s.shape[1]))))
+        n = np.vstack((n, np.zeros((1, n.shape[1]))))
+    if s.shape[1] % 2:
+        s = np.hstack((s, np.zeros((s.shape[0], 1))))
+        n = np.hstack((n, np.zeros((n.shape[0], 1))))
+
+    if method == 'nearest':
+        s2 = s[0::2, 0::2]
+        n2 = n[0::2, 0::2]
+    else:
+        s2 = s[0::2, 0::2] + s[1::2, 0::2] + s[0::2, 1::2] + s[1::2, 1::2]
+        n2 = n[0::2, 0::2] + n[1::2, 0::2] + n[0::2, 1::2] + n[1::2, 1::2]
+    return (s2, n2), carry
+
+
+def write(file_name, source, properties, dtype=None, tile_size=TILE_SIZE, overviews=None, method='mean',
+          compress_level=COMPRESS_LEVEL, threads=None, epsg=None, wkt=None, bigtiff=None, overwrite=False):
+    """
+    Write a grid as a tiled, deflate-compressed Cloud-Optimized GeoTIFF.
+
+    :param file_name:       GeoTIFF file name
+    :param source:          2D numpy array shaped (ny, nx) of grid values, or a function `source(window)` that
+                            returns the grid values in an (ix0, iy0, nx, ny) window as a numpy array, such as
+                            `geosoft.gxpy.grid.Grid.np`. Row 0 is the grid origin, and float dummies are
+                            `numpy.nan`.
+    :param properties:      grid properties, see `geosoft.gxpy.grid.Grid.properties`. 'nx', 'ny', 'x0', 'y0',
+                            'dx', 'dy', 'rot' and 'dtype' are used.
+    :param dtype:           data type written, default is the properties 'dtype', or float32
+    :param tile_size:       tile dimension in pixels, a multiple of 16, default `TILE_SIZE`
+    :param overviews:       number of overviews, default is enough overviews to fit the smallest in one tile
+    :param method:          overview method, 'mean' (default) of the valid values, or 'nearest'
+    :param compress_level:  zlib compression level 1 to 9, 0 for no compression
+    :param threads:         maximum number of threads, default is the number of processors
+    :param epsg:            EPSG code of the coordinate system, default none
+    :param wkt:             ESRI well-known-text of the coordinate system if there is no `epsg`, written as a
+                            GeoTIFF citation, which is understood by GDAL.
+    :param bigtiff:         `True` to write BigTIFF, default is BigTIFF only if the image may exceed 4 GB
+    :param overwrite:       `True` to overwrite an existing file
+    :returns:               file name
+
+    .. versionadded:: 9.6
+    """
+
+    if os.path.exists(file_name) and not overwrite:
+        raise GeoTIFFException(_t('Cannot overwrite existing file {}').format(file_name))
+    if properties.get('is_color', False):
+        raise GeoTIFFException(_t('Color grids are not supported.'))
+    if method not in ('mean', 'nearest'):
+        raise GeoTIFFException(_t('Unknown overview method "{}"').format(method))
+    tile_size = int(tile_size)
+    if tile_size <= 0 or tile_size % 16:
+        raise GeoTIFFException(_t('Tile size must be a multiple of 16, found {}').format(tile_size))
+
+    if isinstance(source, np.ndarray) or not callable(source):
+        array = np.asarray(source)
+        if array.ndim != 2:
+            raise GeoTIFFException(_t('Grid data must be 2-dimensional'))
+        ny, nx = array.shape
+        if dtype is None:
+            dtype = array.dtype
+
+        def source(window):
+            ix0, iy0, wnx, wny = window
+            return array[iy0: iy0 + wny, ix0: ix0 + wnx]
+
+    else:
+        nx = properties['nx']
+        ny = properties['ny']
+
+    if dtype is None:
+        dtype = properties.get('dtype', np.float32)
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype.kind not in 'uif':
+        raise GeoTIFFException(_t('Unsupported data type {}').format(dtype))
+    if dtype == np.float16:
+        dtype = np.dtype('<f4')
+    nodata = _nodata(dtype)
+
+    if overviews is None:
+        overviews = default_overviews(nx, ny, tile_size)
+    overviews = max(0, int(overviews))
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = max(1, threads)
+    if bigtiff is None:
+        bigtiff = nx * ny * dtype.itemsize * 4 // 3 > 2 ** 32 - 2 ** 28
+
+    levels = []
+    lnx, lny = nx, ny
+    for level in range(overviews + 1):
+        levels.append(_Level(lnx, lny, tile_size, '{}.level{}.tmp'.format(file_name, level)))
+        lnx = (lnx + 1) // 2
+        lny = (lny + 1) // 2
+
+    def to_dtype(values):
+        if dtype.kind == 'f':
+            return values.astype(dtype)
+        dummy = np.isnan(values)
+        if dtype.kind != 'f' and values.dtype.kind == 'f':
+            values = np.rint(values)
+        info = np.iinfo(dtype)
+        values = np.clip(np.nan_to_num(values), info.min, info.max).astype(dtype)
+        values[dummy] = nodata
+        return values
+
+    def compress_band(band, n_across):
+        """ compressed tiles of a band of rows, padded to full tiles"""
+        rows = band.shape[0]
+        padded = np.full((tile_size, n_across * tile_size), nodata, dtype=dtype)
+        padded[:rows, :band.shape[1]] = band
+        tiles = []
+        for it in range(n_across):
+            tile = np.ascontiguousarray(padded[:, it * tile_size: (it + 1) * tile_size]).tobytes()
+            tiles.append(zlib.compress(tile, compress_level) if compress_level else tile)
+        return tiles
+
+    pool = ThreadPoolExecutor(max_workers=threads)
+    pending = deque()
+
+    def flush(limit):
+        while len(pending) > limit:
+            lv, future = pending.popleft()
+            for tile in future.result():
+                lv.tiles.append((lv.spill.tell(), len(tile)))
+                lv.spill.write(tile)
+
+    def add_rows(index, values, counts, final):
+        """ add rows in TIFF order (top first) to a level, as values and (sum, count) for reduction"""
+
+        lv = levels[index]
+        if values is not None and values.shape[0]:
+            lv.rows.append(to_dtype(values))
+            lv.n_rows += values.shape[0]
+        while lv.n_rows >= tile_size or (final and lv.n_rows):
+            band = np.vstack(lv.rows)
+            lv.rows = [band[tile_size:]] if band.shape[0] > tile_size else []
+            lv.n_rows = max(0, band.shape[0] - tile_size)
+            pending.append((lv, pool.submit(compress_band, band[:tile_size], lv.tiles_across)))
+            flush(2 * threads)
+
+        if index + 1 < len(levels):
+            reduced = None
+            if counts is None and final and lv.carry is not None:
+                counts = (np.zeros((0, lv.nx)), np.zeros((0, lv.nx)))
+            if counts is not None:
+                reduced, lv.carry = _reduce_rows(counts, method, lv.carry, final)
+            if reduced is not None:
+                s, n = reduced
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = s / n
+                mean[n == 0.] = np.nan
+                add_rows(index + 1, mean, reduced, final)
+            elif final:
+                add_rows(index + 1, None, None, final)
+
+    try:
+        try:
+            for top in range(0, ny, tile_size):
+                rows = min(tile_size, ny - top)
+                data = np.asarray(source((0, ny - top - rows, nx, rows)))
+                if data.dtype.kind in 'ui':
+                    dummy = data == gxgrdgrd.dummy_value(data.dtype)
+                    data = data.astype(np.float64)
+                    data[dummy] = np.nan
+                data = np.asarray(data, dtype=np.float64)[::-1]
+                final = top + rows >= ny
+                valid = ~np.isnan(data)
+                add_rows(0, data, (np.where(valid, data, 0.), valid.astype(np.float64)), final)
+            flush(0)
+        finally:
+            pool.shutdown()
+            for lv in levels:
+                lv.spill.close()
+
+        # image file directories, main image first
+        layout = _Layout(bigtiff)
+        geo_tags = _geo_tags(properties, nx, ny, epsg, wkt)
+
+        def tags(index, offsets, counts):
+            lv = levels[index]
+            t = [(_NEW_SUBFILE_TYPE, _LONG, (1 if index else 0,)),
+                 (_IMAGE_WIDTH, _LONG, (lv.nx,)),
+                 (_IMAGE_LENGTH, _LONG, (lv.ny,)),
+                 (_BITS_PER_SAMPLE, _SHORT, (dtype.itemsize * 8,)),
+                 (_COMPRESSION, _SHORT, (_COMPRESSION_DEFLATE[0] if compress_level else _COMPRESSION_NONE,)),
+                 (_PHOTOMETRIC, _SHORT, (1,)),
+                 (_SAMPLES_PER_PIXEL, _SHORT, (1,)),
+                 (_PLANAR_CONFIGURATION, _SHORT, (1,)),
+                 (_TILE_WIDTH, _SHORT, (tile_size,)),
+                 (_TILE_LENGTH, _SHORT, (tile_size,)),
+                 (_TILE_OFFSETS, layout.offset_type, tuple(offsets)),
+                 (_TILE_BYTE_COUNTS, layout.offset_type, tuple(counts)),
+                 (_SAMPLE_FORMAT, _SHORT, (_sample_format(dtype),)),
+                 (_GDAL_NODATA, _ASCII, _nodata_string(nodata))]
+            if index == 0:
+                t.extend(geo_tags)
+            return t
+
+        ifd_offsets = []
+        offset = layout.header_size
+        for i, lv in enumerate(levels):
+            ifd_offsets.append(offset)
+            n = len(lv.tiles)
+            offset += layout.ifd_size(tags(i, [0] * n, [0] * n))
+            offset += offset & 1
+        data_start = offset
+
+        # tile data, smallest overview first
+        tile_offsets = [None] * len(levels)
+        offset = data_start
+        for i in range(len(levels) - 1, -1, -1):
+            tile_offsets[i] = [offset + o for o, _ in levels[i].tiles]
+            offset += sum(c for _, c in levels[i].tiles)
+        if not bigtiff and offset >= 2 ** 32:
+            raise GeoTIFFException(_t('The GeoTIFF is larger than 4 GB, write it as a BigTIFF.'))
+
+        with open(file_name, 'wb') as f:
+            f.write(layout.header(ifd_offsets[0]))
+            for i, lv in enumerate(levels):
+                f.seek(ifd_offsets[i])
+                next_ifd = ifd_offsets[i + 1] if i + 1 < len(levels) else 0
+                f.write(layout.ifd(tags(i, tile_offsets[i], [c for _, c in lv.tiles]), ifd_offsets[i], next_ifd))
+            f.seek(data_start)
+            for i in range(len(levels) - 1, -1, -1):
+                with open(levels[i].spill_file, 'rb') as spill:
+                    shutil.copyfileobj(spill, f)
+
+    finally:
+        for lv in levels:
+            if os.path.exists(lv.spill_file):
+                os.remove(lv.spill_file)
+
+    return file_name
+
+
+def _read_value(f, field_type, count, value_bytes, inline, offset_format):
+    fmt, size = _FIELD_TYPES[field_type]
+    n = size * count
+    if n > inline:
+        f.seek(struct.unpack(offset_format, value_bytes)[0])
+        raw = f.read(n)
+    else:
+        raw = value_bytes[:n]
+    if field_type == _ASCII:
+        return raw.split(b'\x00')[0].decode('latin-1')
+    return struct.unpack('<{}{}'.format(count, fmt), raw)
+
+
+def read_header(file_name):
+    """
+    Read the image file directories of a tiled GeoTIFF.
+
+    :param file_name:   GeoTIFF file name
+    :returns:           list of image dictionaries, the full-resolution image first, then the overviews.
+                        Each dictionary has 'nx', 'ny', 'tile_width', 'tile_length', 'offsets', 'counts',
+                        'dtype', 'compression', 'predictor', 'nodata', 'overview' and 'tags' (all tags by
+                        number).
+
+    .. versionadded:: 9.6
+    """
+
+    with open(file_name, 'rb') as f:
+        head = f.read(16)
+        if head[:2] != b'II':
+            raise GeoTIFFException(_t('"{}" is not a little-endian TIFF file.').format(file_name))
+        magic = struct.unpack('<H', head[2:4])[0]
+        if magic == 42:
+            layout = _Layout(False)
+            next_ifd = struct.unpack('<I', head[4:8])[0]
+        elif magic == 43:
+            layout = _Layout(True)
+            next_ifd = struct.unpack('<Q', head[8:16])[0]
+        else:
+            raise GeoTIFFException(_t('"{}" is not a TIFF file.').format(file_name))
+
+        images = []
+        count_size = struct.calcsize(layout.count_format)
+        while next_ifd:
+            f.seek(next_ifd)
+            n = struct.unpack(layout.count_format, f.read(count_size))[0]
+            raw = f.read(n * layout.entry_size + layout.inline)
+            tags = {}
+            for i in range(n):
+                entry = raw[i * layout.entry_size: (i + 1) * layout.entry_size]
+                tag, field_type, count = struct.unpack(layout.entry_format, entry[:layout.entry_size - layout.inline])
+                if field_type not in _FIELD_TYPES:
+                    continue
+                tags[tag] = _read_value(f, field_type, count, entry[layout.entry_size - layout.inline:],
+                                        layout.inline, layout.offset_format)
+            next_ifd = struct.unpack(layout.offset_format, raw[-layout.inline:])[0]
+
+            if _TILE_OFFSETS not in tags:
+                raise GeoTIFFException(_t('"{}" is not a tiled TIFF.').format(file_name))
+            if tags.get(_SAMPLES_PER_PIXEL, (1,))[0] != 1:
+                raise GeoTIFFException(_t('Only single band images are supported.'))
+            bits = tags.get(_BITS_PER_SAMPLE, (8,))[0]
+            kind = {1: 'u', 2: 'i', 3: 'f'}.get(tags.get(_SAMPLE_FORMAT, (1,))[0], 'u')
+            nodata = tags.get(_GDAL_NODATA)
+            if nodata is not None:
+                nodata = float(nodata.strip())
+            images.append({'nx': tags[_IMAGE_WIDTH][0],
+                           'ny': tags[_IMAGE_LENGTH][0],
+                           'tile_width': tags[_TILE_WIDTH][0],
+                           'tile_length': tags[_TILE_LENGTH][0],
+                           'offsets': tags[_TILE_OFFSETS],
+                           'counts': tags[_TILE_BYTE_COUNTS],
+                           'dtype': np.dtype('<{}{}'.format(kind, bits // 8)),
+                           'compression': tags.get(_COMPRESSION, (_COMPRESSION_NONE,))[0],
+                           'predictor': tags.get(_PREDICTOR, (1,))[0],
+                           'nodata': nodata,
+                           'overview': bool(tags.get(_NEW_SUBFILE_TYPE, (0,))[0] & 1),
+                           'tags': tags})
+    return images
+
+
+def properties(file_name, level=0):
+    """
+    Grid properties of a GeoTIFF image, with the keys of `geosoft.gxpy.grid.Grid.properties`.
+
+    :param file_name:   GeoTIFF file name, or the list of images from `read_header`
+    :param level:       0 for the full-resolution image, 1 for the first overview, etc.
+    :returns:           properties dictionary. 'coordinate_system' is the ESRI well-known-text from a GeoTIFF
+                        citation, 'EPSG:<code>' if the coordinate system is an EPSG code, or `None`.
+
+    .. versionadded:: 9.6
+    """
+
+    images = file_name if isinstance(file_name, list) else read_header(file_name)
+    if not (0 <= level < len(images)):
+        raise GeoTIFFException(_t('Level {} not found, there are {} images').format(level, len(images)))
+    main = images[0]
+    tags = main['tags']
+    nx, ny = main['nx'], main['ny']
+
+    if _MODEL_TRANSFORMATION in tags:
+        m = tags[_MODEL_TRANSFORMATION]
+        a, b, d, e, f, h = m[0], m[1], m[3], m[4], m[5], m[7]
+        dx = math.hypot(a, e)
+        dy = math.hypot(b, f)
+        rot = math.degrees(math.atan2(-e, a)) or 0.
+    elif _MODEL_PIXEL_SCALE in tags and _MODEL_TIEPOINT in tags:
+        dx, dy = tags[_MODEL_PIXEL_SCALE][:2]
+        tp = tags[_MODEL_TIEPOINT]
+        a, b, e, f = dx, 0., 0., -dy
+        d = tp[3] - tp[0] * dx
+        h = tp[4] + tp[1] * dy
+        rot = 0.
+    else:
+        a, b, d, e, f, h = 1., 0., 0., 0., -1., float(ny)
+        dx = dy = 1.
+        rot = 0.
+
+    cs = None
+    keys = tags.get(_GEO_KEY_DIRECTORY)
+    if keys:
+        key = {keys[i]: keys[i + 1: i + 4] for i in range(4, 4 + 4 * keys[3], 4)}
+        for code_key in (_PROJECTED_CS_TYPE, _GEOGRAPHIC_TYPE):
+            if code_key in key and key[code_key][2] not in (0, _USER_DEFINED):
+                cs = 'EPSG:{}'.format(key[code_key][2])
+                break
+        if cs is None:
+            params = tags.get(_GEO_ASCII_PARAMS, '')
+            for citation_key in (_PCS_CITATION, _GEOG_CITATION, _GT_CITATION):
+                if citation_key in key and key[citation_key][0] == _GEO_ASCII_PARAMS:
+                    _, count, start = key[citation_key]
+                    citation = params[start: start + count].rstrip('|')
+                    if citation.startswith(_ESRI_PE):
+                        cs = citation[len(_ESRI_PE):]
+                        break
+
+    image = images[level]
+    fx = nx / image['nx']
+    fy = ny / image['ny']
+    x0 = a * 0.5 * fx + b * (ny - 0.5 * fy) + d
+    y0 = e * 0.5 * fx + f * (ny - 0.5 * fy) + h
+    dtype = image['dtype']
+    return {'nx': image['nx'],
+            'ny': image['ny'],
+            'x0': x0,
+            'y0': y0,
+            'dx': dx * fx,
+            'dy': dy * fy,
+            'rot': rot,
+            'is_color': False,
+            'dtype': dtype.newbyteorder('='),
+            'gridtype': 'TIF',
+            'decoration': '',
+            'unit_of_measure': '',
+            'coordinate_system': cs}
+
+
+def read(file_name, level=0, window=None, dtype=None):
+    """
+    Read grid data from a tiled GeoTIFF.
+
+    :param file_name:   GeoTIFF file name
+    :param level:       0 for the full-resolution image (default), 1 for the first overview, etc.
+    :param window:      (ix0, iy0, nx, ny) window of grid indexes to read, where iy0 counts from the bottom row,
+                        default reads the whole image. Only the tiles that cover the window are decoded.
+    :param dtype:       numpy data type wanted, default is the stored type
+    :returns:           (numpy array shaped (ny, nx) with row 0 at the grid origin, properties dictionary).
+                        Nodata values are `numpy.nan` for float types.
+
+    .. versionadded:: 9.6
+    """
+
+    images = read_header(file_name)
+    props = properties(images, level)
+    image = images[level]
+    nx, ny = image['nx'], image['ny']
+    tw, tl = image['tile_width'], image['tile_length']
+    stored = image['dtype']
+    compression = image['compression']
+    if compression != _COMPRESSION_NONE and compression not in _COMPRESSION_DEFLATE:
+        raise GeoTIFFException(_t('Unsupported compression {}').format(compression))
+    if image['predictor'] != 1:
+        raise GeoTIFFException(_t('Unsupported predictor {}').format(image['predictor']))
+
+    if window is None:
+        window = (0, 0, nx, ny)
+    ix0, iy0, wnx, wny = window
+    if (ix0 < 0) or (iy0 < 0) or (wnx <= 0) or (wny <= 0) or (ix0 + wnx > nx) or (iy0 + wny > ny):
+        raise GeoTIFFException(_t('Window {} out of bounds ({}, {})').format(window, nx, ny))
+
+    # window rows in TIFF order, from the top
+    top = ny - (iy0 + wny)
+    if dtype is None:
+        dtype = stored.newbyteorder('=')
+    dtype = np.dtype(dtype)
+    data = np.empty((wny, wnx), dtype=stored)
+    across = (nx + tw - 1) // tw
+
+    with open(file_name, 'rb') as f:
+        for ty in range(top // tl, (top + wny - 1) // tl + 1):
+            for tx in range(ix0 // tw, (ix0 + wnx - 1) // tw + 1):
+                i = ty * across + tx
+                f.seek(image['offsets'][i])
+                raw = f.read(image['counts'][i])
+                if compression != _COMPRESSION_NONE:
+                    raw = zlib.decompress(raw)
+                tile = np.frombuffer(raw, dtype=stored, count=tw * tl).reshape((tl, tw))
+                r0 = max(top, ty * tl)
+                r1 = min(top + wny, (ty + 1) * tl)
+                c0 = max(ix0, tx * tw)
+                c1 = min(ix0 + wnx, (tx + 1) * tw)
+                data[r0 - top: r1 - top, c0 - ix0: c1 - ix0] = tile[r0 - ty * tl: r1 - ty * tl,
+                                                                    c0 - tx * tw: c1 - tx * tw]
+
+    data = data[::-1]
+    result = data.astype(dtype)
+    nodata = image['nodata']
+    if nodata is not None and not math.isnan(nodata) and dtype.kind == 'f':
+        result[data == nodata] = np.nan
+
+    x0, y0 = gxgrdsmp.xy_from_index(props, ix0, iy0)
+    props['x0'] = float(x0)
+    props['y0'] = float(y0)
+    props['nx'] = wnx
+    props['ny'] = wny
+    props['dtype'] = dtype
+    return result, props
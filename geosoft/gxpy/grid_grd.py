@@ -0,0 +1,578 @@
+"""
+Pure-Python reading and writing of Geosoft GRD grid files.
+
+The functions in this module read and write the Geosoft `.grd(GRD)` grid format directly with numpy,
+without calling the Geosoft runtime. Uncompressed grids are exposed as zero-copy `numpy.memmap` arrays,
+and compressed grids are decoded one compression block at a time.
+
+The coordinate system of a grid is stored in a separate `.gi` file, which requires the Geosoft runtime
+to interpret. Use `geosoft.gxpy.grid.Grid` if the coordinate system is required.
+
+:Constants:
+    :HEADER_SIZE:   512, size of the GRD file header in bytes
+
+.. seealso:: `geosoft.gxpy.grid`, `geosoft.gxapi.GXIMG`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_grd.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import struct
+import zlib
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+HEADER_SIZE = 512
+
+_COMPRESSED = 1024
+_COMPRESSION_MAGIC = 0xF8E7D8C7
+_COMPRESSION_ZLIB = 2
+_BLOCK_MAGIC = (0xFEFF0E0F, 0x78563412, _COMPRESSION_ZLIB, 1)
+_BLOCK_HEADER_SIZE = 16
+_BLOCK_BYTES = 65536
+
+_SIGN_UNSIGNED = 0
+_SIGN_SIGNED = 1
+_SIGN_FLOAT = 2
+_SIGN_COLOR = 3
+
+# header layout: (name, struct format, offset)
+_HEADER = (('es', '<i', 0),
+           ('sf', '<i', 4),
+           ('ne', '<i', 8),
+           ('nv', '<i', 12),
+           ('kx', '<i', 16),
+           ('de', '<d', 20),
+           ('dv', '<d', 28),
+           ('x0', '<d', 36),
+           ('y0', '<d', 44),
+           ('rot', '<d', 52),
+           ('zbase', '<d', 60),
+           ('zmult', '<d', 68),
+           ('label', '48s', 76),
+           ('mapno', '48s', 124),
+           ('proj', '<i', 172),
+           ('unitx', '<i', 176),
+           ('unity', '<i', 180),
+           ('unitz', '<i', 184),
+           ('nvpts', '<i', 188),
+           ('izmin', '<f', 192),
+           ('izmax', '<f', 196),
+           ('izmed', '<f', 200),
+           ('izmea', '<f', 204),
+           ('zvar', '<d', 208),
+           ('prcs', '<i', 216))
+
+# Geosoft dummy values for each storage type, see geosoft.gxapi GS_xxDM constants
+_DUMMY = {np.dtype('<u1'): 255,
+          np.dtype('<u2'): 65535,
+          np.dtype('<u4'): 0xFFFFFFFF,
+          np.dtype('<i1'): -127,
+          np.dtype('<i2'): -32767,
+          np.dtype('<i4'): -2147483647,
+          np.dtype('<i8'): -9223372036854775808,
+          np.dtype('<f4'): -1.0E32,
+          np.dtype('<f8'): -1.0E32}
+
+
+class GRDException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_grd`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _grd_file(file_name):
+    """ remove decorations from a grid file name"""
+    file_name = str(file_name)
+    if file_name.endswith(')') and '(' in file_name:
+        dec = file_name[file_name.rfind('(') + 1: -1].split(';')[0].strip().upper()
+        if dec and dec != 'GRD':
+            raise GRDException(_t('"{}" is not a GRD grid.').format(file_name))
+        file_name = file_name[:file_name.rfind('(')]
+    return file_name
+
+
+def storage_dtype(element_size, sign_flag):
+    """
+    Return the numpy dtype of the elements stored in a GRD file.
+
+    :param element_size:    element size in bytes, 1, 2, 4 or 8. Compression flags are ignored.
+    :param sign_flag:       0 unsigned integer, 1 signed integer, 2 float, 3 colour
+    :returns:               little-endian numpy dtype
+
+    .. versionadded:: 9.6
+    """
+
+    es = element_size % _COMPRESSED
+    if sign_flag == _SIGN_FLOAT and es in (4, 8):
+        return np.dtype('<f{}'.format(es))
+    if sign_flag == _SIGN_SIGNED and es in (1, 2, 4, 8):
+        return np.dtype('<i{}'.format(es))
+    if sign_flag == _SIGN_UNSIGNED and es in (1, 2, 4):
+        return np.dtype('<u{}'.format(es))
+    if sign_flag == _SIGN_COLOR and es == 4:
+        return np.dtype('<i4')
+    raise GRDException(_t('Unsupported GRD element size {} and sign flag {}').format(element_size, sign_flag))
+
+
+def dummy_value(dtype):
+    """
+    Geosoft dummy value for a GRD storage data type.
+
+    :param dtype:   numpy data type
+    :returns:       dummy value
+
+    .. versionadded:: 9.6
+    """
+    try:
+        return _DUMMY[np.dtype(dtype).newbyteorder('<')]
+    except KeyError:
+        raise GRDException(_t('No GRD dummy for data type {}').format(dtype))
+
+
+def read_header(file_name):
+    """
+    Read the header of a GRD file.
+
+    :param file_name:   grid file name, a '(GRD)' decoration is allowed
+    :returns:           dictionary of header fields. In addition to the Geosoft GRD header fields
+                        ('es', 'sf', 'ne', 'nv', 'kx', 'de', 'dv', 'x0', 'y0', 'rot', 'zbase', 'zmult', ...)
+                        the dictionary contains:
+
+        ============== ================================================================
+        'file_name'    the undecorated file name
+        'dtype'        numpy dtype of the stored elements
+        'compressed'   `True` if the data is compressed
+        'is_color'     `True` for colour grids
+        'dummy'        stored dummy value
+        'nx', 'ny'     grid dimensions
+        'dx', 'dy'     grid point separation
+        ============== ================================================================
+
+    .. versionadded:: 9.6
+    """
+
+    file_name = _grd_file(file_name)
+    with open(file_name, 'rb') as f:
+        buff = f.read(HEADER_SIZE)
+    if len(buff) < HEADER_SIZE:
+        raise GRDException(_t('"{}" is too short to be a GRD file.').format(file_name))
+    return _parse_header(buff, file_name)
+
+
+def _parse_header(buff, file_name=''):
+
+    hd = {}
+    for name, fmt, offset in _HEADER:
+        v = struct.unpack_from(fmt, buff, offset)[0]
+        if isinstance(v, bytes):
+            v = v.split(b'\x00')[0].decode('latin-1').strip()
+        hd[name] = v
+
+    if hd['kx'] not in (1, -1) or hd['ne'] <= 0 or hd['nv'] <= 0:
+        raise GRDException(_t('"{}" is not a valid GRD file.').format(file_name))
+
+    hd['file_name'] = file_name
+    hd['dtype'] = storage_dtype(hd['es'], hd['sf'])
+    hd['compressed'] = hd['es'] > _COMPRESSED
+    hd['is_color'] = hd['sf'] == _SIGN_COLOR
+    hd['dummy'] = dummy_value(hd['dtype'])
+    if hd['zmult'] == 0.:
+        hd['zmult'] = 1.0
+
+    if hd['kx'] == 1:
+        hd['nx'], hd['ny'] = hd['ne'], hd['nv']
+        hd['dx'], hd['dy'] = hd['de'], hd['dv']
+    else:
+        hd['nx'], hd['ny'] = hd['nv'], hd['ne']
+        hd['dx'], hd['dy'] = hd['dv'], hd['de']
+
+    return hd
+
+
+def properties(file_name):
+    """
+    Grid properties dictionary, with the keys of `geosoft.gxpy.grid.Grid.properties`.
+
+    :param file_name:   grid file name, or a header dictionary returned from `read_header`
+    :returns:           properties dictionary. 'coordinate_system' is `None` as the coordinate system
+                        in the `.gi` file cannot be interpreted without the Geosoft runtime.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = file_name if isinstance(file_name, dict) else read_header(file_name)
+    dtype = hd['dtype']
+    if not hd['is_color'] and not np.issubdtype(dtype, np.floating):
+        if hd['zbase'] != 0. or hd['zmult'] != 1.:
+            dtype = np.dtype(np.float64)
+
+    return {'nx': hd['nx'],
+            'ny': hd['ny'],
+            'x0': hd['x0'],
+            'y0': hd['y0'],
+            'dx': hd['dx'],
+            'dy': hd['dy'],
+            'rot': -hd['rot'],
+            'is_color': hd['is_color'],
+            'dtype': np.dtype(dtype).newbyteorder('='),
+            'gridtype': 'GRD',
+            'decoration': '',
+            'unit_of_measure': '',
+            'coordinate_system': None}
+
+
+def memmap(file_name, mode='r'):
+    """
+    Memory-map the data of an uncompressed GRD file.
+
+    :param file_name:   grid file name
+    :param mode:        `numpy.memmap` mode, 'r' (default) for read-only, 'r+' to allow changes
+    :returns:           (`numpy.memmap`, header) The array is shaped (ny, nx) and holds the stored values,
+                        which are not scaled by the header 'zbase' and 'zmult', and dummies are the
+                        Geosoft dummy for the type (header['dummy']). For grids stored by columns
+                        (kx = -1) the array is a transposed view of the file.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = read_header(file_name)
+    if hd['compressed']:
+        raise GRDException(_t('"{}" is compressed and cannot be memory-mapped.').format(hd['file_name']))
+    mm = np.memmap(hd['file_name'], dtype=hd['dtype'], mode=mode, offset=HEADER_SIZE,
+                   shape=(hd['nv'], hd['ne']))
+    if hd['kx'] == -1:
+        mm = mm.T
+    return mm, hd
+
+
+def _block_table(f, hd):
+    """ read the compressed block table: vectors per block, offsets, sizes"""
+
+    f.seek(HEADER_SIZE)
+    magic, ctype, nb, vpb = struct.unpack('<4I', f.read(16))
+    if magic != _COMPRESSION_MAGIC:
+        raise GRDException(_t('"{}" has an invalid compression header.').format(hd['file_name']))
+    if ctype != _COMPRESSION_ZLIB:
+        raise GRDException(_t('"{}" uses unsupported compression type {}.').format(hd['file_name'], ctype))
+    offsets = np.frombuffer(f.read(8 * nb), dtype='<i8')
+    sizes = np.frombuffer(f.read(4 * nb), dtype='<i4')
+    return vpb, offsets, sizes
+
+
+def _decode_block(f, hd, offset, size, nvectors):
+    f.seek(int(offset) + _BLOCK_HEADER_SIZE)
+    raw = zlib.decompress(f.read(int(size) - _BLOCK_HEADER_SIZE))
+    return np.frombuffer(raw, dtype=hd['dtype']).reshape((nvectors, hd['ne']))
+
+
+def iter_vectors(file_name, vectors=None):
+    """
+    Iterate through the stored vectors (rows if kx = 1, columns if kx = -1) of a GRD file.
+    Compressed grids are decoded one compression block at a time.
+
+    :param file_name:   grid file name
+    :param vectors:     number of vectors to yield at a time. The default for compressed grids is the
+                        compression block size, and 256 for uncompressed grids.
+    :returns:           yields (first_vector_index, numpy array shaped (n_vectors, ne)) of stored values
+
+    .. versionadded:: 9.6
+    """
+
+    hd = read_header(file_name)
+    nv = hd['nv']
+
+    if not hd['compressed']:
+        mm = np.memmap(hd['file_name'], dtype=hd['dtype'], mode='r', offset=HEADER_SIZE, shape=(nv, hd['ne']))
+        if vectors is None:
+            vectors = 256
+        for iv in range(0, nv, vectors):
+            yield iv, mm[iv: iv + vectors]
+        return
+
+    with open(hd['file_name'], 'rb') as f:
+        vpb, offsets, sizes = _block_table(f, hd)
+        if vectors is None:
+            vectors = vpb
+        pending = []
+        pending_start = 0
+        pending_n = 0
+        for ib in range(len(offsets)):
+            nvb = min(vpb, nv - ib * vpb)
+            pending.append(_decode_block(f, hd, offsets[ib], sizes[ib], nvb))
+            pending_n += nvb
+            while pending_n >= vectors or (ib == len(offsets) - 1 and pending_n > 0):
+                data = pending[0] if len(pending) == 1 else np.concatenate(pending)
+                n = min(vectors, pending_n)
+                yield pending_start, data[:n]
+                pending = [data[n:]] if n < pending_n else []
+                pending_start += n
+                pending_n -= n
+
+
+def _read_stored(hd, ix0, iy0, nx, ny, step=1):
+    """ read stored values in a grid window, returned shaped (ny, nx), every step'th point"""
+
+    if hd['kx'] == 1:
+        v0, nvec, e0, nel = iy0, ny, ix0, nx
+    else:
+        v0, nvec, e0, nel = ix0, nx, iy0, ny
+
+    if not hd['compressed']:
+        mm = np.memmap(hd['file_name'], dtype=hd['dtype'], mode='r', offset=HEADER_SIZE,
+                       shape=(hd['nv'], hd['ne']))
+        data = np.array(mm[v0: v0 + nvec: step, e0: e0 + nel: step])
+        del mm
+
+    else:
+        vectors = np.arange(v0, v0 + nvec, step)
+        data = np.empty((len(vectors), len(range(e0, e0 + nel, step))), dtype=hd['dtype'])
+        with open(hd['file_name'], 'rb') as f:
+            vpb, offsets, sizes = _block_table(f, hd)
+            blocks = vectors // vpb
+            for ib in np.unique(blocks):
+                b0 = ib * vpb
+                nvb = min(vpb, hd['nv'] - b0)
+                block = _decode_block(f, hd, offsets[ib], sizes[ib], nvb)
+                in_block = blocks == ib
+                data[in_block] = block[vectors[in_block] - b0, e0: e0 + nel: step]
+
+    if hd['kx'] == -1:
+        data = data.T
+    return data
+
+
+def read(file_name, window=None, dtype=None, step=1):
+    """
+    Read grid data from a GRD file.
+
+    :param file_name:   grid file name
+    :param window:      (ix0, iy0, nx, ny) window of grid indexes to read, default reads the whole grid
+    :param dtype:       numpy data type wanted, default is the grid data type
+    :param step:        read every `step` grid point in x and y, starting from the window origin. Rows
+                        that are not needed are not read, and compressed blocks that hold no needed rows
+                        are not decoded. Default is 1, every point.
+    :returns:           (numpy array shaped (ny, nx), properties dictionary). Data is scaled by the
+                        header 'zbase' and 'zmult'. Float dummies are `numpy.nan`, and integer
+                        dummies are the Geosoft dummy value for the type. Colour grids are returned
+                        as colour integers. The properties match `geosoft.gxpy.grid.Grid.properties`
+                        and describe the returned window.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = read_header(file_name)
+    props = properties(hd)
+
+    if window is None:
+        window = (0, 0, hd['nx'], hd['ny'])
+    ix0, iy0, nx, ny = window
+    if (ix0 < 0) or (iy0 < 0) or (nx <= 0) or (ny <= 0) or (ix0 + nx > hd['nx']) or (iy0 + ny > hd['ny']):
+        raise GRDException(_t('Window {} out of bounds ({}, {})').format(window, hd['nx'], hd['ny']))
+    step = int(step)
+    if step < 1:
+        raise GRDException(_t('Step must be 1 or more, found {}').format(step))
+
+    stored = _read_stored(hd, ix0, iy0, nx, ny, step)
+    if dtype is None:
+        dtype = props['dtype']
+    dtype = np.dtype(dtype)
+
+    data = stored_to_values(stored, hd, dtype)
+
+    props['ny'], props['nx'] = data.shape
+    if ix0 or iy0:
+        props['x0'], props['y0'] = _window_origin(props, ix0, iy0)
+    props['dx'] *= step
+    props['dy'] *= step
+    props['dtype'] = dtype
+
+    return data, props
+
+
+def _window_origin(props, ix0, iy0):
+    dx = props['dx'] * ix0
+    dy = props['dy'] * iy0
+    if props['rot'] == 0.:
+        return props['x0'] + dx, props['y0'] + dy
+    cos = np.cos(np.radians(props['rot']))
+    sin = np.sin(np.radians(props['rot']))
+    return props['x0'] + dx * cos + dy * sin, props['y0'] - dx * sin + dy * cos
+
+
+def stored_to_values(stored, hd, dtype=None):
+    """
+    Convert stored GRD values to data values.
+
+    :param stored:  numpy array of stored values
+    :param hd:      header dictionary from `read_header`
+    :param dtype:   numpy dtype wanted, default is the properties dtype
+    :returns:       data array. Float dummies are `numpy.nan`.
+
+    .. versionadded:: 9.6
+    """
+
+    if dtype is None:
+        dtype = properties(hd)['dtype']
+    dtype = np.dtype(dtype)
+    mask = stored == hd['dummy']
+    scaled = (hd['zbase'] != 0.) or (hd['zmult'] != 1.)
+
+    if hd['is_color'] or not scaled:
+        data = stored.astype(dtype)
+    else:
+        data = stored.astype(np.float64)
+        data /= hd['zmult']
+        data += hd['zbase']
+        if not np.issubdtype(dtype, np.floating):
+            data = np.round(data)
+        data = data.astype(dtype)
+
+    if mask.any():
+        if np.issubdtype(dtype, np.floating):
+            data[mask] = np.nan
+        elif not hd['is_color']:
+            data[mask] = dummy_value(dtype)
+    return data
+
+
+def write(file_name, data, properties=None, dtype=None, compress=False, overwrite=False):
+    """
+    Write a GRD grid file.
+
+    :param file_name:   grid file name
+    :param data:        2D numpy array shaped (ny, nx). Float `numpy.nan` values are written as dummies.
+    :param properties:  grid properties dictionary with the keys of `geosoft.gxpy.grid.Grid.properties`.
+                        Only 'x0', 'y0', 'dx', 'dy', 'rot' and 'is_color' are used.
+    :param dtype:       storage data type, default is the data type of `data`
+    :param compress:    `True` to write a zlib-compressed grid
+    :param overwrite:   `True` to overwrite an existing file
+    :returns:           file name of the grid
+
+    .. versionadded:: 9.6
+    """
+
+    file_name = _grd_file(file_name)
+    if os.path.exists(file_name) and not overwrite:
+        raise GRDException(_t('Cannot overwrite existing grid {}').format(file_name))
+
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise GRDException(_t('Grid data must be 2-dimensional'))
+    if properties is None:
+        properties = {}
+    is_color = bool(properties.get('is_color', False))
+
+    if dtype is None:
+        dtype = data.dtype
+        if dtype == np.int64:
+            dtype = np.int32
+        elif dtype == np.bool_:
+            dtype = np.uint8
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if is_color:
+        dtype = np.dtype('<i4')
+        sign_flag = _SIGN_COLOR
+    elif np.issubdtype(dtype, np.floating):
+        sign_flag = _SIGN_FLOAT
+    elif np.issubdtype(dtype, np.signedinteger):
+        sign_flag = _SIGN_SIGNED
+    else:
+        sign_flag = _SIGN_UNSIGNED
+    storage_dtype(dtype.itemsize, sign_flag)
+    dummy = dummy_value(dtype)
+
+    ny, nx = data.shape
+    dx = properties.get('dx', 1.0)
+    dy = properties.get('dy', dx)
+
+    stored = np.ascontiguousarray(data, dtype=dtype) if data.dtype == dtype else data.astype(dtype)
+    if np.issubdtype(data.dtype, np.floating):
+        nan = np.isnan(data)
+        if nan.any():
+            if stored is data:
+                stored = stored.copy()
+            stored[nan] = dummy
+
+    # statistics for the header
+    valid = stored[stored != dummy]
+    if np.issubdtype(dtype, np.floating):
+        valid = valid[np.isfinite(valid)]
+    if valid.size and not is_color:
+        zmin, zmax, zmean = float(valid.min()), float(valid.max()), float(valid.mean())
+        zvar = float(valid.astype(np.float64).var())
+        zmed = float(np.median(valid))
+    else:
+        zmin = zmax = zmed = -1.0E32
+        zmean = zvar = 0.
+
+    hd = {'es': dtype.itemsize + (_COMPRESSED if compress else 0),
+          'sf': sign_flag,
+          'ne': nx,
+          'nv': ny,
+          'kx': 1,
+          'de': dx,
+          'dv': dy,
+          'x0': properties.get('x0', 0.0),
+          'y0': properties.get('y0', 0.0),
+          'rot': -properties.get('rot', 0.0),
+          'zbase': 0.,
+          'zmult': 1.,
+          'label': b'',
+          'mapno': b'',
+          'proj': 0,
+          'unitx': 0,
+          'unity': 0,
+          'unitz': 0,
+          'nvpts': int(valid.size),
+          'izmin': zmin,
+          'izmax': zmax,
+          'izmed': zmed,
+          'izmea': zmean,
+          'zvar': zvar,
+          'prcs': 0}
+
+    header = bytearray(HEADER_SIZE)
+    for name, fmt, offset in _HEADER:
+        struct.pack_into(fmt, header, offset, hd[name])
+
+    with open(file_name, 'wb') as f:
+        f.write(header)
+
+        if not compress:
+            stored.tofile(f)
+
+        else:
+            vpb = max(1, _BLOCK_BYTES // (nx * dtype.itemsize))
+            nb = (ny + vpb - 1) // vpb
+            table_offset = HEADER_SIZE + 16
+            f.write(struct.pack('<4I', _COMPRESSION_MAGIC, _COMPRESSION_ZLIB, nb, vpb))
+            f.write(bytes(12 * nb))
+            offsets = []
+            sizes = []
+            for ib in range(nb):
+                block = zlib.compress(stored[ib * vpb: (ib + 1) * vpb].tobytes())
+                offsets.append(f.tell())
+                sizes.append(len(block) + _BLOCK_HEADER_SIZE)
+                f.write(struct.pack('<4I', *_BLOCK_MAGIC))
+                f.write(block)
+            f.seek(table_offset)
+            f.write(np.array(offsets, dtype='<i8').tobytes())
+            f.write(np.array(sizes, dtype='<i4').tobytes())
+
+    return file_name
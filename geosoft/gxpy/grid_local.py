@@ -0,0 +1,609 @@
+"""
+Local gridding of located data in numpy.
+
+Grid points are interpolated from the data points near them, which are found with a KD-tree:
+
+    - `idw`: inverse-distance weighted mean of the nearest data points, optionally within a search radius
+      and from each of a number of sectors around the grid point.
+    - `nearest`: value of the nearest data point.
+    - `natural_neighbour`: discrete Sibson interpolation (Park et al., 2006, Discrete Sibson interpolation),
+      in which every grid point spreads the value of its nearest data point to the grid points that are
+      closer to it than that data point, and each grid point is the mean of the values spread to it.
+
+Local gridding is much faster than `geosoft.gxpy.grid_mincurv` for dense data such as drone magnetic
+surveys. The grid is evaluated in tiles on a pool of threads, and the neighbours of the grid points in a tile
+are found together from the data points in the tile area. The KD-tree is built in numpy. If scipy is
+installed `scipy.spatial.cKDTree` is used for searches without sectors. This module does not require the
+Geosoft runtime.
+
+:Constants:
+    :METHOD_IDW:        'idw', inverse-distance weighted mean, see `idw`
+    :METHOD_NEAREST:    'nearest', nearest data point, see `nearest`
+    :METHOD_NATURAL:    'natural', natural neighbours, see `natural_neighbour`
+    :LEAF_SIZE:         32, maximum number of data points in a KD-tree leaf
+    :TILE_SIZE:         128, default grid tile dimension in cells
+    :MAX_NEIGHBOURS:    16, default maximum number of data points of an inverse-distance weighted mean
+
+.. seealso:: `geosoft.gxpy.grid.Grid.local_gridding`, `geosoft.gxpy.grid_mincurv`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_local.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+import geosoft
+from . import grid_blend as gxgrdblnd
+from . import grid_mincurv as gxgrdmc
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+METHOD_IDW = 'idw'
+METHOD_NEAREST = 'nearest'
+METHOD_NATURAL = 'natural'
+
+LEAF_SIZE = 32
+TILE_SIZE = 128
+MAX_NEIGHBOURS = 16
+
+# maximum number of query point to data point distances calculated at once
+_MAX_PAIRS = 1 << 20
+
+# query points searched together
+_BLOCK_SIZE = 1024
+
+# distance tolerance relative to the cell size, data points this close to a grid point are at the point
+_TOLERANCE = 1.0e-9
+
+
+class GridLocalException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_local`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+class KDTree:
+    """
+    Two-dimensional KD-tree of data point locations.
+
+    :param x:           data x locations, numpy array
+    :param y:           data y locations, numpy array
+    :param leaf_size:   maximum number of data points in a leaf, default `LEAF_SIZE`
+
+    Each node splits its points at the median of the wider of the node x or y extents. Points are ordered
+    so that the points of each node are contiguous.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, x, y, leaf_size=LEAF_SIZE):
+        self._x = np.asarray(x, dtype=np.float64).ravel()
+        self._y = np.asarray(y, dtype=np.float64).ravel()
+        if self._x.shape != self._y.shape:
+            raise GridLocalException(_t('x and y must be the same length'))
+        if np.any(np.isnan(self._x) | np.isnan(self._y)):
+            raise GridLocalException(_t('Data locations cannot be dummy.'))
+        self._spacing = gxgrdmc.nominal_spacing(self._x, self._y)
+        self._ckdtree = None
+
+        leaf_size = max(1, int(leaf_size))
+        order = np.arange(self._x.size)
+        nodes = []
+
+        def node(start, end):
+            if end > start:
+                px = self._x[order[start: end]]
+                py = self._y[order[start: end]]
+                nodes.append([float(px.min()), float(py.min()), float(px.max()), float(py.max()), start, end,
+                              -1, -1])
+            else:
+                nodes.append([np.inf, np.inf, -np.inf, -np.inf, start, end, -1, -1])
+            return len(nodes) - 1
+
+        stack = [node(0, self._x.size)]
+        while stack:
+            i = stack.pop()
+            xmin, ymin, xmax, ymax, start, end, _, _ = nodes[i]
+            if (end - start) <= leaf_size or (xmax == xmin and ymax == ymin):
+                continue
+            values = self._x if (xmax - xmin) >= (ymax - ymin) else self._y
+            mid = (start + end) // 2
+            points = order[start: end]
+            order[start: end] = points[np.argpartition(values[points], mid - start)]
+            nodes[i][6] = node(start, mid)
+            nodes[i][7] = node(mid, end)
+            stack.extend(nodes[i][6:8])
+
+        self._order = order
+        self._nodes = [tuple(n) for n in nodes]
+
+    def __len__(self):
+        return self._x.size
+
+    @property
+    def x(self):
+        """data x locations"""
+        return self._x
+
+    @property
+    def y(self):
+        """data y locations"""
+        return self._y
+
+    @property
+    def spacing(self):
+        """nominal data spacing, see `geosoft.gxpy.grid_mincurv.nominal_spacing`"""
+        return self._spacing
+
+    def box(self, xmin, ymin, xmax, ymax):
+        """
+        Indexes of the data points in a box.
+
+        :param xmin:    box minimum x
+        :param ymin:    box minimum y
+        :param xmax:    box maximum x
+        :param ymax:    box maximum y
+        :returns:       numpy array of data point indexes
+        """
+
+        inside = []
+        partial = []
+        stack = [0] if len(self) else []
+        while stack:
+            bx0, by0, bx1, by1, start, end, left, right = self._nodes[stack.pop()]
+            if bx0 > xmax or bx1 < xmin or by0 > ymax or by1 < ymin:
+                continue
+            if bx0 >= xmin and bx1 <= xmax and by0 >= ymin and by1 <= ymax:
+                inside.append(self._order[start: end])
+            elif left < 0:
+                partial.append(self._order[start: end])
+            else:
+                stack.append(right)
+                stack.append(left)
+
+        if partial:
+            points = np.concatenate(partial)
+            px = self._x[points]
+            py = self._y[points]
+            inside.append(points[(px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax)])
+        if not inside:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(inside)
+
+    def query(self, x, y, k=1, radius=None, sectors=1):
+        """
+        Nearest data points to query locations.
+
+        :param x:       query x locations, numpy array
+        :param y:       query y locations, numpy array
+        :param k:       number of nearest points, in each sector if there are sectors
+        :param radius:  search radius, default is no limit. A radius is required to search sectors.
+        :param sectors: number of equal angle sectors around each query location, the `k` nearest points
+                        in each sector are found. The first sector starts from the -x direction.
+        :returns:       (distance, index) numpy arrays shaped (number of queries, `k` * `sectors`). The
+                        points of each sector are in `k` columns, nearest first. Missing points have
+                        distance `numpy.inf` and index -1.
+        """
+
+        qx = np.asarray(x, dtype=np.float64).ravel()
+        qy = np.asarray(y, dtype=np.float64).ravel()
+        k = max(1, int(k))
+        sectors = max(1, int(sectors))
+        if sectors > 1 and radius is None:
+            raise GridLocalException(_t('A sector search requires a search radius.'))
+
+        nq = qx.size
+        distance = np.full((nq, k * sectors), np.inf)
+        index = np.full((nq, k * sectors), -1, dtype=np.int64)
+        if nq == 0 or len(self) == 0:
+            return distance, index
+
+        if sectors == 1 and cKDTree is not None:
+            if self._ckdtree is None:
+                self._ckdtree = cKDTree(np.column_stack((self._x, self._y)))
+            d, i = self._ckdtree.query(np.column_stack((qx, qy)), k=k,
+                                       distance_upper_bound=np.inf if radius is None else float(radius))
+            d = np.asarray(d, dtype=np.float64).reshape((nq, k))
+            i = np.asarray(i, dtype=np.int64).reshape((nq, k))
+            i[i >= len(self)] = -1
+            return d, i
+
+        for block in _blocks(qx, qy):
+            distance[block], index[block] = self._query_block(qx[block], qy[block], k, radius, sectors)
+        return distance, index
+
+    def _query_block(self, qx, qy, k, radius, sectors):
+        """ nearest points to a compact block of query locations"""
+
+        distance = np.full((qx.size, k * sectors), np.inf)
+        index = np.full((qx.size, k * sectors), -1, dtype=np.int64)
+        if radius is None:
+            r = self._spacing * max(1., math.sqrt(k / math.pi)) * 2.
+        else:
+            r = float(radius)
+
+        # points farther than r from a query may not be in the candidates, so without a search radius
+        # queries with neighbours farther than r are searched again with twice the radius
+        todo = np.arange(qx.size)
+        while todo.size:
+            tx = qx[todo]
+            ty = qy[todo]
+            candidates = self.box(tx.min() - r, ty.min() - r, tx.max() + r, ty.max() + r)
+            if candidates.size:
+                distance[todo], index[todo] = self._nearest(tx, ty, candidates, k, radius, sectors)
+            if radius is not None or candidates.size == len(self):
+                break
+            todo = todo[~np.all(distance[todo] <= r, axis=1)]
+            r *= 2.
+        return distance, index
+
+    def _nearest(self, qx, qy, candidates, k, radius, sectors):
+        """ nearest candidate points by brute force, in chunks of queries"""
+
+        px = self._x[candidates]
+        py = self._y[candidates]
+        nc = candidates.size
+        kk = min(k, nc)
+        distance = np.full((qx.size, k * sectors), np.inf)
+        index = np.full((qx.size, k * sectors), -1, dtype=np.int64)
+        rows = max(1, _MAX_PAIRS // nc)
+        for r0 in range(0, qx.size, rows):
+            r1 = min(qx.size, r0 + rows)
+            dx = px[np.newaxis, :] - qx[r0: r1, np.newaxis]
+            dy = py[np.newaxis, :] - qy[r0: r1, np.newaxis]
+            d = np.hypot(dx, dy)
+            if radius is not None:
+                d[d > radius] = np.inf
+            if sectors == 1:
+                groups = [d]
+            else:
+                sector = ((np.arctan2(dy, dx) + math.pi) * (sectors / (2. * math.pi))).astype(np.int64) % sectors
+                groups = [np.where(sector == s, d, np.inf) for s in range(sectors)]
+            for s, ds in enumerate(groups):
+                if nc > kk:
+                    sel = np.argpartition(ds, kk - 1, axis=1)[:, :kk]
+                else:
+                    sel = np.broadcast_to(np.arange(nc), (r1 - r0, nc))
+                sd = np.take_along_axis(ds, sel, axis=1)
+                nearest = np.argsort(sd, axis=1, kind='stable')
+                sel = np.take_along_axis(sel, nearest, axis=1)
+                sd = np.take_along_axis(sd, nearest, axis=1)
+                distance[r0: r1, s * k: s * k + kk] = sd
+                index[r0: r1, s * k: s * k + kk] = np.where(np.isfinite(sd), candidates[sel], -1)
+        return distance, index
+
+
+def _blocks(x, y):
+    """ indexes of compact blocks of about `_BLOCK_SIZE` locations"""
+
+    n = x.size
+    if n <= _BLOCK_SIZE:
+        yield np.arange(n)
+        return
+    xmin, ymin = float(x.min()), float(y.min())
+    w = float(x.max()) - xmin
+    h = float(y.max()) - ymin
+    size = max(w, h, 1.0e-30) * math.sqrt(_BLOCK_SIZE / n)
+    if w > 0. and h > 0.:
+        size = math.sqrt(w * h * _BLOCK_SIZE / n)
+    columns = int(w / size) + 1
+    block = np.floor((y - ymin) / size).astype(np.int64) * columns + np.floor((x - xmin) / size).astype(np.int64)
+    order = np.argsort(block, kind='stable')
+    splits = np.flatnonzero(np.diff(block[order])) + 1
+    for b in np.split(order, splits):
+        yield b
+
+
+def prepare(x, y, v):
+    """
+    Located data ready to grid. Data with dummy locations or values are removed, and data at the same
+    location are replaced by their mean.
+
+    :param x:   data x locations, numpy array
+    :param y:   data y locations, numpy array
+    :param v:   data values, numpy array, `numpy.nan` values are dummies
+    :returns:   (x, y, v) numpy float64 arrays
+
+    .. versionadded:: 9.6
+    """
+
+    x = np.asarray(x, dtype=np.float64).ravel()
+    y = np.asarray(y, dtype=np.float64).ravel()
+    v = np.asarray(v, dtype=np.float64).ravel()
+    if not (len(x) == len(y) == len(v)):
+        raise GridLocalException(_t('x, y and v must be the same length'))
+    valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(v))
+    x, y, v = x[valid], y[valid], v[valid]
+    if len(v) == 0:
+        raise GridLocalException(_t('There is no valid data to grid.'))
+
+    xy, inverse, count = np.unique(np.column_stack((x, y)), axis=0, return_inverse=True, return_counts=True)
+    if len(xy) < len(x):
+        v = np.bincount(inverse.ravel(), weights=v) / count
+        x = xy[:, 0].copy()
+        y = xy[:, 1].copy()
+    return x, y, v
+
+
+def read_gdb(gdb, value_channel, x_channel=None, y_channel=None, lines=None):
+    """
+    Read located data from a database one line at a time.
+
+    :param gdb:             `geosoft.gxpy.gdb.Geosoft_database` instance
+    :param value_channel:   value channel
+    :param x_channel:       x channel, default is the database x channel
+    :param y_channel:       y channel, default is the database y channel
+    :param lines:           lines to read, default is the selected lines
+    :returns:               (x, y, v) numpy float64 arrays of the data with no dummies
+
+    Dummies are removed as each line is read, so only the valid data is held in memory.
+
+    .. versionadded:: 9.6
+    """
+
+    if x_channel is None or y_channel is None:
+        xc, yc, _ = gdb.xyz_channels
+        x_channel = x_channel or xc
+        y_channel = y_channel or yc
+    if lines is None:
+        lines = gdb.list_lines()
+
+    located = []
+    for line in lines:
+        data = gdb.read_line(line, channels=[x_channel, y_channel, value_channel], dtype=np.float64)[0]
+        data = np.asarray(data, dtype=np.float64).reshape((-1, 3))
+        located.append(data[~np.isnan(data).any(axis=1)])
+    if not located:
+        return np.empty(0), np.empty(0), np.empty(0)
+    data = np.vstack(located)
+    return data[:, 0].copy(), data[:, 1].copy(), data[:, 2].copy()
+
+
+def _lattice(x, y, cs, area, spacing):
+    """ cell size and grid properties, as `geosoft.gxpy.grid_mincurv.minimum_curvature`"""
+
+    if cs is None:
+        cs = spacing / 4.
+    cs = float(cs)
+    if cs <= 0.:
+        raise GridLocalException(_t('Cell size must be positive, found {}').format(cs))
+    x0, y0, nx, ny = gxgrdmc.grid_area(x, y, cs, area)
+    return cs, {'nx': nx, 'ny': ny, 'x0': x0, 'y0': y0, 'dx': cs, 'dy': cs, 'rot': 0.}
+
+
+def _evaluate(properties, function, outputs=1, tile_size=TILE_SIZE, threads=None):
+    """ evaluate function(x, y) -> tuple of `outputs` arrays at the grid points, one tile per thread"""
+
+    nx = properties['nx']
+    ny = properties['ny']
+    results = [np.full((ny, nx), np.nan) for _ in range(outputs)]
+
+    def evaluate(tile):
+        ix0, iy0, tnx, tny = tile
+        gy, gx = np.mgrid[iy0: iy0 + tny, ix0: ix0 + tnx]
+        x = properties['x0'] + gx.ravel() * properties['dx']
+        y = properties['y0'] + gy.ravel() * properties['dy']
+        for result, values in zip(results, function(x, y)):
+            result[iy0: iy0 + tny, ix0: ix0 + tnx] = values.reshape((tny, tnx))
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max(1, int(threads))) as pool:
+        for _ in pool.map(evaluate, gxgrdblnd.tiles(nx, ny, tile_size)):
+            pass
+    return results
+
+
+def _blanking(bkd, spacing):
+    return spacing if bkd is None else float(bkd)
+
+
+def idw(x, y, v, cs=None, area=None, power=2., radius=None, max_neighbours=MAX_NEIGHBOURS, min_neighbours=1,
+        sectors=1, max_per_sector=None, bkd=None, tile_size=TILE_SIZE, threads=None):
+    """
+    Grid located data with an inverse-distance weighted mean of the nearest data points.
+
+    :param x:               data x locations, numpy array
+    :param y:               data y locations, numpy array
+    :param v:               data values, numpy array, `numpy.nan` values are ignored
+    :param cs:              cell size, default is a quarter of the nominal data spacing
+    :param area:            (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+    :param power:           inverse-distance weighting power, default 2.
+    :param radius:          search radius, default is no limit, or 4 nominal data spacings for a sector search
+    :param max_neighbours:  maximum number of data points in the mean, default 16
+    :param min_neighbours:  minimum number of data points in the search, grid points with fewer are dummies
+    :param sectors:         number of equal angle search sectors, default 1
+    :param max_per_sector:  maximum number of data points from each sector, default is `max_neighbours`
+                            divided by the number of sectors
+    :param bkd:             blanking distance, grid points farther than this from a data point are dummies.
+                            The default is the nominal data spacing, 0 for no blanking.
+    :param tile_size:       grid tile dimension in cells, default 128
+    :param threads:         maximum number of threads, default is the number of processors
+    :returns:               (data, properties): numpy float64 array shaped (ny, nx) with dummies `numpy.nan`,
+                            and the grid properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'.
+
+    A grid point at a data point is the data value.
+
+    .. versionadded:: 9.6
+    """
+
+    x, y, v = prepare(x, y, v)
+    tree = KDTree(x, y)
+    cs, properties = _lattice(x, y, cs, area, tree.spacing)
+    bkd = _blanking(bkd, tree.spacing)
+    power = float(power)
+    max_neighbours = max(1, int(max_neighbours))
+    min_neighbours = max(1, int(min_neighbours))
+    sectors = max(1, int(sectors))
+    if sectors > 1:
+        if radius is None:
+            radius = 4. * tree.spacing
+        if max_per_sector is None:
+            max_per_sector = max(1, -(-max_neighbours // sectors))
+        k = max(1, int(max_per_sector))
+    else:
+        k = max_neighbours
+
+    def interpolate(gx, gy):
+        d, i = tree.query(gx, gy, k=k, radius=radius, sectors=sectors)
+        if d.shape[1] > max_neighbours:
+            nearest = np.argsort(d, axis=1, kind='stable')[:, :max_neighbours]
+            d = np.take_along_axis(d, nearest, axis=1)
+            i = np.take_along_axis(i, nearest, axis=1)
+        found = i >= 0
+        at_point = found & (d <= _TOLERANCE * cs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = np.where(found & ~at_point, 1. / np.power(d, power), 0.)
+            w = np.where(at_point.any(axis=1)[:, np.newaxis], at_point, w)
+            values = (w * v[np.maximum(i, 0)]).sum(axis=1) / w.sum(axis=1)
+        values[found.sum(axis=1) < min_neighbours] = np.nan
+        if bkd > 0.:
+            values[np.where(found, d, np.inf).min(axis=1) > bkd] = np.nan
+        return values,
+
+    data, = _evaluate(properties, interpolate, tile_size=tile_size, threads=threads)
+    return data, properties
+
+
+def nearest(x, y, v, cs=None, area=None, bkd=None, tile_size=TILE_SIZE, threads=None):
+    """
+    Grid located data with the value of the nearest data point.
+
+    :param x:           data x locations, numpy array
+    :param y:           data y locations, numpy array
+    :param v:           data values, numpy array, `numpy.nan` values are ignored
+    :param cs:          cell size, default is a quarter of the nominal data spacing
+    :param area:        (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+    :param bkd:         blanking distance, grid points farther than this from a data point are dummies.
+                        The default is the nominal data spacing, 0 for no blanking.
+    :param tile_size:   grid tile dimension in cells, default 128
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           (data, properties), see `idw`
+
+    .. versionadded:: 9.6
+    """
+
+    x, y, v = prepare(x, y, v)
+    tree = KDTree(x, y)
+    cs, properties = _lattice(x, y, cs, area, tree.spacing)
+    bkd = _blanking(bkd, tree.spacing)
+
+    def interpolate(gx, gy):
+        _, i = tree.query(gx, gy, radius=bkd if bkd > 0. else None)
+        return np.where(i[:, 0] >= 0, v[np.maximum(i[:, 0], 0)], np.nan),
+
+    data, = _evaluate(properties, interpolate, tile_size=tile_size, threads=threads)
+    return data, properties
+
+
+def natural_neighbour(x, y, v, cs=None, area=None, bkd=None, radius=None, tile_size=TILE_SIZE, threads=None):
+    """
+    Grid located data by discrete natural-neighbour (Sibson) interpolation.
+
+    :param x:           data x locations, numpy array
+    :param y:           data y locations, numpy array
+    :param v:           data values, numpy array, `numpy.nan` values are ignored
+    :param cs:          cell size, default is a quarter of the nominal data spacing
+    :param area:        (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+    :param bkd:         blanking distance, grid points farther than this from a data point are dummies.
+                        The default is the nominal data spacing, 0 for no blanking.
+    :param radius:      grid points farther than this from a data point do not spread their nearest value,
+                        default is twice the blanking distance, or 4 nominal data spacings with no blanking.
+                        The work is proportional to the square of the radius in cells.
+    :param tile_size:   grid tile dimension in cells, default 128
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           (data, properties), see `idw`
+
+    .. versionadded:: 9.6
+    """
+
+    x, y, v = prepare(x, y, v)
+    tree = KDTree(x, y)
+    cs, properties = _lattice(x, y, cs, area, tree.spacing)
+    bkd = _blanking(bkd, tree.spacing)
+    if radius is None:
+        radius = 2. * bkd if bkd > 0. else 4. * tree.spacing
+    radius = max(float(radius), cs)
+
+    # nearest data value and distance of every grid point, -1 beyond the radius
+    def nearest_point(gx, gy):
+        d, i = tree.query(gx, gy, radius=radius)
+        found = i[:, 0] >= 0
+        return np.where(found, v[np.maximum(i[:, 0], 0)], 0.), np.where(found, d[:, 0], -1.)
+
+    value, distance = _evaluate(properties, nearest_point, outputs=2, tile_size=tile_size, threads=threads)
+
+    # each grid point is the mean of the values of the grid points that are closer to it than their nearest
+    # data point, which is only itself at a data point
+    halo = int(math.floor(radius / cs + _TOLERANCE))
+    offsets = [(ox, oy, math.hypot(ox, oy) * cs * (1. + _TOLERANCE) if (ox or oy) else -0.5)
+               for oy in range(-halo, halo + 1) for ox in range(-halo, halo + 1)
+               if math.hypot(ox, oy) <= halo + _TOLERANCE]
+    value = np.pad(value, halo)
+    distance = np.pad(distance, halo, constant_values=-1.)
+    data = np.full((properties['ny'], properties['nx']), np.nan)
+
+    def spread(tile):
+        ix0, iy0, tnx, tny = tile
+        total = np.zeros((tny, tnx))
+        count = np.zeros((tny, tnx))
+        for ox, oy, reach in offsets:
+            ys = slice(iy0 + halo + oy, iy0 + halo + oy + tny)
+            xs = slice(ix0 + halo + ox, ix0 + halo + ox + tnx)
+            spreads = distance[ys, xs] > reach
+            total += np.where(spreads, value[ys, xs], 0.)
+            count += spreads
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tile_data = total / count
+        d = distance[iy0 + halo: iy0 + halo + tny, ix0 + halo: ix0 + halo + tnx]
+        tile_data[d < 0.] = np.nan
+        if bkd > 0.:
+            tile_data[d > bkd] = np.nan
+        data[iy0: iy0 + tny, ix0: ix0 + tnx] = tile_data
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max(1, int(threads))) as pool:
+        for _ in pool.map(spread, gxgrdblnd.tiles(properties['nx'], properties['ny'], tile_size)):
+            pass
+    return data, properties
+
+
+def gridding(x, y, v, method=METHOD_IDW, **kwargs):
+    """
+    Grid located data by a local gridding method.
+
+    :param x:       data x locations, numpy array
+    :param y:       data y locations, numpy array
+    :param v:       data values, numpy array, `numpy.nan` values are ignored
+    :param method:  `METHOD_IDW` (default), `METHOD_NEAREST` or `METHOD_NATURAL`
+    :param kwargs:  parameters of `idw`, `nearest` or `natural_neighbour`
+    :returns:       (data, properties), see `idw`
+
+    .. versionadded:: 9.6
+    """
+
+    methods = {METHOD_IDW: idw, METHOD_NEAREST: nearest, METHOD_NATURAL: natural_neighbour}
+    if method not in methods:
+        raise GridLocalException(_t('Unknown gridding method "{}", expected one of {}.')
+                                 .format(method, ', '.join(sorted(methods))))
+    return methods[method](x, y, v, **kwargs)
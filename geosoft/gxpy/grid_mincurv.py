@@ -0,0 +1,574 @@
+"""
+Minimum-curvature gridding of located data in numpy.
+
+The surface is a continuous curvature spline in tension (Smith and Wessel, 1990, Gridding with continuous
+curvature splines in tension) that passes through the data. Each data point, or the mean of the data points
+that share a grid point, fixes the value of its nearest grid point. The other grid points minimize
+
+    (1 - tension) * curvature + tension * slope
+
+where curvature is the sum of the squared second differences of the grid (a discrete thin plate) and slope
+is the sum of the squared first differences, both measured in grid cells.
+
+The surface is solved coarse-to-fine. The coarsest grid is started from an inverse-distance weighted average
+of the data, and each grid is solved by conjugate-gradient iterations of the vectorized stencil of the
+equations, then interpolated to twice the resolution as the start of the next grid. The iterations are
+preconditioned by a multigrid V-cycle over the coarser grids, which removes the smooth part of the error that
+plain relaxation of the stencil would take thousands of iterations to remove. This module does not require the
+Geosoft runtime.
+
+.. seealso:: `geosoft.gxpy.grid.Grid.minimum_curvature`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_mincurv.py>`_
+
+.. versionadded:: 9.6
+"""
+import math
+import time
+import numpy as np
+
+import geosoft
+from . import grid_fill as gxfill
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+# index tolerance when snapping the grid to multiples of the cell size
+_TOLERANCE = 1.0e-9
+
+# multigrid: free points of the coarsest grid solved directly, Chebyshev smoothing degree and eigenvalue range
+_COARSEST = 400
+_SMOOTHING_DEGREE = 3
+_SMOOTHING_RANGE = 16.
+
+
+class MinimumCurvatureException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_mincurv`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def nominal_spacing(x, y):
+    """
+    Nominal data spacing, the square root of the data extent area per data point.
+
+    .. versionadded:: 9.6
+    """
+
+    n = len(x)
+    if n == 0:
+        return 1.
+    w = float(np.max(x) - np.min(x))
+    h = float(np.max(y) - np.min(y))
+    area = w * h
+    if area <= 0.:
+        area = max(w, h) ** 2
+    if area <= 0.:
+        return 1.
+    return math.sqrt(area / n)
+
+
+def _log(v, logopt, logmin):
+    if logopt == 1:
+        return np.log10(np.maximum(v, logmin))
+    v = v.copy()
+    high = v > logmin
+    low = v < -logmin
+    v[high] = logmin + np.log10(v[high] / logmin)
+    v[low] = -logmin - np.log10(-v[low] / logmin)
+    return v
+
+
+def _unlog(u, logopt, logmin):
+    if logopt == 1:
+        return np.power(10., u)
+    u = u.copy()
+    high = u > logmin
+    low = u < -logmin
+    u[high] = logmin * np.power(10., u[high] - logmin)
+    u[low] = -logmin * np.power(10., -logmin - u[low])
+    return u
+
+
+def _apply(u, curvature, slope):
+    """ the stencil of the minimum-curvature equations applied to u, weighted curvature and slope terms"""
+
+    r = np.zeros_like(u)
+    ny, nx = u.shape
+    if curvature > 0.:
+        if nx > 2:
+            d = curvature * (u[:, :-2] - 2. * u[:, 1:-1] + u[:, 2:])
+            r[:, :-2] += d
+            r[:, 1:-1] -= 2. * d
+            r[:, 2:] += d
+        if ny > 2:
+            d = curvature * (u[:-2, :] - 2. * u[1:-1, :] + u[2:, :])
+            r[:-2, :] += d
+            r[1:-1, :] -= 2. * d
+            r[2:, :] += d
+        if nx > 1 and ny > 1:
+            d = 2. * curvature * (u[1:, 1:] - u[1:, :-1] - u[:-1, 1:] + u[:-1, :-1])
+            r[1:, 1:] += d
+            r[1:, :-1] -= d
+            r[:-1, 1:] -= d
+            r[:-1, :-1] += d
+    if slope > 0.:
+        if nx > 1:
+            d = slope * (u[:, 1:] - u[:, :-1])
+            r[:, 1:] += d
+            r[:, :-1] -= d
+        if ny > 1:
+            d = slope * (u[1:, :] - u[:-1, :])
+            r[1:, :] += d
+            r[:-1, :] -= d
+    return r
+
+
+def _diagonal(shape, curvature, slope):
+    """ diagonal of the stencil of `_apply`"""
+
+    d = np.zeros(shape)
+    ny, nx = shape
+    if nx > 2:
+        d[:, :-2] += curvature
+        d[:, 1:-1] += 4. * curvature
+        d[:, 2:] += curvature
+    if ny > 2:
+        d[:-2, :] += curvature
+        d[1:-1, :] += 4. * curvature
+        d[2:, :] += curvature
+    if nx > 1 and ny > 1:
+        d[1:, 1:] += 2. * curvature
+        d[1:, :-1] += 2. * curvature
+        d[:-1, 1:] += 2. * curvature
+        d[:-1, :-1] += 2. * curvature
+    if nx > 1:
+        d[:, 1:] += slope
+        d[:, :-1] += slope
+    if ny > 1:
+        d[1:, :] += slope
+        d[:-1, :] += slope
+    return d
+
+
+def _refine(u, ny, nx):
+    """ bilinear interpolation of u to twice the resolution, shaped (ny, nx)"""
+
+    def along(a, n, axis):
+        f = np.arange(n) * 0.5
+        i0 = np.minimum(np.floor(f).astype(np.int64), a.shape[axis] - 1)
+        i1 = np.minimum(i0 + 1, a.shape[axis] - 1)
+        w = (f - i0)
+        if axis == 0:
+            return a[i0, :] * (1. - w)[:, np.newaxis] + a[i1, :] * w[:, np.newaxis]
+        return a[:, i0] * (1. - w) + a[:, i1] * w
+
+    return along(along(u, ny, 0), nx, 1)
+
+
+def _coarsen(r, ny, nx):
+    """ transpose of `_refine`, r summed to a grid of half the resolution shaped (ny, nx)"""
+
+    def along(a, n, axis):
+        if axis == 1:
+            return along(a.T, n, 0).T
+        c = np.zeros((n,) + a.shape[1:])
+        even = a[0::2]
+        odd = a[1::2]
+        c[:len(even)] = even
+        c[:len(odd)] += 0.5 * odd
+        c[1: len(odd) + 1] += 0.5 * odd
+        return c
+
+    return along(along(r, ny, 0), nx, 1)
+
+
+class _Level:
+    """ one grid of the multigrid hierarchy"""
+
+    def __init__(self, fixed, curvature, slope):
+        self.fixed = fixed
+        self.free = ~fixed
+        self.curvature = curvature
+        self.slope = slope
+        self.diag = _diagonal(fixed.shape, curvature, slope)
+        self.diag[self.diag == 0.] = 1.
+        self.inverse = None
+        self.high = 0.
+        n_free = np.count_nonzero(self.free)
+        if n_free == 0:
+            return
+        if n_free <= _COARSEST:
+
+            # coarsest grid, pseudo-inverse of the free equations
+            index = np.flatnonzero(self.free)
+            a = np.zeros((n_free, n_free))
+            e = np.zeros(fixed.size)
+            for i, k in enumerate(index):
+                e[k] = 1.
+                a[:, i] = self.apply(e.reshape(fixed.shape)).ravel()[index]
+                e[k] = 0.
+            self.inverse = (index, np.linalg.pinv(a))
+        else:
+
+            # largest eigenvalue of the diagonally scaled equations for the Chebyshev smoother
+            u = np.where(self.free, np.random.RandomState(0).rand(*fixed.shape), 0.)
+            for _ in range(12):
+                au = self.apply(u) / self.diag
+                self.high = math.sqrt(np.vdot(au, au) / np.vdot(u, u))
+                if self.high == 0.:
+                    break
+                u = au / self.high
+
+    def apply(self, u):
+        r = _apply(u, self.curvature, self.slope)
+        r[self.fixed] = 0.
+        return r
+
+    def smooth(self, x, b):
+        """ Chebyshev smoothing of the high-frequency error of A x = b"""
+
+        high = self.high * 1.1
+        low = high / _SMOOTHING_RANGE
+        theta = (high + low) * 0.5
+        delta = (high - low) * 0.5
+        sigma = theta / delta
+        rho = 1. / sigma
+        r = b - self.apply(x)
+        d = r / (self.diag * theta)
+        for k in range(_SMOOTHING_DEGREE):
+            x += d
+            if k == _SMOOTHING_DEGREE - 1:
+                break
+            r -= self.apply(d)
+            rho_next = 1. / (2. * sigma - rho)
+            d *= rho_next * rho
+            d += (2. * rho_next / delta) * r / self.diag
+            rho = rho_next
+        return x
+
+
+def _cycle(r, hierarchy, k=0):
+    """ multigrid V-cycle approximation of the correction e that solves A e = r on grid k"""
+
+    level = hierarchy[k]
+    if level.inverse is not None:
+        index, inverse = level.inverse
+        e = np.zeros(r.size)
+        e[index] = inverse.dot(r.ravel()[index])
+        return e.reshape(r.shape)
+    e = np.zeros_like(r)
+    if level.high == 0.:
+        return e
+    level.smooth(e, r)
+    if k + 1 < len(hierarchy):
+        coarse = hierarchy[k + 1]
+        rc = _coarsen(r - level.apply(e), *coarse.fixed.shape)
+        rc[coarse.fixed] = 0.
+        e += _refine(_cycle(rc, hierarchy, k + 1), *r.shape)
+        e[level.fixed] = 0.
+    level.smooth(e, r)
+    return e
+
+
+def _relax(u, hierarchy, tol, pastol, itrmax):
+    """
+    Solve the free grid points of u by conjugate-gradient iterations preconditioned by a multigrid V-cycle.
+    The preconditioned residual is the estimated remaining correction of each grid point, and the iterations
+    stop when the estimate is less than `tol` for `pastol` percent of the free points. Returns the number of
+    iterations.
+    """
+
+    level = hierarchy[0]
+    n_free = np.count_nonzero(level.free)
+    if n_free == 0:
+        return 0
+    need = int(math.ceil(n_free * min(pastol, 100.) / 100.))
+
+    r = -level.apply(u)
+    z = _cycle(r, hierarchy)
+    p = z.copy()
+    rz = np.vdot(r, z)
+    iterations = 0
+    while iterations < itrmax and rz > 0.:
+        if np.count_nonzero(np.abs(z[level.free]) < tol) >= need:
+            break
+        ap = level.apply(p)
+        pap = np.vdot(p, ap)
+        if pap <= 0.:
+            break
+        alpha = rz / pap
+        u += alpha * p
+        r -= alpha * ap
+        iterations += 1
+        z = _cycle(r, hierarchy)
+        rz_next = np.vdot(r, z)
+        p *= rz_next / rz
+        p += z
+        rz = rz_next
+    return iterations
+
+
+def _node_means(iy, ix, v, ny, nx):
+    """ mean value and count of the data at each grid point"""
+    node = iy * nx + ix
+    count = np.bincount(node, minlength=ny * nx).reshape(ny, nx)
+    total = np.bincount(node, weights=v, minlength=ny * nx).reshape(ny, nx)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / count, count
+
+
+def _start(total, count, radius, iwt, mean):
+    """ inverse-distance weighted start values from node sums and counts, within a radius in cells"""
+
+    ny, nx = count.shape
+    radius = max(1, min(int(math.ceil(radius)), max(nx, ny)))
+    s = np.zeros((ny, nx))
+    w = np.zeros((ny, nx))
+    for oy in range(-radius, radius + 1):
+        for ox in range(-radius, radius + 1):
+            d = math.hypot(ox, oy)
+            if d > radius:
+                continue
+            wd = 1. / max(d, 0.5) ** iwt
+            ys = slice(max(0, oy), ny + min(0, oy))
+            yd = slice(max(0, -oy), ny + min(0, -oy))
+            xs = slice(max(0, ox), nx + min(0, ox))
+            xd = slice(max(0, -ox), nx + min(0, -ox))
+            s[yd, xd] += total[ys, xs] * wd
+            w[yd, xd] += count[ys, xs] * wd
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u = s / w
+    u[w == 0.] = mean
+    return u
+
+
+def _edge_clip(mask, cells):
+    """ grid points within `cells` of the rows and columns spanned by the data points in mask"""
+
+    ny, nx = mask.shape
+    rows = mask.any(axis=1)
+    cols = mask.any(axis=0)
+    ix = np.arange(nx)
+    iy = np.arange(ny)
+    first_x = np.where(rows, np.argmax(mask, axis=1), nx)
+    last_x = np.where(rows, nx - 1 - np.argmax(mask[:, ::-1], axis=1), -1)
+    first_y = np.where(cols, np.argmax(mask, axis=0), ny)
+    last_y = np.where(cols, ny - 1 - np.argmax(mask[::-1, :], axis=0), -1)
+    inside = ((ix[np.newaxis, :] >= first_x[:, np.newaxis]) & (ix[np.newaxis, :] <= last_x[:, np.newaxis]) &
+              (iy[:, np.newaxis] >= first_y[np.newaxis, :]) & (iy[:, np.newaxis] <= last_y[np.newaxis, :]))
+    inside |= mask
+    return gxfill.distance(inside) <= cells
+
+
+def grid_area(x, y, cs, area=None, edgclp=-1):
+    """
+    Grid location and dimensions for data.
+
+    :param x:       data x locations, numpy array
+    :param y:       data y locations, numpy array
+    :param cs:      cell size
+    :param area:    (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits. Without an
+                    area the grid origin is a multiple of the cell size.
+    :param edgclp:  edge clip cells, the grid is extended by this many cells beyond the data limits
+    :returns:       (x0, y0, nx, ny)
+
+    .. versionadded:: 9.6
+    """
+
+    if area is None:
+        area = (None, None, None, None)
+    xmin, ymin, xmax, ymax = area
+    if xmin is None and ymin is None and xmax is None and ymax is None:
+        ext = max(0, int(edgclp))
+        ix0 = math.floor(float(np.min(x)) / cs + _TOLERANCE) - ext
+        iy0 = math.floor(float(np.min(y)) / cs + _TOLERANCE) - ext
+        ix1 = math.ceil(float(np.max(x)) / cs - _TOLERANCE) + ext
+        iy1 = math.ceil(float(np.max(y)) / cs - _TOLERANCE) + ext
+        return ix0 * cs, iy0 * cs, ix1 - ix0 + 1, iy1 - iy0 + 1
+
+    xmin = float(np.min(x)) if xmin is None else float(xmin)
+    ymin = float(np.min(y)) if ymin is None else float(ymin)
+    xmax = float(np.max(x)) if xmax is None else float(xmax)
+    ymax = float(np.max(y)) if ymax is None else float(ymax)
+    nx = math.ceil((xmax - xmin) / cs - _TOLERANCE) + 1
+    ny = math.ceil((ymax - ymin) / cs - _TOLERANCE) + 1
+    return xmin, ymin, max(1, nx), max(1, ny)
+
+
+def minimum_curvature(x, y, v, cs=None, area=None, bclip=False, logopt=0, logmin=1., idsf=1, bkd=None,
+                      srd=None, iwt=2., edgclp=-1, tol=None, pastol=100., itrmax=200, ti=0., icgr=8,
+                      report=None):
+    """
+    Grid located data with a minimum-curvature surface.
+
+    :param x:       data x locations, numpy array
+    :param y:       data y locations, numpy array
+    :param v:       data values, numpy array, `numpy.nan` values are ignored
+    :param cs:      cell size, default is a quarter of the nominal data spacing (see `nominal_spacing`)
+    :param area:    (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+    :param bclip:   `True` to only use the data inside the area. By default data within `icgr` cells of the
+                    area also shape the surface.
+    :param logopt:  0 for linear values, 1 to grid log10(value) with values clipped to `logmin`, 2 to grid
+                    `logmin + log10(value/logmin)` for values above `logmin`, `-logmin - log10(-value/logmin)`
+                    for values below `-logmin` and the value in between.
+    :param logmin:  see `logopt`, default 1.
+    :param idsf:    desampling factor in cells, data in blocks of this many cells are averaged, default 1.
+    :param bkd:     blanking distance, grid points farther than this from a data point are dummies. The
+                    default is the nominal data spacing.
+    :param srd:     search radius for the inverse-distance start values of the coarse grid, default is 4
+                    coarse grid cells. Coarse grid points without data in the radius start at the data mean.
+    :param iwt:     inverse-distance weighting power of the start values, default 2.
+    :param edgclp:  edge clipping in cells beyond the data limits, default -1 for no edge clipping
+    :param tol:     tolerance of the grid values, default is 0.1 percent of the data range. The iterations of a
+                    grid stop when the estimated remaining correction of the grid points, the residual of the
+                    equations preconditioned by the multigrid cycle, is less than `tol`.
+    :param pastol:  percentage of grid points that must meet `tol` to stop the iterations of a grid,
+                    default 100.
+    :param itrmax:  maximum number of iterations of each grid, default 200
+    :param ti:      tension from 0 (default, minimum curvature) to 1 (harmonic surface)
+    :param icgr:    coarse grid factor, 16, 8 (default), 4, 2 or 1
+    :param report:  optional dictionary that receives 'levels', a list of (factor, iterations) for each grid
+                    from the coarsest, and 'seconds', the solution time.
+    :returns:       (data, properties): numpy float64 array shaped (ny, nx) with dummies `numpy.nan`, and the
+                    grid properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'.
+
+    .. versionadded:: 9.6
+    """
+
+    started = time.perf_counter()
+    x = np.asarray(x, dtype=np.float64).ravel()
+    y = np.asarray(y, dtype=np.float64).ravel()
+    v = np.asarray(v, dtype=np.float64).ravel()
+    if not (len(x) == len(y) == len(v)):
+        raise MinimumCurvatureException(_t('x, y and v must be the same length'))
+    valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(v))
+    x, y, v = x[valid], y[valid], v[valid]
+    if len(v) == 0:
+        raise MinimumCurvatureException(_t('There is no valid data to grid.'))
+
+    icgr = int(icgr)
+    if icgr not in (1, 2, 4, 8, 16):
+        raise MinimumCurvatureException(_t('Coarse grid factor must be 16, 8, 4, 2 or 1, found {}').format(icgr))
+    if not (0. <= ti <= 1.):
+        raise MinimumCurvatureException(_t('Tension must be between 0 and 1, found {}').format(ti))
+
+    spacing = nominal_spacing(x, y)
+    if cs is None:
+        cs = spacing / 4.
+    cs = float(cs)
+    if cs <= 0.:
+        raise MinimumCurvatureException(_t('Cell size must be positive, found {}').format(cs))
+    if bkd is None:
+        bkd = spacing
+    edgclp = -1 if edgclp is None else int(edgclp)
+
+    x0, y0, nx, ny = grid_area(x, y, cs, area, edgclp)
+
+    if logopt:
+        v = _log(v, int(logopt), float(logmin))
+
+    # fractional grid indexes, data far outside the grid are not used
+    fx = (x - x0) / cs
+    fy = (y - y0) / cs
+    inside = ((fx > -0.5 - _TOLERANCE) & (fx < nx - 0.5 + _TOLERANCE) &
+              (fy > -0.5 - _TOLERANCE) & (fy < ny - 0.5 + _TOLERANCE))
+    if bclip or inside.all():
+        pad = 0
+        use = inside
+    else:
+        pad = 2 * icgr
+        use = (fx > -pad - 0.5) & (fx < nx - 0.5 + pad) & (fy > -pad - 0.5) & (fy < ny - 0.5 + pad)
+    fx, fy, v = fx[use] + pad, fy[use] + pad, v[use]
+    if len(v) == 0:
+        raise MinimumCurvatureException(_t('There is no data in the grid area.'))
+    wnx = nx + 2 * pad
+    wny = ny + 2 * pad
+
+    # desample: mean location and value of the data in blocks of idsf cells
+    idsf = max(1, int(idsf))
+    if idsf > 1:
+        bx = np.floor(fx / idsf).astype(np.int64)
+        by = np.floor(fy / idsf).astype(np.int64)
+        _, block, count = np.unique(by * (wnx // idsf + 2) + bx, return_inverse=True, return_counts=True)
+        fx = np.bincount(block, weights=fx) / count
+        fy = np.bincount(block, weights=fy) / count
+        v = np.bincount(block, weights=v) / count
+
+    vmin, vmax = float(v.min()), float(v.max())
+    if tol is None:
+        tol = (vmax - vmin) * 0.001
+    tol = max(float(tol), 1.0e-25)
+    mean = float(v.mean())
+
+    def data_nodes(factor):
+        cnx = -(-(wnx - 1) // factor) + 1
+        cny = -(-(wny - 1) // factor) + 1
+        ix = np.clip(np.rint(fx / factor).astype(np.int64), 0, cnx - 1)
+        iy = np.clip(np.rint(fy / factor).astype(np.int64), 0, cny - 1)
+        return _node_means(iy, ix, v, cny, cnx)
+
+    # multigrid hierarchy by factor, the curvature of a grid of f cells weighs 1/f**2 relative to slope
+    grids = {}
+
+    def hierarchy(factor):
+        chain = []
+        while True:
+            if factor not in grids:
+                _, count = data_nodes(factor)
+                grids[factor] = _Level(count > 0, (1. - ti) / factor ** 2, ti)
+            level = grids[factor]
+            chain.append(level)
+            if level.inverse is not None or level.high == 0.:
+                return chain
+            factor *= 2
+
+    # coarse-to-fine
+    ti = float(ti)
+    levels = []
+    factor = icgr
+    while factor > 1 and ((wnx - 1) // factor < 1 or (wny - 1) // factor < 1):
+        factor //= 2
+    u = None
+    while True:
+        values, count = data_nodes(factor)
+        fixed = count > 0
+        if u is None:
+            radius = (4. if srd is None else float(srd) / (cs * factor))
+            u = _start(np.where(fixed, values * count, 0.), count, radius, float(iwt), mean)
+        else:
+            u = _refine(u, *fixed.shape)
+        u[fixed] = values[fixed]
+        levels.append((factor, _relax(u, hierarchy(factor), tol, float(pastol), int(itrmax))))
+        if factor == 1:
+            break
+        factor //= 2
+
+    data = u[pad: pad + ny, pad: pad + nx].copy()
+    if logopt:
+        data = _unlog(data, int(logopt), float(logmin))
+
+    # blanking distance and edge clipping
+    data_nodes = fixed[pad: pad + ny, pad: pad + nx]
+    if data_nodes.any():
+        if float(bkd) > 0.:
+            data[gxfill.distance(data_nodes, (cs, cs)) > float(bkd)] = np.nan
+        if edgclp >= 0:
+            data[~_edge_clip(data_nodes, edgclp)] = np.nan
+
+    if report is not None:
+        report['levels'] = levels
+        report['seconds'] = time.perf_counter() - started
+
+    properties = {'nx': nx, 'ny': ny, 'x0': x0, 'y0': y0, 'dx': cs, 'dy': cs, 'rot': 0.}
+    return data, properties
@@ -0,0 +1,265 @@
+"""
+Reduced-resolution overviews of grids.
+
+Overview level `n` of a grid has grid points `2**n` times further apart than the grid, and is saved as a
+Geosoft GRD file next to the grid, named `<grid file>.ovr<n>.grd`. Overviews are created by
+`geosoft.gxpy.grid.Grid.build_overviews`, and readers and renderers that want a target resolution use
+`select` to find the smallest overview that still meets that resolution.
+
+This module reduces blocks of grid rows to all overview levels at once and finds overview files, without
+calling the Geosoft runtime.
+
+:Constants:
+    :METHOD_MEAN:       'mean' mean of the valid grid values in each overview cell
+    :METHOD_NEAREST:    'nearest' grid value at the first grid point of each overview cell
+    :METHOD_MODE:       'mode' most common valid value in each overview cell, the smallest of equally
+                        common values. Use for classified grids.
+
+.. seealso:: `geosoft.gxpy.grid.Grid.build_overviews`, `geosoft.gxpy.grid.Grid.preview`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_overview.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+import numpy as np
+
+import geosoft
+from . import grid_grd as gxgrdgrd
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+METHOD_MEAN = 'mean'
+METHOD_NEAREST = 'nearest'
+METHOD_MODE = 'mode'
+
+# overviews are not reduced below this dimension
+_MIN_DIMENSION = 64
+
+
+class OverviewException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_overview`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _undecorated(file_name):
+    file_name = str(file_name)
+    if file_name.endswith(')') and '(' in file_name:
+        file_name = file_name[:file_name.rfind('(')]
+    return file_name
+
+
+def file_name(grid_file, level):
+    """
+    Overview file name of a grid.
+
+    :param grid_file:   grid file name, decorations are ignored
+    :param level:       overview level, 1 or more
+    :returns:           overview file name, without decoration
+
+    .. versionadded:: 9.6
+    """
+
+    return '{}.ovr{}.grd'.format(_undecorated(grid_file), int(level))
+
+
+def overview_files(grid_file):
+    """
+    Overviews of a grid that are current, which are overview files not older than the grid file.
+
+    :param grid_file:   grid file name
+    :returns:           list of (level, file name), in increasing level
+
+    .. versionadded:: 9.6
+    """
+
+    grid_file = _undecorated(grid_file)
+    try:
+        grid_time = os.path.getmtime(grid_file)
+    except OSError:
+        return []
+
+    overviews = []
+    level = 1
+    while True:
+        ovr = file_name(grid_file, level)
+        if not os.path.exists(ovr):
+            break
+        if os.path.getmtime(ovr) >= grid_time:
+            overviews.append((level, ovr))
+        level += 1
+    return overviews
+
+
+def default_levels(nx, ny):
+    """
+    Number of overview levels until the overview dimensions are 64 or less.
+
+    .. versionadded:: 9.6
+    """
+
+    n = max(nx, ny)
+    if n <= _MIN_DIMENSION:
+        return 0
+    return int(math.ceil(math.log2(n / _MIN_DIMENSION)))
+
+
+def select(grid_file, pix_width=None, pix_height=None):
+    """
+    The smallest current overview of a grid with at least a number of grid points across and up.
+
+    :param grid_file:   grid file name, with decorations
+    :param pix_width:   minimum number of grid points in x, `None` for no requirement
+    :param pix_height:  minimum number of grid points in y, `None` for no requirement
+    :returns:           name of the overview file decorated '(GRD)', or `grid_file` if no overview is
+                        small enough.
+
+    .. versionadded:: 9.6
+    """
+
+    if not pix_width and not pix_height:
+        return grid_file
+
+    selected = grid_file
+    for _, ovr in overview_files(grid_file):
+        try:
+            hd = gxgrdgrd.read_header(ovr)
+        except (gxgrdgrd.GRDException, OSError):
+            break
+        if (pix_width and hd['nx'] < pix_width) or (pix_height and hd['ny'] < pix_height):
+            break
+        selected = ovr + '(GRD)'
+    return selected
+
+
+def properties(grid_properties, level, method=METHOD_MEAN):
+    """
+    Properties of an overview level.
+
+    :param grid_properties: grid properties dictionary, see `geosoft.gxpy.grid.Grid.properties`
+    :param level:           overview level, 1 or more
+    :param method:          `METHOD_MEAN` (default), `METHOD_NEAREST` or `METHOD_MODE`. Mean and mode
+                            overview points are at the centre of the grid points they summarize, nearest
+                            overview points are on the first grid point.
+    :returns:               properties dictionary of the overview, with 'nx', 'ny', 'x0', 'y0', 'dx' and
+                            'dy' changed. Mean overviews of integer grids are float32.
+
+    .. versionadded:: 9.6
+    """
+
+    _check_method(method)
+    f = 2 ** int(level)
+    p = dict(grid_properties)
+    if method == METHOD_NEAREST:
+        offset = 0.
+    else:
+        offset = (f - 1) * 0.5
+    x0, y0 = gxgrdsmp.xy_from_index(grid_properties, offset, offset)
+    p['x0'] = float(x0)
+    p['y0'] = float(y0)
+    p['dx'] = grid_properties['dx'] * f
+    p['dy'] = grid_properties['dy'] * f
+    p['nx'] = (grid_properties['nx'] + f - 1) // f
+    p['ny'] = (grid_properties['ny'] + f - 1) // f
+    if method == METHOD_MEAN and not np.issubdtype(np.dtype(p.get('dtype', np.float64)), np.floating):
+        p['dtype'] = np.dtype(np.float32)
+    return p
+
+
+def _check_method(method):
+    if method not in (METHOD_MEAN, METHOD_NEAREST, METHOD_MODE):
+        raise OverviewException(_t('Unknown overview method "{}"').format(method))
+
+
+def _pad(data, f, fill):
+    ny, nx = data.shape
+    py = (-ny) % f
+    px = (-nx) % f
+    if px or py:
+        data = np.pad(data, ((0, py), (0, px)), mode='constant', constant_values=fill)
+    return data
+
+
+def _sum2(a):
+    """ sum of 2 x 2 blocks"""
+    return a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]
+
+
+def _mode(data, f):
+    """ mode of f x f blocks, nan is not a value"""
+
+    data = _pad(data, f, np.nan)
+    ny, nx = data.shape
+    v = data.reshape(ny // f, f, nx // f, f).transpose(0, 2, 1, 3).reshape(ny // f, nx // f, f * f)
+    v = np.sort(v, axis=-1)
+
+    # running count of equal values along the sorted values, 0 for nan
+    m = v.shape[-1]
+    position = np.broadcast_to(np.arange(m), v.shape)
+    start = np.ones(v.shape, dtype=bool)
+    start[..., 1:] = v[..., 1:] != v[..., :-1]
+    run_start = np.maximum.accumulate(np.where(start, position, 0), axis=-1)
+    count = np.where(np.isnan(v), 0, position - run_start + 1)
+
+    best = np.argmax(count, axis=-1)[..., np.newaxis]
+    mode = np.take_along_axis(v, best, axis=-1)[..., 0]
+    mode[np.take_along_axis(count, best, axis=-1)[..., 0] == 0] = np.nan
+    return mode
+
+
+def reduce(data, levels, method=METHOD_MEAN):
+    """
+    Reduce a block of grid rows to overview levels.
+
+    :param data:    numpy float array shaped (ny, nx) of grid values, dummies `numpy.nan`. For blocks of a
+                    larger grid the first row of the block must be a multiple of `2**levels`.
+    :param levels:  number of levels
+    :param method:  `METHOD_MEAN` (default), `METHOD_NEAREST` or `METHOD_MODE`
+    :returns:       list of numpy float arrays for levels 1 to `levels`, level `n` shaped
+                    (ceil(ny / 2**n), ceil(nx / 2**n))
+
+    .. versionadded:: 9.6
+    """
+
+    _check_method(method)
+    data = np.asarray(data, dtype=np.float64)
+    result = []
+
+    if method == METHOD_NEAREST:
+        for level in range(1, levels + 1):
+            f = 2 ** level
+            result.append(data[::f, ::f].copy())
+
+    elif method == METHOD_MODE:
+        for level in range(1, levels + 1):
+            result.append(_mode(data, 2 ** level))
+
+    else:
+
+        # carry sums and counts so that each level is the mean of all valid grid values
+        valid = ~np.isnan(data)
+        s = np.where(valid, data, 0.)
+        n = valid.astype(np.float64)
+        for level in range(1, levels + 1):
+            s = _sum2(_pad(s, 2, 0.))
+            n = _sum2(_pad(n, 2, 0.))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = s / n
+            mean[n == 0.] = np.nan
+            result.append(mean)
+
+    return result
@@ -0,0 +1,505 @@
+"""
+Colour-mapped and shaded rendering of grid data in numpy.
+
+Grid values are coloured from a colour table, either by zone boundaries, as in a
+`geosoft.gxpy.group.Color_map` or an ITR colour zone definition, or by a linear or histogram-equalized
+stretch of the data range over the colours. Colours can be shaded by a hillshade from one or more light
+directions, combined with the colours by multiply, overlay or soft-light blending. Images are written as PNG
+files without any image library.
+
+`thumbnail` renders a GRD grid file from the smallest overview that meets the image size (see
+`geosoft.gxpy.grid.Grid.build_overviews`), so small images of large grids read little data, and `thumbnails`
+renders many grids in parallel. This module does not require the Geosoft runtime.
+
+:Constants:
+    :STRETCH_LINEAR:    0 colours are spread linearly over the data range
+    :STRETCH_EQUALIZE:  1 colours are spread over the data histogram, each colour covering an equal area
+    :SHADE_MULTIPLY:    0 colours are multiplied by the shade
+    :SHADE_OVERLAY:     1 overlay blend, which darkens shadows and lightens highlights
+    :SHADE_SOFT_LIGHT:  2 soft-light blend, a gentler overlay
+    :MULTIDIRECTIONAL:  (225., 270., 315., 360.) light azimuths of a multi-directional hillshade
+
+.. seealso:: `geosoft.gxpy.grid.Grid.thumbnail`, `geosoft.gxpy.group.Color_map`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_render.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+from . import grid_grd as gxgrdgrd
+from . import grid_overview as gxgrdovr
+from . import grid_sample as gxgrdsmp
+from . import grid_derivative as gxderiv
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+STRETCH_LINEAR = 0
+STRETCH_EQUALIZE = 1
+
+SHADE_MULTIPLY = 0
+SHADE_OVERLAY = 1
+SHADE_SOFT_LIGHT = 2
+
+MULTIDIRECTIONAL = (225., 270., 315., 360.)
+
+# blue to red colour ramp, similar to the Geosoft default colour table
+_RAMP = np.array([(0, 0, 160), (0, 64, 255), (0, 192, 255), (0, 224, 128), (128, 255, 0),
+                  (255, 255, 0), (255, 160, 0), (255, 64, 0), (224, 0, 64), (255, 128, 255)], dtype=np.float64)
+
+
+class RenderException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_render`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def default_colors(n=256):
+    """
+    Default colour table.
+
+    :param n:   number of colours
+    :returns:   numpy uint8 array shaped (n, 3) of (red, green, blue) colours from blue to red
+
+    .. versionadded:: 9.6
+    """
+
+    t = np.linspace(0., len(_RAMP) - 1, max(1, int(n)))
+    return np.rint(np.stack([np.interp(t, np.arange(len(_RAMP)), _RAMP[:, i]) for i in range(3)],
+                            axis=-1)).astype(np.uint8)
+
+
+def color_table(color_map=None):
+    """
+    Colours and zone boundaries of a colour map.
+
+    :param color_map:   one of:
+
+        - `None` for the `default_colors`
+        - a `geosoft.gxpy.group.Color_map`, or any object with a `color_map_rgb` list
+        - a list of (zone maximum, colour) zones, as `geosoft.gxpy.group.Color_map.color_map_rgb`, where
+          the colour is (red, green, blue) or has an `rgb` attribute. The last zone maximum is `None`.
+        - a numpy array or list of (red, green, blue) colours, which are stretched over the data
+
+    :returns:   (colors, levels), where `colors` is a numpy uint8 array shaped (n, 3), and `levels` is a numpy
+                float64 array of the n - 1 zone maxima, or `None` if the colours are to be stretched.
+
+    .. versionadded:: 9.6
+    """
+
+    if color_map is None:
+        return default_colors(), None
+    if hasattr(color_map, 'color_map_rgb'):
+        color_map = color_map.color_map_rgb
+
+    if len(color_map) == 0:
+        raise RenderException(_t('Empty colour map'))
+    first = color_map[0]
+    if (len(first) == 2) and not np.isscalar(first[1]):
+        colors = [c.rgb if hasattr(c, 'rgb') else c for _, c in color_map]
+        levels = np.array([v for v, _ in color_map[:-1]], dtype=np.float64)
+        if len(levels) and np.any(np.diff(levels) < 0.):
+            raise RenderException(_t('Colour zone boundaries must increase'))
+    else:
+        colors = color_map
+        levels = None
+
+    colors = np.asarray(colors)
+    if colors.ndim != 2 or colors.shape[1] < 3:
+        raise RenderException(_t('Colours must be (red, green, blue)'))
+    return np.clip(colors[:, :3], 0, 255).astype(np.uint8), levels
+
+
+def stretch(data, method=STRETCH_LINEAR, limits=None, percent_clip=0., bins=1024):
+    """
+    Stretch grid values to the range 0 to 1.
+
+    :param data:            numpy array of grid values, dummies are `numpy.nan`
+    :param method:          `STRETCH_LINEAR` (default) or `STRETCH_EQUALIZE`
+    :param limits:          (minimum, maximum) data range of a linear stretch, default is the data range
+    :param percent_clip:    percent of the data clipped at each end of the data range, default 0
+    :param bins:            number of quantiles of a histogram-equalized stretch, default 1024
+    :returns:               numpy float64 array, dummies are `numpy.nan`
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+    valid = data[~np.isnan(data)]
+    result = np.full(data.shape, np.nan)
+    if valid.size == 0:
+        return result
+
+    if method == STRETCH_EQUALIZE:
+        p = np.linspace(percent_clip, 100. - percent_clip, max(2, int(bins)) + 1)
+        q = np.percentile(valid, p)
+        with np.errstate(invalid='ignore'):
+            result = np.interp(data, q, np.linspace(0., 1., len(q)))
+        result[np.isnan(data)] = np.nan
+        return result
+
+    if method != STRETCH_LINEAR:
+        raise RenderException(_t('Unknown stretch {}').format(method))
+    if limits is None:
+        if percent_clip:
+            limits = np.percentile(valid, (percent_clip, 100. - percent_clip))
+        else:
+            limits = (valid.min(), valid.max())
+    lo, hi = float(limits[0]), float(limits[1])
+    if hi <= lo:
+        result[~np.isnan(data)] = 0.5
+        return result
+    return np.clip((data - lo) / (hi - lo), 0., 1.)
+
+
+def colorize(data, color_map=None, method=STRETCH_LINEAR, limits=None, percent_clip=0.):
+    """
+    Colour grid values.
+
+    :param data:            numpy array shaped (ny, nx) of grid values, dummies are `numpy.nan`
+    :param color_map:       colour map, see `color_table`. Values are coloured by the zones of a zoned colour
+                            map, a value being in the zone of the first zone maximum it is less than or equal
+                            to, otherwise colours are spread over the stretched data.
+    :param method:          `STRETCH_LINEAR` (default) or `STRETCH_EQUALIZE`, see `stretch`
+    :param limits:          (minimum, maximum) data range of a linear stretch, default is the data range
+    :param percent_clip:    percent of the data clipped at each end of the data range, default 0
+    :returns:               numpy uint8 array shaped (ny, nx, 4) of (red, green, blue, alpha). Dummies are
+                            transparent.
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+    colors, levels = color_table(color_map)
+    if levels is not None:
+        index = np.searchsorted(levels, data, side='left')
+    else:
+        t = stretch(data, method=method, limits=limits, percent_clip=percent_clip)
+        index = np.minimum(np.nan_to_num(t) * len(colors), len(colors) - 1).astype(np.int64)
+
+    rgba = np.zeros(data.shape + (4,), dtype=np.uint8)
+    valid = ~np.isnan(data)
+    rgba[..., :3] = colors[np.clip(index, 0, len(colors) - 1)]
+    rgba[valid, 3] = 255
+    rgba[~valid, :3] = 0
+    return rgba
+
+
+def hillshade(data, dx=1., dy=1., azimuths=(315.,), altitude=45., z_factor=1., weights=None):
+    """
+    Hillshade of a grid surface lit from one or more directions.
+
+    :param data:        numpy array shaped (ny, nx) of grid values, dummies are `numpy.nan`. Row 0 is the
+                        bottom of the grid.
+    :param dx:          grid point separation in x
+    :param dy:          grid point separation in y
+    :param azimuths:    light azimuth in degrees clockwise from the grid y axis, or a list of azimuths, such as
+                        `MULTIDIRECTIONAL`. The default is 315, from the upper left.
+    :param altitude:    light altitude above the horizon in degrees, default 45
+    :param z_factor:    vertical exaggeration of the grid values, default 1
+    :param weights:     weights of the light directions, default is equal weights
+    :returns:           numpy float64 array of shade from 0 (dark) to 1 (lit), dummies where the data is dummy
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.asarray(data, dtype=np.float64) * z_factor
+    gx = gxderiv.x_derivative(data, dx)
+    gy = gxderiv.y_derivative(data, dy)
+    norm = np.sqrt(gx * gx + gy * gy + 1.)
+
+    azimuths = np.atleast_1d(np.asarray(azimuths, dtype=np.float64))
+    if weights is None:
+        weights = np.ones(len(azimuths))
+    weights = np.asarray(weights, dtype=np.float64)
+    if (len(weights) != len(azimuths)) or (weights.sum() <= 0.):
+        raise RenderException(_t('There must be a positive weight for each azimuth'))
+
+    alt = math.radians(altitude)
+    shade = np.zeros(data.shape)
+    for az, w in zip(np.radians(azimuths), weights):
+        lx = math.sin(az) * math.cos(alt)
+        ly = math.cos(az) * math.cos(alt)
+        shade += w * np.maximum((math.sin(alt) - gx * lx - gy * ly) / norm, 0.)
+    return shade / weights.sum()
+
+
+def blend(rgba, shade, mode=SHADE_MULTIPLY, strength=1.):
+    """
+    Shade colours.
+
+    :param rgba:        numpy uint8 array shaped (ny, nx, 3 or 4) of colours
+    :param shade:       numpy float array shaped (ny, nx) of shade from 0 to 1, dummies leave colours unshaded
+    :param mode:        `SHADE_MULTIPLY` (default), `SHADE_OVERLAY` or `SHADE_SOFT_LIGHT`
+    :param strength:    proportion of the shaded colour, 0 to 1, default 1
+    :returns:           numpy uint8 array of shaded colours, with the alpha of `rgba`
+
+    .. versionadded:: 9.6
+    """
+
+    c = rgba[..., :3].astype(np.float64) / 255.
+    s = np.asarray(shade, dtype=np.float64)[..., np.newaxis]
+    if mode == SHADE_MULTIPLY:
+        b = c * s
+    elif mode == SHADE_OVERLAY:
+        b = np.where(c < 0.5, 2. * c * s, 1. - 2. * (1. - c) * (1. - s))
+    elif mode == SHADE_SOFT_LIGHT:
+        b = (1. - 2. * s) * c * c + 2. * s * c
+    else:
+        raise RenderException(_t('Unknown shade mode {}').format(mode))
+    b = np.where(np.isnan(s), c, c + (b - c) * strength)
+
+    result = rgba.copy()
+    result[..., :3] = np.rint(np.clip(b, 0., 1.) * 255.).astype(np.uint8)
+    return result
+
+
+def color_rgba(data):
+    """
+    RGBA colours of Geosoft colour grid values.
+
+    :param data:    numpy int array of colour grid values, as returned by `geosoft.gxpy.grid_grd.read`
+    :returns:       numpy uint8 array shaped data.shape + (4,). Dummies are transparent.
+
+    .. versionadded:: 9.6
+    """
+
+    values = np.array(data, dtype='<i4')
+    values[values == gxgrdsmp._COLOR_DUMMY] = 0
+    rgba = values.view(np.uint8).reshape(values.shape + (4,)).copy()
+    rgba[..., 3][rgba[..., 3] > 0] = 255
+    return rgba
+
+
+def render(data, properties=None, color_map=None, method=STRETCH_LINEAR, limits=None, percent_clip=0.,
+           shade=False, azimuths=(315.,), altitude=45., z_factor=1., shade_mode=SHADE_MULTIPLY, strength=1.):
+    """
+    Render grid values as an image.
+
+    :param data:        numpy array shaped (ny, nx) of grid values, dummies `numpy.nan`, with row 0 at the
+                        bottom of the grid, or an RGBA colour grid shaped (ny, nx, 4)
+    :param properties:  grid properties dictionary, which provides 'dx' and 'dy' for shading
+    :param color_map:   colour map, see `color_table`
+    :param method:      stretch `STRETCH_LINEAR` (default) or `STRETCH_EQUALIZE`
+    :param limits:      (minimum, maximum) data range of a linear stretch, default is the data range
+    :param percent_clip: percent of the data clipped at each end of the data range, default 0
+    :param shade:       `True` to shade by a hillshade, see `hillshade`
+    :param azimuths:    light azimuth, or list of azimuths, default 315
+    :param altitude:    light altitude in degrees, default 45
+    :param z_factor:    vertical exaggeration of the grid values, default 1
+    :param shade_mode:  `SHADE_MULTIPLY` (default), `SHADE_OVERLAY` or `SHADE_SOFT_LIGHT`
+    :param strength:    proportion of the shaded colour, 0 to 1, default 1
+    :returns:           numpy uint8 array shaped (ny, nx, 4) of (red, green, blue, alpha) with the top row
+                        of the grid first, as expected by `write_png`.
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.asarray(data)
+    if data.ndim == 3:
+        rgba = data.astype(np.uint8)
+    else:
+        rgba = colorize(data, color_map, method=method, limits=limits, percent_clip=percent_clip)
+        if shade:
+            dx = dy = 1.
+            if properties is not None:
+                dx = properties.get('dx', 1.)
+                dy = properties.get('dy', dx)
+            s = hillshade(data, dx, dy, azimuths=azimuths, altitude=altitude, z_factor=z_factor)
+            rgba = blend(rgba, s, mode=shade_mode, strength=strength)
+    return rgba[::-1]
+
+
+def write_png(file_name, rgba, compress_level=6):
+    """
+    Write an image to a PNG file.
+
+    :param file_name:       PNG file name
+    :param rgba:            numpy uint8 array shaped (ny, nx, 4) of (red, green, blue, alpha), or (ny, nx, 3)
+                            of (red, green, blue), top row first
+    :param compress_level:  zlib compression level 0 to 9, default 6
+    :returns:               file name
+
+    .. versionadded:: 9.6
+    """
+
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    if rgba.ndim != 3 or rgba.shape[2] not in (3, 4):
+        raise RenderException(_t('Image must be shaped (ny, nx, 3) or (ny, nx, 4)'))
+    ny, nx, bands = rgba.shape
+    raw = np.zeros((ny, nx * bands + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape((ny, -1))
+
+    def chunk(tag, body):
+        return struct.pack('>I', len(body)) + tag + body + struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff)
+
+    with open(file_name, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', nx, ny, 8, 6 if bands == 4 else 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)))
+        f.write(chunk(b'IEND', b''))
+    return file_name
+
+
+def image_size(properties, pix_width=None, pix_height=None):
+    """
+    Image size that keeps the grid aspect ratio.
+
+    :param properties:  grid properties dictionary, uses 'nx', 'ny', 'dx' and 'dy'
+    :param pix_width:   image width in pixels, default is from `pix_height`, or the grid `nx`
+    :param pix_height:  image height in pixels, default is from `pix_width`
+    :returns:           (width, height)
+
+    .. versionadded:: 9.6
+    """
+
+    width = properties['nx'] * abs(properties['dx'])
+    height = properties['ny'] * abs(properties.get('dy', properties['dx']))
+    if not pix_width and not pix_height:
+        pix_width = properties['nx']
+    if not pix_height:
+        pix_height = pix_width * height / width
+    elif not pix_width:
+        pix_width = pix_height * width / height
+    return max(1, int(round(pix_width))), max(1, int(round(pix_height)))
+
+
+def resize(data, properties, width, height):
+    """
+    Resize grid data to an image size.
+
+    :param data:        numpy array shaped (ny, nx) of grid values, dummies `numpy.nan`, int32 colour grid values,
+                        or RGBA colours shaped (ny, nx, 4)
+    :param properties:  grid properties dictionary
+    :param width:       image width in pixels
+    :param height:      image height in pixels
+    :returns:           (data, properties) resized to (height, width). Grid values are reduced by the mean of
+                        the grid points to no less than twice the image size, then bi-linearly interpolated at
+                        the image pixel centres. Colours are resampled by the nearest point.
+
+    .. versionadded:: 9.6
+    """
+
+    data = np.asarray(data)
+    ny, nx = data.shape[:2]
+    is_color = (data.ndim == 3) or properties.get('is_color', False)
+    if not is_color:
+        levels = 0
+        while (nx // 2 ** (levels + 1) >= 2 * width) and (ny // 2 ** (levels + 1) >= 2 * height):
+            levels += 1
+        if levels:
+            data = gxgrdovr.reduce(data, levels, gxgrdovr.METHOD_MEAN)[-1]
+            properties = gxgrdovr.properties(properties, levels, gxgrdovr.METHOD_MEAN)
+            ny, nx = data.shape
+    if (nx, ny) == (width, height):
+        return data, properties
+
+    # image pixel centres in grid indexes
+    fx = (np.arange(width) + 0.5) * nx / width - 0.5
+    fy = (np.arange(height) + 0.5) * ny / height - 0.5
+    if is_color:
+        ix = np.clip(np.rint(fx), 0, nx - 1).astype(np.int64)
+        iy = np.clip(np.rint(fy), 0, ny - 1).astype(np.int64)
+        values = data[iy][:, ix]
+    else:
+        iy, ix = np.meshgrid(fy, fx, indexing='ij')
+
+        def gather(jx, jy):
+            return data[jy, jx]
+
+        values = gxgrdsmp.interpolate(gather, ix, iy, nx, ny, method=gxgrdsmp.SAMPLE_LINEAR, threads=1)
+
+    p = dict(properties)
+    p['nx'] = width
+    p['ny'] = height
+    p['x0'], p['y0'] = gxgrdsmp.xy_from_index(properties, fx[0], fy[0])
+    p['dx'] = properties['dx'] * nx / width
+    p['dy'] = properties['dy'] * ny / height
+    return values, p
+
+
+def thumbnail(grid_file, image_file=None, pix_width=256, pix_height=None, **kwargs):
+    """
+    Render a GRD grid file as a PNG image from the smallest overview that meets the image size.
+
+    :param grid_file:   GRD grid file name
+    :param image_file:  PNG file name, default is the grid file name with a '.png' extension
+    :param pix_width:   image width in pixels, default 256
+    :param pix_height:  image height in pixels, default keeps the grid aspect ratio
+    :param kwargs:      rendering options passed to `render`, such as `color_map`, `method` and `shade`
+    :returns:           PNG file name
+
+    The grid or overview is reduced to the image size by the mean of the grid points, and colour grids
+    by the nearest point. Stretches use the data range of the overview.
+
+    .. code::
+
+        import geosoft.gxpy.grid_render as gxrndr
+
+        gxrndr.thumbnail('mag.grd', 'mag.png', pix_width=200, shade=True,
+                         azimuths=gxrndr.MULTIDIRECTIONAL, method=gxrndr.STRETCH_EQUALIZE)
+
+    .. versionadded:: 9.6
+    """
+
+    file_name = gxgrdovr._undecorated(grid_file)
+    hd = gxgrdgrd.read_header(file_name)
+    width, height = image_size(gxgrdgrd.properties(hd), pix_width, pix_height)
+    source = gxgrdovr._undecorated(gxgrdovr.select(file_name, width, height))
+    if hd['is_color']:
+        data, properties = gxgrdgrd.read(source, dtype=np.int32)
+        data = color_rgba(data)
+    else:
+        data, properties = gxgrdgrd.read(source, dtype=np.float64)
+    data, properties = resize(data, properties, width, height)
+
+    if image_file is None:
+        image_file = os.path.splitext(file_name)[0] + '.png'
+    return write_png(image_file, render(data, properties, **kwargs))
+
+
+def thumbnails(grid_files, folder=None, pix_width=256, pix_height=None, threads=None, **kwargs):
+    """
+    Render GRD grid files as PNG images in parallel, see `thumbnail`.
+
+    :param grid_files:  list of GRD grid file names
+    :param folder:      folder for the images, default is the folder of each grid
+    :param pix_width:   image width in pixels, default 256
+    :param pix_height:  image height in pixels, default keeps the grid aspect ratio
+    :param threads:     maximum number of threads, default is the number of processors
+    :param kwargs:      rendering options passed to `render`
+    :returns:           list of PNG file names, in the order of `grid_files`
+
+    .. versionadded:: 9.6
+    """
+
+    def one(grid_file):
+        image_file = None
+        if folder is not None:
+            name = os.path.basename(gxgrdovr._undecorated(grid_file))
+            image_file = os.path.join(folder, os.path.splitext(name)[0] + '.png')
+        return thumbnail(grid_file, image_file, pix_width=pix_width, pix_height=pix_height, **kwargs)
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    if threads <= 1 or len(grid_files) <= 1:
+        return [one(g) for g in grid_files]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(one, grid_files))
@@ -0,0 +1,251 @@
+"""
+Vectorized sampling of grid values at point locations.
+
+Points are sampled by nearest-point, bi-linear or bi-cubic interpolation between grid points, working in
+chunks of points that are spread over threads for large point arrays. This module does not require the
+Geosoft runtime: `sample` works on a numpy array of grid values and a grid properties dictionary, and
+`interpolate` works through any function that returns grid values at grid indexes, such as
+`geosoft.gxpy.grid.Tile_cache.values`.
+
+:Constants:
+    :SAMPLE_NEAREST:    0 value of the nearest grid point
+    :SAMPLE_LINEAR:     1 bi-linear interpolation between the 4 surrounding grid points
+    :SAMPLE_CUBIC:      2 bi-cubic (Catmull-Rom) interpolation of the 16 surrounding grid points
+
+Where an interpolation needs a dummy grid point the next simpler method is used, so that data is
+returned up to the edge of valid grid data. Points more than half a cell outside the grid are dummy.
+
+.. seealso:: `geosoft.gxpy.grid_utility.sample`, `geosoft.gxpy.grid.Grid.get_value`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_sample.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+SAMPLE_NEAREST = 0
+SAMPLE_LINEAR = 1
+SAMPLE_CUBIC = 2
+
+# points per chunk, chunks are processed in parallel
+CHUNK_SIZE = 1000000
+
+# color grid dummy, same as geosoft.gxapi.iDUMMY
+_COLOR_DUMMY = -2147483647
+
+
+class SampleException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_sample`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def index_from_xy(properties, x, y):
+    """
+    Fractional grid indexes of locations on the grid plane.
+
+    :param properties:  grid properties dictionary, uses 'x0', 'y0', 'dx', 'dy' and 'rot'
+    :param x:           x locations, float or numpy array
+    :param y:           y locations, float or numpy array
+    :returns:           (ix, iy) fractional grid indexes
+
+    .. versionadded:: 9.6
+    """
+
+    x = np.asarray(x, dtype=np.float64) - properties['x0']
+    y = np.asarray(y, dtype=np.float64) - properties['y0']
+    rot = properties.get('rot', 0.)
+    if rot:
+        cos = math.cos(math.radians(rot))
+        sin = math.sin(math.radians(rot))
+        x, y = x * cos - y * sin, x * sin + y * cos
+    return x / properties['dx'], y / properties['dy']
+
+
+def xy_from_index(properties, ix, iy):
+    """
+    Locations on the grid plane of fractional grid indexes, the inverse of `index_from_xy`.
+
+    :param properties:  grid properties dictionary, uses 'x0', 'y0', 'dx', 'dy' and 'rot'
+    :param ix:          x grid indexes, float or numpy array
+    :param iy:          y grid indexes, float or numpy array
+    :returns:           (x, y) locations
+
+    .. versionadded:: 9.6
+    """
+
+    u = np.asarray(ix, dtype=np.float64) * properties['dx']
+    v = np.asarray(iy, dtype=np.float64) * properties['dy']
+    rot = properties.get('rot', 0.)
+    if rot:
+        cos = math.cos(math.radians(rot))
+        sin = math.sin(math.radians(rot))
+        u, v = u * cos + v * sin, -u * sin + v * cos
+    return u + properties['x0'], v + properties['y0']
+
+
+def _cubic_weights(t):
+    """ Catmull-Rom weights for the 4 points at offsets -1, 0, 1, 2"""
+    t2 = t * t
+    t3 = t2 * t
+    return (-0.5 * t3 + t2 - 0.5 * t,
+            1.5 * t3 - 2.5 * t2 + 1.,
+            -1.5 * t3 + 2. * t2 + 0.5 * t,
+            0.5 * t3 - 0.5 * t2)
+
+
+def _interpolate(gather, fx, fy, nx, ny, method, is_color):
+
+    inside = (fx >= -0.5) & (fx <= nx - 0.5) & (fy >= -0.5) & (fy <= ny - 0.5)
+    if is_color:
+        values = np.full(fx.shape, _COLOR_DUMMY, dtype=np.int32)
+    else:
+        values = np.full(fx.shape, np.nan)
+    if not inside.any():
+        return values
+
+    fx = np.clip(fx[inside], 0., nx - 1)
+    fy = np.clip(fy[inside], 0., ny - 1)
+    v = gather(np.rint(fx).astype(np.int64), np.rint(fy).astype(np.int64))
+    if is_color or method == SAMPLE_NEAREST:
+        values[inside] = v
+        return values
+
+    ix = np.floor(fx).astype(np.int64)
+    iy = np.floor(fy).astype(np.int64)
+    tx = fx - ix
+    ty = fy - iy
+
+    def col(i):
+        return np.clip(ix + i, 0, nx - 1)
+
+    def row(i):
+        return np.clip(iy + i, 0, ny - 1)
+
+    vi = ((gather(col(0), row(0)) * (1. - tx) + gather(col(1), row(0)) * tx) * (1. - ty) +
+          (gather(col(0), row(1)) * (1. - tx) + gather(col(1), row(1)) * tx) * ty)
+    dummy = np.isnan(vi)
+    vi[dummy] = v[dummy]
+    v = vi
+
+    if method == SAMPLE_CUBIC:
+        wx = _cubic_weights(tx)
+        wy = _cubic_weights(ty)
+        vc = np.zeros(fx.shape)
+        for j in range(4):
+            r = row(j - 1)
+            vr = gather(col(-1), r) * wx[0]
+            for i in range(1, 4):
+                vr += gather(col(i - 1), r) * wx[i]
+            vc += vr * wy[j]
+        dummy = np.isnan(vc)
+        vc[dummy] = v[dummy]
+        v = vc
+
+    values[inside] = v
+    return values
+
+
+def interpolate(gather, fx, fy, nx, ny, method=SAMPLE_LINEAR, is_color=False, chunk_size=CHUNK_SIZE,
+                threads=None):
+    """
+    Interpolate grid values at fractional grid indexes.
+
+    :param gather:      function `gather(ix, iy)` that returns grid values as a float numpy array (dummies
+                        `numpy.nan`) for numpy int arrays of valid grid indexes, or int color values for
+                        color grids. The function must be thread-safe if `threads` is not 1.
+    :param fx:          fractional x grid indexes, numpy array
+    :param fy:          fractional y grid indexes, numpy array
+    :param nx:          grid x dimension
+    :param ny:          grid y dimension
+    :param method:      `SAMPLE_NEAREST`, `SAMPLE_LINEAR` (default) or `SAMPLE_CUBIC`
+    :param is_color:    `True` for a color grid, which is always sampled by nearest point
+    :param chunk_size:  number of points processed together, default `CHUNK_SIZE`
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           numpy array of values shaped like `fx`. Scalar dummies are `numpy.nan`.
+
+    .. versionadded:: 9.6
+    """
+
+    if method not in (SAMPLE_NEAREST, SAMPLE_LINEAR, SAMPLE_CUBIC):
+        raise SampleException(_t('Unknown sample method {}').format(method))
+
+    fx = np.asarray(fx, dtype=np.float64)
+    fy = np.asarray(fy, dtype=np.float64)
+    shape = fx.shape
+    fx = fx.ravel()
+    fy = fy.ravel()
+    n = fx.size
+    chunk_size = max(1, int(chunk_size))
+    if threads is None:
+        threads = os.cpu_count() or 1
+
+    values = np.empty(n, dtype=np.int32 if is_color else np.float64)
+
+    def chunk(i):
+        values[i: i + chunk_size] = _interpolate(gather, fx[i: i + chunk_size], fy[i: i + chunk_size],
+                                                 nx, ny, method, is_color)
+
+    if (threads <= 1) or (n <= chunk_size):
+        for i in range(0, n, chunk_size):
+            chunk(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for _ in pool.map(chunk, range(0, n, chunk_size)):
+                pass
+
+    return values.reshape(shape)
+
+
+def sample(data, properties, x, y, method=SAMPLE_LINEAR, chunk_size=CHUNK_SIZE, threads=None):
+    """
+    Sample a numpy grid array at locations on the grid plane.
+
+    :param data:        numpy array shaped (ny, nx) of grid values with dummies as `numpy.nan`, or int
+                        color values for a color grid, for example from `geosoft.gxpy.grid.Grid.np` or
+                        `geosoft.gxpy.grid_grd.read`.
+    :param properties:  grid properties dictionary (see `geosoft.gxpy.grid.Grid.properties`),
+                        uses 'x0', 'y0', 'dx', 'dy', 'rot' and 'is_color'
+    :param x:           x locations, numpy array
+    :param y:           y locations, numpy array
+    :param method:      `SAMPLE_NEAREST`, `SAMPLE_LINEAR` (default) or `SAMPLE_CUBIC`
+    :param chunk_size:  number of points processed together, default `CHUNK_SIZE`
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           numpy array of sampled values shaped like `x`
+
+    .. versionadded:: 9.6
+    """
+
+    if data.ndim != 2:
+        raise SampleException(_t('Expected a 2D array, found shape {}').format(data.shape))
+    is_color = bool(properties.get('is_color', False))
+
+    if is_color:
+        def gather(ix, iy):
+            return data[iy, ix]
+    else:
+        def gather(ix, iy):
+            return data[iy, ix].astype(np.float64)
+
+    fx, fy = index_from_xy(properties, x, y)
+    ny, nx = data.shape
+    return interpolate(gather, fx, fy, nx, ny, method=method, is_color=is_color,
+                       chunk_size=chunk_size, threads=threads)
@@ -0,0 +1,466 @@
+"""
+Streaming statistics of grid and voxel data.
+
+Data is read in blocks, such as the row blocks of `geosoft.gxpy.grid.Grid.iter_blocks` or the plane blocks of
+`geosoft.gxpy.vox.Vox.iter_blocks`, and each block is reduced on a thread pool to a `Moments` accumulator.
+Accumulators are merged exactly (Chan/Pebay pairwise updates), so the result does not depend on the number of
+blocks or threads. Histograms use fixed bins on the data range, and percentiles are exact: histogram passes
+narrow each requested rank to a small interval, and the values in the interval are then sorted. Memory is
+bounded by the block size and `COLLECT_LIMIT`, not by the size of the data. This module does not require
+the Geosoft runtime.
+
+:Constants:
+    :HISTOGRAM_BINS:    4096, bins used to locate percentiles
+    :COLLECT_LIMIT:     1000000, maximum number of values sorted to resolve a percentile
+    :CHUNK_SIZE:        1000000, values per block when the data is a numpy array
+
+.. seealso:: `geosoft.gxpy.grid.Grid.statistics`, `geosoft.gxpy.vox.Vox.statistics`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_statistics.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+HISTOGRAM_BINS = 4096
+COLLECT_LIMIT = 1000000
+CHUNK_SIZE = 1000000
+
+
+class StatisticsException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_statistics`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _valid(data):
+    data = np.asarray(data, dtype=np.float64).ravel()
+    valid = ~np.isnan(data)
+    if valid.all():
+        return data, 0
+    return data[valid], data.size - np.count_nonzero(valid)
+
+
+class Moments:
+    """
+    Mergeable accumulator of count, extremes and central moments to the fourth order.
+
+    Add numpy arrays of data with `add`, combine accumulators with `merge`, and get the statistics
+    dictionary from `statistics`. Data values that are `numpy.nan` are counted as dummies.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, data=None):
+        self.n = 0
+        self.num_dummy = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.m3 = 0.
+        self.m4 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self.sum_log = 0.
+        self.num_positive = 0
+        if data is not None:
+            self.add(data)
+
+    def add(self, data):
+        """
+        Add data to the accumulator.
+
+        :param data:    numpy array, dummies are `numpy.nan`
+        """
+
+        x, num_dummy = _valid(data)
+        other = Moments()
+        other.num_dummy = num_dummy
+        if x.size:
+            other.n = x.size
+            other.mean = float(x.mean())
+            d = x - other.mean
+            d2 = d * d
+            other.m2 = float(d2.sum())
+            other.m3 = float((d2 * d).sum())
+            other.m4 = float((d2 * d2).sum())
+            other.min = float(x.min())
+            other.max = float(x.max())
+            positive = x[x > 0.]
+            other.num_positive = positive.size
+            if positive.size:
+                other.sum_log = float(np.log(positive).sum())
+        self.merge(other)
+
+    def merge(self, other):
+        """
+        Merge another accumulator into this accumulator.
+
+        :param other:   `Moments` instance
+        """
+
+        self.num_dummy += other.num_dummy
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean, other.m2, other.m3, other.m4
+            self.min, self.max = other.min, other.max
+            self.sum_log, self.num_positive = other.sum_log, other.num_positive
+            return
+
+        na = float(self.n)
+        nb = float(other.n)
+        n = na + nb
+        delta = other.mean - self.mean
+        d_n = delta / n
+        d_n2 = d_n * d_n
+        t = delta * d_n * na * nb
+
+        m4 = (self.m4 + other.m4 + t * d_n2 * (na * na - na * nb + nb * nb) +
+              6. * d_n2 * (na * na * other.m2 + nb * nb * self.m2) + 4. * d_n * (na * other.m3 - nb * self.m3))
+        m3 = self.m3 + other.m3 + t * d_n * (na - nb) + 3. * d_n * (na * other.m2 - nb * self.m2)
+        self.m2 += other.m2 + t
+        self.m3 = m3
+        self.m4 = m4
+        self.mean += d_n * nb
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum_log += other.sum_log
+        self.num_positive += other.num_positive
+
+    def statistics(self):
+        """
+        Statistics dictionary, with the keys of `geosoft.gxpy.grid.Grid.statistics`. Values that cannot be
+        calculated are `None`. The variance is the sample variance (n - 1), and the geometric mean is `None`
+        unless all values are positive.
+        """
+
+        n = self.n
+        st = {'min': None,
+              'max': None,
+              'mean': None,
+              'geometric_mean': None,
+              'variance': None,
+              'sd': None,
+              'skew': None,
+              'kurtosis': None,
+              'sum': None,
+              'sum_power_2': None,
+              'sum_power_3': None,
+              'sum_power_4': None,
+              'num_data': n,
+              'num_dummy': self.num_dummy}
+        if n == 0:
+            return st
+
+        mean = self.mean
+        st['min'] = self.min
+        st['max'] = self.max
+        st['mean'] = mean
+        st['sum'] = mean * n
+        st['sum_power_2'] = self.m2 + n * mean ** 2
+        st['sum_power_3'] = self.m3 + 3. * mean * self.m2 + n * mean ** 3
+        st['sum_power_4'] = self.m4 + 4. * mean * self.m3 + 6. * mean ** 2 * self.m2 + n * mean ** 4
+        if self.num_positive == n:
+            st['geometric_mean'] = math.exp(self.sum_log / n)
+        if n > 1:
+            variance = self.m2 / (n - 1)
+            st['variance'] = variance
+            st['sd'] = math.sqrt(variance)
+            if variance > 0.:
+                st['skew'] = self.m3 / (n * variance ** 1.5)
+                st['kurtosis'] = self.m4 / (n * variance * variance) - 3.
+        return st
+
+
+class Histogram:
+    """
+    Mergeable histogram with fixed bins, as `numpy.histogram` with a `range`.
+
+    :param vmin:    lower edge of the first bin
+    :param vmax:    upper edge of the last bin, which includes values equal to `vmax`
+    :param bins:    number of bins, default `HISTOGRAM_BINS`
+
+    Values outside the range are counted in `below` and `above`.
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, vmin, vmax, bins=HISTOGRAM_BINS):
+        self.range = (float(vmin), float(vmax))
+        self.bins = max(1, int(bins))
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def edges(self):
+        """bin edges, `bins` + 1 values"""
+        return np.histogram_bin_edges(self.range, self.bins, range=self.range)
+
+    def add(self, data):
+        """
+        Add data to the histogram.
+
+        :param data:    numpy array, `numpy.nan` values are ignored
+        """
+
+        x, _ = _valid(data)
+        lo, hi = self.range
+        below = x < lo
+        above = x > hi
+        self.below += np.count_nonzero(below)
+        self.above += np.count_nonzero(above)
+        x = x[~(below | above)]
+        if x.size:
+            self.counts += np.histogram(x, self.bins, range=self.range)[0]
+            self.min = min(self.min, float(x.min()))
+            self.max = max(self.max, float(x.max()))
+
+    def merge(self, other):
+        """
+        Merge a histogram with the same range and bins into this histogram.
+
+        :param other:   `Histogram` instance
+        """
+
+        if (other.range != self.range) or (other.bins != self.bins):
+            raise StatisticsException(_t('Histograms must have the same range and bins to merge.'))
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class _Collect:
+    """ values within a range, and the count of values below the range"""
+
+    def __init__(self, vmin, vmax):
+        self.range = (vmin, vmax)
+        self.below = 0
+        self.values = []
+
+    def add(self, data):
+        x, _ = _valid(data)
+        lo, hi = self.range
+        self.below += np.count_nonzero(x < lo)
+        self.values.append(x[(x >= lo) & (x <= hi)])
+
+    def merge(self, other):
+        self.below += other.below
+        self.values.extend(other.values)
+
+
+def _blocks(data):
+    """ callable that returns an iterator of data blocks"""
+
+    if callable(data):
+        return data
+    data = np.asarray(data).ravel()
+
+    def blocks():
+        for i in range(0, data.size, CHUNK_SIZE):
+            yield data[i: i + CHUNK_SIZE]
+
+    return blocks
+
+
+def _reduce(blocks, factories, threads):
+    """
+    Reduce all data blocks to accumulators. `factories` is a list of functions that return new accumulators,
+    the merged accumulators are returned in the same order.
+    """
+
+    def accumulate(data):
+        result = [f() for f in factories]
+        for acc in result:
+            acc.add(data)
+        return result
+
+    def merge(result):
+        for acc, r in zip(total, result):
+            acc.merge(r)
+
+    total = [f() for f in factories]
+    if threads <= 1:
+        for data in blocks():
+            merge(accumulate(data))
+        return total
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for data in blocks():
+            pending.append(pool.submit(accumulate, data))
+            if len(pending) > threads:
+                merge(pending.popleft().result())
+        while pending:
+            merge(pending.popleft().result())
+    return total
+
+
+def _ranked_values(blocks, ranks, n, vmin, vmax, threads, bins=HISTOGRAM_BINS, collect_limit=COLLECT_LIMIT):
+    """ exact values of the data at 0-based ranks of the sorted data, `n` values between `vmin` and `vmax`"""
+
+    values = {}
+
+    # rank: (lo, hi, collect), collect the values in the interval or histogram the interval
+    pending = {r: (vmin, vmax, n <= collect_limit) for r in ranks}
+    while pending:
+
+        intervals = {}
+        for r, interval in pending.items():
+            intervals.setdefault(interval, []).append(r)
+        intervals = list(intervals.items())
+
+        factories = []
+        for (lo, hi, collect), _ in intervals:
+            if collect:
+                factories.append(lambda lo=lo, hi=hi: _Collect(lo, hi))
+            else:
+                factories.append(lambda lo=lo, hi=hi: Histogram(lo, hi, bins))
+        accumulators = _reduce(blocks, factories, threads)
+
+        pending = {}
+        for ((lo, hi, collect), rs), acc in zip(intervals, accumulators):
+
+            if collect:
+                inside = np.sort(np.concatenate(acc.values)) if acc.values else np.empty(0)
+                for r in rs:
+                    i = r - acc.below
+                    if not (0 <= i < inside.size):
+                        raise StatisticsException(_t('Data changed while calculating percentiles.'))
+                    values[r] = float(inside[i])
+                continue
+
+            if acc.min == acc.max:
+                for r in rs:
+                    values[r] = acc.min
+                continue
+
+            cumulative = np.cumsum(acc.counts)
+            edges = acc.edges
+            for r in rs:
+                k = int(np.searchsorted(cumulative, r - acc.below, side='right'))
+                if k >= acc.bins:
+                    raise StatisticsException(_t('Data changed while calculating percentiles.'))
+
+                # widen by a bin on each side so that rounding at bin edges cannot exclude the value
+                k0 = max(k - 1, 0)
+                k1 = min(k + 2, acc.bins)
+                sub_lo = float(edges[k0])
+                sub_hi = float(edges[k1])
+                count = int(acc.counts[k0: k1].sum())
+                collect = (count <= collect_limit) or ((sub_lo, sub_hi) == (lo, hi))
+                pending[r] = (sub_lo, sub_hi, collect)
+
+    return values
+
+
+def percentile_ranks(n, percentiles):
+    """
+    Ranks in the sorted data and interpolation weights of percentiles, as `numpy.percentile` with the
+    default 'linear' method.
+
+    :param n:           number of data values
+    :param percentiles: percentiles, 0 to 100
+    :returns:           list of (lower rank, upper rank, fraction) for each percentile
+
+    .. versionadded:: 9.6
+    """
+
+    ranks = []
+    for q in percentiles:
+        if not (0. <= q <= 100.):
+            raise StatisticsException(_t('Percentile {} is not in the range 0 to 100.').format(q))
+        position = q / 100. * (n - 1)
+        lower = int(math.floor(position))
+        upper = min(lower + 1, n - 1)
+        ranks.append((lower, upper, position - lower))
+    return ranks
+
+
+def statistics(data, percentiles=None, bins=None, threads=None):
+    """
+    Statistics of data that is read in blocks.
+
+    :param data:        numpy array of data, or a function that returns a new iterator of numpy array blocks
+                        of the data each time it is called. Dummies are `numpy.nan`. Calculating percentiles
+                        and histograms requires more than one pass through the data.
+    :param percentiles: list of percentiles (0 to 100) to calculate exactly, default none.
+    :param bins:        number of histogram bins on the data range, default no histogram.
+    :param threads:     maximum number of threads, default is the number of processors
+    :returns:           statistics dictionary with the keys of `Moments.statistics`, and:
+
+        =============== ==================================================================
+        'median'        median, if `percentiles` are requested
+        'percentiles'   dictionary of values by requested percentile, if requested.
+                        Values agree with `numpy.nanpercentile`.
+        'histogram'     (counts, edges) if `bins` is requested, as `numpy.histogram`
+                        with the data range.
+        =============== ==================================================================
+
+    .. versionadded:: 9.6
+    """
+
+    blocks = _blocks(data)
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = max(1, int(threads))
+
+    moments = _reduce(blocks, [Moments], threads)[0]
+    st = moments.statistics()
+    n = moments.n
+
+    if bins:
+        if n:
+            hist = _reduce(blocks, [lambda: Histogram(moments.min, moments.max, bins)], threads)[0]
+            st['histogram'] = (hist.counts, hist.edges)
+        else:
+            st['histogram'] = (np.zeros(int(bins), dtype=np.int64), np.linspace(0., 1., int(bins) + 1))
+
+    if percentiles is not None:
+        percentiles = [float(q) for q in percentiles]
+        if n == 0:
+            st['median'] = None
+            st['percentiles'] = {q: None for q in percentiles}
+        else:
+            ranks = percentile_ranks(n, percentiles + [50.])
+            ranked = set()
+            for lower, upper, _ in ranks:
+                ranked.add(lower)
+                ranked.add(upper)
+            values = _ranked_values(blocks, sorted(ranked), n, moments.min, moments.max, threads)
+
+            def value(rank):
+                lower, upper, f = rank
+                v = values[lower]
+                if f > 0.:
+                    v += (values[upper] - v) * f
+                return v
+
+            st['median'] = value(ranks[-1])
+            st['percentiles'] = {q: value(r) for q, r in zip(percentiles, ranks[:-1])}
+
+    return st
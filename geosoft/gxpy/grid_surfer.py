@@ -0,0 +1,240 @@
+"""
+Pure-Python reading of Golden Software Surfer binary grids.
+
+Surfer 6 (`DSBB`) and Surfer 7 (`DSRB`) binary grids are read with numpy, without calling the Geosoft
+runtime. Grid data is memory-mapped from the file. Arrays are returned shaped (ny, nx) with the first
+row at the grid origin, which is the same orientation as `geosoft.gxpy.grid.Grid.np`.
+
+:Constants:
+    :SURFER_BLANK:  1.70141e38, Surfer blank value
+
+.. seealso:: `geosoft.gxpy.grid`, `geosoft.gxpy.grid_grd`, `geosoft.gxpy.grid_ers`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_surfer.py>`_
+
+.. versionadded:: 9.6
+"""
+import math
+import struct
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+SURFER_BLANK = 1.70141e38
+
+_SURFER6 = b'DSBB'
+_SURFER7 = b'DSRB'
+
+
+class SurferException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_surfer`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _surfer_file(file_name):
+    file_name = str(file_name)
+    if file_name.endswith(')') and '(' in file_name:
+        file_name = file_name[:file_name.rfind('(')]
+    return file_name
+
+
+def _blanks(stored, blank):
+    """ True where stored values are the blank value, or above the Surfer blank"""
+
+    stored = stored.astype(np.float64)
+    is_blank = np.abs(stored - blank) <= abs(blank) * 1.0e-6
+    if blank == SURFER_BLANK:
+        is_blank |= stored >= SURFER_BLANK * (1.0 - 1.0e-6)
+    return is_blank
+
+
+def read_header(file_name):
+    """
+    Read the header of a Surfer 6 or Surfer 7 binary grid.
+
+    :param file_name:   grid file name
+    :returns:           header dictionary:
+
+        ============== ================================================================
+        'file_name'    file name
+        'version'      6 or 7
+        'offset'       byte offset to the grid data
+        'dtype'        numpy dtype of the data
+        'nx', 'ny'     grid dimensions
+        'x0', 'y0'     location of the first grid point
+        'dx', 'dy'     grid point separation
+        'rot'          rotation in degrees azimuth, clockwise about the first grid point. Surfer 7 stores
+                       the rotation counter-clockwise. Surfer 6 grids are not rotated.
+        'zmin', 'zmax' data range
+        'blank'        blank value
+        ============== ================================================================
+
+    .. versionadded:: 9.6
+    """
+
+    file_name = _surfer_file(file_name)
+    with open(file_name, 'rb') as f:
+        tag = f.read(4)
+
+        if tag == _SURFER6:
+            nx, ny = struct.unpack('<2h', f.read(4))
+            xlo, xhi, ylo, yhi, zlo, zhi = struct.unpack('<6d', f.read(48))
+            return {'file_name': file_name,
+                    'version': 6,
+                    'offset': 56,
+                    'dtype': np.dtype('<f4'),
+                    'nx': nx,
+                    'ny': ny,
+                    'x0': xlo,
+                    'y0': ylo,
+                    'dx': (xhi - xlo) / (nx - 1) if nx > 1 else 1.0,
+                    'dy': (yhi - ylo) / (ny - 1) if ny > 1 else 1.0,
+                    'rot': 0.0,
+                    'zmin': zlo,
+                    'zmax': zhi,
+                    'blank': SURFER_BLANK}
+
+        if tag != _SURFER7:
+            raise SurferException(_t('"{}" is not a Surfer binary grid.').format(file_name))
+
+        f.seek(struct.unpack('<i', f.read(4))[0], 1)
+        hd = None
+        while True:
+            section = f.read(8)
+            if len(section) < 8:
+                break
+            tag, size = struct.unpack('<4sI', section)
+            if tag == b'GRID':
+                ny, nx, xll, yll, dx, dy, zmin, zmax, rot, blank = struct.unpack('<2i8d', f.read(72))
+                f.seek(size - 72, 1)
+                hd = {'file_name': file_name,
+                      'version': 7,
+                      'dtype': np.dtype('<f8'),
+                      'nx': nx,
+                      'ny': ny,
+                      'x0': xll,
+                      'y0': yll,
+                      'dx': dx,
+                      'dy': dy,
+                      'rot': -rot or 0.0,
+                      'zmin': zmin,
+                      'zmax': zmax,
+                      'blank': blank}
+            elif tag == b'DATA':
+                if hd is None:
+                    break
+                hd['offset'] = f.tell()
+                return hd
+            else:
+                f.seek(size, 1)
+
+    raise SurferException(_t('"{}" has no grid data.').format(file_name))
+
+
+def properties(file_name):
+    """
+    Grid properties dictionary, with the keys of `geosoft.gxpy.grid.Grid.properties`.
+
+    :param file_name:   grid file name, or a header dictionary returned from `read_header`
+    :returns:           properties dictionary. 'coordinate_system' is `None` as Surfer grids
+                        do not carry a coordinate system.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = file_name if isinstance(file_name, dict) else read_header(file_name)
+    return {'nx': hd['nx'],
+            'ny': hd['ny'],
+            'x0': hd['x0'],
+            'y0': hd['y0'],
+            'dx': hd['dx'],
+            'dy': hd['dy'],
+            'rot': hd['rot'],
+            'is_color': False,
+            'dtype': hd['dtype'].newbyteorder('='),
+            'gridtype': 'SRF',
+            'decoration': 'SRF;VER=V{}'.format(hd['version']),
+            'unit_of_measure': '',
+            'coordinate_system': None}
+
+
+def memmap(file_name):
+    """
+    Memory-map the data of a Surfer binary grid.
+
+    :param file_name:   grid file name
+    :returns:           (`numpy.memmap` shaped (ny, nx), header). Values are as stored, including
+                        blank values.
+
+    .. versionadded:: 9.6
+    """
+
+    hd = read_header(file_name)
+    mm = np.memmap(hd['file_name'], dtype=hd['dtype'], mode='r', offset=hd['offset'],
+                   shape=(hd['ny'], hd['nx']))
+    return mm, hd
+
+
+def read(file_name, window=None, dtype=None):
+    """
+    Read Surfer grid data.
+
+    :param file_name:   grid file name
+    :param window:      (ix0, iy0, nx, ny) window of grid indexes to read, default reads the whole grid
+    :param dtype:       numpy data type wanted, default is the stored type (float32 for Surfer 6,
+                        float64 for Surfer 7)
+    :returns:           (numpy array shaped (ny, nx), properties dictionary). Blanks are `numpy.nan`.
+
+    .. versionadded:: 9.6
+    """
+
+    mm, hd = memmap(file_name)
+    props = properties(hd)
+
+    if window is None:
+        window = (0, 0, hd['nx'], hd['ny'])
+    ix0, iy0, nx, ny = window
+    if (ix0 < 0) or (iy0 < 0) or (nx <= 0) or (ny <= 0) or (ix0 + nx > hd['nx']) or (iy0 + ny > hd['ny']):
+        raise SurferException(_t('Window {} out of bounds ({}, {})').format(window, hd['nx'], hd['ny']))
+
+    if dtype is None:
+        dtype = props['dtype']
+    dtype = np.dtype(dtype)
+
+    stored = mm[iy0: iy0 + ny, ix0: ix0 + nx]
+    data = stored.astype(dtype)
+    blank = _blanks(stored, hd['blank'])
+    if blank.any():
+        if not np.issubdtype(dtype, np.floating):
+            raise SurferException(_t('Grid has blanks, which require a float dtype.'))
+        data[blank] = np.nan
+    del mm
+
+    props['nx'] = nx
+    props['ny'] = ny
+    if ix0 or iy0:
+        ox = ix0 * props['dx']
+        oy = iy0 * props['dy']
+        if props['rot'] != 0.:
+            cos = math.cos(math.radians(props['rot']))
+            sin = math.sin(math.radians(props['rot']))
+            ox, oy = ox * cos + oy * sin, -ox * sin + oy * cos
+        props['x0'] += ox
+        props['y0'] += oy
+    props['dtype'] = dtype
+
+    return data, props
@@ -12,20 +12,25 @@ Geosoft grid and image utilities.
 import os
 import numpy as np
 import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import geosoft
 import geosoft.gxapi as gxapi
 from . import gx as gx
-from . import vv as gxvv
 from . import grid as gxgrd
-from . import map as gxmap
-from . import view as gxv
-from . import group as gxgrp
 from . import gdb as gxgdb
 from . import geometry as gxgeo
-from . import utility as gxu
 from . import geometry_utility as gxgeou
-from . import grid_fft as gxfft
+from . import grid_sample as gxgrdsmp
+from . import grid_blend as gxgrdblnd
+from . import grid_expression as gxexp
+from . import grid_fill as gxfill
+from . import grid_contour as gxcntr
+from . import grid_derivative as gxderiv
+from . import grid_warp as gxwarp
+from . import grid_statistics as gxgrdst
+from . import coordinate_system as gxcs
 
 __version__ = geosoft.__version__
 
@@ -42,15 +47,24 @@ BOOL_OVERLAP_GRID2 = gxapi.IMU_BOOL_OLAP_2
 
 TREND_EDGE = gxapi.IMU_TREND_EDGE
 TREND_ALL = gxapi.IMU_TREND_ALL
-DERIVATIVE_X = 0
-DERIVATIVE_Y = 1
-DERIVATIVE_Z = 2
-DERIVATIVE_XY = 3
-DERIVATIVE_XYZ = 4
-TILT_ANGLE = 5
+DERIVATIVE_X = gxderiv.DERIVATIVE_X
+DERIVATIVE_Y = gxderiv.DERIVATIVE_Y
+DERIVATIVE_Z = gxderiv.DERIVATIVE_Z
+DERIVATIVE_XY = gxderiv.DERIVATIVE_XY
+DERIVATIVE_XYZ = gxderiv.DERIVATIVE_XYZ
+TILT_ANGLE = gxderiv.TILT_ANGLE
 RETURN_PPOINT = 0
 RETURN_LIST_OF_PPOINT = 1
 RETURN_GDB = 2
+RETURN_ARRAY = 3
+SAMPLE_NEAREST = gxgrdsmp.SAMPLE_NEAREST
+SAMPLE_LINEAR = gxgrdsmp.SAMPLE_LINEAR
+SAMPLE_CUBIC = gxgrdsmp.SAMPLE_CUBIC
+SAMPLE_AVERAGE = gxwarp.METHOD_AVERAGE
+BLEND_LAST = gxgrdblnd.BLEND_LAST
+BLEND_MEAN = gxgrdblnd.BLEND_MEAN
+BLEND_FEATHER = gxgrdblnd.BLEND_FEATHER
+BLEND_MEDIAN = gxgrdblnd.BLEND_MEDIAN
 
 
 def _t(s):
@@ -108,6 +122,7 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
         DERIVATIVE_X               in the grid X direction
         DERIVATIVE_Y               in the grid Y direction
         DERIVATIVE_Z               in the grid Z direction
+        DERIVATIVE_XY              the horizontal gradient sqrt(dx**2 + dy**2)
         DERIVATIVE_XYZ             the total derivative sqrt(dx**2 + dy**2 + dz**2) (analytic signal)
         TILT_ANGLE                 tilt angle, atan2(dz, sqrt(dx**2 + dy**2)) (radians)
         ========================== ====================================================================
@@ -122,118 +137,93 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
         which is radians.
 
         Horizontal derivatives are calculated in the space domain based on the difference between
-        neighboring cell values, and the Z derivative can be calculated using an FFT or a 5x5 space-domain
+        neighboring cell values, and the Z derivative can be calculated using an FFT or a space-domain
         convolution.  An FFT calculation will generally produce a better result and it will be able to
         work with longer wavelengths, but at the expense of speed and edge effects in cases of very powerful
         anomalies along the edge of a grid.
 
+    To calculate several derivatives of the same grid use `derivatives`, which reads the grid once.
+
     .. versionadded 9.4
+
+    .. versionchanged 9.6 calculated in numpy by `geosoft.gxpy.grid_derivative`
     """
 
-    def vertical_derivative(g, dt):
+    return derivatives(grid, [derivative_type], file_names=[file_name], overwrite=overwrite, dtype=dtype,
+                       fft=fft)[0]
 
-        # float64 grids for grid_vd
-        if not isinstance(g, gxgrd.Grid):
-            g = gxgrd.Grid.open(g, dtype=np.float64, mode=gxgrd.FILE_READ)
-
-        if g.dtype != np.float64:
-            g = g.copy(g, gx.gx().temp_file('.grd(GRD)'), dtype=np.float32, overwrite=True)
-            g.delete_files()
-
-        if fft:
-            with gxfft.GridFFT(g) as gfft:
-                gfft.filter(filters=['DRVZ 1'])
-                dzg = gfft.result_grid(file_name=file_name, overwrite=overwrite)
-        else:
-            dzg = gxgrd.Grid.new(file_name=file_name, properties=g.properties(), overwrite=overwrite)
-            gxapi.GXIMU.grid_vd(g.gximg, dzg.gximg)
-        dzg.unit_of_measure = g.unit_of_measure + '/' + g.coordinate_system.unit_of_measure
-        return gxgrd.reopen(dzg, dtype=dt)
-
-    def tilt_angle(g, fn=None):
-        dx = derivative(g, DERIVATIVE_X)
-        dy = derivative(g, DERIVATIVE_Y)
-        dz = derivative(g, DERIVATIVE_Z, fft=fft)
-
-        result = expression((dx, dy, dz), 'atan2(g3,sqrt(g1**2+g2**2))',
-                            result_file_name=fn,
-                            overwrite=overwrite)
-        result.unit_of_measure = 'radians'
-        return gxgrd.reopen(result)
-
-    def horizontal_gradient(g):
-        dx = derivative(g, DERIVATIVE_X)
-        dy = derivative(g, DERIVATIVE_Y)
-        result = expression((dx, dy), 'sqrt(g1**2+g2**2)',
-                            result_file_name=file_name,
-                            overwrite=overwrite)
-        result.unit_of_measure = g.unit_of_measure + '/' + g.coordinate_system.unit_of_measure
-        return result
-
-    def total_gradient(g):
-        dx = derivative(g, DERIVATIVE_X)
-        dy = derivative(g, DERIVATIVE_Y)
-        dz = derivative(g, DERIVATIVE_Z, fft=fft)
-        result = expression((dx, dy, dz), 'sqrt(g1**2+g2**2+g3**2)',
-                            result_file_name=file_name,
-                            overwrite=overwrite)
-        result.unit_of_measure = g.unit_of_measure + '/' + g.coordinate_system.unit_of_measure
-        return result
-
-    if derivative_type == DERIVATIVE_Z:
-        return vertical_derivative(grid, dt=dtype)
-
-    # need float32 grids for grid_filt
-    if not isinstance(grid, gxgrd.Grid):
-        grid = gxgrd.Grid.open(grid, dtype=np.float32, mode=gxgrd.FILE_READ)
 
-    if dtype is None:
-        return_dtype = grid.dtype
-    else:
-        return_dtype = dtype
-
-    if grid.dtype != np.float32:
-        grid = grid.copy(grid, gx.gx().temp_file('.grd(GRD)'), dtype=np.float32, overwrite=True)
-        grid.delete_files()
-
-    if derivative_type == DERIVATIVE_XY:
-        rgrd = horizontal_gradient(grid)
-        if rgrd.dtype != return_dtype:
-            return gxgrd.reopen(rgrd, dtype=return_dtype)
-
-    if derivative_type == DERIVATIVE_XYZ:
-        rgrd = total_gradient(grid)
-        if rgrd.dtype != return_dtype:
-            return gxgrd.reopen(rgrd, dtype=return_dtype)
-
-    if derivative_type == TILT_ANGLE:
-        if file_name is None:
-            file_name = gx.gx().temp_file('.grd(GRD)')
-        rgrd = tilt_angle(grid, fn=file_name)
-        if rgrd.dtype != return_dtype:
-            return gxgrd.reopen(rgrd, dtype=return_dtype)
-
-    # dxy grid
-    if file_name is None:
-        file_name = gx.gx().temp_file('.grd(GRD)')
-    dxy = gxgrd.Grid.new(file_name=file_name, properties=grid.properties(), overwrite=overwrite)
+def derivatives(grid, derivative_types, file_names=None, overwrite=False, dtype=None, fft=True):
+    """
+    Return several derivatives of a grid, calculated together.
+
+    :param grid:                `geosoft.gxpy.grid.Grid` instance, or a file name
+    :param derivative_types:    list of derivatives to calculate, see `derivative`
+    :param file_names:          list of derivative file names matching `derivative_types`, `None` for
+                                temporary files
+    :param overwrite:           True to overwrite existing files
+    :param dtype:               dtype for the return grids, default is the grid dtype for float grids,
+                                otherwise float64.
+    :param fft:                 `False` calculate Z derivative with a space-domain convolution rather than an FFT.
+    :return:                    list of `geosoft.gxpy.grid.Grid` instances in the order of `derivative_types`
+
+    The derivatives are calculated in one pass over the grid that shares the horizontal and vertical
+    derivatives between the requested products (see `geosoft.gxpy.grid_derivative.derivative_tiles`).
+    The grid is read in tiles together with the overlap around each tile, and the products are written to
+    the result grids one tile at a time, so memory depends on the tile size, not on the size of the grid.
+    Grids larger than one tile are read twice for a space-domain vertical derivative, which needs the grid
+    mean before the first tile.
+
+    .. code::
+
+        import geosoft.gxpy.grid_utility as gxgrdu
+
+        dz, tilt = gxgrdu.derivatives('mag.grd', (gxgrdu.DERIVATIVE_Z, gxgrdu.TILT_ANGLE))
+
+    .. versionadded 9.6
+    """
 
-    # filter
-    if derivative_type == DERIVATIVE_X:
-        filter_vv = gxvv.GXvv([0., 0., 0., -0.5, 0., +0.5, 0., 0., 0.], dtype=np.float64)
-        mult = 1.0 / grid.dx
+    derivative_types = list(derivative_types)
+    if file_names is None:
+        file_names = [None] * len(derivative_types)
+    if len(file_names) != len(derivative_types):
+        raise GridUtilityException(_t('Expected {} file names').format(len(derivative_types)))
+
+    if isinstance(grid, gxgrd.Grid):
+        g = grid
     else:
-        filter_vv = gxvv.GXvv([0., 0.5, 0., 0., 0., 0., 0., -0.5, 0.], dtype=np.float64)
-        mult = 1.0 / grid.dy
-    gxapi.GXIMU.grid_filt(grid.gximg, dxy.gximg,
-                          1, mult,
-                          gxapi.IMU_FILT_DUMMY_NO,
-                          gxapi.IMU_FILT_HZDRV_NO,
-                          gxapi.IMU_FILT_FILE_NO,
-                          "",
-                          filter_vv.gxvv)
-    dxy.unit_of_measure = grid.unit_of_measure + '/' + grid.coordinate_system.unit_of_measure
-    return gxgrd.reopen(dxy, dtype=return_dtype)
+        g = gxgrd.Grid.open(grid)
+    try:
+        properties = g.properties()
+        uom = g.unit_of_measure + '/' + g.coordinate_system.unit_of_measure
+        if dtype is None:
+            dtype = _float_dtype(g)
+
+        def read(window):
+            return g.np(dtype=np.float64, window=window)
+
+        try:
+            tiles = gxderiv.derivative_tiles(read, g.dx, g.dy, derivative_types, shape=(g.ny, g.nx), fft=fft)
+        except gxderiv.DerivativeException as e:
+            raise GridUtilityException(str(e))
+
+        properties['dtype'] = dtype
+        grids = []
+        for file_name in file_names:
+            if (file_name is None) or (len(file_name.strip()) == 0):
+                file_name = gx.gx().temp_file('.grd(GRD)')
+            grids.append(gxgrd.Grid.new(file_name, dict(properties), overwrite=overwrite))
+        for (ix0, iy0, _, _), products in tiles:
+            for derivative_type, dg in zip(derivative_types, grids):
+                dg.write_rows(products[derivative_type].astype(dtype), ix0, iy0)
+    finally:
+        if g is not grid:
+            g.close()
+
+    for i, derivative_type in enumerate(derivative_types):
+        grids[i] = gxgrd.reopen(grids[i])
+        grids[i].unit_of_measure = 'radians' if derivative_type == TILT_ANGLE else uom
+    return grids
 
 
 def tilt_depth(grid, resolution=None, return_as=RETURN_PPOINT, gdb=None, overwrite=False, fft=True):
@@ -248,6 +238,7 @@ def tilt_depth(grid, resolution=None, return_as=RETURN_PPOINT, gdb=None, overwri
         RETURN_PPOINT         return results as a single `geosoft.gxpy.geometry.PPoint` instance
         RETURN_LIST_OF_PPOINT return results as a list of `geosoft.gxpy.geometry.PPoint` instances
         RETURN_GDB            return result as a `geosoft.gxpy.gdb.Geosoft_gdb` instance
+        RETURN_ARRAY          return results as a numpy array of (x, y, depth) shaped (-1, 3)
         ===================== ====================================================================
 
     :param gdb:         return database name, or a `geosoft.gxpy.gdv.Geosoft_database` instance. If not
@@ -262,51 +253,54 @@ def tilt_depth(grid, resolution=None, return_as=RETURN_PPOINT, gdb=None, overwri
         reciprocol of the horizontal gradient of the tilt-derivative at the zero-contour of
         the tilt derivative.
 
+    The calculation is in memory by `geosoft.gxpy.grid_derivative.tilt_depth`, and large grids are
+    processed in overlapping tiles.
+
     .. versionadded:: 9.4
+
+    .. versionchanged:: 9.6 calculated in memory, added `RETURN_ARRAY`
     """
 
     if gdb is not None:
         return_as = RETURN_GDB
 
-    gxc = gx.gx()
-    gxc.log('Calculate tilt-angle...')
-
-    ta = derivative(grid, TILT_ANGLE, fft=fft)
-    gxc.log('Find zero contour of the tilt-angle...')
-
-    if resolution is None:
-        resolution = min(ta.dx, ta.dy) * 4.
-    gdb = contour_points(ta, 0., resolution=resolution, return_as=RETURN_GDB, gdb=gdb, overwrite=overwrite)
-    gxc.log('Calculate tilt-derivative...')
-    tad = derivative(ta, DERIVATIVE_XY, fft=fft)
-
-    # get gradient of the TD at the zero locations
-    gxc.log('Calculate depth = reciprocal(tilt-derivative) at zero contour of the tilt-angle...')
-    for ln in gdb.list_lines():
-        xyz, chlist, fid = gdb.read_line(ln, channels=('X', 'Y', 'Z'))
-        zero_tad = sample(tad, xyz)
-        zero_tad[zero_tad == 0.] = np.nan
-        np.reciprocal(zero_tad, out=zero_tad)
-        xyz[:, 2] = zero_tad
-        gdb.write_line(ln, xyz, chlist, fid)
+    if isinstance(grid, gxgrd.Grid):
+        g = grid
+    else:
+        g = gxgrd.Grid.open(grid)
+    try:
+        cs = g.coordinate_system
+        lines = gxderiv.tilt_depth(g.np(dtype=np.float64), g.properties(), resolution=resolution, fft=fft)
+    finally:
+        if g is not grid:
+            g.close()
+    lines = [xyz for xyz in lines if len(xyz)]
 
-    if return_as == RETURN_GDB:
-        return gdb
+    if return_as == RETURN_ARRAY:
+        if not lines:
+            return np.zeros((0, 3))
+        return np.concatenate(lines)
 
-    pplist = []
-    for ln in gdb.list_lines():
-        xyz = gdb.read_line(ln, channels=('X', 'Y', 'Z'))[0]
-        pplist.append(gxgeo.PPoint(xyz, coordinate_system=gdb.coordinate_system))
+    if not lines:
+        raise GridUtilityException(_t('The tilt angle has no zero contour.'))
 
-    gdb.close(discard=True)
+    if return_as == RETURN_GDB:
+        if not isinstance(gdb, gxgdb.Geosoft_gdb):
+            gdb = gxgdb.Geosoft_gdb.new(name=gdb, max_lines=max(1000, len(lines)), max_channels=10,
+                                        overwrite=overwrite)
+        gdb.coordinate_system = cs
+        for i, xyz in enumerate(lines):
+            gdb.write_line('L{}'.format(i), xyz, channels=('X', 'Y', 'Z'))
+        return gdb
 
+    pplist = [gxgeo.PPoint(xyz, coordinate_system=cs) for xyz in lines]
     if return_as == RETURN_LIST_OF_PPOINT:
         return pplist
 
     return gxgeo.PPoint.merge(pplist)
 
 
-def sample(grid, xyz):
+def sample(grid, xyz, method=SAMPLE_LINEAR, threads=None):
     """
     Return grid values sampled at the point locations.
 
@@ -314,11 +308,24 @@ def sample(grid, xyz):
     :param xyz:     `geosoft.gxpy.geometry.PPoint` instance, or a numpy array shapped (-1, 3) that holds
                     the desired (x, y, z) locations. If a PPoint instance is passed it will be reporjected to the
                     grid coordinate system if necessary.
+    :param method:  interpolation method:
+
+        ============== ==========================================================
+        SAMPLE_NEAREST value of the nearest grid point
+        SAMPLE_LINEAR  bi-linear interpolation (default)
+        SAMPLE_CUBIC   bi-cubic interpolation
+        ============== ==========================================================
+
+    :param threads: maximum number of threads for large point sets, default is the number of processors
     :return:        1-dimensional numpy array of grid data values that match the passes PPoint or XYZ.
 
-    .. note:: Sampled data values use linear interpolation between grid points.
+    .. note:: Where a neighbouring grid point is dummy the next simpler interpolation method is used.
+        Values are read through the grid `tile_cache`. See `geosoft.gxpy.grid_sample` to sample a numpy
+        grid array without the Geosoft runtime.
 
     .. versionadded:: 9.1
+
+    .. versionchanged:: 9.6 vectorized sampling from the grid tile cache, added `method` and `threads`
     """
 
     if not isinstance(grid, gxgrd.Grid):
@@ -331,115 +338,440 @@ def sample(grid, xyz):
             xyz = xyz.coordinate_system.oriented_from_xyz(xyz)
         xyz = xyz.pp
 
-    vvx, vvy, vvz = gxvv.vvset_from_np(xyz)
-    gxapi.GXIMU.get_zvv(grid.gximg, vvx.gxvv, vvy.gxvv, vvz.gxvv)
-    return vvz.np
+    xyz = np.asarray(xyz, dtype=np.float64).reshape((-1, 3))
+    fx, fy = grid.index_from_xy(xyz[:, 0], xyz[:, 1])
+    grid.tile_cache.prefetch(np.clip(np.rint(fx), 0, grid.nx - 1), np.clip(np.rint(fy), 0, grid.ny - 1))
+    return grid._interpolate(fx, fy, method=method, threads=threads)
+
+
+def _projection(cs_from, cs_to):
+    """ (x, y) transform function between coordinate systems, dummy results are nan"""
+    pj = gxcs.Coordinate_translate(cs_from, cs_to)
+
+    def transform(x, y):
+        xy = np.column_stack((np.ravel(x), np.ravel(y))).astype(np.float64)
+        xy = pj.convert(xy)
+        xy[xy == gxapi.rDUMMY] = np.nan
+        return xy[:, 0].reshape(np.shape(x)), xy[:, 1].reshape(np.shape(y))
+
+    return transform
+
+
+def reproject(grid, coordinate_system, file_name=None, overwrite=False, cell_size=None, properties=None,
+              method=SAMPLE_LINEAR, tolerance=gxwarp.TOLERANCE, tile_size=gxwarp.TILE_SIZE, threads=None):
+    """
+    Reproject a grid to a new coordinate system or grid geometry.
+
+    :param grid:                `geosoft.gxpy.grid.Grid` instance or a grid file name
+    :param coordinate_system:   coordinate system of the new grid
+    :param file_name:           name of the new grid, default is a temporary grid
+    :param overwrite:           `True` to overwrite an existing grid
+    :param cell_size:           cell size of the new grid. The default preserves the area of the grid cells.
+    :param properties:          grid properties dictionary of the new grid lattice ('nx', 'ny', 'x0', 'y0',
+                                'dx', 'dy' and 'rot'), default is an unrotated lattice that covers the grid.
+    :param method:              interpolation method:
+
+        ============== ==========================================================
+        SAMPLE_NEAREST value of the nearest grid point
+        SAMPLE_LINEAR  bi-linear interpolation (default)
+        SAMPLE_CUBIC   bi-cubic interpolation
+        SAMPLE_AVERAGE mean of the grid points within each new grid cell
+        ============== ==========================================================
+
+    :param tolerance:           maximum error of the interpolated projection in grid cells, default 0.125
+    :param tile_size:           new grid tile dimension in cells, default 256
+    :param threads:             maximum number of threads, default is the number of processors
+    :returns:                   `geosoft.gxpy.grid.Grid` instance
+
+    The new grid is built tile by tile by `geosoft.gxpy.grid_warp`, which projects only the nodes of a coarse
+    control mesh in each tile and interpolates between them. Projection meshes are cached, so reprojecting
+    grids of the same geometry between the same coordinate systems projects the mesh once. Color grids
+    are resampled by the nearest point.
+
+    .. versionadded:: 9.6
+    """
 
+    if not isinstance(grid, gxgrd.Grid):
+        grid = gxgrd.Grid.open(grid, mode=gxgrd.FILE_READ)
+    if not isinstance(coordinate_system, gxcs.Coordinate_system):
+        coordinate_system = gxcs.Coordinate_system(coordinate_system)
+    grid_cs = grid.coordinate_system
+    if grid_cs.is_oriented or coordinate_system.is_oriented:
+        raise GridUtilityException(_t('Cannot reproject grids in oriented coordinate systems.'))
+
+    if coordinate_system == grid_cs:
+        forward = inverse = key = None
+    else:
+        forward = _projection(grid_cs, coordinate_system)
+        inverse = _projection(coordinate_system, grid_cs)
+        key = (tuple(grid_cs.gxf), tuple(coordinate_system.gxf))
+
+    p = grid.properties()
+    if properties is None:
+        properties = gxwarp.warp_properties(p, forward, cell_size=cell_size)
+    new_properties = dict(p)
+    new_properties.update(properties)
+    new_properties['rot'] = properties.get('rot', 0.)
+    new_properties['coordinate_system'] = coordinate_system
+
+    def read(window):
+        if grid.is_color:
+            return grid._pager_data(np.int32, window, rgba=False)
+        return grid.np(dtype=np.float64, window=window)
+
+    new_grid = gxgrd.Grid.new(file_name, new_properties, overwrite=overwrite)
+    for tile, data in gxwarp.warp_tiles(read, p, new_properties, transform=inverse, key=key, method=method,
+                                        tolerance=tolerance, tile_size=tile_size, is_color=grid.is_color,
+                                        threads=threads):
+        new_grid.write_rows(data, tile[0], tile[1])
+
+    return new_grid
+
+
+def compare(a, b, tolerance=0., relative_tolerance=0., file_name=None, overwrite=False, bins=None, worst=10,
+            method=SAMPLE_LINEAR, tile_size=gxwarp.TILE_SIZE, threads=None):
+    """
+    Compare two grids, reporting the statistics and locations of the differences `b - a`.
+
+    :param a:                   reference `geosoft.gxpy.grid.Grid` instance or grid file name
+    :param b:                   `geosoft.gxpy.grid.Grid` instance or grid file name compared to `a`
+    :param tolerance:           absolute tolerance of a difference, default 0.
+    :param relative_tolerance:  tolerance relative to the magnitude of `a`, default 0. A difference fails
+                                if it exceeds ``tolerance + relative_tolerance * abs(a)``.
+    :param file_name:           name of a difference grid to create, default is no difference grid
+    :param overwrite:           `True` to overwrite an existing difference grid
+    :param bins:                number of bins in a histogram of the differences, default no histogram
+    :param worst:               number of worst differences to report, default 10
+    :param method:              method to resample `b` if it is not on the lattice of `a`, `SAMPLE_NEAREST`,
+                                `SAMPLE_LINEAR` (default) or `SAMPLE_CUBIC`
+    :param tile_size:           tile dimension in cells, default 256
+    :param threads:             maximum number of threads, default is the number of processors
+    :returns:                   dictionary report:
+
+        ================== ===============================================================================
+        num_compared       number of points valid in both grids
+        num_dummy_a        number of points that are dummy in `a` but valid in `b`
+        num_dummy_b        number of points that are dummy in `b` but valid in `a`
+        num_failed         number of differences outside the tolerance
+        passed             `True` if no differences fail and dummies match
+        min                minimum difference
+        max                maximum difference
+        max_abs            maximum absolute difference
+        mean               mean difference
+        rms                root-mean-square difference
+        sd                 standard deviation of the differences
+        worst              list of the largest absolute differences, largest first, as dictionaries
+                           with keys 'x', 'y', 'ix', 'iy', 'a', 'b' and 'difference'
+        histogram          (counts, edges) of the differences if `bins` is specified
+        difference_grid    name of the difference grid if `file_name` is specified
+        ================== ===============================================================================
+
+    Differences are on the lattice of grid `a`. If grid `b` has a different lattice or coordinate system
+    it is resampled to the lattice of `a` by `geosoft.gxpy.grid_warp`. The grids are compared one tile at a
+    time so memory does not depend on the size of the grids. The histogram requires a second pass over the
+    grids. Statistics values are `None` if there are no points to compare.
+
+    .. versionadded:: 9.6
+    """
 
-def grid_mosaic(mosaic, grid_list, type_decorate=''):
+    close = []
+    try:
+        if not isinstance(a, gxgrd.Grid):
+            a = gxgrd.Grid.open(a, mode=gxgrd.FILE_READ)
+            close.append(a)
+        if not isinstance(b, gxgrd.Grid):
+            b = gxgrd.Grid.open(b, mode=gxgrd.FILE_READ)
+            close.append(b)
+        if a.is_color or b.is_color:
+            raise GridUtilityException(_t('Color grids cannot be compared.'))
+
+        pa = a.properties()
+        pb = b.properties()
+        transform = key = None
+        if a.coordinate_system != b.coordinate_system:
+            if a.coordinate_system.is_oriented or b.coordinate_system.is_oriented:
+                raise GridUtilityException(_t('Cannot compare grids in oriented coordinate systems.'))
+            transform = _projection(a.coordinate_system, b.coordinate_system)
+            key = (tuple(a.coordinate_system.gxf), tuple(b.coordinate_system.gxf))
+        elif all((pa[k] == pb[k]) for k in ('nx', 'ny')) and \
+                np.allclose([pa[k] for k in ('x0', 'y0', 'dx', 'dy', 'rot')],
+                            [pb[k] for k in ('x0', 'y0', 'dx', 'dy', 'rot')]):
+            method = SAMPLE_NEAREST
+
+        def read(grid, window):
+            return grid.np(dtype=np.float64, window=window)
+
+        def differences():
+            for tile, vb in gxwarp.warp_tiles(lambda window: read(b, window), pb, pa, transform=transform,
+                                              key=key, method=method, tile_size=tile_size, threads=threads):
+                va = read(a, tile)
+                yield tile, va, vb, vb - va
+
+        diff_grid = None
+        if file_name:
+            dp = dict(pa)
+            dp['dtype'] = _float_dtype(a)
+            dp['coordinate_system'] = a.coordinate_system
+            diff_grid = gxgrd.Grid.new(file_name, dp, overwrite=overwrite)
+
+        moments = gxgrdst.Moments()
+        num_dummy_a = num_dummy_b = num_failed = 0
+        worst = max(0, int(worst))
+        candidates = np.zeros((0, 6))
+        try:
+            for tile, va, vb, d in differences():
+                dummy_a = np.isnan(va)
+                dummy_b = np.isnan(vb)
+                num_dummy_a += int(np.count_nonzero(dummy_a & ~dummy_b))
+                num_dummy_b += int(np.count_nonzero(dummy_b & ~dummy_a))
+                moments.add(d)
+
+                abs_d = np.abs(d)
+                valid = ~np.isnan(abs_d)
+                limit = tolerance + relative_tolerance * np.abs(va[valid])
+                num_failed += int(np.count_nonzero(abs_d[valid] > limit))
+
+                if worst and np.any(valid):
+                    iy, ix = np.nonzero(valid)
+                    abs_v = abs_d[valid]
+                    if abs_v.size > worst:
+                        top = np.argpartition(abs_v, abs_v.size - worst)[-worst:]
+                        iy, ix, abs_v = iy[top], ix[top], abs_v[top]
+                    tile_worst = np.column_stack((abs_v, ix + tile[0], iy + tile[1],
+                                                  va[iy, ix], vb[iy, ix], d[iy, ix]))
+                    candidates = np.concatenate((candidates, tile_worst))
+                    candidates = candidates[np.argsort(-candidates[:, 0], kind='stable')[:worst]]
+
+                if diff_grid is not None:
+                    diff_grid.write_rows(d, tile[0], tile[1])
+        finally:
+            if diff_grid is not None:
+                diff_grid.close()
+
+        st = moments.statistics()
+        report = {'num_compared': moments.n,
+                  'num_dummy_a': num_dummy_a,
+                  'num_dummy_b': num_dummy_b,
+                  'num_failed': num_failed,
+                  'passed': (num_failed == 0) and (num_dummy_a == 0) and (num_dummy_b == 0),
+                  'min': st['min'],
+                  'max': st['max'],
+                  'max_abs': None,
+                  'mean': st['mean'],
+                  'rms': None,
+                  'sd': st['sd'],
+                  'worst': []}
+        if moments.n:
+            report['max_abs'] = max(abs(st['min']), abs(st['max']))
+            report['rms'] = math.sqrt(st['sum_power_2'] / moments.n)
+
+        for abs_d, ix, iy, va, vb, d in candidates:
+            x, y = a.xy_from_index(ix, iy)
+            report['worst'].append({'x': float(x), 'y': float(y), 'ix': int(ix), 'iy': int(iy),
+                                    'a': float(va), 'b': float(vb), 'difference': float(d)})
+
+        if bins:
+            if moments.n:
+                histogram = gxgrdst.Histogram(st['min'], st['max'], bins)
+                for _, _, _, d in differences():
+                    histogram.add(d)
+            else:
+                histogram = gxgrdst.Histogram(0., 0., bins)
+            report['histogram'] = (histogram.counts, histogram.edges)
+
+        if diff_grid is not None:
+            report['difference_grid'] = diff_grid.file_name_decorated
+
+        return report
+
+    finally:
+        for g in close:
+            g.close()
+
+
+def grid_mosaic(mosaic, grid_list, type_decorate='', blend=BLEND_LAST, tile_size=256, threads=None,
+                method=SAMPLE_LINEAR):
     """
-    Combine a set of grids into a single grid.  Raises an error if the resulting grid is too large.
+    Combine a set of grids into a single grid.
 
     :param mosaic:          name of the output grid, returned.  Decorate with '(HGD)' to get an HGD
     :param grid_list:       list of input grid names
     :param type_decorate:   decoration for input grids if not default
+    :param blend:           how overlapping grid values are combined:
+
+        =============== ==================================================================
+        BLEND_LAST      the last valid value in `grid_list` order (default)
+        BLEND_MEAN      mean of the valid values
+        BLEND_FEATHER   mean weighted by the distance from the edge of each grid
+        BLEND_MEDIAN    median of the valid values
+        =============== ==================================================================
+
+    :param tile_size:       mosaic tile dimension in cells, default 256
+    :param threads:         maximum number of threads, default is the number of processors
+    :param method:          method to resample grids that are not on the lattice of the first grid,
+                            `SAMPLE_NEAREST`, `SAMPLE_LINEAR` (default) or `SAMPLE_CUBIC`
     :returns:               `geosoft.gxpy.grid.Grid` instance
 
+    The mosaic is on the lattice, cell size and rotation of the first grid, and covers all grids. It is
+    built one tile at a time, reading only the part of each grid that covers the tile, so memory depends
+    on `tile_size` and the number of overlapping grids, not on the size of the mosaic. Color grids can
+    only be blended by BLEND_LAST.
+
     .. note:: If the coordinate systems are different the grids are
         reprojected to the coordinate system of the first grid.
 
     .. versionadded:: 9.4
-    """
 
-    def props(gn, repro=None):
-        with gxgrd.Grid.open(gn) as gg:
-            if repro:
-                gg.gximg.create_projected2(repro[0], repro[1])
-            return gg.properties()
-
-    def dimension(glist):
-
-        def dimg(_gd, _rep=None):
-            prp = props(_gd, _rep)
-            _x0 = prp.get('x0')
-            _y0 = prp.get('y0')
-            _xm = _x0 + (prp.get('nx') - 1) * prp.get('dx')
-            _ym = _y0 + (prp.get('ny') - 1) * prp.get('dy')
-            _ipj = prp.get('coordinate_system').gxipj
-            cell = prp.get('dx')
-            return _x0, _y0, _xm, _ym, (_ipj, cell)
-
-        def ndim(_x0, _xm, _dx):
-            return int((_xm - _x0 + _dx / 2.0) / _dx) + 1
-
-        dx0, dy0, dxm, dym, drepro = dimg(glist[0])
-        for gd in glist[1:]:
-            xx0, yy0, xxm, yym, r = dimg(gd, drepro)
-            if xx0 < dx0:
-                dx0 = xx0
-            if yy0 < dy0:
-                dy0 = yy0
-            if xxm > dxm:
-                dxm = xxm
-            if yym > dym:
-                dym = yym
-
-        # calculate new grid dimension
-        _p = props(glist[0])
-        nnx = ndim(dx0, dxm, _p.get('dx'))
-        nny = ndim(dy0, dym, _p.get('dy'))
-
-        return dx0, dy0, nnx, nny, dxm, dym
-
-    def locate(_x0, _y0, _p):
-
-        _dx = _p.get('dx')
-        _dy = _p.get('dy')
-        dsx = round((p.get('x0') - _x0) / _dx)
-        dsy = round((p.get('y0') - _y0) / _dy)
-
-        return dsx, dsy
-
-    def paste(gn, _mpg):
-        with gxgrd.Grid.open(gn) as _g:
-            _p = _g.properties()
-            _nx = _p.get('nx')
-            _ny = _p.get('ny')
-            gpg = _g.gxpg()
-            destx, desty = locate(x0, y0, _p)
-            gxc.log('    +{} nx,ny({},{})'.format(_g, _nx, _ny))
-            gxc.log('     Copy ({},{}) -> ({},{}) of ({},{})'.format(_nx, _ny, destx, desty, mnx, mny))
-            _mpg.copy_subset(gpg, desty, destx, 0, 0, _ny, _nx)
-            return
+    .. versionchanged:: 9.6 mosaic is built tile by tile, added `blend`, `tile_size`, `threads` and `method`
+    """
 
     gxc = gx.gx()
     if len(grid_list) == 0:
         raise GridUtilityException(_t('At least one grid is required'))
 
-    # create list of grids, all matching on coordinate system of first grid
     grids = []
-    for i in range(len(grid_list)):
-        grids.append(gxgrd.decorate_name(grid_list[i], type_decorate))
-
-    # output grid
-    x0, y0, nx, ny, xm, ym = dimension(grids)
-    p = props(grids[0])
-    p['x0'] = x0
-    p['y0'] = y0
-    p['nx'] = nx
-    p['ny'] = ny
-    gxc.log('')
-    gxc.log('Mosaic: dim({},{}) x({},{}) y({},{}), cell({})...'.format(nx, ny, x0, xm, y0, ym, p.get('dx')))
-    master = gxgrd.Grid.new(mosaic, p)
-    gxc.log('Memory image ready ({}) dim({},{}) x0,y0({},{})'.
-            format(master, master.nx, master.ny, master.x0, master.y0))
-
-    # paste grids onto master
-    mnx = master.nx
-    mny = master.ny
-    mpg = master.gxpg()
-    for g in grids:
-        paste(g, mpg)
+    try:
+
+        # open grids, all matching on coordinate system of first grid
+        cs = None
+        cell = None
+        for gn in grid_list:
+            gn = gxgrd.decorate_name(gn, type_decorate)
+            if cs is None:
+                g = gxgrd.Grid.open(gn)
+                cs = g.coordinate_system
+                cell = g.dx
+            else:
+                with gxgrd.Grid.open(gn) as g:
+                    repro = g.coordinate_system != cs
+                if repro:
+                    g = gxgrd.Grid.open(gn, coordinate_system=cs, cell_size=cell)
+                else:
+                    g = gxgrd.Grid.open(gn)
+            grids.append(g)
+
+        is_color = grids[0].is_color
+        if any(g.is_color != is_color for g in grids):
+            raise GridUtilityException(_t('Cannot mosaic color grids with scalar grids.'))
+        if is_color:
+            if blend != BLEND_LAST:
+                raise GridUtilityException(_t('Color grids can only be mosaicked with BLEND_LAST.'))
+            method = SAMPLE_NEAREST
+
+        props = [g.properties() for g in grids]
+        p = gxgrdblnd.mosaic_properties(props[0], props)
+        nx = p['nx']
+        ny = p['ny']
+        x0 = p['x0']
+        y0 = p['y0']
+        gxc.log('')
+        gxc.log('Mosaic: dim({},{}) x0,y0({},{}), cell({})...'.format(nx, ny, x0, y0, p.get('dx')))
+
+        # mosaic index extent and lattice alignment of each grid
+        inputs = []
+        for g, gp in zip(grids, props):
+            ex0, ey0, ex1, ey1 = gxgrdblnd.index_extent(p, gp)
+            inputs.append((g, gp, (ex0 - 1, ey0 - 1, ex1 + 1, ey1 + 1), gxgrdblnd.aligned_offset(p, gp)))
+            gxc.log('    +{} nx,ny({},{})'.format(g, gp['nx'], gp['ny']))
+
+        master = gxgrd.Grid.new(mosaic, p)
+        gxc.log('Memory image ready ({}) dim({},{}) x0,y0({},{})'.
+                format(master, master.nx, master.ny, master.x0, master.y0))
+
+        def read(g, window):
+            if is_color:
+                return g._pager_data(np.int32, window, rgba=False)
+            return g.np(dtype=np.float64, window=window)
+
+        def tile_sources(tile):
+            """ grid data that covers a tile, read on the calling thread """
+            tx0, ty0, tnx, tny = tile
+            iy, ix = np.mgrid[ty0: ty0 + tny, tx0: tx0 + tnx]
+            sources = []
+
+            for g, gp, (ex0, ey0, ex1, ey1), offset in inputs:
+                if (ex1 < tx0) or (ex0 > tx0 + tnx - 1) or (ey1 < ty0) or (ey0 > ty0 + tny - 1):
+                    continue
+                gnx = gp['nx']
+                gny = gp['ny']
+
+                if offset:
+
+                    # grid points coincide with mosaic points, read the overlapping window
+                    gx0 = max(tx0 + offset[0], 0)
+                    gy0 = max(ty0 + offset[1], 0)
+                    gx1 = min(tx0 + offset[0] + tnx, gnx)
+                    gy1 = min(ty0 + offset[1] + tny, gny)
+                    if (gx1 <= gx0) or (gy1 <= gy0):
+                        continue
+                    window = (gx0 - tx0 - offset[0], gy0 - ty0 - offset[1], gx1 - gx0, gy1 - gy0)
+                    data = read(g, (gx0, gy0, gx1 - gx0, gy1 - gy0))
+                    sources.append((gp, (gx0, gy0, gx1, gy1), window, None, None, data))
+
+                else:
+
+                    # the part of the grid that covers the tile, to be resampled
+                    fx, fy = gxgrdsmp.index_from_xy(gp, *gxgrdsmp.xy_from_index(p, ix, iy))
+                    inside = (fx >= -0.5) & (fx <= gnx - 0.5) & (fy >= -0.5) & (fy <= gny - 0.5)
+                    if not inside.any():
+                        continue
+                    gx0 = max(int(math.floor(fx[inside].min())) - 1, 0)
+                    gy0 = max(int(math.floor(fy[inside].min())) - 1, 0)
+                    gx1 = min(int(math.ceil(fx[inside].max())) + 2, gnx)
+                    gy1 = min(int(math.ceil(fy[inside].max())) + 2, gny)
+                    data = read(g, (gx0, gy0, gx1 - gx0, gy1 - gy0))
+                    sources.append((gp, (gx0, gy0, gx1, gy1), None, fx, fy, data))
+
+            return sources
+
+        def blend_tile(tile, sources):
+            tnx, tny = tile[2:]
+            tile_blend = gxgrdblnd.Blend((tny, tnx), blend, is_color=is_color)
+
+            for gp, (gx0, gy0, gx1, gy1), window, fx, fy, data in sources:
+                gnx = gp['nx']
+                gny = gp['ny']
+
+                if window is not None:
+                    weights = None
+                    if blend == BLEND_FEATHER:
+                        jy, jx = np.mgrid[gy0: gy1, gx0: gx1]
+                        weights = gxgrdblnd.feather_weights(jx, jy, gnx, gny)
+                    tile_blend.add(data, weights, window)
+
+                else:
+
+                    def gather(jx, jy, data=data):
+                        return data[jy, jx]
+
+                    values = gxgrdsmp.interpolate(gather, fx - gx0, fy - gy0, gx1 - gx0, gy1 - gy0,
+                                                  method=method, is_color=is_color, threads=1)
+                    weights = None
+                    if blend == BLEND_FEATHER:
+                        weights = gxgrdblnd.feather_weights(fx, fy, gnx, gny)
+                    tile_blend.add(values, weights)
+
+            return tile, tile_blend.result()
+
+        def write(tile, data):
+            master.write_rows(data, tile[0], tile[1])
+
+        # grids are read on this thread, which has the Geosoft context, workers only blend
+        if threads is None:
+            threads = os.cpu_count() or 1
+        threads = max(1, threads)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            pending = deque()
+            for tile in gxgrdblnd.tiles(nx, ny, tile_size):
+                pending.append(pool.submit(blend_tile, tile, tile_sources(tile)))
+                if len(pending) > threads:
+                    write(*pending.popleft().result())
+            while pending:
+                write(*pending.popleft().result())
+
+    finally:
+        for g in grids:
+            g.close()
 
     gxc.log('Mosaic completed: {}'.format(mosaic))
 
@@ -508,7 +840,7 @@ def grid_bool(g1, g2, joined_grid=None, opt=1, size=3, olap=1):
 
 
 def contour_points(grid, value, max_segments=1000, resolution=None,
-                   return_as=RETURN_LIST_OF_PPOINT, gdb=None, overwrite=False):
+                   return_as=RETURN_LIST_OF_PPOINT, gdb=None, overwrite=False, min_length=None):
     """
     Return a set of point segments that represent the spatial locations of contours threaded through the grid.
 
@@ -529,84 +861,77 @@ def contour_points(grid, value, max_segments=1000, resolution=None,
     :param gdb:         return database name, or a `geosoft.gxpy.gdv.Geosoft_database` instance. If not
                         specified and `return_as=RETURN_GDB`, a temporary database is created.
     :param overwrite:   `True` to overwrite gdb if it exists.
+    :param min_length:  contour segments shorter than this are not returned. The default is 1.98 times the
+                        smaller grid cell size, which drops the small closed contours around single grid
+                        points and the short segments at dummy edges, as the Geosoft contour group does.
+                        Set `min_length=0` to return all segments.
     :return:            depends on `return_as` setting
 
     .. note::   Contours through 3D oriented grids will be oriented in 3D. Grids that are not 3D oriented
         will have a z value 0.0.
 
+    Contours are threaded through the grid by `geosoft.gxpy.grid_contour.contours`, which reads the grid by
+    blocks of rows, without creating any files.
+
     .. versionadded:: 9.4
+
+    .. versionchanged:: 9.6 contours by `geosoft.gxpy.grid_contour`, added `min_length`
     """
 
     if isinstance(grid, gxgrd.Grid):
-        extent = grid.extent
-        with grid.copy(grid) as g:
-            temp_grid = g.file_name
-            grid = g.file_name_decorated
-            if resolution is None:
-                resolution = min(g.dx, g.dy)
-
+        g = grid
     else:
-        with gxgrd.Grid.open(grid) as g:
-            extent = g.extent
-            if resolution is None:
-                resolution = min(g.dx, g.dy)
-        temp_grid = None
-
-    # create a contour group for this value, export to a shape file
-    with gxmap.Map.new(data_area=extent.extent_xy, overwrite=True) as gmap:
-        map_file = gmap.file_name
-        with gxv.View.open(gmap, "data") as v:
-            gxgrp.contour(v, '_', grid, parameters=(',0,0', '', '', '', '', '1',
-                                                    str(value) + ',,,0'))
-        shp_file = gx.gx().temp_file('shp')
-        gmap.gxmap.export_all_in_view(shp_file, 'data', 1.0, 1.0,
-                                      gxapi.MAP_EXPORT_BITS_24,
-                                      gxapi.MAP_EXPORT_METHOD_STANDARD,
-                                      gxapi.MAP_EXPORT_FORMAT_SHP, '')
-        shp_file = shp_file[:-4] + '_lnz.shp'
-
-    if not os.path.exists(shp_file):
-        raise GridUtilityException(_t('The grid data does not intersect value {}').format(value))
-
-    if gdb is not None:
-        return_as = RETURN_GDB
+        g = gxgrd.Grid.open(grid)
+    try:
+        if resolution is None:
+            resolution = min(g.dx, g.dy)
+        if min_length is None:
+            min_length = 1.98 * min(g.dx, g.dy)
+        cs = g.coordinate_system
 
-    # import shape to database
-    if not isinstance(gdb, gxgdb.Geosoft_gdb):
-        gdb = gxgdb.Geosoft_gdb.new(name=gdb, max_lines=max_segments, max_channels=10, overwrite=overwrite)
+        def read(window):
+            return g.np(dtype=np.float64, window=window)
 
-    gis = gxapi.GXGIS.create(shp_file, '', gxapi.GIS_TYPE_ARCVIEW)
-    gis.load_shapes_gdb(gdb.gxdb)
-    gdb.coordinate_system = extent.coordinate_system
+        lines = gxcntr.contours(read, value, g.properties(), shape=(g.ny, g.nx))
+    finally:
+        if g is not grid:
+            g.close()
 
-    # discard the temp files
-    gxu.delete_files_by_root(temp_grid)
-    gxu.delete_files_by_root(map_file)
-    gxu.delete_files_by_root(shp_file[:-4])
+    if min_length > 0.:
+        lines = [xy for xy in lines if np.sum(np.hypot(*np.diff(xy, axis=0).T)) >= min_length]
 
-    # resample to resolution
-    if resolution > 0.:
-        for ln in gdb.list_lines():
-            xyz, chlist, _ = gdb.read_line(ln, channels=('X', 'Y', 'Z'))
+    if not lines:
+        raise GridUtilityException(_t('The grid data does not intersect value {}').format(value))
+    if len(lines) > max_segments:
+        raise GridUtilityException(_t('{} contour segments exceeds max_segments {}').format(len(lines),
+                                                                                           max_segments))
+
+    # locations on the grid plane, resampled to resolution
+    xyz_lines = []
+    for xy in lines:
+        xyz = np.zeros((len(xy), 3))
+        xyz[:, :2] = xy
+        if resolution > 0.:
             xyz = gxgeou.resample(xyz, resolution)
-            gdb.write_line(ln, xyz, chlist)
+        xyz_lines.append(xyz)
+
+    if gdb is not None:
+        return_as = RETURN_GDB
 
     if return_as == RETURN_GDB:
+        if not isinstance(gdb, gxgdb.Geosoft_gdb):
+            gdb = gxgdb.Geosoft_gdb.new(name=gdb, max_lines=max_segments, max_channels=10, overwrite=overwrite)
+        gdb.coordinate_system = cs
+        for i, xyz in enumerate(xyz_lines):
+            gdb.write_line('L{}'.format(i), xyz, channels=('X', 'Y', 'Z'))
         return gdb
 
     # make points from segments
     pplist = []
-    for ln in gdb.list_lines():
-        xyz = gdb.read_line(ln, channels=('X', 'Y', 'Z'))[0]
-        xyz[:, 2] = 0.
-        if resolution > 0.:
-            xyz = gxgeou.resample(xyz, resolution)
-        if extent.coordinate_system.is_oriented:
-            xyz = extent.coordinate_system.xyz_from_oriented(xyz)
-        pplist.append(gxgeo.PPoint(xyz, coordinate_system=extent.coordinate_system))
-
-    # discard the database
-    gdb.close(discard=True)
+    for xyz in xyz_lines:
+        if cs.is_oriented:
+            xyz = cs.xyz_from_oriented(xyz)
+        pplist.append(gxgeo.PPoint(xyz, coordinate_system=cs))
 
     if return_as == RETURN_PPOINT:
         return gxgeo.PPoint.merge(pplist)
@@ -647,76 +972,60 @@ def calculate_slope_standard_deviation(grid):
 
 def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=250, pass_tol=99.):
     """
-    Flood blank areas in a grid based on a minimum-curvature surface.
+    Flood blank areas in a grid.
 
     :param grid:            `geosoft.gxpy.grid.Grid` instance, or a grid file name
     :param file_name:       flooded grid file name, temporary created if `None`.
     :param overwrite:       `True` to overwrite existing file
-    :param tolerance:       data fit tolerance, default is 0.001 times the data standard deviation
-    :param max_iterations:  maximum iterations for fiting the surface
-    :param pass_tol:        percentage of data that needs to pass the tolerance test when definint
-                            the minimum-curfacture surface. The default is 99%.
+    :param tolerance:       smoothing tolerance, default is 0.001 times the data standard deviation
+    :param max_iterations:  maximum smoothing iterations
+    :param pass_tol:        percentage of filled points that need to pass the tolerance test to stop
+                            smoothing. The default is 99%.
     :return:                `geosoft.gxpy.grid.Grid` instance of a flooded grid.
 
+    Blank areas are filled in order of their distance from the data by a priority flood, and the filled
+    values are smoothed toward a surface that honours the data (see `geosoft.gxpy.grid_fill.flood`).
+    Valid values are unchanged, but filled values are not the 9.4 minimum-curvature surface, so filled
+    values, and statistics of grids with filled areas, differ slightly from 9.4.
+
     .. seealso:: `geosoft.gxpy.grid.Grid.minimum_curvature`
 
     .. versionadded:: 9.4
-    """
 
-    def pg_rows(n):
-        if n >= grid.ny:
-            return None
-        pg.read_row(n, 0, 0, rvv.gxvv)
-        xyv[:, 1] = n
-        xyv[:, 2] = rvv.np
-        return xyv
+    .. versionchanged:: 9.6 priority flood in numpy replaces a minimum-curvature surface
+    """
 
     if not isinstance(grid, gxgrd.Grid):
         grid = gxgrd.Grid.open(grid)
 
-    pg = grid.gxpg(False)
-    rvv = gxvv.GXvv(dtype=grid.dtype)
-    rvv.length = grid.nx
-    xyv = np.empty((grid.nx, 3))
-    xyv[:, 0] = [i for i in range(grid.nx)]
-    bkd = max(grid.nx, grid.ny)
-    if tolerance is None:
-        tolerance = grid.statistics()['sd'] * 0.001
-    filled_grid = gxgrd.Grid.minimum_curvature(pg_rows,
-                                               file_name=file_name,
-                                               overwrite=overwrite,
-                                               cs=1,
-                                               area=(0, 0, grid.nx - 1, grid.ny - 1),
-                                               bkd=bkd,
-                                               itrmax=max_iterations,
-                                               pastol=pass_tol,
-                                               tol=tolerance,
-                                               icgr=16,
-                                               max_segments=grid.ny)
-    filled_grid.set_properties(grid.properties())
-    return filled_grid
-
-
-def feather(grid, width, edge_value=None, file_name=None, overwrite=False):
+    try:
+        data = gxfill.flood(grid.np(dtype=np.float64), tolerance=tolerance, max_iterations=max_iterations,
+                            pass_tol=pass_tol)
+    except gxfill.FillException as e:
+        raise GridUtilityException(str(e))
+    return gxgrd.Grid.from_data_array(data.astype(_float_dtype(grid)), file_name=file_name, overwrite=overwrite,
+                                      properties=grid.properties())
+
+
+def feather(grid, width, edge_value=None, file_name=None, overwrite=False, feather_blanks=False):
     """
     Feather the edge of a grid to a constant value at the edge.
 
-    :param grid:        `geosoft.gxpy.grid.Grid` instance, or a file name
-    :param file_name:   feathered grid file name, temporary created if `None`.
-    :param overwrite:   `True` to overwrite existing file
-    :param width:       feather width in cells around the grid, must be <= half the grid dimension
-    :param edge_value:  edge value, default is the data mean
-    :return:            feathered grid `geosoft.gxpy.grid.Grid`
+    :param grid:            `geosoft.gxpy.grid.Grid` instance, or a file name
+    :param file_name:       feathered grid file name, temporary created if `None`.
+    :param overwrite:       `True` to overwrite existing file
+    :param width:           feather width in cells around the grid, must be <= half the grid dimension
+    :param edge_value:      edge value, default is the data mean
+    :param feather_blanks:  `True` to also feather values at the edges of blank areas by their exact Euclidean
+                            distance from the nearest blank. The default is `False`, blank areas are unchanged.
+    :return:                feathered grid `geosoft.gxpy.grid.Grid`
+
+    Values are tapered by a cosine of the distance from the grid edges (see `geosoft.gxpy.grid_fill.feather`).
 
     .. versionadded:: 9.4
-    """
 
-    def _feather(dlen, w):
-        ff = np.ones(dlen)
-        e = np.array([math.cos((i + 1) * math.pi/w) for i in range(w)]) * 0.5 + 0.5
-        ff[-len(e):] = e
-        ff[:len(e)] = e[::-1]
-        return ff
+    .. versionchanged:: 9.6 feathered in numpy, added `feather_blanks`
+    """
 
     if not isinstance(grid, gxgrd.Grid):
         grid = gxgrd.Grid.open(grid)
@@ -728,26 +1037,19 @@ def feather(grid, width, edge_value=None, file_name=None, overwrite=False):
     if edge_value is None:
         edge_value = grid.statistics()['mean']
 
-    pg = grid.gxpg()
-    pgf = gxapi.GXPG.create(pg.n_rows(), pg.n_cols(), pg.e_type())
-    vv = gxvv.GXvv(dtype=gxu.dtype_gx(pg.e_type()))
-
-    f = _feather(pg.n_cols(), width)
-    for row in range(pg.n_rows()):
-        pg.read_row(row, 0, 0, vv.gxvv)
-        df = (vv.np - edge_value) * f + edge_value
-        pgf.write_row(row, 0, 0, gxvv.GXvv(df).gxvv)
+    data = gxfill.feather(grid.np(dtype=np.float64), width, edge_value, feather_blanks=feather_blanks)
+    return gxgrd.Grid.from_data_array(data.astype(_float_dtype(grid)), file_name=file_name, overwrite=overwrite,
+                                      properties=grid.properties())
 
-    f = _feather(pg.n_rows(), width)
-    for col in range(pg.n_cols()):
-        pgf.read_col(col, 0, 0, vv.gxvv)
-        df = (vv.np - edge_value) * f + edge_value
-        pgf.write_col(col, 0, 0, gxvv.GXvv(df).gxvv)
 
-    return gxgrd.Grid.from_data_array(pgf, file_name=file_name, overwrite=overwrite, properties=grid.properties())
+def _float_dtype(grid):
+    """ grid dtype if it is a float type, otherwise float64"""
+    if np.issubdtype(grid.dtype, np.floating):
+        return grid.dtype
+    return np.float64
 
 
-def expression(grids, expr, result_file_name=None, overwrite=False):
+def expression(grids, expr, result_file_name=None, overwrite=False, dtype=None, rows=256, threads=None):
     """
     Apply an expressing to grids.
 
@@ -755,8 +1057,12 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
                         is provided the operand names will be 'g1', 'g2', 'g3', etc...
     :param expr:        expression string to apply, conforms to Python/C math expression syntax. The expression
                         can have multiple lines, each line terminated by a ';' character.
+                        See `geosoft.gxpy.grid_expression` for the syntax.
     :param result_file_name:    optional result grid file name, if `None` a temporary grid is created.
     :param overwrite:   True to overwrite existing grid
+    :param dtype:       result grid data type, default is float64.
+    :param rows:        number of grid rows evaluated together, default 256.
+    :param threads:     maximum number of threads, default is the number of processors.
     :return:            `Grid` instance that contains the resuilt of the expression.
 
     *Example*
@@ -776,10 +1082,14 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
         # add using named operands
         sum = gxgrd.expression({'a': grid_1, 'b': grid_2}, 'a+b')
 
+    .. note:: The expression is evaluated in blocks of rows read directly from the operand grids, which
+        must all have the same dimensions. Expressions that `geosoft.gxpy.grid_expression` cannot parse
+        are evaluated by `geosoft.gxapi.GXIEXP`.
+
     .. versionadded 9.4
-    """
 
-    exp = gxapi.GXIEXP.create()
+    .. versionchanged:: 9.6 evaluated by `geosoft.gxpy.grid_expression`, added `dtype`, `rows` and `threads`
+    """
 
     # build default operands dict from list of grids
     if not isinstance(grids, dict):
@@ -790,6 +1100,76 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
             i += 1
         grids = gd
 
+    try:
+        exp = gxexp.Expression(expr)
+    except gxexp.ExpressionException:
+        return _iexp_expression(grids, expr, result_file_name, overwrite)
+
+    missing = [n for n in exp.operands if n not in grids]
+    if missing:
+        raise GridUtilityException(_t('Expression operands {} are not defined.').format(missing))
+
+    opened = {}
+    close_list = []
+    try:
+        for k, g in grids.items():
+            if not isinstance(g, gxgrd.Grid):
+                g = gxgrd.Grid.open(g)
+                close_list.append(g)
+            opened[k] = g
+        operands = {k: opened[k] for k in exp.operands}
+        first = opened[next(iter(grids))]
+        properties = first.properties()
+        nx = first.nx
+        ny = first.ny
+        for k, g in operands.items():
+            if (g.nx, g.ny) != (nx, ny):
+                raise GridUtilityException(_t('Grid "{}" ({}, {}) does not match the first grid ({}, {})')
+                                           .format(k, g.nx, g.ny, nx, ny))
+
+        if dtype is None:
+            dtype = np.float64
+        properties['dtype'] = dtype
+        if result_file_name is None:
+            result_file_name = gx.gx().temp_file('.grd(GRD)')
+        result = gxgrd.Grid.new(file_name=result_file_name, properties=properties, overwrite=overwrite)
+
+        rows = max(1, int(rows))
+        if threads is None:
+            threads = os.cpu_count() or 1
+
+        def evaluate_rows(iy0, data):
+            return iy0, exp.evaluate(data, dtype=dtype)
+
+        def write(iy0, data):
+            if data.ndim < 2:
+                data = np.full((min(rows, ny - iy0), nx), data, dtype=data.dtype)
+            result.write_rows(data, 0, iy0)
+
+        # operands are read on this thread, which has the Geosoft context, workers only evaluate
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            pending = deque()
+            for iy0 in range(0, ny, rows):
+                window = (0, iy0, nx, min(rows, ny - iy0))
+                data = {k: g.np(dtype=np.float64, window=window) for k, g in operands.items()}
+                pending.append(pool.submit(evaluate_rows, iy0, data))
+                if len(pending) > threads:
+                    write(*pending.popleft().result())
+            while pending:
+                write(*pending.popleft().result())
+
+    finally:
+        for g in close_list:
+            g.close()
+
+    return gxgrd.reopen(result)
+
+
+def _iexp_expression(grids, expr, result_file_name=None, overwrite=False):
+    """ Apply an expression to grids using `geosoft.gxapi.GXIEXP`."""
+
+    exp = gxapi.GXIEXP.create()
+
     # add grids to the expression
     properties = None
     delete_list = []
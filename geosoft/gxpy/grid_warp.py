@@ -0,0 +1,503 @@
+"""
+Warping and reprojection of grid data in numpy.
+
+A warp resamples a source grid onto the points of a destination grid through a `transform` that maps
+locations on the destination grid plane to locations on the source grid plane, such as a coordinate system
+projection. Transforms are usually expensive, so the destination-to-source mapping is calculated exactly only
+at the nodes of a coarse control mesh in each destination tile, and is bi-linearly interpolated between the
+nodes. The mesh is refined in tiles where the interpolated mapping misses the transform by more than the
+`tolerance` at the centres of the mesh cells.
+
+A `Warp_mapping` holds the control meshes, and mappings are cached by the `key` of the transform and the
+geometry of the source and destination grids, so repeated warps between the same grid geometries do not
+call the transform again. The destination is resampled tile by tile, and tiles are processed in parallel.
+This module does not require the Geosoft runtime.
+
+:Constants:
+    :METHOD_NEAREST:    0 value of the nearest source point
+    :METHOD_LINEAR:     1 bi-linear interpolation of the source grid
+    :METHOD_CUBIC:      2 bi-cubic interpolation of the source grid
+    :METHOD_AVERAGE:    3 mean of the source points within each destination cell
+    :TILE_SIZE:         256 destination tile dimension in cells
+    :MESH_STEP:         16 initial control mesh node separation in destination cells
+    :TOLERANCE:         0.125 maximum mapping error in source cells
+    :CACHE_SIZE:        8 number of mappings held in the mapping cache
+
+.. seealso:: `geosoft.gxpy.grid_utility.reproject`, `geosoft.gxpy.grid_sample`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grid_warp.py>`_
+
+.. versionadded:: 9.6
+"""
+import os
+import math
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import geosoft
+from . import grid_sample as gxgrdsmp
+from . import grid_blend as gxgrdblnd
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+METHOD_NEAREST = gxgrdsmp.SAMPLE_NEAREST
+METHOD_LINEAR = gxgrdsmp.SAMPLE_LINEAR
+METHOD_CUBIC = gxgrdsmp.SAMPLE_CUBIC
+METHOD_AVERAGE = 3
+
+TILE_SIZE = 256
+MESH_STEP = 16
+TOLERANCE = 0.125
+CACHE_SIZE = 8
+
+# maximum sub-samples along each axis of a destination cell for METHOD_AVERAGE
+_MAX_SUBSAMPLES = 16
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class WarpException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.grid_warp`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _geometry(properties):
+    return tuple(float(properties.get(k, 0.)) for k in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot'))
+
+
+class Warp_mapping:
+    """
+    Mapping of destination grid indexes to fractional source grid indexes, interpolated from a control mesh
+    of exact transform locations in each destination tile. Meshes are calculated on first use of a tile.
+
+    :param transform:       function `transform(x, y)` that returns the source grid plane locations (x, y) of
+                            numpy arrays of destination grid plane locations. Locations that cannot be
+                            transformed are returned as `numpy.nan`. The default is the identity, for grids
+                            on the same plane. The transform is called when a tile mesh is built.
+    :param dst_properties:  destination grid properties dictionary, uses 'nx', 'ny', 'x0', 'y0', 'dx', 'dy'
+                            and 'rot'
+    :param src_properties:  source grid properties dictionary
+    :param tolerance:       maximum error of the interpolated mapping in source cells, default `TOLERANCE`.
+                            Use 0 to calculate the transform at every destination point.
+    :param mesh_step:       initial control mesh node separation in destination cells, default `MESH_STEP`
+    :param tile_size:       destination tile dimension in cells, default `TILE_SIZE`
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, transform, dst_properties, src_properties, tolerance=TOLERANCE, mesh_step=MESH_STEP,
+                 tile_size=TILE_SIZE):
+        self._transform = transform
+        self._dst = dict(dst_properties)
+        self._src = dict(src_properties)
+        self._tolerance = float(tolerance)
+        self._mesh_step = max(1, int(mesh_step))
+        self._tile_size = max(1, int(tile_size))
+        self._meshes = {}
+        self._lock = threading.Lock()
+        self._transformed = 0
+
+    def __repr__(self):
+        return '{}(tiles={}, transformed={})'.format(self.__class__.__name__, len(self._meshes), self._transformed)
+
+    @property
+    def tile_size(self):
+        """destination tile dimension in cells"""
+        return self._tile_size
+
+    @property
+    def transformed(self):
+        """number of locations passed to the transform"""
+        return self._transformed
+
+    def tiles(self):
+        """
+        Destination tile windows, see `geosoft.gxpy.grid_blend.tiles`.
+        """
+        return gxgrdblnd.tiles(int(self._dst['nx']), int(self._dst['ny']), self._tile_size)
+
+    def _source_index(self, ix, iy):
+        x, y = gxgrdsmp.xy_from_index(self._dst, ix, iy)
+        if self._transform is not None:
+            x, y = self._transform(x, y)
+        with self._lock:
+            self._transformed += np.size(x)
+        return gxgrdsmp.index_from_xy(self._src, x, y)
+
+    @staticmethod
+    def _mesh_interpolate(mesh, step, u, v):
+        """ bi-linear interpolation of a (ny, nx, 2) mesh at tile-relative fractional indexes"""
+
+        a = u / step
+        b = v / step
+        i = np.clip(np.floor(a).astype(np.int64), 0, mesh.shape[1] - 2)
+        j = np.clip(np.floor(b).astype(np.int64), 0, mesh.shape[0] - 2)
+        t = (a - i)[..., np.newaxis]
+        s = (b - j)[..., np.newaxis]
+        m = (mesh[j, i] * (1. - t) + mesh[j, i + 1] * t) * (1. - s) + \
+            (mesh[j + 1, i] * (1. - t) + mesh[j + 1, i + 1] * t) * s
+        return m[..., 0], m[..., 1]
+
+    def _build(self, tile):
+        tx0, ty0, tnx, tny = tile
+        step = self._mesh_step
+        while True:
+            kx = max(1, -(-(tnx - 1) // step))
+            ky = max(1, -(-(tny - 1) // step))
+            nodes_y, nodes_x = np.mgrid[0: ky + 1, 0: kx + 1] * step
+            mesh = np.stack(self._source_index(nodes_x + tx0, nodes_y + ty0), axis=-1)
+            if step == 1:
+                return step, mesh
+
+            # error at the mesh cell centres
+            cy, cx = (np.mgrid[0: ky, 0: kx] + 0.5) * step
+            fx, fy = self._source_index(cx + tx0, cy + ty0)
+            mx, my = self._mesh_interpolate(mesh, step, cx, cy)
+            error = np.hypot(mx - fx, my - fy)
+            if np.any(np.isnan(fx) != np.isnan(mx)):
+                error = np.inf
+            elif np.all(np.isnan(error)):
+                error = 0.
+            else:
+                error = np.nanmax(error)
+            if error <= self._tolerance:
+                return step, mesh
+            step = max(1, step // 2)
+
+    def mesh(self, tile):
+        """
+        Control mesh of a destination tile.
+
+        :param tile:    (ix0, iy0, nx, ny) destination tile window from `tiles`
+        :returns:       (step, mesh), where `mesh` is a numpy array shaped (my, mx, 2) of the fractional source
+                        (ix, iy) of the destination points at a separation of `step` cells from the tile origin.
+        """
+        tile = tuple(int(t) for t in tile)
+        m = self._meshes.get(tile)
+        if m is None:
+            m = self._build(tile)
+            self._meshes[tile] = m
+        return m
+
+    def index(self, tile, ix, iy):
+        """
+        Fractional source grid indexes of destination grid indexes in a tile.
+
+        :param tile:    (ix0, iy0, nx, ny) destination tile window from `tiles`
+        :param ix:      destination x grid indexes, numpy array, may be fractional
+        :param iy:      destination y grid indexes, numpy array, may be fractional
+        :returns:       (fx, fy) fractional source grid indexes, `numpy.nan` where there is no transform
+        """
+        step, mesh = self.mesh(tile)
+        return self._mesh_interpolate(mesh, step, np.asarray(ix, dtype=np.float64) - tile[0],
+                                      np.asarray(iy, dtype=np.float64) - tile[1])
+
+
+def mapping(dst_properties, src_properties, transform=None, key=None, tolerance=TOLERANCE, mesh_step=MESH_STEP,
+            tile_size=TILE_SIZE):
+    """
+    Return a `Warp_mapping` from the mapping cache, or a new mapping that is added to the cache.
+
+    :param dst_properties:  destination grid properties dictionary
+    :param src_properties:  source grid properties dictionary
+    :param transform:       destination to source location transform, see `Warp_mapping`. The default is the
+                            identity.
+    :param key:             hashable key that identifies the transform in the cache, for example the pair of
+                            coordinate system names. Mappings of a transform with no key are not cached
+                            unless `transform` is `None`.
+    :param tolerance:       maximum mapping error in source cells, default `TOLERANCE`
+    :param mesh_step:       initial control mesh node separation in destination cells, default `MESH_STEP`
+    :param tile_size:       destination tile dimension in cells, default `TILE_SIZE`
+    :returns:               `Warp_mapping` instance
+
+    .. versionadded:: 9.6
+    """
+
+    if transform is None and key is None:
+        key = 'identity'
+    if key is None:
+        return Warp_mapping(transform, dst_properties, src_properties, tolerance, mesh_step, tile_size)
+
+    cache_key = (key, _geometry(dst_properties), _geometry(src_properties), float(tolerance), int(mesh_step),
+                 int(tile_size))
+    with _cache_lock:
+        m = _cache.get(cache_key)
+        if m is not None:
+            _cache.move_to_end(cache_key)
+            return m
+        m = Warp_mapping(transform, dst_properties, src_properties, tolerance, mesh_step, tile_size)
+        _cache[cache_key] = m
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+        return m
+
+
+def clear_cache():
+    """
+    Release all cached mappings.
+
+    .. versionadded:: 9.6
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def warp_properties(src_properties, transform=None, cell_size=None, edge_points=64):
+    """
+    Destination grid properties that cover a source grid after a transform.
+
+    :param src_properties:  source grid properties dictionary
+    :param transform:       function `transform(x, y)` that returns destination locations of source grid plane
+                            locations (the inverse of a warp transform). The default is the identity.
+    :param cell_size:       destination cell size. The default preserves the area of the source cells.
+    :param edge_points:     number of locations transformed along each edge of the source grid, default 64
+    :returns:               properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'. The
+                            destination is not rotated, and its cell edges cover the transformed source cells.
+
+    .. versionadded:: 9.6
+    """
+
+    nx = src_properties['nx']
+    ny = src_properties['ny']
+    t = np.linspace(0., 1., max(2, int(edge_points)), endpoint=False)
+    ix = np.concatenate((t * nx, np.full(t.shape, nx), (1. - t) * nx, np.zeros(t.shape))) - 0.5
+    iy = np.concatenate((np.zeros(t.shape), t * ny, np.full(t.shape, ny), (1. - t) * ny)) - 0.5
+    x, y = gxgrdsmp.xy_from_index(src_properties, ix, iy)
+    if transform is not None:
+        x, y = transform(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.any():
+        raise WarpException(_t('The grid cannot be transformed.'))
+    x = x[valid]
+    y = y[valid]
+
+    if cell_size is None:
+        area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+        cell_size = math.sqrt(area / (nx * ny))
+    if not cell_size > 0.:
+        raise WarpException(_t('Invalid cell size {}').format(cell_size))
+
+    dnx = max(1, int(math.ceil((x.max() - x.min()) / cell_size - 1.0e-9)))
+    dny = max(1, int(math.ceil((y.max() - y.min()) / cell_size - 1.0e-9)))
+    return {'nx': dnx,
+            'ny': dny,
+            'x0': float(x.min() + 0.5 * cell_size),
+            'y0': float(y.min() + 0.5 * cell_size),
+            'dx': float(cell_size),
+            'dy': float(cell_size),
+            'rot': 0.}
+
+
+def _source_window(fx, fy, nx, ny, pad):
+    """ source window that covers fractional indexes, or None if no index is inside the source grid"""
+
+    inside = (fx >= -0.5 - pad) & (fx <= nx - 0.5 + pad) & (fy >= -0.5 - pad) & (fy <= ny - 0.5 + pad)
+    if not inside.any():
+        return None
+    x0 = max(int(math.floor(np.nanmin(fx[inside]))) - pad, 0)
+    y0 = max(int(math.floor(np.nanmin(fy[inside]))) - pad, 0)
+    x1 = min(int(math.ceil(np.nanmax(fx[inside]))) + pad + 1, nx)
+    y1 = min(int(math.ceil(np.nanmax(fy[inside]))) + pad + 1, ny)
+    if (x1 <= x0) or (y1 <= y0):
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _subsamples(mesh, step):
+    """ sub-samples along each axis to cover the source cells in a destination cell"""
+
+    du = np.abs(np.diff(mesh, axis=1)) / step
+    dv = np.abs(np.diff(mesh, axis=0)) / step
+    extent = du[:-1] + dv[:, :-1]
+    if np.all(np.isnan(extent)):
+        return 1
+    extent = np.nanmax(extent)
+    return int(min(_MAX_SUBSAMPLES, max(1, math.ceil(extent - 1.0e-9))))
+
+
+def _tile_source(warp_map, read, tile, src_nx, src_ny, method):
+    """
+    Source indexes of the points of a destination tile, and the source window and data that cover them.
+    The control mesh is built and the source is read by the caller, so that the transform and `read` are
+    only called on the calling thread.
+    """
+
+    tx0, ty0, tnx, tny = tile
+    iy, ix = np.mgrid[ty0: ty0 + tny, tx0: tx0 + tnx].astype(np.float64)
+    if method == METHOD_AVERAGE:
+        index = None
+        corners = [warp_map.index(tile, ix + ox, iy + oy) for ox in (-0.5, 0.5) for oy in (-0.5, 0.5)]
+        window = _source_window(np.concatenate([c[0] for c in corners]),
+                                np.concatenate([c[1] for c in corners]), src_nx, src_ny, 1)
+    else:
+        index = warp_map.index(tile, ix, iy)
+        window = _source_window(index[0], index[1], src_nx, src_ny, 2)
+    if window is None:
+        return index, None, None
+    return index, window, read(window)
+
+
+def _warp_tile(warp_map, tile, index, window, data, method, is_color):
+    tx0, ty0, tnx, tny = tile
+    if is_color:
+        result = np.full((tny, tnx), gxgrdsmp._COLOR_DUMMY, dtype=np.int32)
+    else:
+        result = np.full((tny, tnx), np.nan)
+    if window is None:
+        return result
+
+    wx0, wy0, wnx, wny = window
+
+    def gather(jx, jy):
+        return data[jy, jx]
+
+    if method != METHOD_AVERAGE:
+        fx, fy = index
+        return gxgrdsmp.interpolate(gather, fx - wx0, fy - wy0, wnx, wny, method=method, is_color=is_color,
+                                    threads=1)
+
+    step, mesh = warp_map.mesh(tile)
+    n = _subsamples(mesh, step)
+    offsets = (np.arange(n) + 0.5) / n - 0.5
+    iy, ix = np.mgrid[ty0: ty0 + tny, tx0: tx0 + tnx].astype(np.float64)
+    total = np.zeros((tny, tnx))
+    count = np.zeros((tny, tnx))
+    for oy in offsets:
+        for ox in offsets:
+            fx, fy = warp_map.index(tile, ix + ox, iy + oy)
+            v = gxgrdsmp.interpolate(gather, fx - wx0, fy - wy0, wnx, wny, method=METHOD_NEAREST, threads=1)
+            valid = ~np.isnan(v)
+            total[valid] += v[valid]
+            count[valid] += 1.
+    has_data = count > 0.
+    result[has_data] = total[has_data] / count[has_data]
+    return result
+
+
+def warp_tiles(source, src_properties, dst_properties, transform=None, key=None, method=METHOD_LINEAR,
+               tolerance=TOLERANCE, mesh_step=MESH_STEP, tile_size=TILE_SIZE, is_color=False, threads=None):
+    """
+    Warp a source grid to destination grid tiles.
+
+    :param source:          source grid values as a numpy array shaped (ny, nx) with dummies as `numpy.nan`, or
+                            int32 color values for color grids, or a function `read(window)` that returns such
+                            an array for an (ix0, iy0, nx, ny) source window. Only the part of the source that
+                            covers each tile is read, on the calling thread.
+    :param src_properties:  source grid properties dictionary, uses 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'
+    :param dst_properties:  destination grid properties dictionary
+    :param transform:       function `transform(x, y)` that returns source grid plane locations of destination
+                            grid plane locations, see `Warp_mapping`. The default is the identity.
+    :param key:             hashable key that identifies the transform in the mapping cache, see `mapping`
+    :param method:          `METHOD_NEAREST`, `METHOD_LINEAR` (default), `METHOD_CUBIC` or `METHOD_AVERAGE`.
+                            Color grids are always resampled by `METHOD_NEAREST`.
+    :param tolerance:       maximum mapping error in source cells, default `TOLERANCE`
+    :param mesh_step:       initial control mesh node separation in destination cells, default `MESH_STEP`
+    :param tile_size:       destination tile dimension in cells, default `TILE_SIZE`
+    :param is_color:        `True` for a color grid
+    :param threads:         maximum number of threads, default is the number of processors
+    :returns:               iterator of (tile, data) in row order from the destination origin, where `tile`
+                            is an (ix0, iy0, nx, ny) destination window and `data` is the tile values. Points
+                            that do not map to the source grid are dummy.
+
+    The control mesh of each tile is built and the source window is read on the calling thread, so the
+    transform and `read` may call the Geosoft runtime. Tiles are resampled on worker threads.
+
+    .. versionadded:: 9.6
+    """
+
+    if method not in (METHOD_NEAREST, METHOD_LINEAR, METHOD_CUBIC, METHOD_AVERAGE):
+        raise WarpException(_t('Unknown warp method {}').format(method))
+    if is_color:
+        method = METHOD_NEAREST
+
+    if isinstance(source, np.ndarray):
+        data = source
+
+        def read(window):
+            x0, y0, nx, ny = window
+            return data[y0: y0 + ny, x0: x0 + nx]
+    else:
+        read = source
+
+    warp_map = mapping(dst_properties, src_properties, transform, key, tolerance, mesh_step, tile_size)
+    src_nx = int(src_properties['nx'])
+    src_ny = int(src_properties['ny'])
+
+    def source(tile):
+        return _tile_source(warp_map, read, tile, src_nx, src_ny, method)
+
+    def tile_data(tile, index, window, data):
+        return tile, _warp_tile(warp_map, tile, index, window, data, method, is_color)
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = max(1, threads)
+    if threads == 1:
+        for tile in warp_map.tiles():
+            yield tile_data(tile, *source(tile))
+        return
+
+    # meshes and source windows are prepared on this thread, workers only resample
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for tile in warp_map.tiles():
+            pending.append(pool.submit(tile_data, tile, *source(tile)))
+            if len(pending) > threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def warp(source, src_properties, dst_properties, transform=None, key=None, method=METHOD_LINEAR,
+         tolerance=TOLERANCE, mesh_step=MESH_STEP, tile_size=TILE_SIZE, is_color=False, threads=None):
+    """
+    Warp a source grid to a destination grid.
+
+    The parameters are as for `warp_tiles`.
+
+    :returns:   numpy array of destination values shaped (ny, nx), float64 with dummies as `numpy.nan`, or
+                int32 for color grids.
+
+    .. code::
+
+        import numpy as np
+        import geosoft.gxpy.grid_warp as gxwarp
+
+        data = np.random.rand(100, 200)
+        src = {'nx': 200, 'ny': 100, 'x0': 0., 'y0': 0., 'dx': 1., 'dy': 1., 'rot': 0.}
+
+        # rotate the grid 30 degrees onto a cell twice the size
+        dst = gxwarp.warp_properties(src, cell_size=2., transform=lambda x, y: (x * 0.866 + y * 0.5,
+                                                                              y * 0.866 - x * 0.5))
+        rotated = gxwarp.warp(data, src, dst, method=gxwarp.METHOD_AVERAGE, key='rotate 30',
+                              transform=lambda x, y: (x * 0.866 - y * 0.5, y * 0.866 + x * 0.5))
+
+    .. versionadded:: 9.6
+    """
+
+    dnx = int(dst_properties['nx'])
+    dny = int(dst_properties['ny'])
+    if is_color:
+        result = np.empty((dny, dnx), dtype=np.int32)
+    else:
+        result = np.empty((dny, dnx))
+    for (x0, y0, nx, ny), data in warp_tiles(source, src_properties, dst_properties, transform=transform, key=key,
+                                             method=method, tolerance=tolerance, mesh_step=mesh_step,
+                                             tile_size=tile_size, is_color=is_color, threads=threads):
+        result[y0: y0 + ny, x0: x0 + nx] = data
+    return result
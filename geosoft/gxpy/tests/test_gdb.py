@@ -207,6 +207,50 @@ class Test(GXPYTest):
             self.assertEqual(va.fid, (-10.0, 2.5))
             gdb.delete_channel('test_chan_va')
 
+    def test_lazy_va(self):
+        self.start()
+
+        with gxdb.Geosoft_gdb.open(self.gdb_name) as gdb:
+            try:
+                data = np.arange(600, dtype=np.float64).reshape((50, 12))
+                data[7, :] = np.nan
+                data[9, 4] = np.nan
+                gdb.write_channel('T46', 'lazy_va', data, fid=(-10, 2.5))
+
+                va = gdb.lazy_va('T46', 'lazy_va')
+                self.assertEqual(va.shape, (50, 12))
+                self.assertEqual(va.fid, (-10.0, 2.5))
+                self.assertEqual(len(va), 50)
+
+                block = va[10:20, 3:6]
+                self.assertEqual(block.shape, (10, 3))
+                self.assertEqual(block.tolist(), data[10:20, 3:6].tolist())
+                self.assertEqual(va[5, 2], data[5, 2])
+                self.assertEqual(va[5].tolist(), data[5].tolist())
+                self.assertEqual(va[:, 11].tolist(), data[:, 11].tolist())
+                self.assertEqual(va[40::3, [0, 5]].tolist(), data[40::3, [0, 5]].tolist())
+                self.assertEqual(va[::-4, 1].tolist(), data[::-4, 1].tolist())
+                self.assertTrue(np.isnan(va[7, 0]))
+
+                ws = va.window_sum(2, 5, rows=8)
+                self.assertEqual(ws.shape, (50,))
+                self.assertTrue(np.isnan(ws[7]))
+                self.assertEqual(ws[9], np.nansum(data[9, 2:7]))
+                self.assertEqual(ws[49], np.sum(data[49, 2:7]))
+
+                am = va.argmax(rows=7)
+                self.assertEqual(am[7], -1)
+                self.assertEqual(am[0], 11)
+                self.assertEqual(va.argmax(3, 4)[20], 6)
+
+                chunks = list(va.iter_chunks(rows=16, start_col=10))
+                self.assertEqual(len(chunks), 4)
+                self.assertEqual(chunks[-1][0], 48)
+                self.assertEqual(chunks[-1][1].shape, (2, 2))
+
+            finally:
+                gdb.delete_channel('lazy_va')
+
     def test_group_VA_read_write(self):
         self.start()
 
@@ -1,5 +1,6 @@
 import unittest
 import os
+import warnings
 import numpy as np
 
 import geosoft
@@ -8,6 +9,10 @@ import geosoft.gxpy.gx as gx
 import geosoft.gxpy.system as gsys
 import geosoft.gxpy.coordinate_system as gxcs
 import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_geotiff as gxgrdtif
+import geosoft.gxpy.grid_local as gxgrdlcl
+import geosoft.gxpy.grid_overview as gxgrdovr
+import geosoft.gxpy.grid_sample as gxgrdsmp
 import geosoft.gxpy.map as gxmap
 import geosoft.gxpy.gdb as gxgdb
 
@@ -69,6 +74,20 @@ class Test(GXPYTest):
             self.assertAlmostEqual(stats['mean'], 997.2176063303659)
             self.assertEqual(stats['num_data'] + stats['num_dummy'], g1.nx * g1.ny)
 
+            gxst_stats = g1.statistics(gxst=gxa.GXST.create())
+            for k in ('min', 'max', 'mean', 'sd', 'sum', 'num_data', 'num_dummy'):
+                self.assertAlmostEqual(stats[k] / gxst_stats[k], 1.)
+
+            data = g1.np(dtype=np.float64)
+            stats = g1.statistics(percentiles=(1, 25, 75, 99), bins=10, rows=7, threads=3)
+            self.assertAlmostEqual(stats['mean'], 997.2176063303659)
+            self.assertEqual(stats['median'], np.nanmedian(data))
+            for q, v in zip((1, 25, 75, 99), np.nanpercentile(data, (1, 25, 75, 99))):
+                self.assertAlmostEqual(stats['percentiles'][q], v)
+            counts, edges = stats['histogram']
+            self.assertTrue(np.array_equal(counts, np.histogram(data[~np.isnan(data)], 10,
+                                                                range=(stats['min'], stats['max']))[0]))
+
     def test_copy(self):
         self.start()
 
@@ -326,10 +345,64 @@ class Test(GXPYTest):
             with gxgrd.Grid.index_window(g, window, 4, 2, 96, 5, overwrite=True) as gw:
                 gw.delete_files()
                 ex = gw.extent_2d()
-                self.assertAlmostEqual(ex[0], 6.9513424466727765)
-                self.assertAlmostEqual(ex[1], 43.81649172360945)
-                self.assertAlmostEqual(ex[2], 7.905440298447842)
-                self.assertAlmostEqual(ex[3], 44.032434361820314)
+                self.assertAlmostEqual(ex[0], 7.0370729940204315)
+                self.assertAlmostEqual(ex[1], 43.84199217951659)
+                self.assertAlmostEqual(ex[2], 7.991170845795498)
+                self.assertAlmostEqual(ex[3], 44.05793481772746)
+                self.assertEqual(gw.xy_from_index(0, 0), g.xy_from_index(4, 2))
+
+    def test_index_window_view(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np()
+            with gxgrd.Grid.index_window(g, x0=4, y0=2, nx=96, ny=5, view=True) as gw:
+                self.assertTrue(isinstance(gw, gxgrd.Grid_window))
+                self.assertEqual(gw.window, (4, 2, 96, 5))
+                self.assertEqual((gw.nx, gw.ny), (96, 5))
+                self.assertAlmostEqual(gw.x0, g.x0 + (4 * g.dx))
+                self.assertAlmostEqual(gw.y0, g.y0 + (2 * g.dy))
+                self.assertEqual(gw.properties()['nx'], 96)
+                self.assertTrue(np.allclose(gw.extent_2d(), (7.035, 44.015, 7.995, 44.065)))
+                self.assertTrue(np.array_equal(gw.np(), data[2:7, 4:100], equal_nan=True))
+                self.assertTrue(np.array_equal(gw.np(window=(1, 1, 3, 2)), data[3:5, 5:8], equal_nan=True))
+                self.assertRaises(gxgrd.GridException, gw.np, window=(90, 0, 10, 1))
+
+                stats = gw.statistics()
+                self.assertEqual(stats['num_data'] + stats['num_dummy'], 96 * 5)
+                self.assertAlmostEqual(stats['mean'], np.nanmean(data[2:7, 4:100]))
+
+                iy0, block, x, y, z = next(gw.iter_blocks(rows=2))
+                self.assertEqual(block.shape, (2, 96))
+                self.assertAlmostEqual(x[0, 0], gw.x0)
+                self.assertAlmostEqual(y[1, 0], gw.y0 + g.dy)
+
+                x, y = gw.xy_from_index(np.array([0., 10.5]), np.array([0., 3.25]))
+                self.assertTrue(np.allclose(gw.sample(x, y), g._interpolate(*g.index_from_xy(x, y)),
+                                            equal_nan=True))
+                self.assertEqual(gw.get_value(*g.xy_from_index(2, 2)), None)
+                self.assertEqual(gw.get_value(*g.xy_from_index(6, 3)), g.get_value(*g.xy_from_index(6, 3)))
+
+                # windows of windows share the grid
+                ww = gxgrd.Grid.index_window(gw, x0=10, y0=1, nx=5, ny=3, view=True)
+                self.assertTrue(ww.grid is g)
+                self.assertEqual(ww.window, (14, 3, 5, 3))
+                self.assertRaises(gxgrd.GridException, gxgrd.Grid.index_window, gw, x0=95, nx=2, view=True)
+
+                window = os.path.join(self.folder, 'testwindow.grd(GRD)')
+                with gw.to_grid(window, overwrite=True) as gg:
+                    gg.delete_files()
+                    self.assertTrue(np.allclose(gg.extent_2d(), gw.extent_2d()))
+                    self.assertTrue(np.array_equal(gg.np(), gw.np(), equal_nan=True))
+
+            g.rot = 10.0
+            gw = gxgrd.Grid.index_window(g, x0=4, y0=2, nx=96, ny=5, view=True)
+            x, y = g.xy_from_index(4, 2)
+            self.assertAlmostEqual(gw.x0, x)
+            self.assertAlmostEqual(gw.y0, y)
+            ex = gw.extent_2d()
+            self.assertAlmostEqual(ex[0], 7.0370729940204315)
+            self.assertAlmostEqual(ex[3], 44.05793481772746)
 
     def test_from_array(self):
         self.start()
@@ -387,6 +460,31 @@ class Test(GXPYTest):
             self.assertEqual(a[0,0,1], -25.25)
             self.assertEqual(a[0,0,2], 0.0)
             self.assertTrue(np.isnan(a[0, 0, 3]))
+
+    def test_xyzv(self):
+        self.start()
+
+        props = {'x0': 100, 'y0': -25.25, 'dx': 5, 'nx': 101, 'ny': 51, 'rot': 10, 'dtype': np.int32}
+        with gxgrd.Grid.new(properties=props) as g:
+            g.write_rows(np.arange(101 * 51, dtype=np.int32).reshape((51, 101)))
+            xyzv = g.xyzv()
+            self.assertTrue(isinstance(xyzv, gxgrd.Grid_xyzv))
+            self.assertEqual(xyzv.values.dtype, np.int32)
+            data = np.asarray(xyzv)
+            self.assertEqual(data.shape, (51, 101, 4))
+            self.assertEqual(data.dtype, np.float64)
+            self.assertTrue(np.array_equal(data[:, :, 3], xyzv.values))
+            self.assertTrue(np.array_equal(xyzv.reshape(-1, 4), data.reshape(-1, 4)))
+
+            rows = 0
+            for iy0, block in xyzv.chunks(rows=20):
+                self.assertTrue(np.array_equal(block, data[iy0: iy0 + block.shape[0]]))
+                rows += block.shape[0]
+            self.assertEqual(rows, 51)
+
+            for item in ((7,), (slice(3, 9), 4), (Ellipsis, 1), (slice(None, None, -3), slice(2, 50, 5), slice(1, 3)),
+                         (-1, -1, -1), (5, 6, 0)):
+                self.assertTrue(np.array_equal(xyzv[item], data[item]))
             self.assertEqual(a[0,1,0]-a[0,0,0], g.dx)
             self.assertEqual(a[1,0,1]-a[0,0,1], g.dy)
             self.assertEqual(a[0,0,2]-a[1,1,2], 0.)
@@ -677,6 +775,177 @@ class Test(GXPYTest):
             self.assertEqual(col_2[2], 102)
             self.assertEqual(col_2[3], 255)
 
+    def test_np_window(self):
+        self.start()
+
+        for mode in (gxgrd.FILE_READ, gxgrd.FILE_READWRITE):
+            with gxgrd.Grid.open(self.g1f, mode=mode) as g1:
+                data = g1.np()
+                window = g1.np(window=(10, 20, 30, 40))
+                self.assertEqual(window.shape, (40, 30))
+                self.assertTrue(np.array_equal(window, data[20:60, 10:40], equal_nan=True))
+                self.assertTrue(np.array_equal(g1.np(window=(5, 10, 60, 8)), data[10:18, 5:65], equal_nan=True))
+
+                out = np.zeros((101, 101), dtype=np.float64)
+                self.assertTrue(g1.np(out=out) is out)
+                self.assertTrue(np.array_equal(out, data, equal_nan=True))
+
+                self.assertRaises(gxgrd.GridException, g1.np, window=(90, 0, 20, 10))
+                self.assertRaises(gxgrd.GridException, g1.np, out=np.zeros((10, 10)))
+
+                xyzv = g1.xyzv()
+                self.assertTrue(np.array_equal(xyzv[:, :, 3], data, equal_nan=True))
+
+        with gxgrd.Grid.open(self.gcf, mode=gxgrd.FILE_READWRITE) as gc:
+            data = gc.np()
+            window = gc.np(window=(100, 50, 20, 60))
+            self.assertEqual(window.shape, (60, 20, 4))
+            self.assertTrue(np.array_equal(window, data[50:110, 100:120]))
+
+    def test_iter_blocks(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g1:
+            data = g1.np()
+            rows = 0
+            for iy0, block in g1.iter_blocks(rows=30, with_coords=False):
+                self.assertEqual(iy0, rows)
+                self.assertTrue(np.array_equal(block, data[iy0: iy0 + block.shape[0]], equal_nan=True))
+                rows += block.shape[0]
+            self.assertEqual(rows, g1.ny)
+            self.assertEqual(10081870.0, sum([np.nansum(b[1]) for b in g1.iter_blocks(with_coords=False)]))
+
+        props = {'x0': 100, 'y0': -25.25, 'dx': 5, 'nx': 101, 'ny': 51, 'rot': 10}
+        with gxgrd.Grid.new(properties=props) as g:
+            xyzv = g.xyzv()
+            for iy0, block, x, y, z in g.iter_blocks(rows=7):
+                ny = block.shape[0]
+                self.assertEqual(x.shape, block.shape)
+                self.assertTrue(np.allclose(x, xyzv[iy0: iy0 + ny, :, 0]))
+                self.assertTrue(np.allclose(y, xyzv[iy0: iy0 + ny, :, 1]))
+                self.assertTrue(np.allclose(z, xyzv[iy0: iy0 + ny, :, 2]))
+
+    def test_overviews(self):
+        self.start()
+
+        grid_file = os.path.join(self.folder, 'overviews.grd')
+        with gxgrd.Grid.open(self.mag) as g:
+            gxgrd.Grid.copy(g, grid_file + '(GRD)', overwrite=True).close()
+
+        # without overviews the grid is decimated as it is read
+        for mode in (gxgrd.FILE_READ, gxgrd.FILE_READWRITE):
+            with gxgrd.Grid.open(grid_file, mode=mode) as g:
+                data = g.np(dtype=np.float64)
+                preview, properties = g.preview(pix_width=g.nx // 5, dtype=np.float64)
+                self.assertEqual(properties['dx'], g.dx * 4)
+                self.assertTrue(np.array_equal(preview, data[::4, ::4], equal_nan=True))
+
+        with gxgrd.Grid.open(grid_file) as g:
+            data = g.np(dtype=np.float64)
+            self.assertEqual(g.overviews, [])
+            files = g.build_overviews(rows=5, threads=3)
+            self.assertEqual(len(files), gxgrdovr.default_levels(g.nx, g.ny))
+            self.assertEqual([f for _, f in g.overviews], files)
+            expected = gxgrdovr.reduce(data, len(files))
+
+            for level, ovr_file in enumerate(files, 1):
+                with gxgrd.Grid.open(ovr_file) as ovr:
+                    self.assertEqual((ovr.nx, ovr.ny), expected[level - 1].shape[::-1])
+                    self.assertAlmostEqual(ovr.dx, g.dx * 2 ** level)
+                    self.assertTrue(np.allclose(ovr.np(dtype=np.float64), expected[level - 1],
+                                                equal_nan=True, rtol=1e-6))
+
+            preview, properties = g.preview(pix_width=g.nx // 3)
+            self.assertEqual(properties['dx'], g.dx * 2)
+            self.assertEqual(preview.shape, expected[0].shape)
+
+            g.build_overviews(levels=2, method='nearest')
+            with gxgrd.Grid.open(files[1]) as ovr:
+                self.assertTrue(np.array_equal(ovr.np(dtype=np.float64), data[::4, ::4], equal_nan=True))
+
+            self.assertRaises(gxgrd.GridException, g.build_overviews, 2, 'max')
+
+        image = gxgrd.image_file(grid_file, pix_width=100)
+        self.assertTrue(os.path.exists(image))
+
+        gxgrd.delete_files(grid_file)
+        self.assertFalse(os.path.exists(files[0]))
+
+    def test_to_geotiff(self):
+        self.start()
+
+        tif = os.path.join(self.folder, 'mag.tif')
+        with gxgrd.Grid.open(self.mag) as g:
+            data = g.np(dtype=np.float64)
+            g.to_geotiff(tif, tile_size=64, threads=2, overwrite=True)
+            rt, properties = gxgrdtif.read(tif, dtype=np.float64)
+            self.assertTrue(np.allclose(rt, data, equal_nan=True))
+            for k in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot'):
+                self.assertAlmostEqual(properties[k], g.properties()[k])
+            self.assertEqual(len(gxgrdtif.read_header(tif)),
+                             gxgrdtif.default_overviews(g.nx, g.ny, 64) + 1)
+            if g.coordinate_system.is_known:
+                self.assertEqual(properties['coordinate_system'], g.coordinate_system.esri_wkt)
+
+            self.assertRaises(gxgrd.GridException, g.to_geotiff, tif)
+            g.to_geotiff(tif, epsg=4326, overviews=0, overwrite=True)
+            self.assertEqual(gxgrdtif.properties(tif)['coordinate_system'], 'EPSG:4326')
+
+    def test_tile_cache(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np(dtype=np.float64)
+            g.tile_cache = gxgrd.Tile_cache(g, tile_size=16, memory_mb=0.01)
+            for ix, iy in ((0, 0), (100, 100), (17, 33), (50, 5)):
+                x, y, z, v = g[ix, iy]
+                if np.isnan(data[iy, ix]):
+                    self.assertTrue(v is None)
+                else:
+                    self.assertEqual(v, data[iy, ix])
+            self.assertTrue(np.array_equal(g.tile_cache.values([3, 99, 40], [7, 2, 88]),
+                                           data[[7, 2, 88], [3, 99, 40]], equal_nan=True))
+
+            for i in range(g.nx):
+                for fy in (50.5, 0., g.ny - 1.):
+                    x, y = g.xy_from_index(i + 0.25, fy)
+                    gv = g.gximg.get_z(x, y)
+                    v = g.get_value(x, y)
+                    if gv == gxa.rDUMMY:
+                        self.assertTrue(v is None)
+                    else:
+                        self.assertAlmostEqual(v, gv, 3)
+            stats = g.tile_cache.statistics
+            self.assertTrue(stats['prefetched'] > 0)
+            self.assertTrue(stats['evicted'] > 0)
+            self.assertTrue(stats['bytes'] <= stats['max_bytes'])
+            self.assertEqual(g.get_value(g.x0 - g.dx, g.y0), None)
+
+            # outside the grid points and next to dummies are None, as from GXIMG.get_z
+            self.assertEqual(g.get_value(*g.xy_from_index(-0.25, 10.)), None)
+            self.assertEqual(g.get_value(*g.xy_from_index(g.nx - 0.75, 10.)), None)
+            iy, ix = np.argwhere(np.isnan(data[1:-1, 1:-1]))[0] + 1
+            self.assertEqual(g.get_value(*g.xy_from_index(ix + 0.5, iy)), None)
+            self.assertEqual(g.get_value(*g.xy_from_index(ix - 0.5, iy + 0.5)), None)
+
+            ix, iy = g.index_from_xy(*g.xy_from_index(12.5, 40.))
+            self.assertAlmostEqual(ix, 12.5)
+            self.assertAlmostEqual(iy, 40.)
+
+        # grids read through the pager load tiles on the calling thread, also beyond the cache budget
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np(dtype=np.float64)
+            fx = np.random.RandomState(3).uniform(0., g.nx - 1., 3000)
+            fy = np.random.RandomState(4).uniform(0., g.ny - 1., 3000)
+            with gxgrd.Grid.copy(g, in_memory=True) as gm:
+                for memory_mb in (64, 0.01):
+                    gm.tile_cache = gxgrd.Tile_cache(gm, tile_size=16, memory_mb=memory_mb)
+                    values = gm._interpolate(fx, fy, method=gxgrdsmp.SAMPLE_CUBIC, chunk_size=100, threads=4)
+                    self.assertTrue(np.array_equal(values, gxgrdsmp.interpolate(
+                        lambda ix, iy: data[iy, ix], fx, fy, g.nx, g.ny, method=gxgrdsmp.SAMPLE_CUBIC,
+                        threads=1), equal_nan=True))
+                self.assertTrue(gm.tile_cache.statistics['evicted'] > 0)
+
     def test_image_file(self):
         self.start()
 
@@ -858,6 +1127,62 @@ class Test(GXPYTest):
             self.assertEqual((grd.nx, grd.ny), (199, 127))
             self.assertAlmostEqual(grd.statistics()['sd'], 23.4893997876449, 5)
 
+        # numpy gridder, solved until the estimated correction is below tol, so the grids are more converged
+        with gxgrd.Grid.minimum_curvature(xyv, rangrid=False) as grd:
+            self.assertEqual((grd.nx, grd.ny), (9, 9))
+            self.assertAlmostEqual(grd.statistics()['sd'], 17.826810, 3)
+
+        with gxgrd.Grid.minimum_curvature(feed_data, cs=1., rangrid=False) as grd:
+            self.assertEqual((grd.nx, grd.ny), (48, 30))
+            self.assertAlmostEqual(grd.statistics()['sd'], 31.106254, 3)
+
+        with gxgrd.Grid.minimum_curvature(feed_data, cs=0.25, bkd=20, rangrid=False) as grd:
+            self.assertEqual((grd.nx, grd.ny), (189, 117))
+            self.assertAlmostEqual(grd.statistics()['sd'], 29.144911, 3)
+
+        with gdb_from_callback(feed_data) as gdb:
+            gxgdb.Channel(gdb, 'v').unit_of_measure = 'maki'
+            with gxgrd.Grid.minimum_curvature((gdb, 'v'), cs=0.25, bkd=20, rangrid=False) as grd:
+                self.assertEqual((grd.nx, grd.ny), (189, 117))
+                self.assertAlmostEqual(grd.statistics()['sd'], 29.144911, 3)
+                self.assertEqual(grd.unit_of_measure, 'maki')
+
+        with gxgrd.Grid.minimum_curvature(feed_data, cs=0.25, bkd=500, edgclp=5, rangrid=False) as grd:
+            self.assertEqual((grd.nx, grd.ny), (199, 127))
+            self.assertAlmostEqual(grd.statistics()['sd'], 31.147676, 3)
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            gxgrd.Grid.minimum_curvature(xyv, max_segments=10).close()
+            self.assertTrue(issubclass(w[-1].category, DeprecationWarning))
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            gxgrd.Grid.minimum_curvature(xyv, max_segments=10, rangrid=False).close()
+            self.assertTrue(issubclass(w[-1].category, DeprecationWarning))
+
+    def test_local_gridding(self):
+        self.start()
+
+        xyv = np.array([(0., 0., 1.), (10., 0., 2.), (0., 10., 3.), (10., 10., 4.), (5., 5., np.nan)])
+        with gxgrd.Grid.local_gridding(xyv, cs=1., bkd=0) as grd:
+            self.assertEqual((grd.nx, grd.ny), (11, 11))
+            data = grd.np()
+            self.assertEqual([data[0, 0], data[0, 10], data[10, 0], data[10, 10]], [1., 2., 3., 4.])
+            self.assertAlmostEqual(data[5, 5], 2.5, 5)
+
+        with gxgdb.Geosoft_gdb.new() as gdb:
+            gdb.write_line('L0', xyv[:3], channels=('x', 'y', 'v'))
+            gdb.write_line('L1', xyv[3:], channels=('x', 'y', 'v'))
+            gdb.xyz_channels = ('x', 'y')
+            gxgdb.Channel(gdb, 'v').unit_of_measure = 'nT'
+            for method in (gxgrdlcl.METHOD_IDW, gxgrdlcl.METHOD_NEAREST, gxgrdlcl.METHOD_NATURAL):
+                with gxgrd.Grid.local_gridding((gdb, 'v'), method=method, cs=1., bkd=0) as grd:
+                    self.assertEqual(grd.unit_of_measure, 'nT')
+                    self.assertEqual(grd.np()[10, 10], 4.)
+
+        self.assertRaises(gxgrd.GridException, gxgrd.Grid.local_gridding, xyv, method='kriging')
+
     def test_mask(self):
         self.start()
 
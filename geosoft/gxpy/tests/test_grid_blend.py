@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_blend as gxgrdblnd
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.props = {'x0': 100., 'y0': 200., 'dx': 10., 'dy': 10., 'rot': 0., 'nx': 50, 'ny': 40}
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdblnd.__version__, geosoft.__version__)
+
+    def test_mosaic_properties(self):
+        self.start()
+
+        other = dict(self.props, x0=580., y0=100., nx=20, ny=20)
+        p = gxgrdblnd.mosaic_properties(self.props, [self.props, other])
+        self.assertEqual(p['x0'], 100.)
+        self.assertEqual(p['y0'], 100.)
+        self.assertEqual(p['nx'], 68)
+        self.assertEqual(p['ny'], 50)
+        self.assertEqual(gxgrdblnd.aligned_offset(p, self.props), (0, -10))
+        self.assertEqual(gxgrdblnd.aligned_offset(p, other), (-48, 0))
+
+        # off-lattice grids extend the mosaic to the enclosing mosaic points
+        other = dict(other, x0=583., dx=7.)
+        p = gxgrdblnd.mosaic_properties(self.props, [self.props, other])
+        self.assertEqual(p['nx'], 63)
+        self.assertTrue(gxgrdblnd.aligned_offset(p, other) is None)
+
+        # rotated frame
+        rotated = dict(self.props, rot=30.)
+        p = gxgrdblnd.mosaic_properties(rotated, [rotated])
+        self.assertAlmostEqual(p['x0'], 100.)
+        self.assertAlmostEqual(p['y0'], 200.)
+        self.assertEqual((p['nx'], p['ny']), (50, 40))
+
+        self.assertRaises(gxgrdblnd.BlendException, gxgrdblnd.mosaic_properties, self.props, [])
+
+    def test_tiles(self):
+        self.start()
+
+        tiles = list(gxgrdblnd.tiles(10, 7, 4))
+        self.assertEqual(len(tiles), 6)
+        self.assertEqual(tiles[0], (0, 0, 4, 4))
+        self.assertEqual(tiles[-1], (8, 4, 2, 3))
+        self.assertEqual(sum(t[2] * t[3] for t in tiles), 70)
+
+    def test_blend(self):
+        self.start()
+
+        a = np.array([[1., 2.], [np.nan, 4.]])
+        b = np.array([[3., np.nan], [np.nan, 8.]])
+        c = np.array([[5., 6.], [np.nan, 9.]])
+
+        def blended(mode, weights=None):
+            blend = gxgrdblnd.Blend((2, 2), mode)
+            for i, v in enumerate((a, b, c)):
+                blend.add(v, None if weights is None else weights[i])
+            self.assertEqual(blend.count, 3)
+            return blend.result()
+
+        nan = np.nan
+        self.assertTrue(np.array_equal(blended(gxgrdblnd.BLEND_LAST), [[5., 6.], [nan, 9.]], equal_nan=True))
+        self.assertTrue(np.array_equal(blended(gxgrdblnd.BLEND_MEAN), [[3., 4.], [nan, 7.]], equal_nan=True))
+        self.assertTrue(np.array_equal(blended(gxgrdblnd.BLEND_MEDIAN), [[3., 4.], [nan, 8.]], equal_nan=True))
+        w = [np.full((2, 2), 1.), np.full((2, 2), 2.), np.full((2, 2), 1.)]
+        self.assertTrue(np.allclose(blended(gxgrdblnd.BLEND_FEATHER, w), [[3., 4.], [nan, 7.25]], equal_nan=True))
+
+        blend = gxgrdblnd.Blend((3, 3), gxgrdblnd.BLEND_MEAN)
+        blend.add(np.ones((2, 2)), window=(1, 1, 2, 2))
+        blend.add(np.full((1, 3), 4.), window=(0, 2, 3, 1))
+        self.assertTrue(np.array_equal(blend.result(), [[nan, nan, nan], [nan, 1., 1.], [4., 2.5, 2.5]],
+                                       equal_nan=True))
+
+        self.assertRaises(gxgrdblnd.BlendException, gxgrdblnd.Blend, (2, 2), 9)
+        self.assertRaises(gxgrdblnd.BlendException, gxgrdblnd.Blend((2, 2), gxgrdblnd.BLEND_FEATHER).add, a)
+
+    def test_color(self):
+        self.start()
+
+        blend = gxgrdblnd.Blend((1, 3), is_color=True)
+        blend.add(np.array([[1, 2, -2147483647]], dtype=np.int32))
+        blend.add(np.array([[-2147483647, 5, -2147483647]], dtype=np.int32))
+        self.assertTrue(np.array_equal(blend.result(), [[1, 5, -2147483647]]))
+        self.assertRaises(gxgrdblnd.BlendException, gxgrdblnd.Blend, (2, 2), gxgrdblnd.BLEND_MEAN, True)
+
+    def test_feather_weights(self):
+        self.start()
+
+        fy, fx = np.mgrid[0:5, 0:7].astype(np.float64)
+        w = gxgrdblnd.feather_weights(fx, fy, 7, 5)
+        self.assertEqual(w[0, 0], 0.5)
+        self.assertEqual(w[2, 3], 2.5)
+        self.assertEqual(w[4, 6], 0.5)
+        self.assertTrue(gxgrdblnd.feather_weights(np.array([-0.5]), np.array([0.]), 7, 5)[0] > 0.)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import threading
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid_grd as gxgrdgrd
+import geosoft.gxpy.grid_contour as gxcntr
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.g1f = os.path.join(cls.folder, 'test_grid_1.grd')
+        y, x = np.mgrid[0:60, 0:80].astype(np.float64)
+        cls.cone = np.hypot(x - 40., y - 30.)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxcntr.__version__, geosoft.__version__)
+
+    def test_circle(self):
+        self.start()
+
+        lines = gxcntr.contours(self.cone, 10.)
+        self.assertEqual(len(lines), 1)
+        line = lines[0]
+        self.assertEqual(line.shape[1], 2)
+        self.assertTrue(np.array_equal(line[0], line[-1]))
+        r = np.hypot(line[:, 0] - 40., line[:, 1] - 30.)
+        self.assertTrue(np.all(np.abs(r - 10.) < 0.01))
+
+        # higher values are on the left, so the circle is clockwise
+        area = 0.5 * np.sum(line[:-1, 0] * line[1:, 1] - line[1:, 0] * line[:-1, 1])
+        self.assertAlmostEqual(area, -np.pi * 100., delta=1.)
+
+        # locations on the grid plane
+        p = {'x0': 1000., 'y0': 500., 'dx': 2., 'dy': 2., 'rot': 0.}
+        xy = gxcntr.contours(self.cone, [10.], properties=p)[0][0]
+        self.assertTrue(np.allclose(xy, line * 2. + (1000., 500.)))
+
+        self.assertEqual(gxcntr.contours(self.cone, 1000.), [])
+        self.assertRaises(gxcntr.ContourException, gxcntr.contours, np.zeros(5), 0.)
+
+    def test_dummies(self):
+        self.start()
+
+        data = self.cone.copy()
+        data[30, :] = np.nan
+        lines = gxcntr.contours(data, 10.)
+        self.assertEqual(len(lines), 2)
+        for line in lines:
+            self.assertFalse(np.array_equal(line[0], line[-1]))
+            self.assertTrue(np.all(np.abs(line[:, 1] - 30.) >= 1.))
+
+    def test_saddle(self):
+        self.start()
+
+        lines = gxcntr.contours(np.array([[1., 0.], [0., 1.]]), 0.5)
+        self.assertEqual([line.tolist() for line in lines], [[[0.5, 0.], [1., 0.5]], [[0.5, 1.], [0., 0.5]]])
+        lines = gxcntr.contours(np.array([[1., 0.], [0., 0.9]]), 0.5)
+        self.assertEqual(lines[0].tolist(), [[0.5, 0.], [0., 0.5]])
+
+    def test_crossings(self):
+        self.start()
+
+        # every crossing of a valid cell edge is on exactly one line
+        rng = np.random.RandomState(1)
+        data = rng.randn(30, 40)
+        data[rng.rand(30, 40) < 0.05] = np.nan
+        level = 0.1
+        lines = gxcntr.contours(data, level, tile_rows=3)
+        self.assertEqual(len(lines), len(gxcntr.contours(data, level, threads=1)))
+        n = 0
+        for line in lines:
+            self.assertTrue(np.abs(np.diff(line, axis=0)).max() <= 1.)
+            n += len(line) - (1 if np.array_equal(line[0], line[-1]) else 0)
+
+        above = data >= level
+        v = ~np.isnan(data)
+        cells = v[:-1, :-1] & v[:-1, 1:] & v[1:, :-1] & v[1:, 1:]
+        h = np.zeros((30, 39), dtype=bool)
+        h[:-1] |= cells
+        h[1:] |= cells
+        vt = np.zeros((29, 40), dtype=bool)
+        vt[:, :-1] |= cells
+        vt[:, 1:] |= cells
+        self.assertEqual(n, np.count_nonzero(h & (above[:, 1:] != above[:, :-1])) +
+                         np.count_nonzero(vt & (above[1:] != above[:-1])))
+
+    def test_grid(self):
+        self.start()
+
+        data, p = gxgrdgrd.read(self.g1f, dtype=np.float64)
+        lines = gxcntr.contours(data, [500., 250.], properties=p)
+        self.assertEqual([len(lines[0]), len(lines[1])], [22, 18])
+        self.assertEqual(sum(len(line) for line in lines[1]), 447)
+
+        # read by blocks of rows from a function
+        windows = []
+
+        def read(window):
+            windows.append((window, threading.current_thread()))
+            x0, y0, nx, ny = window
+            return data[y0: y0 + ny, x0: x0 + nx]
+
+        blocks = gxcntr.contours(read, [500., 250.], properties=p, tile_rows=10, threads=4, shape=data.shape)
+        for a, b in zip(lines, blocks):
+            self.assertEqual(len(a), len(b))
+            self.assertTrue(all(np.array_equal(la, lb) for la, lb in zip(a, b)))
+        self.assertEqual(len(windows), 10)
+        self.assertTrue(max(w[3] for w, _ in windows) == 11)
+        self.assertTrue(all(t is threading.current_thread() for _, t in windows))
+        self.assertRaises(gxcntr.ContourException, gxcntr.contours, read, 500.)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+import os
+import json
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_geotiff as gxgrdtif
+import geosoft.gxpy.grid_convert as gxconv
+import geosoft.gxpy.coordinate_system as gxcs
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.g1f = os.path.join(cls.folder, 'test_grid_1.grd')
+        cls.g2f = os.path.join(cls.folder, 'test_grid_2.grd')
+        cls.mag = os.path.join(cls.folder, 'mag.grd')
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxconv.__version__, geosoft.__version__)
+
+    def test_jobs(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        self.assertEqual(gxconv.destination_name(self.g1f, folder, gxconv.FORMAT_TIFF),
+                         os.path.join(folder, 'test_grid_1.tif'))
+        self.assertEqual(gxconv.destination_name(self.g1f + '(GRD)', folder, gxconv.FORMAT_ERS),
+                         os.path.join(folder, 'test_grid_1.ers(ERM)'))
+        self.assertEqual(gxconv.format_from_name('a.grd(SRF;VER=V7)'), gxconv.FORMAT_SURFER)
+        self.assertEqual(gxconv.format_from_name('a.tif'), gxconv.FORMAT_TIFF)
+        self.assertEqual(gxconv.format_from_name('a.grd'), gxconv.FORMAT_GRD)
+        self.assertRaises(gxconv.GridConvertException, gxconv.destination_name, self.g1f, folder, 'XYZ')
+
+        conversions = gxconv.jobs(os.path.join(self.folder, 'test_grid_?.grd'), folder=folder, fmt='hgd')
+        self.assertEqual(conversions, [(self.g1f, os.path.join(folder, 'test_grid_1.hgd(HGD)')),
+                                       (self.g2f, os.path.join(folder, 'test_grid_2.hgd(HGD)'))])
+
+        list_file = os.path.join(folder, 'list.csv')
+        with open(list_file, 'w') as f:
+            f.write('# grids to convert\n\n{},mag.tif\n{}\n{}\n'.format(self.mag, self.g1f, self.g1f))
+        conversions = gxconv.jobs(list_file=list_file, folder=folder)
+        self.assertEqual(conversions, [(self.mag, os.path.join(folder, 'mag.tif')),
+                                       (self.g1f, os.path.join(folder, 'test_grid_1.grd(GRD)'))])
+
+        # a destination that is the source file is skipped
+        self.assertEqual(gxconv.jobs(self.g1f), [])
+        self.assertEqual(gxconv.jobs(self.g1f + '(GRD)', fmt=gxconv.FORMAT_SURFER), [])
+        self.assertEqual(gxconv.jobs(self.g1f, folder=self.folder + os.sep), [])
+        self.assertEqual(gxconv.jobs(self.g1f, fmt=gxconv.FORMAT_HGD),
+                         [(self.g1f, os.path.join(self.folder, 'test_grid_1.hgd(HGD)'))])
+        with open(list_file, 'w') as f:
+            f.write('{},{}\n{},mag.grd\n'.format(self.g1f, self.g1f + '(SRF;VER=V7)', self.mag))
+        self.assertEqual(gxconv.jobs(list_file=list_file, folder=self.folder), [])
+
+    def test_manifest(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        file_name = os.path.join(folder, 'manifest.txt')
+        manifest = gxconv.Manifest(file_name)
+        self.assertEqual(len(manifest), 0)
+        manifest.record(self.g1f, self.mag, cells=10)
+        self.assertTrue(manifest.is_finished(self.g1f, self.mag))
+        self.assertFalse(manifest.is_finished(self.g1f, os.path.join(folder, 'missing.grd')))
+
+        # a partial record from an interrupted batch is ignored
+        with open(file_name, 'a') as f:
+            f.write('{"source": "a.grd", "dest')
+        manifest = gxconv.Manifest(file_name)
+        self.assertEqual(len(manifest), 1)
+        manifest.record(self.g2f, self.mag)
+        with open(file_name) as f:
+            records = [json.loads(line) for line in f if line.strip().endswith('}')]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['cells'], 10)
+
+    def test_convert(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        with gxgrd.Grid.open(self.mag) as g:
+            data = g.np()
+            cs = g.coordinate_system
+
+        tif = gxconv.convert(self.mag, os.path.join(folder, 'mag.tif'))
+        self.assertEqual(tif, data.size)
+        self.assertTrue(np.array_equal(gxgrdtif.read(os.path.join(folder, 'mag.tif')), data, equal_nan=True))
+
+        hgd = os.path.join(folder, 'mag.hgd')
+        gxconv.convert(self.mag, hgd, dtype=np.float32)
+        with gxgrd.Grid.open(hgd + '(HGD)') as g:
+            self.assertEqual(g.nx * g.ny, data.size)
+            self.assertEqual(g.coordinate_system, cs)
+
+        utm = gxcs.Coordinate_system("NAD83 / UTM zone 32N")
+        ers = os.path.join(folder, 'mag_utm.ers')
+        cells = gxconv.convert(self.mag, ers, coordinate_system=utm)
+        with gxgrd.Grid.open(ers + '(ERM)') as g:
+            self.assertEqual(g.coordinate_system, utm)
+            self.assertEqual(g.nx * g.ny, cells)
+
+        self.assertRaises(gxconv.GridConvertException, gxconv.convert, self.mag, self.mag, overwrite=True)
+        self.assertRaises(gxconv.GridConvertException, gxconv.convert, self.mag, self.mag + '(SRF;VER=V7)',
+                          overwrite=True)
+
+    def test_batch(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        manifest = os.path.join(folder, 'manifest.txt')
+        conversions = gxconv.jobs([self.g1f, self.g2f, os.path.join(folder, 'missing.grd')], folder=folder,
+                                  fmt=gxconv.FORMAT_TIFF)
+        reports = []
+        summary = gxconv.convert_batch(conversions, manifest=manifest, processes=1, report=reports.append)
+        self.assertEqual(summary['num_converted'], 2)
+        self.assertEqual(summary['num_failed'], 1)
+        self.assertEqual(summary['failures'][0][0], os.path.join(folder, 'missing.grd'))
+        self.assertTrue(summary['cells'] > 0)
+        self.assertTrue('2 of 3 grids converted' in reports[-1])
+
+        # finished conversions are skipped when the batch runs again
+        summary = gxconv.convert_batch(conversions, manifest=manifest, processes=2)
+        self.assertEqual(summary['num_skipped'], 2)
+        self.assertEqual(summary['num_converted'], 0)
+        self.assertEqual(summary['num_failed'], 1)
+
+        # worker processes
+        summary = gxconv.convert_batch(conversions[:2], processes=2, overwrite=True)
+        self.assertEqual(summary['num_converted'], 2)
+
+        status = gxconv.main([self.g1f, '--folder', folder, '--format', 'surfer', '--processes', '1', '-q'])
+        self.assertEqual(status, 0)
+        self.assertTrue(os.path.exists(os.path.join(folder, 'test_grid_1.grd')))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,198 @@
+import unittest
+import os
+import threading
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid_grd as gxgrdgrd
+import geosoft.gxpy.grid_derivative as gxderiv
+import geosoft.gxpy.grid_sample as gxgrdsmp
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.mag = os.path.join(cls.folder, 'mag.grd')
+
+        # field of a point source 8 below the grid, and its vertical derivative
+        y, x = np.mgrid[-128:128, -128:128].astype(np.float64)
+        r2 = x * x + y * y + 64.
+        cls.point = 8. / r2 ** 1.5
+        cls.point_dz = 192. / r2 ** 2.5 - 1. / r2 ** 1.5
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxderiv.__version__, geosoft.__version__)
+
+    def test_horizontal(self):
+        self.start()
+
+        y, x = np.mgrid[0:20, 0:30].astype(np.float64)
+        data = x * 3. + y * y
+        self.assertTrue(np.allclose(gxderiv.x_derivative(data, 2.), 1.5))
+        dy = gxderiv.y_derivative(data, 1.)
+        self.assertTrue(np.allclose(dy[1:-1], 2. * y[1:-1]))
+        self.assertTrue(np.allclose(dy[0], 1.))
+        self.assertTrue(np.allclose(dy[-1], 37.))
+
+        # one-sided next to dummies
+        data[5, 10] = np.nan
+        dx = gxderiv.x_derivative(data, 2.)
+        self.assertTrue(np.isnan(dx[5, 10]))
+        self.assertTrue(np.allclose(dx[~np.isnan(data)], 1.5))
+        self.assertRaises(gxderiv.DerivativeException, gxderiv.x_derivative, np.zeros(5), 1.)
+
+    def test_vertical(self):
+        self.start()
+
+        peak = np.abs(self.point_dz).max()
+        dz = gxderiv.z_derivative(self.point, 1., 1.)
+        self.assertTrue(np.abs(dz - self.point_dz)[20:-20, 20:-20].max() < peak * 0.001)
+        dz = gxderiv.z_derivative(self.point + 100., 2., 2.)
+        self.assertTrue(np.abs(dz - self.point_dz * 0.5)[20:-20, 20:-20].max() < peak * 0.001)
+
+        tiled = gxderiv.z_derivative(self.point, 1., 1., tile_size=64, overlap=48)
+        self.assertTrue(np.abs(tiled - self.point_dz)[20:-20, 20:-20].max() < peak * 0.002)
+
+        space = gxderiv.z_derivative(self.point, 1., 1., fft=False)
+        self.assertTrue(np.abs(space - self.point_dz)[20:-20, 20:-20].max() < peak * 0.05)
+        tiled = gxderiv.z_derivative(self.point, 1., 1., fft=False, tile_size=64, overlap=16)
+        self.assertTrue(np.allclose(tiled, space))
+
+        # the space-domain derivative of a real grid correlates with the FFT derivative
+        data, p = gxgrdgrd.read(self.mag, dtype=np.float64)
+        fft = gxderiv.z_derivative(data, p['dx'], p['dy'])
+        space = gxderiv.z_derivative(data, p['dx'], p['dy'], fft=False)
+        self.assertAlmostEqual(np.std(space, ddof=1), np.std(fft, ddof=1), delta=np.std(fft, ddof=1) * 0.01)
+        self.assertTrue(np.corrcoef(fft.ravel(), space.ravel())[0, 1] > 0.96)
+
+        data = self.point.copy()
+        data[100:110, 50:60] = np.nan
+        dz = gxderiv.z_derivative(data, 1., 1.)
+        self.assertTrue(np.array_equal(np.isnan(dz), np.isnan(data)))
+        self.assertRaises(gxderiv.DerivativeException, gxderiv.z_derivative, np.full((5, 5), np.nan), 1., 1.)
+
+    def test_products(self):
+        self.start()
+
+        products = (gxderiv.DERIVATIVE_X, gxderiv.DERIVATIVE_Y, gxderiv.DERIVATIVE_Z, gxderiv.DERIVATIVE_XY,
+                    gxderiv.DERIVATIVE_XYZ, gxderiv.TILT_ANGLE)
+        data = self.point.copy()
+        data[100:110, 50:60] = np.nan
+        for fft in (True, False):
+            d = gxderiv.derivatives(data, 1., 2., products, fft=fft)
+            self.assertEqual(sorted(d.keys()), sorted(products))
+            dx = d[gxderiv.DERIVATIVE_X]
+            dy = d[gxderiv.DERIVATIVE_Y]
+            dz = d[gxderiv.DERIVATIVE_Z]
+            self.assertTrue(np.array_equal(dx, gxderiv.x_derivative(data, 1.), equal_nan=True))
+            self.assertTrue(np.array_equal(dy, gxderiv.y_derivative(data, 2.), equal_nan=True))
+            self.assertTrue(np.array_equal(dz, gxderiv.z_derivative(data, 1., 2., fft=fft), equal_nan=True))
+            self.assertTrue(np.allclose(d[gxderiv.DERIVATIVE_XY], np.hypot(dx, dy), equal_nan=True))
+            self.assertTrue(np.allclose(d[gxderiv.DERIVATIVE_XYZ], np.sqrt(dx ** 2 + dy ** 2 + dz ** 2),
+                                        equal_nan=True))
+            self.assertTrue(np.allclose(d[gxderiv.TILT_ANGLE], np.arctan2(dz, np.hypot(dx, dy)), equal_nan=True))
+            for p in products:
+                self.assertTrue(np.array_equal(np.isnan(d[p]), np.isnan(data)))
+
+            # space-domain tiles match the whole grid, FFT tiles are close with enough overlap
+            tiled = gxderiv.derivatives(data, 1., 2., products, fft=fft, tile_size=50, overlap=100, threads=3)
+            for p in products:
+                error = np.nanmax(np.abs(tiled[p] - d[p])) / np.nanmax(np.abs(d[p]))
+                if not fft:
+                    self.assertTrue(error < 1.0e-12)
+                elif p != gxderiv.TILT_ANGLE:
+                    self.assertTrue(error < 0.01)
+
+        # tiles read from a function, the space-domain derivative needs the grid mean
+        windows = []
+
+        def read(window):
+            windows.append(window)
+            self.assertTrue(threading.current_thread() is threading.main_thread())
+            x0, y0, nx, ny = window
+            return data[y0: y0 + ny, x0: x0 + nx]
+
+        d = gxderiv.derivatives(data, 1., 2., products, fft=False)
+        tiled = {p: np.full(data.shape, -1.) for p in products}
+        for (x0, y0, nx, ny), block in gxderiv.derivative_tiles(read, 1., 2., products, shape=data.shape,
+                                                                fft=False, mean=np.nanmean(data), tile_size=100,
+                                                                overlap=20, threads=2):
+            for p in products:
+                tiled[p][y0: y0 + ny, x0: x0 + nx] = block[p]
+        for p in products:
+            self.assertTrue(np.allclose(tiled[p], d[p], rtol=0., atol=1.0e-12, equal_nan=True))
+        self.assertEqual(len(windows), 9)
+        self.assertTrue(max(w[2] for w in windows) <= 140)
+
+        # without the mean, the mean is accumulated from the tile cores first
+        windows = []
+        tiled = {p: np.full(data.shape, -1.) for p in products}
+        for (x0, y0, nx, ny), block in gxderiv.derivative_tiles(read, 1., 2., products, shape=data.shape,
+                                                                fft=False, tile_size=100, overlap=20, threads=2):
+            for p in products:
+                tiled[p][y0: y0 + ny, x0: x0 + nx] = block[p]
+        for p in products:
+            self.assertTrue(np.allclose(tiled[p], d[p], rtol=0., atol=1.0e-12, equal_nan=True))
+        self.assertEqual(len(windows), 18)
+        self.assertEqual(sum(w[2] * w[3] for w in windows[:9]), data.size)
+
+        # a grid of one tile is read once, FFT derivatives do not need the mean
+        for fft in (False, True):
+            windows = []
+            list(gxderiv.derivative_tiles(read, 1., 2., products, shape=data.shape, fft=fft, threads=2))
+            self.assertEqual(windows, [(0, 0, data.shape[1], data.shape[0])])
+
+        d = gxderiv.derivatives(data, 1., 1., [gxderiv.TILT_ANGLE])
+        self.assertEqual(list(d.keys()), [gxderiv.TILT_ANGLE])
+        self.assertRaises(gxderiv.DerivativeException, gxderiv.derivatives, data, 1., 1., [99])
+
+    def test_tilt_depth(self):
+        self.start()
+
+        # the tilt angle of a vertical contact 10 deep is atan(x / 10)
+        y, x = np.mgrid[0:200, 0:300].astype(np.float64)
+        contact = np.arctan((x - 150.3) / 10.) * 100.
+        tilt = gxderiv.tilt_angle(contact, 1., 1.)
+        self.assertTrue(np.allclose(tilt[100, 140:161], np.arctan((x[100, 140:161] - 150.3) / 10.), atol=0.01))
+
+        p = {'x0': 1000., 'y0': 0., 'dx': 1., 'dy': 1., 'rot': 0.}
+        lines = gxderiv.tilt_depth(contact, p)
+        self.assertEqual(len(lines), 1)
+        xyd = lines[0]
+        self.assertTrue(np.allclose(xyd[:, 0], 1150.3, atol=0.05))
+        self.assertTrue(np.allclose(np.abs(np.diff(xyd[:, 1])), 4.))
+        self.assertAlmostEqual(np.median(xyd[:, 2]), 10., delta=0.1)
+
+        data, p = gxgrdgrd.read(self.mag, dtype=np.float64)
+        lines = gxderiv.tilt_depth(data, p, resolution=1000., fft=False)
+        self.assertEqual(sum(len(xyd) for xyd in lines), 290)
+
+        # from a tilt angle read by blocks, and a gradient sampling function
+        tilt = gxderiv.tilt_angle(data, p['dx'], p['dy'], fft=False)
+        gradient = np.hypot(gxderiv.x_derivative(tilt, p['dx']), gxderiv.y_derivative(tilt, p['dy']))
+
+        def read(window):
+            x0, y0, nx, ny = window
+            return tilt[y0: y0 + ny, x0: x0 + nx]
+
+        def sample(x, y):
+            return gxgrdsmp.sample(gradient, p, x, y)
+
+        blocks = gxderiv.contact_depths(read, sample, p, resolution=1000., shape=tilt.shape)
+        self.assertEqual(len(blocks), len(lines))
+        self.assertTrue(all(np.array_equal(a, b, equal_nan=True) for a, b in zip(lines, blocks)))
+        self.assertRaises(gxderiv.DerivativeException, gxderiv.derivative_tiles, read, 1., 1.,
+                          [gxderiv.DERIVATIVE_Z])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_ers as gxers
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.mag = os.path.join(cls.folder, 'mag.grd')
+        cls.ers = os.path.join(cls.folder, 'mag.ers')
+        with gxgrd.Grid.open(cls.mag) as g:
+            gxgrd.Grid.copy(g, gxgrd.Grid.decorate_name(cls.ers, 'ERM'), overwrite=True).close()
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxers.__version__, geosoft.__version__)
+
+    def test_header(self):
+        self.start()
+
+        hd = gxers.read_header(self.ers + '(ERM)')
+        self.assertEqual(hd['data_file'], os.path.splitext(self.ers)[0])
+        self.assertEqual(hd['bands'], 1)
+        self.assertEqual(gxers.read_header(hd['data_file'])['file_name'], self.ers)
+
+        p = gxers.properties(self.ers)
+        with gxgrd.Grid.open(self.mag) as g:
+            gp = g.properties()
+        for k in ('nx', 'ny', 'dx', 'dy', 'rot'):
+            self.assertEqual(p[k], gp[k])
+        self.assertAlmostEqual(p['x0'], gp['x0'])
+        self.assertAlmostEqual(p['y0'], gp['y0'])
+
+        self.assertRaises(gxers.ERSException, gxers.read_header, self.mag)
+
+    def test_read(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            gxnp = g.np(dtype=np.float32)
+        data, p = gxers.read(self.ers)
+        self.assertEqual(data.shape, gxnp.shape)
+        self.assertTrue(np.array_equal(data, gxnp, equal_nan=True))
+
+        window, wp = gxers.read(self.ers, window=(5, 10, 20, 30), dtype=np.float64)
+        self.assertEqual(window.dtype, np.float64)
+        self.assertTrue(np.array_equal(window, data[10:40, 5:25], equal_nan=True))
+        self.assertAlmostEqual(wp['x0'], p['x0'] + 5 * p['dx'])
+        self.assertAlmostEqual(wp['y0'], p['y0'] + 10 * p['dy'])
+
+        mm, hd = gxers.memmap(self.ers)
+        self.assertEqual(mm.shape, data.shape)
+        del mm
+
+        self.assertRaises(gxers.ERSException, gxers.read, self.ers, window=(0, 0, 1000, 10))
+        self.assertRaises(gxers.ERSException, gxers.read, self.ers, band=1)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_expression as gxexp
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.operands = {'g1': np.array([4., -1., np.nan, 0.]),
+                        'g2': np.array([1., 2., 3., 0.])}
+
+    def evaluate(self, expr, dtype=None):
+        return gxexp.evaluate(expr, self.operands, dtype=dtype)
+
+    def assertResult(self, expr, expected):
+        self.assertTrue(np.array_equal(self.evaluate(expr), np.array(expected), equal_nan=True), expr)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxexp.__version__, geosoft.__version__)
+
+    def test_operators(self):
+        self.start()
+
+        self.assertResult('g1 + g2 * 2', [6., 3., np.nan, 0.])
+        self.assertResult('-g1**2', [-16., -1., np.nan, 0.])
+        self.assertResult('(g1 - g2) / g2', [3., -1.5, np.nan, np.nan])
+        self.assertResult('g1 % 3', [1., -1., np.nan, 0.])
+        self.assertResult('g1 >= g2', [1., 0., np.nan, 1.])
+        self.assertResult('g1 && g2', [1., 1., np.nan, 0.])
+        self.assertResult('!g1 || g2 > 2', [0., 0., np.nan, 1.])
+        self.assertResult('g1 > 0 ? sqrt(g1) : g2', [2., 2., np.nan, 0.])
+
+    def test_dummy(self):
+        self.start()
+
+        self.assertResult('g1 == DUMMY', [0., 0., 1., 0.])
+        self.assertResult('g1 != dummy ? g1 : -9', [4., -1., -9., 0.])
+        self.assertResult('g2 > 2 ? DUMMY : g2', [1., 2., np.nan, 0.])
+        self.assertResult('1 / g2', [1., 0.5, 1. / 3., np.nan])
+
+    def test_functions(self):
+        self.start()
+
+        self.assertResult('max(g1, g2)', [4., 2., np.nan, 0.])
+        self.assertResult('round(2.5 - g2)', [2., 1., -1., 3.])
+        self.assertResult('abs(g1) + pow(g2, 2)', [5., 5., np.nan, 0.])
+        self.assertTrue(np.allclose(self.evaluate('atan2(g2, 1)'), np.arctan2(self.operands['g2'], 1.)))
+
+    def test_statements(self):
+        self.start()
+
+        # as for GXIEXP the result is the first statement, unless `_` is assigned later
+        self.assertResult('t = g1 * 2; t + g2;', [8., -2., np.nan, 0.])
+        self.assertResult('t = g1 * 2; _ = t + g2;', [9., 0., np.nan, 0.])
+        self.assertResult('_ = g1;\n x = 5', [4., -1., np.nan, 0.])
+        self.assertResult('g1 * 2; _ = _ + g2; g2', [9., 0., np.nan, 0.])
+        exp = gxexp.Expression('@a = g1 * 2;\n_ = @a + g2 + c;')
+        self.assertEqual(exp.operands, ['g1', 'g2', 'c'])
+        self.assertTrue(np.array_equal(exp.evaluate(dict(self.operands, c=1.)), [10., 1., np.nan, 1.],
+                                       equal_nan=True))
+
+    def test_dtype(self):
+        self.start()
+
+        self.assertTrue(np.array_equal(self.evaluate('g1 + g2', dtype=np.int16), [5, 1, -32767, 0]))
+        self.assertTrue(np.array_equal(self.evaluate('g1 + g2', dtype=np.uint8), [5, 1, 255, 0]))
+        self.assertEqual(self.evaluate('g1', dtype=np.float32).dtype, np.float32)
+
+    def test_errors(self):
+        self.start()
+
+        for expr in ('g1 +', 'foo(g1)', 'sqrt(g1, g2)', 'g1 $ g2', '', 'g1 ? g2'):
+            self.assertRaises(gxexp.ExpressionException, gxexp.Expression, expr)
+        self.assertRaises(gxexp.ExpressionException, self.evaluate, 'g1 + g3')
+
+
+if __name__ == '__main__':
+
+    unittest.main()
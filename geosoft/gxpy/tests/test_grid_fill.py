@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_fill as gxfill
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        y, x = np.mgrid[0:60, 0:80].astype(np.float64)
+        cls.surface = x * 0.5 + y * 0.25 + np.sin(x / 7.)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxfill.__version__, geosoft.__version__)
+
+    def test_distance(self):
+        self.start()
+
+        rng = np.random.RandomState(7)
+        for sampling in ((1., 1.), (2., 0.5)):
+            mask = rng.rand(23, 31) < 0.05
+            d = gxfill.distance(mask, sampling)
+            py, px = np.nonzero(mask)
+            y, x = np.mgrid[0:23, 0:31]
+            expected = np.sqrt((((x[..., np.newaxis] - px) * sampling[0]) ** 2 +
+                                ((y[..., np.newaxis] - py) * sampling[1]) ** 2).min(axis=-1))
+            self.assertTrue(np.allclose(d, expected))
+
+        mask = np.zeros((5, 6), dtype=bool)
+        self.assertTrue(np.all(np.isinf(gxfill.distance(mask))))
+        mask[2, 3] = True
+        self.assertEqual(gxfill.distance(mask)[0, 0], np.hypot(2., 3.))
+        self.assertRaises(gxfill.FillException, gxfill.distance, np.zeros(4, dtype=bool))
+
+    def test_taper(self):
+        self.start()
+
+        t = gxfill.taper(np.array([-1., 0., 2., 4., 9.]), 4)
+        self.assertTrue(np.allclose(t, [0., 0., 0.5, 1., 1.]))
+        self.assertTrue(np.array_equal(gxfill.taper(np.array([0., 1.]), 0), [1., 1.]))
+
+    def test_feather(self):
+        self.start()
+
+        data = self.surface
+        f = gxfill.feather(data, 10, edge_value=5.)
+        self.assertTrue(np.allclose(f[0, :], 5.))
+        self.assertTrue(np.allclose(f[:, -1], 5.))
+        self.assertTrue(np.array_equal(f[10:-10, 10:-10], data[10:-10, 10:-10]))
+
+        # separable cosine taper of the rows and columns
+        ty = gxfill.taper(np.minimum(np.arange(60), np.arange(60)[::-1]), 10)
+        tx = gxfill.taper(np.minimum(np.arange(80), np.arange(80)[::-1]), 10)
+        self.assertTrue(np.allclose(f, (data - 5.) * np.outer(ty, tx) + 5.))
+
+        # dummies stay dummies, and by default their neighbours are not feathered
+        data = data.copy()
+        data[30, 40] = np.nan
+        f = gxfill.feather(data, 10, edge_value=5.)
+        self.assertEqual(np.count_nonzero(np.isnan(f)), 1)
+        self.assertTrue(np.allclose((data - 5.) * np.outer(ty, tx) + 5., f, equal_nan=True))
+
+        # feathered blanks, neighbours are at the edge value
+        f = gxfill.feather(data, 10, edge_value=5., feather_blanks=True)
+        self.assertTrue(np.isnan(f[30, 40]))
+        self.assertEqual(np.count_nonzero(np.isnan(f)), 1)
+        self.assertAlmostEqual(f[30, 41], 5.)
+        self.assertAlmostEqual(f[31, 41], 5. + (data[31, 41] - 5.) * gxfill.taper(np.sqrt(2.) - 1., 10))
+
+        f = gxfill.feather(np.ones((20, 20)), 5)
+        self.assertTrue(np.allclose(f, 1.))
+
+    def test_flood(self):
+        self.start()
+
+        data = self.surface.copy()
+        data[20:35, 30:50] = np.nan
+        data[:, 70:] = np.nan
+        valid = ~np.isnan(data)
+
+        for iterations in (0, 250):
+            filled = gxfill.flood(data, max_iterations=iterations)
+            self.assertFalse(np.any(np.isnan(filled)))
+            self.assertTrue(np.array_equal(filled[valid], data[valid]))
+            self.assertTrue(filled.min() >= np.nanmin(data))
+            self.assertTrue(filled.max() <= np.nanmax(data))
+            self.assertTrue(np.abs(filled - self.surface)[20:35, 30:50].mean() < 2.)
+
+        # a single blank point is the mean of its neighbours
+        data = self.surface.copy()
+        data[10, 10] = np.nan
+        filled = gxfill.flood(data, max_iterations=0)
+        w = np.array([[np.sqrt(0.5), 1., np.sqrt(0.5)], [1., 0., 1.], [np.sqrt(0.5), 1., np.sqrt(0.5)]])
+        block = self.surface[9:12, 9:12]
+        self.assertAlmostEqual(filled[10, 10], (block * w).sum() / w.sum())
+
+        self.assertTrue(np.array_equal(gxfill.flood(self.surface), self.surface))
+        self.assertRaises(gxfill.FillException, gxfill.flood, np.full((3, 3), np.nan))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import os
+import struct
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_geotiff as gxgrdtif
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.props = {'x0': 100., 'y0': 200., 'dx': 10., 'dy': 5., 'rot': 0., 'nx': 70, 'ny': 45}
+
+    def tif(self, name):
+        return os.path.join(self._gx.temp_folder(), name)
+
+    def data(self, dtype=np.float64):
+        ny, nx = self.props['ny'], self.props['nx']
+        data = (np.arange(ny * nx).reshape(ny, nx) % 997).astype(dtype)
+        if np.issubdtype(dtype, np.floating):
+            data[3:7, 10:12] = np.nan
+        return data
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdtif.__version__, geosoft.__version__)
+
+    def test_round_trip(self):
+        self.start()
+
+        data = self.data()
+        tif = gxgrdtif.write(self.tif('rt.tif'), data, self.props, dtype=np.float32, tile_size=32,
+                             overwrite=True)
+        with open(tif, 'rb') as f:
+            self.assertEqual(f.read(4), b'II*\x00')
+
+        images = gxgrdtif.read_header(tif)
+        self.assertEqual(len(images), 3)
+        self.assertEqual((images[0]['nx'], images[0]['ny']), (70, 45))
+        self.assertEqual((images[1]['nx'], images[1]['ny']), (35, 23))
+        self.assertFalse(images[0]['overview'])
+        self.assertTrue(images[1]['overview'])
+        self.assertEqual(images[0]['compression'], 8)
+        self.assertEqual(len(images[0]['offsets']), 3 * 2)
+
+        # cloud-optimized: directories first, then overview tiles before full-resolution tiles
+        self.assertTrue(max(images[1]['offsets']) < min(images[0]['offsets']))
+
+        rt, p = gxgrdtif.read(tif)
+        self.assertEqual(rt.dtype, np.float32)
+        self.assertTrue(np.array_equal(rt, data.astype(np.float32), equal_nan=True))
+        for k in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot'):
+            self.assertAlmostEqual(p[k], self.props[k])
+
+        # window
+        rt, p = gxgrdtif.read(tif, window=(33, 20, 10, 15))
+        self.assertTrue(np.array_equal(rt, data[20:35, 33:43], equal_nan=True))
+        self.assertAlmostEqual(p['x0'], 430.)
+        self.assertAlmostEqual(p['y0'], 300.)
+
+        self.assertRaises(gxgrdtif.GeoTIFFException, gxgrdtif.write, tif, data, self.props)
+        self.assertRaises(gxgrdtif.GeoTIFFException, gxgrdtif.read, tif, 0, (60, 0, 20, 5))
+
+    def test_overviews(self):
+        self.start()
+
+        data = self.data()
+        tif = gxgrdtif.write(self.tif('ovr.tif'), data, self.props, tile_size=16, overwrite=True)
+        images = gxgrdtif.read_header(tif)
+        self.assertEqual(len(images), 4)
+
+        # mean of the valid values in 2 x 2 blocks, from the top of the image
+        top_down = np.pad(data[::-1], ((0, 1), (0, 0)), constant_values=np.nan)
+        blocks = top_down.reshape(23, 2, 35, 2).transpose(0, 2, 1, 3).reshape(23, 35, 4)
+        with np.errstate(invalid='ignore'):
+            expected = np.nanmean(blocks, axis=-1)[::-1]
+        rt, p = gxgrdtif.read(tif, level=1)
+        self.assertEqual(rt.shape, (23, 35))
+        self.assertTrue(np.allclose(rt, expected, equal_nan=True))
+        self.assertAlmostEqual(p['dx'], 20.)
+
+        tif = gxgrdtif.write(self.tif('ovr.tif'), data, self.props, tile_size=16, method='nearest',
+                             overwrite=True)
+        rt, _ = gxgrdtif.read(tif, level=2)
+        self.assertTrue(np.array_equal(rt, data[::-1][::4, ::4][::-1], equal_nan=True))
+
+        tif = gxgrdtif.write(self.tif('ovr.tif'), data, self.props, overviews=0, overwrite=True)
+        self.assertEqual(len(gxgrdtif.read_header(tif)), 1)
+
+    def test_types(self):
+        self.start()
+
+        for dtype in (np.uint8, np.int16, np.int32, np.float64):
+            data = self.data(dtype)
+            tif = gxgrdtif.write(self.tif('types.tif'), data, self.props, tile_size=32, compress_level=0,
+                                 overwrite=True)
+            rt, p = gxgrdtif.read(tif)
+            self.assertEqual(rt.dtype, np.dtype(dtype))
+            self.assertTrue(np.array_equal(rt, data, equal_nan=True))
+            self.assertEqual(gxgrdtif.read_header(tif)[0]['compression'], 1)
+
+        # int dummies are nodata
+        data = self.data(np.int32)
+        data[0, 0] = -2147483647
+        tif = gxgrdtif.write(self.tif('types.tif'), data, self.props, overwrite=True)
+        self.assertEqual(gxgrdtif.read_header(tif)[0]['nodata'], -2147483647)
+        rt, _ = gxgrdtif.read(tif, dtype=np.float64)
+        self.assertTrue(np.isnan(rt[0, 0]))
+        self.assertEqual(rt[0, 1], 1.)
+
+    def test_georeference(self):
+        self.start()
+
+        rotated = dict(self.props, rot=30.)
+        tif = gxgrdtif.write(self.tif('geo.tif'), self.data(), rotated, epsg=32617, overwrite=True)
+        p = gxgrdtif.properties(tif)
+        for k in ('x0', 'y0', 'dx', 'dy', 'rot'):
+            self.assertAlmostEqual(p[k], rotated[k])
+        self.assertEqual(p['coordinate_system'], 'EPSG:32617')
+        _, p = gxgrdtif.read(tif, window=(1, 0, 2, 2))
+        self.assertAlmostEqual(p['x0'], 100. + 10. * np.cos(np.radians(30.)))
+        self.assertAlmostEqual(p['y0'], 200. - 10. * np.sin(np.radians(30.)))
+
+        wkt = 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],' \
+              'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]'
+        tif = gxgrdtif.write(self.tif('geo.tif'), self.data(), self.props, wkt=wkt, overwrite=True)
+        self.assertEqual(gxgrdtif.properties(tif)['coordinate_system'], wkt)
+
+    def test_bigtiff(self):
+        self.start()
+
+        data = self.data()
+        tif = gxgrdtif.write(self.tif('big.tif'), data, self.props, tile_size=32, bigtiff=True, overwrite=True)
+        with open(tif, 'rb') as f:
+            self.assertEqual(struct.unpack('<2sHHH', f.read(8)), (b'II', 43, 8, 0))
+        rt, _ = gxgrdtif.read(tif, dtype=np.float64)
+        self.assertTrue(np.array_equal(rt, data, equal_nan=True))
+
+    def test_source_function(self):
+        self.start()
+
+        data = self.data()
+        windows = []
+
+        def source(window):
+            windows.append(window)
+            ix0, iy0, nx, ny = window
+            return data[iy0: iy0 + ny, ix0: ix0 + nx]
+
+        tif = gxgrdtif.write(self.tif('src.tif'), source, dict(self.props, dtype=np.float64), tile_size=16,
+                             threads=2, overwrite=True)
+        self.assertEqual(windows[0], (0, 29, 70, 16))
+        self.assertEqual(len(windows), 3)
+        rt, _ = gxgrdtif.read(tif)
+        self.assertTrue(np.array_equal(rt, data, equal_nan=True))
+
+        self.assertRaises(gxgrdtif.GeoTIFFException, gxgrdtif.write, tif, data, self.props, tile_size=20,
+                          overwrite=True)
+        self.assertRaises(gxgrdtif.GeoTIFFException, gxgrdtif.write, tif, data, dict(self.props, is_color=True),
+                          overwrite=True)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import os
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_grd as gxgrdgrd
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.g1f = os.path.join(cls.folder, 'test_grid_1.grd')
+        cls.gcf = os.path.join(cls.folder, 'test_bool1_color.grd')
+        cls.mag = os.path.join(cls.folder, 'mag.grd')
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdgrd.__version__, geosoft.__version__)
+
+    def test_header(self):
+        self.start()
+
+        hd = gxgrdgrd.read_header(self.g1f + '(GRD)')
+        self.assertTrue(hd['compressed'])
+        self.assertEqual(hd['dtype'], np.float32)
+        self.assertEqual((hd['nx'], hd['ny']), (101, 101))
+
+        hd = gxgrdgrd.read_header(self.mag)
+        self.assertFalse(hd['compressed'])
+        self.assertEqual(hd['kx'], -1)
+
+        with gxgrd.Grid.open(self.mag) as g:
+            p = gxgrdgrd.properties(self.mag)
+            gp = g.properties()
+            for k in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot', 'is_color'):
+                self.assertEqual(p[k], gp[k])
+
+        self.assertTrue(gxgrdgrd.read_header(self.gcf)['is_color'])
+        self.assertRaises(gxgrdgrd.GRDException, gxgrdgrd.read_header, self.mag + '(ERM)')
+
+    def test_read(self):
+        self.start()
+
+        for gf in (self.g1f, self.mag):
+            with gxgrd.Grid.open(gf, mode=gxgrd.FILE_READWRITE) as g:
+                gxnp = g.np()
+            data, p = gxgrdgrd.read(gf)
+            self.assertEqual(data.shape, gxnp.shape)
+            self.assertTrue(np.array_equal(data, gxnp, equal_nan=True))
+
+            window, wp = gxgrdgrd.read(gf, window=(5, 10, 20, 30))
+            self.assertEqual(window.shape, (30, 20))
+            self.assertTrue(np.array_equal(window, data[10:40, 5:25], equal_nan=True))
+            self.assertAlmostEqual(wp['x0'], p['x0'] + 5 * p['dx'])
+            self.assertAlmostEqual(wp['y0'], p['y0'] + 10 * p['dy'])
+
+            for step in (2, 7):
+                decimated, dp = gxgrdgrd.read(gf, window=(5, 10, 20, 30), step=step)
+                self.assertTrue(np.array_equal(decimated, data[10:40:step, 5:25:step], equal_nan=True))
+                self.assertEqual((dp['nx'], dp['ny']), decimated.shape[::-1])
+                self.assertAlmostEqual(dp['dx'], p['dx'] * step)
+                self.assertAlmostEqual(dp['x0'], wp['x0'])
+
+        self.assertRaises(gxgrdgrd.GRDException, gxgrdgrd.read, self.mag, window=(0, 0, 1000, 10))
+        self.assertRaises(gxgrdgrd.GRDException, gxgrdgrd.read, self.mag, step=0)
+
+    def test_memmap(self):
+        self.start()
+
+        mm, hd = gxgrdgrd.memmap(self.mag)
+        data, _ = gxgrdgrd.read(self.mag)
+        self.assertEqual(mm.shape, data.shape)
+        mmd = np.array(mm, dtype=np.float32)
+        mmd[mmd == hd['dummy']] = np.nan
+        self.assertTrue(np.array_equal(mmd, data, equal_nan=True))
+        del mm
+
+        self.assertRaises(gxgrdgrd.GRDException, gxgrdgrd.memmap, self.g1f)
+
+    def test_iter_vectors(self):
+        self.start()
+
+        data, _ = gxgrdgrd.read(self.g1f)
+        rows = 0
+        for iv, vectors in gxgrdgrd.iter_vectors(self.g1f, vectors=17):
+            self.assertEqual(iv, rows)
+            rows += vectors.shape[0]
+        self.assertEqual(rows, data.shape[0])
+
+    def test_write(self):
+        self.start()
+
+        data, p = gxgrdgrd.read(self.g1f)
+        for compress in (False, True):
+            for dtype in (np.float32, np.float64, np.int16):
+                gf = os.path.join(self.folder, 'write_{}_{}.grd'.format(compress, np.dtype(dtype).name))
+                d = data.astype(dtype) if dtype != np.int16 else np.nan_to_num(data).astype(dtype)
+                gxgrdgrd.write(gf, d, p, compress=compress, overwrite=True)
+                self.assertRaises(gxgrdgrd.GRDException, gxgrdgrd.write, gf, d, p)
+
+                rd, rp = gxgrdgrd.read(gf)
+                self.assertEqual(rd.dtype, dtype)
+                self.assertTrue(np.array_equal(rd, d, equal_nan=True))
+                for k in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot'):
+                    self.assertEqual(rp[k], p[k])
+
+                with gxgrd.Grid.open(gf, mode=gxgrd.FILE_READWRITE) as g:
+                    self.assertEqual(g.nx, p['nx'])
+                    self.assertTrue(np.array_equal(g.np(), d, equal_nan=True))
+
+    def test_grid_np(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag, mode=gxgrd.FILE_READWRITE) as g:
+            gxnp = g.np()
+        with gxgrd.Grid.open(self.mag) as g:
+            self.assertTrue(np.array_equal(g.np(), gxnp, equal_nan=True))
+
+        with gxgrd.Grid.open(self.gcf, mode=gxgrd.FILE_READWRITE) as g:
+            gxnp = g.np()
+        with gxgrd.Grid.open(self.gcf) as g:
+            self.assertTrue(np.array_equal(g.np(), gxnp))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
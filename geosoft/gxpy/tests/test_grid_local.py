@@ -0,0 +1,114 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_local as gxgrdlcl
+
+from base import GXPYTest
+
+
+def _surface(x, y):
+    return np.sin(x / 25.) * np.cos(y / 30.) * 100. + x * 0.2
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        rng = np.random.RandomState(3)
+        cls.x = rng.rand(5000) * 200.
+        cls.y = rng.rand(5000) * 150.
+        cls.v = _surface(cls.x, cls.y)
+        cls.qx = rng.rand(2000) * 240. - 20.
+        cls.qy = rng.rand(2000) * 190. - 20.
+        cls.d = np.hypot(cls.x[np.newaxis, :] - cls.qx[:, np.newaxis], cls.y[np.newaxis, :] - cls.qy[:, np.newaxis])
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdlcl.__version__, geosoft.__version__)
+
+    def test_tree(self):
+        self.start()
+
+        tree = gxgrdlcl.KDTree(self.x, self.y, leaf_size=8)
+        self.assertEqual(len(tree), 5000)
+        box = tree.box(20., 30., 60., 50.)
+        inside = np.flatnonzero((self.x >= 20.) & (self.x <= 60.) & (self.y >= 30.) & (self.y <= 50.))
+        self.assertTrue(np.array_equal(np.sort(box), inside))
+        self.assertEqual(len(tree.box(300., 300., 400., 400.)), 0)
+
+        # nearest points match a brute-force search
+        d, i = tree.query(self.qx, self.qy, k=4)
+        nearest = np.argsort(self.d, axis=1)[:, :4]
+        self.assertTrue(np.array_equal(i, nearest))
+        self.assertTrue(np.allclose(d, np.take_along_axis(self.d, nearest, axis=1)))
+
+        d, i = tree.query(self.qx, self.qy, k=3, radius=3.)
+        for row in range(len(self.qx)):
+            within = np.flatnonzero(self.d[row] <= 3.)
+            within = within[np.argsort(self.d[row, within])][:3]
+            self.assertTrue(np.array_equal(i[row, :len(within)], within))
+            self.assertTrue(np.all(i[row, len(within):] == -1))
+            self.assertTrue(np.all(np.isinf(d[row, len(within):])))
+
+    def test_sectors(self):
+        self.start()
+
+        tree = gxgrdlcl.KDTree(self.x, self.y)
+        d, i = tree.query(self.qx[:300], self.qy[:300], k=2, radius=10., sectors=4)
+        self.assertEqual(i.shape, (300, 8))
+        for row in range(300):
+            angle = np.arctan2(self.y - self.qy[row], self.x - self.qx[row])
+            sector = ((angle + np.pi) * (4. / (2. * np.pi))).astype(int) % 4
+            for s in range(4):
+                points = np.flatnonzero((sector == s) & (self.d[row] <= 10.))
+                points = points[np.argsort(self.d[row, points])][:2]
+                self.assertTrue(np.array_equal(i[row, s * 2: s * 2 + len(points)], points))
+        self.assertRaises(gxgrdlcl.GridLocalException, tree.query, self.qx, self.qy, 1, None, 4)
+
+    def test_prepare(self):
+        self.start()
+
+        x, y, v = gxgrdlcl.prepare([1., 1., 2., np.nan], [1., 1., 2., 3.], [1., 3., np.nan, 4.])
+        self.assertEqual((list(x), list(y), list(v)), ([1.], [1.], [2.]))
+        self.assertRaises(gxgrdlcl.GridLocalException, gxgrdlcl.prepare, [1.], [1.], [np.nan])
+        self.assertRaises(gxgrdlcl.GridLocalException, gxgrdlcl.prepare, [1., 2.], [1.], [1.])
+
+    def test_gridding(self):
+        self.start()
+
+        # grid points at data points are the data values
+        x = np.array([0., 10., 0., 10., 5.])
+        y = np.array([0., 0., 10., 10., 5.])
+        v = np.array([1., 2., 3., 4., 10.])
+        for method in (gxgrdlcl.METHOD_IDW, gxgrdlcl.METHOD_NEAREST, gxgrdlcl.METHOD_NATURAL):
+            data, p = gxgrdlcl.gridding(x, y, v, method=method, cs=1., bkd=0)
+            self.assertEqual((p['nx'], p['ny'], p['x0'], p['y0']), (11, 11, 0., 0.))
+            self.assertEqual([data[0, 0], data[0, 10], data[10, 0], data[10, 10], data[5, 5]],
+                             [1., 2., 3., 4., 10.])
+            self.assertFalse(np.any(np.isnan(data)))
+        self.assertRaises(gxgrdlcl.GridLocalException, gxgrdlcl.gridding, x, y, v, method='kriging')
+
+        # the surface is recovered, and blanked away from the data
+        for method, rms in ((gxgrdlcl.METHOD_IDW, 2.), (gxgrdlcl.METHOD_NEAREST, 4.),
+                            (gxgrdlcl.METHOD_NATURAL, 2.)):
+            data, p = gxgrdlcl.gridding(self.x, self.y, self.v, method=method, cs=1., tile_size=50, threads=3)
+            gy, gx = np.mgrid[0: p['ny'], 0: p['nx']]
+            error = data - _surface(p['x0'] + gx * p['dx'], p['y0'] + gy * p['dy'])
+            self.assertTrue(np.sqrt(np.nanmean(error ** 2)) < rms)
+            self.assertTrue(np.mean(np.isnan(data)) < 0.2)
+            single, _ = gxgrdlcl.gridding(self.x, self.y, self.v, method=method, cs=1., threads=1)
+            self.assertTrue(np.array_equal(data, single, equal_nan=True))
+
+        data, p = gxgrdlcl.idw(self.x, self.y, self.v, cs=1., area=(-50., None, None, None), bkd=5.)
+        self.assertTrue(np.all(np.isnan(data[:, :40])))
+
+        data, p = gxgrdlcl.idw(self.x, self.y, self.v, cs=1., radius=3., min_neighbours=4, bkd=0.)
+        sectors, _ = gxgrdlcl.idw(self.x, self.y, self.v, cs=1., radius=6., sectors=4, max_per_sector=2, bkd=0.)
+        self.assertTrue(np.count_nonzero(np.isnan(data)) > np.count_nonzero(np.isnan(sectors)))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_mincurv as gxgrdmc
+
+from base import GXPYTest
+
+
+def _surface(x, y):
+    return np.sin(x / 25.) * np.cos(y / 30.) * 100. + x * 0.2
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        rng = np.random.RandomState(3)
+        cls.x = rng.rand(3000) * 200.
+        cls.y = rng.rand(3000) * 150.
+        cls.v = _surface(cls.x, cls.y)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdmc.__version__, geosoft.__version__)
+
+    def test_area(self):
+        self.start()
+
+        x = np.array([13.1, 60.])
+        y = np.array([2., 31.])
+        self.assertEqual(gxgrdmc.grid_area(x, y, 0.25), (13., 2., 189, 117))
+        self.assertEqual(gxgrdmc.grid_area(x, y, 0.25, edgclp=5), (11.75, 0.75, 199, 127))
+        self.assertEqual(gxgrdmc.grid_area(x, y, 1., area=(10.5, None, 20.5, None)), (10.5, 2., 11, 30))
+
+        xyv = np.array([(45., 10., 100), (60., 25., 77.), (50., 8., 80.)])
+        data, p = gxgrdmc.minimum_curvature(*xyv.T)
+        self.assertEqual((p['nx'], p['ny']), (9, 9))
+        self.assertAlmostEqual(p['dx'], np.sqrt(15. * 17. / 3.) / 4.)
+
+    def test_analytic(self):
+        self.start()
+
+        report = {}
+        data, p = gxgrdmc.minimum_curvature(self.x, self.y, self.v, cs=1., bkd=1.0e9, report=report)
+        self.assertEqual((p['nx'], p['ny']), (201, 151))
+        self.assertEqual([f for f, _ in report['levels']], [8, 4, 2, 1])
+        self.assertTrue(report['seconds'] > 0.)
+
+        gy, gx = np.mgrid[0:p['ny'], 0:p['nx']].astype(np.float64)
+        error = data - _surface(gx * p['dx'] + p['x0'], gy * p['dy'] + p['y0'])
+        self.assertTrue(np.sqrt(np.mean(error ** 2)) < 1.)
+
+        # data points fix their nearest grid point
+        ix = np.rint((self.x - p['x0']) / p['dx']).astype(int)
+        iy = np.rint((self.y - p['y0']) / p['dy']).astype(int)
+        single = np.bincount(iy * p['nx'] + ix)[iy * p['nx'] + ix] == 1
+        self.assertTrue(np.allclose(data[iy[single], ix[single]], self.v[single]))
+
+        # a tighter tolerance converges further
+        tight = {}
+        gxgrdmc.minimum_curvature(self.x, self.y, self.v, cs=1., tol=1.0e-6, itrmax=5000, report=tight)
+        self.assertTrue(sum(i for _, i in tight['levels']) > sum(i for _, i in report['levels']))
+
+    def test_convergence(self):
+        self.start()
+
+        # sparse data on a fine grid, every grid converges to within a few tol of the exact solution
+        x = np.array([45., 60., 50., 55., 20., 25., 28., 35., 40., 13.1, 44.])
+        y = np.array([10., 25., 8., 11., 15., 5., 2., 18., 31., 3.88, 4.])
+        v = np.array([100., 77., 81., 66., 108., 77., 22., 110., 77., 83., 7.])
+        tol = (v.max() - v.min()) * 0.001
+        report = {}
+        data, p = gxgrdmc.minimum_curvature(x, y, v, cs=0.25, bkd=20, report=report)
+        self.assertEqual((p['nx'], p['ny']), (189, 117))
+        self.assertEqual([f for f, _ in report['levels']], [8, 4, 2, 1])
+        self.assertTrue(all(0 < i < 50 for _, i in report['levels'][1:]))
+
+        exact = {}
+        solution, _ = gxgrdmc.minimum_curvature(x, y, v, cs=0.25, bkd=20, tol=1.0e-9, itrmax=1000, report=exact)
+        self.assertTrue(all(i < 1000 for _, i in exact['levels']))
+        self.assertTrue(np.nanmax(np.abs(data - solution)) < 3. * tol)
+
+    def test_plane(self):
+        self.start()
+
+        # planes have no curvature, so are reproduced everywhere, also beyond the data
+        x = np.array([0., 10., 0., 10., 5.])
+        y = np.array([0., 0., 10., 10., 5.])
+        v = 2. * x - 3. * y + 7.
+        data, p = gxgrdmc.minimum_curvature(x, y, v, cs=1., area=(-5., -5., 15., 15.), bkd=1.0e9, tol=1.0e-8,
+                                            itrmax=1000)
+        gy, gx = np.mgrid[0:p['ny'], 0:p['nx']].astype(np.float64)
+        self.assertTrue(np.allclose(data, 2. * (gx - 5.) - 3. * (gy - 5.) + 7., atol=1.0e-4))
+
+        # full tension is a harmonic surface within the data range
+        data, _ = gxgrdmc.minimum_curvature(self.x[:200], self.y[:200], self.v[:200], cs=2., ti=1., bkd=1.0e9)
+        self.assertTrue(data.min() >= self.v[:200].min() - 1.0e-6)
+        self.assertTrue(data.max() <= self.v[:200].max() + 1.0e-6)
+
+    def test_blanking(self):
+        self.start()
+
+        data, p = gxgrdmc.minimum_curvature(self.x[:200], self.y[:200], self.v[:200], cs=2., bkd=4.)
+        self.assertTrue(np.any(np.isnan(data)))
+        gy, gx = np.mgrid[0:p['ny'], 0:p['nx']].astype(np.float64)
+        gx = gx * p['dx'] + p['x0']
+        gy = gy * p['dy'] + p['y0']
+        d = np.sqrt((gx[..., np.newaxis] - self.x[:200]) ** 2 + (gy[..., np.newaxis] - self.y[:200]) ** 2).min(-1)
+        self.assertFalse(np.any(np.isnan(data[d < 2.])))
+        self.assertTrue(np.all(np.isnan(data[d > 4. + 2.])))
+
+        x = np.array([0., 10., 20., 10.])
+        y = np.array([10., 0., 10., 20.])
+        data, p = gxgrdmc.minimum_curvature(x, y, np.ones(4), cs=1., area=(-5., -5., 25., 25.), bkd=1.0e9,
+                                            edgclp=2)
+        self.assertTrue(np.isnan(data[0, 0]))
+        self.assertFalse(np.isnan(data[15, 15]))
+        self.assertFalse(np.isnan(data[15, 4]))
+        self.assertTrue(np.isnan(data[15, 2]))
+
+    def test_options(self):
+        self.start()
+
+        # log gridding is positive
+        v = np.exp(self.v[:300] / 20.)
+        data, _ = gxgrdmc.minimum_curvature(self.x[:300], self.y[:300], v, cs=4., logopt=1, logmin=1.0e-3,
+                                            bkd=1.0e9)
+        self.assertTrue(data.min() > 0.)
+
+        # desampling averages the data in blocks
+        data, p = gxgrdmc.minimum_curvature(self.x, self.y, self.v, cs=1., idsf=10, bkd=1.0e9)
+        self.assertEqual((p['nx'], p['ny']), (201, 151))
+
+        # data outside the area shape the surface unless clipped
+        area = (0., 0., 100., 75.)
+        data, p = gxgrdmc.minimum_curvature(self.x, self.y, self.v, cs=2., area=area, bkd=1.0e9)
+        clipped, _ = gxgrdmc.minimum_curvature(self.x, self.y, self.v, cs=2., area=area, bclip=True, bkd=1.0e9)
+        self.assertEqual((p['nx'], p['ny']), (51, 39))
+        self.assertFalse(np.allclose(data[-1, :], clipped[-1, :]))
+
+        nan = np.array([np.nan])
+        self.assertRaises(gxgrdmc.MinimumCurvatureException, gxgrdmc.minimum_curvature, nan, nan, nan)
+        self.assertRaises(gxgrdmc.MinimumCurvatureException, gxgrdmc.minimum_curvature,
+                          self.x, self.y, self.v, icgr=3)
+        self.assertRaises(gxgrdmc.MinimumCurvatureException, gxgrdmc.minimum_curvature,
+                          self.x, self.y, self.v, ti=2.)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import os
+import time
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_grd as gxgrdgrd
+import geosoft.gxpy.grid_overview as gxgrdovr
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        rng = np.random.RandomState(36)
+        cls.data = rng.randint(0, 4, (37, 53)).astype(np.float64)
+        cls.data[rng.uniform(size=cls.data.shape) < 0.2] = np.nan
+        cls.props = {'x0': 100., 'y0': 200., 'dx': 10., 'dy': 5., 'rot': 0., 'nx': 53, 'ny': 37,
+                     'dtype': np.dtype(np.int16), 'is_color': False}
+
+    def blocks(self, f, function):
+        ny = (self.data.shape[0] + f - 1) // f
+        nx = (self.data.shape[1] + f - 1) // f
+        result = np.full((ny, nx), np.nan)
+        for j in range(ny):
+            for i in range(nx):
+                block = self.data[j * f: (j + 1) * f, i * f: (i + 1) * f]
+                block = block[~np.isnan(block)]
+                if block.size:
+                    result[j, i] = function(block)
+        return result
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdovr.__version__, geosoft.__version__)
+
+    def test_reduce(self):
+        self.start()
+
+        def mode(v):
+            values, counts = np.unique(v, return_counts=True)
+            return values[np.argmax(counts)]
+
+        for method, function in ((gxgrdovr.METHOD_MEAN, np.mean), (gxgrdovr.METHOD_MODE, mode)):
+            levels = gxgrdovr.reduce(self.data, 3, method)
+            self.assertEqual(len(levels), 3)
+            for level, data in enumerate(levels, 1):
+                self.assertTrue(np.allclose(data, self.blocks(2 ** level, function), equal_nan=True))
+
+        levels = gxgrdovr.reduce(self.data, 2, gxgrdovr.METHOD_NEAREST)
+        self.assertTrue(np.array_equal(levels[1], self.data[::4, ::4], equal_nan=True))
+
+        # reducing blocks of rows is the same as reducing the grid
+        top = gxgrdovr.reduce(self.data[:16], 2)
+        bottom = gxgrdovr.reduce(self.data[16:], 2)
+        whole = gxgrdovr.reduce(self.data, 2)
+        self.assertTrue(np.array_equal(np.vstack((top[1], bottom[1])), whole[1], equal_nan=True))
+
+        self.assertRaises(gxgrdovr.OverviewException, gxgrdovr.reduce, self.data, 1, 'max')
+
+    def test_properties(self):
+        self.start()
+
+        p = gxgrdovr.properties(self.props, 2)
+        self.assertEqual((p['nx'], p['ny']), (14, 10))
+        self.assertEqual((p['dx'], p['dy']), (40., 20.))
+        self.assertEqual((p['x0'], p['y0']), (115., 207.5))
+        self.assertEqual(p['dtype'], np.float32)
+
+        p = gxgrdovr.properties(self.props, 1, gxgrdovr.METHOD_NEAREST)
+        self.assertEqual((p['x0'], p['y0']), (100., 200.))
+        self.assertEqual(p['dtype'], np.int16)
+
+        self.assertEqual(gxgrdovr.default_levels(64, 10), 0)
+        self.assertEqual(gxgrdovr.default_levels(10000, 300), 8)
+
+    def test_select(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        grid_file = os.path.join(folder, 'overview_test.grd')
+        gxgrdgrd.write(grid_file, self.data, self.props, overwrite=True)
+        self.assertEqual(gxgrdovr.select(grid_file + '(GRD)', 20), grid_file + '(GRD)')
+
+        time.sleep(0.01)
+        for level, data in enumerate(gxgrdovr.reduce(self.data, 3), 1):
+            gxgrdgrd.write(gxgrdovr.file_name(grid_file, level), data,
+                           gxgrdovr.properties(self.props, level), overwrite=True)
+        self.assertEqual([lv for lv, _ in gxgrdovr.overview_files(grid_file)], [1, 2, 3])
+        self.assertEqual(gxgrdovr.select(grid_file, 20), gxgrdovr.file_name(grid_file, 1) + '(GRD)')
+        self.assertEqual(gxgrdovr.select(grid_file, 14), gxgrdovr.file_name(grid_file, 2) + '(GRD)')
+        self.assertEqual(gxgrdovr.select(grid_file, 14, 10), gxgrdovr.file_name(grid_file, 2) + '(GRD)')
+        self.assertEqual(gxgrdovr.select(grid_file, 1), gxgrdovr.file_name(grid_file, 3) + '(GRD)')
+        self.assertEqual(gxgrdovr.select(grid_file, 100), grid_file)
+        self.assertEqual(gxgrdovr.select(grid_file), grid_file)
+
+        # overviews older than the grid are not used
+        time.sleep(0.01)
+        gxgrdgrd.write(grid_file, self.data, self.props, overwrite=True)
+        os.utime(grid_file, (time.time() + 10., time.time() + 10.))
+        self.assertEqual(gxgrdovr.overview_files(grid_file), [])
+        self.assertEqual(gxgrdovr.select(grid_file, 1), grid_file)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
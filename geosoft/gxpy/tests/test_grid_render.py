@@ -0,0 +1,155 @@
+import unittest
+import os
+import struct
+import zlib
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_grd as gxgrdgrd
+import geosoft.gxpy.grid_overview as gxgrdovr
+import geosoft.gxpy.grid_render as gxrndr
+
+from base import GXPYTest
+
+
+def _read_png(file_name):
+    with open(file_name, 'rb') as f:
+        png = f.read()
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    pos = 8
+    idat = b''
+    while pos < len(png):
+        length, tag = struct.unpack('>I4s', png[pos: pos + 8])
+        body = png[pos + 8: pos + 8 + length]
+        if tag == b'IHDR':
+            nx, ny, _, color_type = struct.unpack('>IIBB', body[:10])
+        elif tag == b'IDAT':
+            idat += body
+        pos += length + 12
+    bands = 4 if color_type == 6 else 3
+    raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape((ny, nx * bands + 1))
+    return raw[:, 1:].reshape((ny, nx, bands))
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        gy, gx = np.mgrid[0:300, 0:400].astype(np.float64)
+        cls.data = np.sin(gx / 40.) * np.cos(gy / 30.) * 100. + gx * 0.1
+        cls.data[:20, :30] = np.nan
+        cls.props = {'x0': 0., 'y0': 0., 'dx': 10., 'dy': 10., 'rot': 0., 'nx': 400, 'ny': 300,
+                     'is_color': False}
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxrndr.__version__, geosoft.__version__)
+
+    def test_colors(self):
+        self.start()
+
+        colors, levels = gxrndr.color_table()
+        self.assertEqual(colors.shape, (256, 3))
+        self.assertEqual(levels, None)
+
+        zones = [(0., (255, 0, 0)), (10., (0, 255, 0)), (None, (0, 0, 255))]
+        colors, levels = gxrndr.color_table(zones)
+        self.assertEqual(list(levels), [0., 10.])
+        rgba = gxrndr.colorize(np.array([[-5., 0., 5.], [10., 11., np.nan]]), zones)
+        self.assertEqual(rgba[0, :, :3].tolist(), [[255, 0, 0], [255, 0, 0], [0, 255, 0]])
+        self.assertEqual(rgba[1, :2, :3].tolist(), [[0, 255, 0], [0, 0, 255]])
+        self.assertEqual(rgba[..., 3].tolist(), [[255, 255, 255], [255, 255, 0]])
+        self.assertRaises(gxrndr.RenderException, gxrndr.color_table, [(1., (0, 0, 0)), (0., (1, 1, 1)),
+                                                                        (None, (2, 2, 2))])
+
+        # colours are stretched over the data
+        ramp = [(0, 0, 0), (100, 100, 100), (200, 200, 200), (255, 255, 255)]
+        rgba = gxrndr.colorize(np.array([[0., 1., 2., 3.]]), ramp)
+        self.assertEqual(rgba[0, :, 0].tolist(), [0, 100, 200, 255])
+        rgba = gxrndr.colorize(np.array([[0., 1., 2., 100.]]), ramp, method=gxrndr.STRETCH_EQUALIZE)
+        self.assertEqual(rgba[0, :, 0].tolist(), [0, 100, 200, 255])
+        rgba = gxrndr.colorize(np.array([[0., 1., 2., 100.]]), ramp, limits=(0., 4.))
+        self.assertEqual(rgba[0, :, 0].tolist(), [0, 100, 200, 255])
+
+        t = gxrndr.stretch(self.data, gxrndr.STRETCH_EQUALIZE)
+        hist, _ = np.histogram(t[~np.isnan(t)], bins=10)
+        self.assertTrue(hist.min() > 0.9 * hist.max())
+
+    def test_shade(self):
+        self.start()
+
+        # a plane facing the light is fully lit, and shade follows the slope
+        gy, gx = np.mgrid[0:10, 0:10].astype(np.float64)
+        s = gxrndr.hillshade(np.zeros((10, 10)), altitude=90.)
+        self.assertTrue(np.allclose(s, 1.))
+        s = gxrndr.hillshade(-gx, azimuths=90., altitude=45.)
+        self.assertTrue(np.allclose(s, 1.))
+        s = gxrndr.hillshade(gx, azimuths=90., altitude=45.)
+        self.assertTrue(np.allclose(s, 0.))
+        s = gxrndr.hillshade(gy, azimuths=gxrndr.MULTIDIRECTIONAL)
+        self.assertTrue(np.all((s > 0.) & (s < 1.)))
+
+        shade = gxrndr.hillshade(self.data, 10., 10.)
+        self.assertTrue(np.isnan(shade[0, 0]))
+        rgba = gxrndr.colorize(self.data)
+        for mode in (gxrndr.SHADE_MULTIPLY, gxrndr.SHADE_OVERLAY, gxrndr.SHADE_SOFT_LIGHT):
+            shaded = gxrndr.blend(rgba, shade, mode)
+            self.assertEqual(shaded.shape, rgba.shape)
+            self.assertTrue(np.array_equal(shaded[..., 3], rgba[..., 3]))
+        self.assertTrue(np.array_equal(gxrndr.blend(rgba, np.ones(shade.shape)), rgba))
+        self.assertTrue(np.array_equal(gxrndr.blend(rgba, shade, strength=0.), rgba))
+        self.assertRaises(gxrndr.RenderException, gxrndr.blend, rgba, shade, 9)
+
+    def test_png(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        image = gxrndr.render(self.data, self.props, shade=True)
+        self.assertEqual(image.shape, (300, 400, 4))
+
+        # the image is top row first
+        self.assertEqual(image[-1, 0, 3], 0)
+        self.assertEqual(image[0, 0, 3], 255)
+
+        png = gxrndr.write_png(os.path.join(folder, 'render.png'), image)
+        self.assertTrue(np.array_equal(_read_png(png), image))
+        png = gxrndr.write_png(os.path.join(folder, 'render_rgb.png'), image[..., :3])
+        self.assertTrue(np.array_equal(_read_png(png), image[..., :3]))
+
+    def test_thumbnail(self):
+        self.start()
+
+        folder = self._gx.temp_folder()
+        grid_file = gxgrdgrd.write(os.path.join(folder, 'render.grd'), self.data, self.props, dtype=np.float32)
+        self.assertEqual(gxrndr.image_size(self.props, 100), (100, 75))
+        self.assertEqual(gxrndr.image_size(self.props, pix_height=30), (40, 30))
+
+        png = gxrndr.thumbnail(grid_file + '(GRD)', pix_width=100)
+        self.assertEqual(png, os.path.join(folder, 'render.png'))
+        image = _read_png(png)
+        self.assertEqual(image.shape, (75, 100, 4))
+        self.assertEqual(image[-1, 0, 3], 0)
+
+        # overviews are used when they meet the size
+        for level, data in enumerate(gxgrdovr.reduce(self.data, 2), 1):
+            gxgrdgrd.write(gxgrdovr.file_name(grid_file, level), data, gxgrdovr.properties(self.props, level),
+                           dtype=np.float32, overwrite=True)
+        ovr = _read_png(gxrndr.thumbnail(grid_file, os.path.join(folder, 'ovr.png'), pix_width=100))
+        self.assertEqual(ovr.shape, image.shape)
+        self.assertTrue(np.mean(np.abs(ovr.astype(int) - image.astype(int))) < 2.)
+
+        data, p = gxrndr.resize(self.data, self.props, 100, 75)
+        self.assertEqual(data.shape, (75, 100))
+        self.assertEqual((p['dx'], p['dy']), (40., 40.))
+        self.assertAlmostEqual(p['x0'], 15.)
+
+        pngs = gxrndr.thumbnails([grid_file, grid_file], folder=self._gx.temp_folder(), pix_width=50,
+                                 shade=True, method=gxrndr.STRETCH_EQUALIZE, threads=2)
+        self.assertEqual(len(pngs), 2)
+        self.assertEqual(_read_png(pngs[0]).shape, (38, 50, 4))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
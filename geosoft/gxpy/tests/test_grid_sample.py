@@ -0,0 +1,104 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_sample as gxgrdsmp
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        yy, xx = np.mgrid[0:150, 0:200].astype(np.float64)
+        cls.data = np.sin(xx / 30.) * np.cos(yy / 20.)
+        cls.props = {'x0': 1000., 'y0': 2000., 'dx': 10., 'dy': 10., 'rot': 0., 'is_color': False}
+        cls.fx = np.random.uniform(2, 197, 20000)
+        cls.fy = np.random.uniform(2, 147, 20000)
+        cls.truth = np.sin(cls.fx / 30.) * np.cos(cls.fy / 20.)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdsmp.__version__, geosoft.__version__)
+
+    def test_methods(self):
+        self.start()
+
+        x = self.props['x0'] + self.fx * 10.
+        y = self.props['y0'] + self.fy * 10.
+        error = [np.abs(gxgrdsmp.sample(self.data, self.props, x, y, method=m) - self.truth).max()
+                 for m in (gxgrdsmp.SAMPLE_NEAREST, gxgrdsmp.SAMPLE_LINEAR, gxgrdsmp.SAMPLE_CUBIC)]
+        self.assertTrue(error[0] > error[1] > error[2])
+        self.assertTrue(error[2] < 1e-5)
+
+        # grid points are exact
+        x = self.props['x0'] + np.arange(10) * 10.
+        y = np.full(10, self.props['y0'] + 30.)
+        for m in (gxgrdsmp.SAMPLE_NEAREST, gxgrdsmp.SAMPLE_LINEAR, gxgrdsmp.SAMPLE_CUBIC):
+            self.assertTrue(np.allclose(gxgrdsmp.sample(self.data, self.props, x, y, method=m), self.data[3, :10]))
+
+        self.assertRaises(gxgrdsmp.SampleException, gxgrdsmp.sample, self.data, self.props, x, y, method=9)
+
+    def test_rotated(self):
+        self.start()
+
+        props = dict(self.props, rot=30.)
+        cos = np.cos(np.radians(30.))
+        sin = np.sin(np.radians(30.))
+        u = self.fx * 10.
+        v = self.fy * 10.
+        x = props['x0'] + u * cos + v * sin
+        y = props['y0'] - u * sin + v * cos
+        fx, fy = gxgrdsmp.index_from_xy(props, x, y)
+        self.assertTrue(np.allclose(fx, self.fx))
+        self.assertTrue(np.allclose(fy, self.fy))
+        xx, yy = gxgrdsmp.xy_from_index(props, fx, fy)
+        self.assertTrue(np.allclose(xx, x))
+        self.assertTrue(np.allclose(yy, y))
+        values = gxgrdsmp.sample(self.data, props, x, y, method=gxgrdsmp.SAMPLE_CUBIC)
+        self.assertTrue(np.abs(values - self.truth).max() < 1e-5)
+
+    def test_dummies(self):
+        self.start()
+
+        data = self.data.copy()
+        data[50:60, 50:60] = np.nan
+        x = self.props['x0'] + self.fx * 10.
+        y = self.props['y0'] + self.fy * 10.
+        nearest = gxgrdsmp.sample(data, self.props, x, y, method=gxgrdsmp.SAMPLE_NEAREST)
+        for m in (gxgrdsmp.SAMPLE_LINEAR, gxgrdsmp.SAMPLE_CUBIC):
+            values = gxgrdsmp.sample(data, self.props, x, y, method=m)
+            self.assertTrue(np.array_equal(np.isnan(values), np.isnan(nearest)))
+
+        x = np.array([self.props['x0'] - 4., self.props['x0'] - 6.])
+        y = np.array([self.props['y0'], self.props['y0']])
+        values = gxgrdsmp.sample(data, self.props, x, y)
+        self.assertEqual(values[0], data[0, 0])
+        self.assertTrue(np.isnan(values[1]))
+
+    def test_color(self):
+        self.start()
+
+        data = np.arange(200 * 150, dtype=np.int32).reshape((150, 200))
+        props = dict(self.props, is_color=True)
+        x = props['x0'] + np.array([10.4, 20.6, -5.]) * 10.
+        y = props['y0'] + np.array([5.2, 7.7, 0.]) * 10.
+        values = gxgrdsmp.sample(data, props, x, y, method=gxgrdsmp.SAMPLE_CUBIC)
+        self.assertEqual(values.dtype, np.int32)
+        self.assertEqual(list(values), [data[5, 10], data[8, 21], -2147483647])
+
+    def test_threads(self):
+        self.start()
+
+        x = self.props['x0'] + np.tile(self.fx, 10) * 10.
+        y = self.props['y0'] + np.tile(self.fy, 10) * 10.
+        single = gxgrdsmp.sample(self.data, self.props, x, y, threads=1)
+        threaded = gxgrdsmp.sample(self.data, self.props, x, y, chunk_size=7777, threads=4)
+        self.assertTrue(np.array_equal(single, threaded))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_statistics as gxgrdst
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        rng = np.random.RandomState(35)
+        cls.data = rng.standard_normal((600, 500)) * 5. + 100.
+        cls.data[rng.uniform(size=cls.data.shape) < 0.1] = np.nan
+        cls.data[::7, ::3] = 102.5
+        cls.valid = cls.data[~np.isnan(cls.data)]
+        cls.percentiles = (0, 0.1, 1, 10, 25, 50, 75, 90, 99, 99.9, 100)
+
+    def blocks(self, rows=37):
+        def blocks():
+            for i in range(0, self.data.shape[0], rows):
+                yield self.data[i: i + rows]
+        return blocks
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdst.__version__, geosoft.__version__)
+
+    def test_moments(self):
+        self.start()
+
+        x = self.valid
+        n = x.size
+        mean = x.mean()
+        sd = x.std(ddof=1)
+        for threads in (1, 4):
+            st = gxgrdst.statistics(self.blocks(), threads=threads)
+            self.assertEqual(st['num_data'], n)
+            self.assertEqual(st['num_dummy'], self.data.size - n)
+            self.assertEqual(st['min'], x.min())
+            self.assertEqual(st['max'], x.max())
+            self.assertAlmostEqual(st['mean'], mean, 10)
+            self.assertAlmostEqual(st['sd'], sd, 10)
+            self.assertAlmostEqual(st['variance'], x.var(ddof=1), 8)
+            self.assertAlmostEqual(st['skew'], ((x - mean) ** 3).sum() / (n * sd ** 3), 10)
+            self.assertAlmostEqual(st['kurtosis'], ((x - mean) ** 4).sum() / (n * sd ** 4) - 3., 10)
+            self.assertAlmostEqual(st['geometric_mean'], np.exp(np.log(x).mean()), 10)
+            for k, p in (('sum', 1), ('sum_power_2', 2), ('sum_power_3', 3), ('sum_power_4', 4)):
+                self.assertAlmostEqual(st[k] / (x ** p).sum(), 1., 12)
+            self.assertFalse('percentiles' in st)
+
+        # merging is independent of the blocks
+        a = gxgrdst.Moments(self.data[:100])
+        a.merge(gxgrdst.Moments(self.data[100:]))
+        b = gxgrdst.Moments(self.data)
+        for k in ('mean', 'variance', 'skew', 'kurtosis'):
+            self.assertAlmostEqual(a.statistics()[k], b.statistics()[k], 10)
+
+        st = gxgrdst.statistics(np.array([-1., 2., np.nan]))
+        self.assertTrue(st['geometric_mean'] is None)
+        self.assertEqual(st['num_dummy'], 1)
+        st = gxgrdst.statistics(np.full(5, np.nan), percentiles=[50])
+        self.assertTrue(st['mean'] is None)
+        self.assertTrue(st['median'] is None)
+        self.assertEqual(st['num_dummy'], 5)
+
+    def test_percentiles(self):
+        self.start()
+
+        expected = np.nanpercentile(self.data, self.percentiles)
+        st = gxgrdst.statistics(self.blocks(), percentiles=self.percentiles, threads=3)
+        for q, v in zip(self.percentiles, expected):
+            self.assertEqual(st['percentiles'][q], v)
+        self.assertEqual(st['median'], np.nanmedian(self.data))
+
+        # narrow the interval over several histogram passes
+        ranks = [0, 17, 12345, self.valid.size // 2, self.valid.size - 1]
+        values = gxgrdst._ranked_values(self.blocks(), ranks, self.valid.size, self.valid.min(),
+                                        self.valid.max(), 2, bins=8, collect_limit=500)
+        x = np.sort(self.valid)
+        for r in ranks:
+            self.assertEqual(values[r], x[r])
+
+        # repeated values
+        data = np.random.RandomState(1).randint(0, 4, 100000).astype(np.float64)
+        st = gxgrdst.statistics(data, percentiles=self.percentiles)
+        for q, v in zip(self.percentiles, np.percentile(data, self.percentiles)):
+            self.assertEqual(st['percentiles'][q], v)
+        st = gxgrdst.statistics(np.full(1000, 7.), percentiles=(5, 95))
+        self.assertEqual(st['percentiles'], {5.: 7., 95.: 7.})
+
+        self.assertRaises(gxgrdst.StatisticsException, gxgrdst.statistics, data, percentiles=[101])
+
+    def test_histogram(self):
+        self.start()
+
+        st = gxgrdst.statistics(self.blocks(), bins=25)
+        counts, edges = np.histogram(self.valid, 25, range=(self.valid.min(), self.valid.max()))
+        self.assertTrue(np.array_equal(st['histogram'][0], counts))
+        self.assertTrue(np.allclose(st['histogram'][1], edges))
+
+        h = gxgrdst.Histogram(90., 110., 10)
+        h.add(self.data)
+        self.assertEqual(h.below + h.above + h.counts.sum(), self.valid.size)
+        self.assertRaises(gxgrdst.StatisticsException, h.merge, gxgrdst.Histogram(90., 100., 10))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
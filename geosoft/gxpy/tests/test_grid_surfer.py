@@ -0,0 +1,98 @@
+import unittest
+import os
+import struct
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.system as gsys
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_surfer as gxsrf
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.folder, files = gsys.unzip(os.path.join(os.path.dirname(cls._test_case_py), 'testgrids.zip'),
+                                       folder=cls._gx.temp_folder())
+        cls.mag = os.path.join(cls.folder, 'mag.grd')
+        cls.srf6 = os.path.join(cls.folder, 'mag_surfer6.grd')
+        cls.srf7 = os.path.join(cls.folder, 'mag_surfer7.grd')
+        with gxgrd.Grid.open(cls.mag) as g:
+            gxgrd.Grid.copy(g, gxgrd.Grid.decorate_name(cls.srf6, 'SRF;VER=V6'), overwrite=True).close()
+            gxgrd.Grid.copy(g, gxgrd.Grid.decorate_name(cls.srf7, 'SRF;VER=V7'), overwrite=True).close()
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxsrf.__version__, geosoft.__version__)
+
+    def test_header(self):
+        self.start()
+
+        self.assertEqual(gxsrf.read_header(self.srf6)['version'], 6)
+        self.assertEqual(gxsrf.read_header(self.srf7 + '(SRF;VER=V7)')['version'], 7)
+
+        with gxgrd.Grid.open(self.mag) as g:
+            gp = g.properties()
+        for gf in (self.srf6, self.srf7):
+            p = gxsrf.properties(gf)
+            for k in ('nx', 'ny', 'rot'):
+                self.assertEqual(p[k], gp[k])
+            for k in ('x0', 'y0', 'dx', 'dy'):
+                self.assertAlmostEqual(p[k], gp[k])
+
+        self.assertRaises(gxsrf.SurferException, gxsrf.read_header, self.mag)
+
+    def test_read(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            gxnp = g.np(dtype=np.float64)
+
+        for gf in (self.srf6, self.srf7):
+            data, p = gxsrf.read(gf, dtype=np.float64)
+            self.assertEqual(data.shape, gxnp.shape)
+            self.assertTrue(np.array_equal(np.isnan(data), np.isnan(gxnp)))
+            self.assertTrue(np.allclose(data, gxnp, rtol=1e-6, equal_nan=True))
+
+            window, wp = gxsrf.read(gf, window=(5, 10, 20, 30), dtype=np.float64)
+            self.assertTrue(np.array_equal(window, data[10:40, 5:25], equal_nan=True))
+            self.assertAlmostEqual(wp['x0'], p['x0'] + 5 * p['dx'])
+            self.assertAlmostEqual(wp['y0'], p['y0'] + 10 * p['dy'])
+
+        self.assertEqual(gxsrf.read(self.srf6)[0].dtype, np.float32)
+        self.assertEqual(gxsrf.read(self.srf7)[0].dtype, np.float64)
+        self.assertRaises(gxsrf.SurferException, gxsrf.read, self.srf7, window=(0, 0, 1000, 10))
+
+    def test_blank_rotation(self):
+        self.start()
+
+        # Surfer 7 grid with a negative blank, rotated 30 degrees counter-clockwise
+        gf = os.path.join(self._gx.temp_folder(), 'rotated.grd')
+        values = np.arange(12, dtype=np.float64).reshape(3, 4)
+        values[1, 2] = -99999.
+        values[2, 3] = -99999.0000001
+        with open(gf, 'wb') as f:
+            f.write(struct.pack('<4sIi', b'DSRB', 4, 2))
+            f.write(struct.pack('<4sI2i8d', b'GRID', 72, 3, 4, 100., 200., 10., 5., 0., 11., 30., -99999.))
+            f.write(struct.pack('<4sI', b'DATA', values.nbytes))
+            f.write(values.tobytes())
+
+        data, p = gxsrf.read(gf)
+        self.assertEqual(p['rot'], -30.)
+        self.assertTrue(np.array_equal(np.isnan(data), values < -1.))
+        self.assertEqual(data[0, 0], 0.)
+        self.assertEqual(data[2, 2], 10.)
+
+        # window origins are along the rotated grid axes
+        window, wp = gxsrf.read(gf, window=(2, 1, 2, 2))
+        self.assertAlmostEqual(wp['x0'], 100. + 20. * np.cos(np.radians(30.)) - 5. * np.sin(np.radians(30.)))
+        self.assertAlmostEqual(wp['y0'], 200. + 20. * np.sin(np.radians(30.)) + 5. * np.cos(np.radians(30.)))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
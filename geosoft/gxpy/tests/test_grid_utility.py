@@ -1,18 +1,47 @@
 import unittest
 import os
+import math
 import numpy as np
 
 import geosoft
+import geosoft.gxapi as gxapi
 import geosoft.gxpy.system as gsys
 import geosoft.gxpy.grid as gxgrd
 import geosoft.gxpy.grid_utility as gxgrdu
 import geosoft.gxpy.geometry as gxgeo
 import geosoft.gxpy.coordinate_system as gxcs
 import geosoft.gxpy.gdb as gxgdb
+import geosoft.gxpy.vv as gxvv
 
 from base import GXPYTest
 
 
+def _grid_vd(grid_file):
+    """ the 9.4 space-domain vertical derivative, a Geosoft 5x5 convolution """
+
+    with gxgrd.Grid.open(grid_file, dtype=np.float64) as g:
+        dzg = gxgrd.Grid.new(properties=g.properties())
+        gxapi.GXIMU.grid_vd(g.gximg, dzg.gximg)
+        return gxgrd.reopen(dzg).np(dtype=np.float64), g.properties()
+
+
+def _tilt_depth_94(grid_file, resolution):
+    """
+    Tilt depths by the 9.4 pipeline: the Geosoft 5x5 vertical derivative, a tilt-angle grid, the zero contour
+    of the tilt angle, and the reciprocal of the horizontal gradient of the tilt angle sampled on the contour.
+    """
+
+    dz, properties = _grid_vd(grid_file)
+    dxy = gxgrdu.derivative(grid_file, gxgrdu.DERIVATIVE_XY).np(dtype=np.float64)
+    properties['dtype'] = np.float64
+    ta = gxgrd.Grid.from_data_array(np.arctan2(dz, dxy), properties=properties)
+    tad = gxgrdu.derivative(ta, gxgrdu.DERIVATIVE_XY)
+    xyz = gxgrdu.contour_points(ta, 0., max_segments=10000, resolution=resolution,
+                                return_as=gxgrdu.RETURN_PPOINT).pp
+    xyz[:, 2] = 1. / gxgrdu.sample(tad, xyz)
+    return xyz
+
+
 class Test(GXPYTest):
     @classmethod
     def setUpClass(cls):
@@ -68,6 +97,144 @@ class Test(GXPYTest):
             self.assertEqual(properties.get('ny'),101)
             self.assertEqual(str(properties.get('coordinate_system')),'WGS 84')
 
+        # a mosaic of one grid is the grid for all blend modes
+        with gxgrd.Grid.open(m1s) as g:
+            m1 = g.np()
+        for blend in (gxgrdu.BLEND_MEAN, gxgrdu.BLEND_FEATHER, gxgrdu.BLEND_MEDIAN):
+            m = os.path.join(self.folder, 'test_mosaic_blend.grd')
+            with gxgrdu.grid_mosaic(m, [m1s, m1s], blend=blend, tile_size=37, threads=3) as grd:
+                self.assertTrue(np.allclose(grd.np(), m1, equal_nan=True))
+            with gxgrdu.grid_mosaic(m, glist, blend=blend) as grd:
+                self.assertEqual((grd.nx, grd.ny), (201, 101))
+
+        # grids reprojected as they are opened are read through the pager, on the calling thread
+        utm = os.path.join(self.folder, 'm1_utm.grd(GRD)')
+        with gxgrd.Grid.open(m1s) as g:
+            gxgrdu.reproject(g, 'WGS 84 / UTM zone 32N', file_name=utm, overwrite=True).close()
+            sd = g.statistics()['sd']
+            x0, y0 = g.x0, g.y0
+        m = os.path.join(self.folder, 'test_mosaic_utm.grd')
+        with gxgrdu.grid_mosaic(m, [m1s, utm], blend=gxgrdu.BLEND_MEAN, tile_size=37, threads=4) as grd:
+            self.assertEqual(grd.coordinate_system, 'WGS 84')
+            ix0, iy0 = (int(round(i)) for i in grd.index_from_xy(x0, y0))
+            data = grd.np(dtype=np.float64)[iy0: iy0 + m1.shape[0], ix0: ix0 + m1.shape[1]]
+            self.assertTrue(np.nanmedian(np.abs(data - m1)) < 0.05 * sd)
+
+        self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.grid_mosaic, m, [])
+
+    def test_sample(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            nx, ny = g.nx, g.ny
+            fx = np.random.uniform(0, nx - 1, 5000)
+            fy = np.random.uniform(0, ny - 1, 5000)
+            xyz = np.zeros((fx.shape[0], 3))
+            xyz[:, 0], xyz[:, 1] = g.xy_from_index(fx, fy)
+
+            vvx, vvy, vvz = gxvv.vvset_from_np(xyz)
+            gxapi.GXIMU.get_zvv(g.gximg, vvx.gxvv, vvy.gxvv, vvz.gxvv)
+            gx_values = vvz.np
+
+            values = gxgrdu.sample(g, xyz)
+            valid = ~(np.isnan(gx_values) | np.isnan(values))
+            self.assertTrue(np.count_nonzero(valid) > 1000)
+            self.assertTrue(np.allclose(values[valid], gx_values[valid], rtol=1e-5))
+
+            data = g.np(dtype=np.float64)
+            nearest = gxgrdu.sample(g, xyz, method=gxgrdu.SAMPLE_NEAREST)
+            ix = np.rint(fx).astype(int)
+            iy = np.rint(fy).astype(int)
+            self.assertTrue(np.array_equal(nearest, data[iy, ix], equal_nan=True))
+
+            cubic = gxgrdu.sample(g, xyz, method=gxgrdu.SAMPLE_CUBIC, threads=2)
+            self.assertEqual(np.count_nonzero(np.isnan(cubic)), np.count_nonzero(np.isnan(values)))
+
+            pp = gxgeo.PPoint(xyz, coordinate_system=g.coordinate_system)
+            self.assertTrue(np.array_equal(gxgrdu.sample(g, pp), values, equal_nan=True))
+
+    def test_reproject(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            stats = g.statistics()
+            cs = gxcs.Coordinate_system("NAD83 / UTM zone 32N")
+
+            with gxgrdu.reproject(g, cs, method=gxgrdu.SAMPLE_LINEAR) as r:
+                self.assertEqual(r.coordinate_system, cs)
+                self.assertEqual(r.rot, 0.)
+                rstats = r.statistics()
+                self.assertTrue(rstats['num_data'] > 0.9 * stats['num_data'])
+                self.assertAlmostEqual(rstats['mean'], stats['mean'], delta=0.01 * stats['sd'])
+
+                # the reprojected grid samples the grid at the projected locations
+                data = r.np(dtype=np.float64)
+                ix, iy = np.meshgrid(np.arange(5, r.nx, 17), np.arange(5, r.ny, 13))
+                xyz = np.zeros((ix.size, 3))
+                xyz[:, 0], xyz[:, 1] = r.xy_from_index(ix.ravel(), iy.ravel())
+                expected = gxgrdu.sample(g, gxgeo.PPoint(xyz, coordinate_system=cs))
+                values = data[iy.ravel(), ix.ravel()]
+                valid = ~(np.isnan(expected) | np.isnan(values))
+                self.assertTrue(np.count_nonzero(valid) > 100)
+                self.assertTrue(np.allclose(values[valid], expected[valid], atol=0.05 * stats['sd']))
+
+                # the same geometry on the same lattice and cell size repeats the projection exactly
+                with gxgrdu.reproject(g, cs, properties=r.properties()) as rr:
+                    self.assertTrue(np.array_equal(rr.np(dtype=np.float64), data, equal_nan=True))
+
+            with gxgrdu.reproject(g, g.coordinate_system, cell_size=g.dx * 2,
+                                  method=gxgrdu.SAMPLE_AVERAGE) as r:
+                self.assertEqual(r.nx, (g.nx + 1) // 2)
+                self.assertAlmostEqual(r.statistics()['mean'], stats['mean'], delta=0.01 * stats['sd'])
+
+    def test_compare(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            report = gxgrdu.compare(g, self.mag, bins=8)
+            self.assertTrue(report['passed'])
+            self.assertEqual(report['max_abs'], 0.)
+            self.assertEqual(report['num_compared'], g.statistics()['num_data'])
+            self.assertEqual(np.sum(report['histogram'][0]), report['num_compared'])
+
+            data = g.np(dtype=np.float64)
+            valid = np.argwhere(~np.isnan(data))
+            iy, ix = valid[len(valid) // 2]
+            data[iy, ix] += 100.
+            iy0, ix0 = valid[0]
+            data[iy0, ix0] = np.nan
+            p = g.properties()
+            with gxgrd.Grid.from_data_array(data, properties=p) as b:
+                diff_file = os.path.join(self.folder, 'compare.grd(GRD)')
+                report = gxgrdu.compare(g, b, tolerance=1., file_name=diff_file, overwrite=True, worst=2)
+                self.assertFalse(report['passed'])
+                self.assertEqual(report['num_failed'], 1)
+                self.assertEqual(report['num_dummy_b'], 1)
+                self.assertEqual(report['num_dummy_a'], 0)
+                self.assertAlmostEqual(report['max_abs'], 100.)
+                self.assertAlmostEqual(report['rms'], 100. / math.sqrt(report['num_compared']))
+                worst = report['worst'][0]
+                self.assertEqual((worst['ix'], worst['iy']), (ix, iy))
+                self.assertAlmostEqual(worst['difference'], 100.)
+                self.assertEqual((worst['x'], worst['y']), g.xy_from_index(ix, iy))
+                self.assertEqual(len(report['worst']), 2)
+
+                with gxgrd.Grid.open(report['difference_grid']) as d:
+                    self.assertAlmostEqual(d.statistics()['max'], 100., places=3)
+
+                self.assertTrue(gxgrdu.compare(g, b, tolerance=1000.)['num_failed'] == 0)
+
+            # a grid in another coordinate system is projected and read through the pager on the calling thread
+            cs = gxcs.Coordinate_system("WGS 84 / UTM zone 53S")
+            stats = g.statistics()
+            with gxgrdu.reproject(g, cs, threads=4) as r:
+                report = gxgrdu.compare(g, r, threads=4)
+                self.assertTrue(report['num_compared'] > 0.9 * stats['num_data'])
+                self.assertTrue(abs(report['mean']) < 0.01 * stats['sd'])
+                self.assertTrue(report['rms'] < 0.05 * stats['sd'])
+                report_r = gxgrdu.compare(r, g, threads=1)
+                self.assertTrue(report_r['rms'] < 0.05 * stats['sd'])
+
     def test_bool(self):
         self.start()
 
@@ -130,12 +297,12 @@ class Test(GXPYTest):
 
         with gxgrd.Grid.open(self.mag) as grd:
             das = gxgrdu.derivative(grd, gxgrdu.DERIVATIVE_XYZ, fft=False)
-            self.assertAlmostEqual(das.statistics()['sd'], 1.0226482933289056)
+            self.assertAlmostEqual(das.statistics()['sd'], 0.9779422566774186)
             self.assertEqual(das.unit_of_measure, 'nT/m')
 
         with gxgrd.Grid.open(self.mag) as grd:
             dtd = gxgrdu.derivative(grd, gxgrdu.TILT_ANGLE, fft=False)
-            self.assertAlmostEqual(dtd.statistics()['sd'], 0.8209237171466927)
+            self.assertAlmostEqual(dtd.statistics()['sd'], 0.8329203518175807)
             self.assertEqual(dtd.unit_of_measure, 'radians')
 
         with gxgrd.Grid.open(self.mag, dtype=np.float64) as grd:
@@ -146,7 +313,7 @@ class Test(GXPYTest):
 
         with gxgrd.Grid.open(self.mag, dtype=np.float64) as grd:
             dzg = gxgrdu.derivative(grd, gxgrdu.DERIVATIVE_Z, fft=False)
-            self.assertAlmostEqual(dzg.statistics()['sd'], 0.9377582582050702)
+            self.assertAlmostEqual(dzg.statistics()['sd'], 0.9251946002582822)
             self.assertEqual(dzg.dtype, np.float64)
             self.assertEqual(dzg.unit_of_measure, 'nT/m')
 
@@ -157,13 +324,42 @@ class Test(GXPYTest):
             self.assertEqual(dzg.unit_of_measure, 'nT/m')
 
         dzg = gxgrdu.derivative(self.mag, gxgrdu.DERIVATIVE_Z, fft=False)
-        self.assertAlmostEqual(dzg.statistics()['sd'], 0.9377582582050702, 2)
+        self.assertAlmostEqual(dzg.statistics()['sd'], 0.9251946002582822, 2)
+
+        dxg, dzg, dtd = gxgrdu.derivatives(self.mag, (gxgrdu.DERIVATIVE_X, gxgrdu.DERIVATIVE_Z, gxgrdu.TILT_ANGLE),
+                                           fft=False)
+        self.assertAlmostEqual(dxg.statistics()['sd'], 0.7668436702132574)
+        self.assertAlmostEqual(dzg.statistics()['sd'], 0.9251946002582822)
+        self.assertAlmostEqual(dtd.statistics()['sd'], 0.8329203518175807)
+        self.assertEqual(dzg.unit_of_measure, 'nT/m')
+        self.assertEqual(dtd.unit_of_measure, 'radians')
+        self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.derivatives, self.mag, (gxgrdu.DERIVATIVE_X,),
+                          file_names=('a.grd', 'b.grd'))
         self.assertEqual(dzg.unit_of_measure, 'nT/m')
 
         dxg = gxgrdu.derivative(self.mag, gxgrdu.DERIVATIVE_X)
         self.assertAlmostEqual(dxg.statistics()['sd'], 0.7668436702132574, 2)
         self.assertEqual(dxg.unit_of_measure, 'nT/m')
 
+        # the space-domain operator is longer than the 9.4 Geosoft 5x5 convolution, the sd of the vertical
+        # derivative is 1.3% lower than 9.4, and closer to the FFT derivative sd 0.9175
+        dz94, _ = _grid_vd(self.mag)
+        self.assertAlmostEqual(np.nanstd(dz94, ddof=1), 0.9377582582050702)
+        dz = gxgrdu.derivative(self.mag, gxgrdu.DERIVATIVE_Z, fft=False).np(dtype=np.float64)
+        self.assertAlmostEqual(np.nanstd(dz, ddof=1), 0.9377582582050702, delta=0.9377582582050702 * 0.02)
+        self.assertTrue(np.corrcoef(dz.ravel(), dz94.ravel())[0, 1] > 0.9)
+
+        # 9.4 analytic signal and tilt angle sd, within 5% and 2%
+        das, dtd = gxgrdu.derivatives(self.mag, (gxgrdu.DERIVATIVE_XYZ, gxgrdu.TILT_ANGLE), fft=False)
+        self.assertAlmostEqual(das.statistics()['sd'], 1.0226482933289056, delta=1.0226482933289056 * 0.05)
+        self.assertAlmostEqual(dtd.statistics()['sd'], 0.8209237171466927, delta=0.8209237171466927 * 0.02)
+
+        # with the 9.4 vertical derivative the horizontal gradient gives the 9.4 analytic signal and tilt angle,
+        # so the analytic signal and tilt angle only differ from 9.4 by the vertical derivative operator
+        dxy = gxgrdu.derivative(self.mag, gxgrdu.DERIVATIVE_XY).np(dtype=np.float64)
+        self.assertAlmostEqual(np.nanstd(np.hypot(dxy, dz94), ddof=1), 1.0226482933289056, 3)
+        self.assertAlmostEqual(np.nanstd(np.arctan2(dz94, dxy), ddof=1), 0.8209237171466927, 3)
+
     def test_contour_xy(self):
         self.start()
 
@@ -183,20 +379,32 @@ class Test(GXPYTest):
                 self.assertTrue(isinstance(xyp, list))
                 self.assertTrue(isinstance(xyp[0], gxgeo.PPoint))
                 self.assertEqual(len(xyp), 45)
+                self.assertEqual(len(gxgrdu.contour_points(gm, v, min_length=0)), 61)
 
                 self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.contour_points, gm, 0)
+                self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.contour_points, gm, v, max_segments=44)
 
+                # 343 points from the Geosoft contour group in 9.4. The lines are resampled by a spline
+                # through the contour crossings, which are not the vertices of the contour group lines, so the
+                # lengths and the number of resampled points differ slightly. The crossings are exact.
                 xyp = gxgrdu.contour_points(gm, 500, return_as=gxgrdu.RETURN_PPOINT)
                 self.assertTrue(isinstance(xyp, gxgeo.PPoint))
-                self.assertEqual(len(xyp), 343)
+                self.assertAlmostEqual(len(xyp), 343, delta=3)
+                self.assertEqual(sum(len(pp) for pp in gxgrdu.contour_points(gm, 500, resolution=0)), 464)
 
                 xyp = gxgrdu.contour_points(gm, 250, return_as=gxgrdu.RETURN_GDB)
                 self.assertTrue(isinstance(xyp, gxgdb.Geosoft_gdb))
                 self.assertEqual(len(xyp.list_lines()), 9)
 
+                xyp = gxgrdu.contour_points(gm, 250, resolution=0)
+                self.assertEqual(sum(len(pp) for pp in xyp), 404)
+
     def test_tilt_depth(self):
         self.start()
 
+        # 9.4 found 1673 and 399 depths. The zero contour of the tilt angle follows the vertical derivative,
+        # and the 122 zero contours of the space-domain operator are 214 km long, 1134 depths 200 m apart.
+        # Depths are compared with the 9.4 pipeline below.
         td = gxgrdu.tilt_depth(self.mag, return_as=gxgrdu.RETURN_GDB, fft=False)
         self.assertTrue(isinstance(td, gxgdb.Geosoft_gdb))
         self.assertTrue(td.coordinate_system == 'AGD66 / AMG zone 53')
@@ -204,7 +412,7 @@ class Test(GXPYTest):
         for ln in td.list_lines():
             d = td.read_line(ln, 'X')
             n += len(d[0])
-        self.assertEqual(n, 1673)
+        self.assertEqual(n, 1134)
 
         td = gxgrdu.tilt_depth(self.mag, resolution=1000, gdb='temp.gdb', overwrite=True, fft=False)
         self.assertTrue(isinstance(td, gxgdb.Geosoft_gdb))
@@ -213,7 +421,7 @@ class Test(GXPYTest):
         for ln in td.list_lines():
             d = td.read_line(ln, 'X')
             n += len(d[0])
-        self.assertEqual(n, 399)
+        self.assertEqual(n, 290)
         td.close(discard=True)
 
         td = gxgrdu.tilt_depth(self.mag, resolution=1000, return_as=gxgrdu.RETURN_LIST_OF_PPOINT, fft=False)
@@ -223,7 +431,24 @@ class Test(GXPYTest):
         n = 0
         for p in td:
             n += len(p)
-        self.assertEqual(n, 399)
+        self.assertEqual(n, 290)
+
+        td = gxgrdu.tilt_depth(self.mag, resolution=1000, return_as=gxgrdu.RETURN_ARRAY, fft=False)
+        self.assertEqual(td.shape, (290, 3))
+        self.assertTrue(50. < np.nanmedian(td[:, 2]) < 200.)
+
+        # compare with the 9.4 depths at the nearest 9.4 location within 2 cells, the zero contours move
+        # with the vertical derivative operator, but depths along the contours should agree
+        td = gxgrdu.tilt_depth(self.mag, return_as=gxgrdu.RETURN_ARRAY, fft=False)
+        td94 = _tilt_depth_94(self.mag, 200.)
+        separation = np.hypot(td[:, 0, np.newaxis] - td94[np.newaxis, :, 0],
+                              td[:, 1, np.newaxis] - td94[np.newaxis, :, 1])
+        nearest = np.argmin(separation, axis=1)
+        matched = separation[np.arange(len(td)), nearest] <= 100.
+        self.assertTrue(np.mean(matched) > 0.5)
+        relative = (td[matched, 2] - td94[nearest[matched], 2]) / td94[nearest[matched], 2]
+        self.assertTrue(abs(np.nanmedian(relative)) < 0.1)
+        self.assertTrue(np.nanmedian(np.abs(relative)) < 0.25)
 
     def test_calculate_slope_standard_deviation(self):
         self.start()
@@ -235,13 +460,40 @@ class Test(GXPYTest):
         self.start()
 
         with gxgrd.Grid.open(self.mag) as g:
+            data = g.np(dtype=np.float64)
             pg = g.gxpg(True)
             pg.re_allocate(g.ny + 20, g.nx + 20)
             with gxgrd.Grid.from_data_array(pg) as gp:
                 filled_gd = gxgrdu.flood(gp)
                 self.assertEqual(filled_gd.statistics()['num_dummy'], 0)
-                feath_pg = gxgrdu.feather(filled_gd, 20)
-                self.assertEqual(feath_pg.statistics()['mean'], 4986.261784683294, 1)
+                filled = filled_gd.np(dtype=np.float64)
+                valid = ~np.isnan(data)
+                self.assertTrue(np.array_equal(filled[:g.ny, :g.nx][valid], data[valid]))
+                self.assertTrue(np.nanmin(data) <= filled.min() and filled.max() <= np.nanmax(data))
+
+                # the feather taper is unchanged from 9.4, the mean differs by the flood. The 9.4
+                # minimum-curvature flood gave a feathered mean of 4986.261784683294, the priority flood
+                # fills the blank margin with a mean 0.3 lower (0.001 sd).
+                feath_gd = gxgrdu.feather(filled_gd, 20)
+                self.assertAlmostEqual(feath_gd.statistics()['mean'], 4985.956587463265, 4)
+                self.assertAlmostEqual(feath_gd.statistics()['mean'], 4986.261784683294, delta=0.5)
+                edge_value = filled_gd.statistics()['mean']
+                feathered = feath_gd.np(dtype=np.float64)
+                self.assertTrue(np.allclose(feathered[0, :], edge_value))
+                self.assertTrue(np.allclose(feathered[:, -1], edge_value))
+                self.assertTrue(np.allclose(feathered[20:-20, 20:-20], filled[20:-20, 20:-20]))
+                feath_gd.close(discard=True)
+
+                # by default values next to blanks are not feathered
+                blanks = gp.np(dtype=np.float64)
+                feath_gd = gxgrdu.feather(gp, 20, edge_value=5000.)
+                ty = np.minimum(np.arange(gp.ny), np.arange(gp.ny)[::-1])
+                tx = np.minimum(np.arange(gp.nx), np.arange(gp.nx)[::-1])
+                f = np.outer(0.5 - 0.5 * np.cos(np.minimum(ty, 20) * np.pi / 20),
+                             0.5 - 0.5 * np.cos(np.minimum(tx, 20) * np.pi / 20))
+                self.assertTrue(np.allclose(feath_gd.np(dtype=np.float64), (blanks - 5000.) * f + 5000.,
+                                            equal_nan=True))
+                feath_gd.close(discard=True)
 
         with gxgrd.Grid.open(self.mag) as g:
             pg = g.gxpg(True)
@@ -250,7 +502,12 @@ class Test(GXPYTest):
                 filled_gd = gxgrdu.flood(gp, tolerance=50, max_iterations=5, file_name='filled', overwrite=True)
                 self.assertEqual(filled_gd.statistics()['num_dummy'], 0)
                 feath_gd = gxgrdu.feather(filled_gd, 20, file_name='feather', overwrite=True)
-                self.assertAlmostEqual(feath_gd.statistics()['mean'], 4986.439654577116, 1)
+                self.assertEqual(feath_gd.statistics()['num_dummy'], 0)
+
+                # 4986.439654577116 from the 9.4 minimum-curvature flood
+                self.assertAlmostEqual(feath_gd.statistics()['mean'], 4986.043724328169, 4)
+                self.assertAlmostEqual(feath_gd.statistics()['mean'], 4986.439654577116, delta=0.5)
+                self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.feather, filled_gd, g.nx)
 
         filled_gd.close(discard=True)
         feath_gd.close(discard=True)
@@ -266,6 +523,38 @@ class Test(GXPYTest):
             x = gxgrdu.expression((grd, grd), 'g1-g2')
             self.assertEqual(x.statistics()['mean'], 0.)
 
+        with gxgrd.Grid.open(self.mag) as grd:
+            data = grd.np(dtype=np.float64)
+            x = gxgrdu.expression((grd, self.mag, grd), 'g1 > 5000 ? g2 - g3 : g1 * 2', rows=17, threads=3)
+            expected = np.where(data > 5000, 0., data * 2)
+            self.assertTrue(np.allclose(x.np(), expected, equal_nan=True))
+
+            x = gxgrdu.expression({'m': grd}, 'm == DUMMY ? -1 : round(m)', dtype=np.int32)
+            self.assertEqual(x.dtype, np.int32)
+            expected = np.where(np.isnan(data), -1, np.trunc(data + np.copysign(0.5, data)))
+            self.assertTrue(np.array_equal(x.np(), expected))
+
+            # multiple statements give the GXIEXP result
+            for expr in ('t = m * 2; t + 1;', 't = m * 2;\n_ = t + 1;', 'm; _ = _ * 3'):
+                x = gxgrdu.expression({'m': grd}, expr)
+                g = gxgrdu._iexp_expression({'m': grd}, expr)
+                self.assertTrue(np.allclose(x.np(), g.np(), equal_nan=True), expr)
+
+            # the result has the properties of the first grid, even if it is not an operand
+            with gxgrd.Grid.copy(grd) as other:
+                other.x0 = grd.x0 + 1000.
+                x = gxgrdu.expression({'m': other, 'n': grd}, 'n + 1')
+                self.assertAlmostEqual(x.x0, grd.x0 + 1000.)
+
+            # operands read through the pager, in memory and open for writing, evaluated on threads
+            with gxgrd.Grid.copy(grd, in_memory=True) as mem, gxgrd.Grid.copy(grd) as rw:
+                x = gxgrdu.expression({'a': mem, 'b': rw, 'c': grd}, 'a + b - c', rows=13, threads=4)
+                self.assertTrue(np.allclose(x.np(), data, equal_nan=True))
+
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.expression, {'m': grd}, 'm + n')
+            with gxgrd.Grid.open(self.g1f) as g1:
+                self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.expression, (grd, g1), 'g1 + g2')
+
 
 ###############################################################################################
 
@@ -0,0 +1,178 @@
+import unittest
+import math
+import threading
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid_sample as gxgrdsmp
+import geosoft.gxpy.grid_warp as gxwarp
+
+from base import GXPYTest
+
+
+def _surface(x, y):
+    return np.sin(x / 25.) * np.cos(y / 30.) * 100. + x * 0.2
+
+
+def _rotate(angle):
+    cos = math.cos(math.radians(angle))
+    sin = math.sin(math.radians(angle))
+
+    def transform(x, y):
+        return x * cos - y * sin, x * sin + y * cos
+
+    return transform
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.src = {'nx': 300, 'ny': 200, 'x0': 0., 'y0': 0., 'dx': 1., 'dy': 1., 'rot': 0.}
+        gy, gx = np.mgrid[0:200, 0:300].astype(np.float64)
+        cls.data = _surface(gx, gy)
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxwarp.__version__, geosoft.__version__)
+
+    def test_identity(self):
+        self.start()
+
+        data = gxwarp.warp(self.data, self.src, self.src, method=gxwarp.METHOD_NEAREST, tile_size=64)
+        self.assertTrue(np.array_equal(data, self.data))
+
+        # shifted lattice is interpolated
+        dst = dict(self.src, x0=10.5, y0=20.25, nx=100, ny=50)
+        data = gxwarp.warp(self.data, self.src, dst, method=gxwarp.METHOD_LINEAR)
+        gy, gx = np.mgrid[0:50, 0:100].astype(np.float64)
+        expected = gxgrdsmp.sample(self.data, self.src, gx + 10.5, gy + 20.25)
+        self.assertTrue(np.allclose(data, expected))
+
+        # outside the source is dummy
+        dst = dict(self.src, x0=250., nx=100, ny=10)
+        data = gxwarp.warp(self.data, self.src, dst)
+        self.assertFalse(np.any(np.isnan(data[:, :50])))
+        self.assertTrue(np.all(np.isnan(data[:, 51:])))
+
+    def test_mapping(self):
+        self.start()
+
+        gxwarp.clear_cache()
+        transform = _rotate(30.)
+        dst = gxwarp.warp_properties(self.src, _rotate(-30.), cell_size=1.)
+        self.assertEqual(dst['rot'], 0.)
+        self.assertTrue(dst['nx'] * dst['ny'] > 300 * 200)
+
+        # affine transforms are exact on the coarsest mesh
+        m = gxwarp.mapping(dst, self.src, transform, key='rotate 30')
+        tile = next(m.tiles())
+        step, mesh = m.mesh(tile)
+        self.assertEqual(step, gxwarp.MESH_STEP)
+        iy, ix = np.mgrid[0:tile[3], 0:tile[2]].astype(np.float64)
+        fx, fy = m.index(tile, ix, iy)
+        ex, ey = gxgrdsmp.index_from_xy(self.src, *transform(*gxgrdsmp.xy_from_index(dst, ix, iy)))
+        self.assertTrue(np.allclose(fx, ex) and np.allclose(fy, ey))
+
+        # curved transforms refine the mesh to the tolerance
+        def curve(x, y):
+            return x + (y - 100.) ** 2 / 50., y
+
+        m = gxwarp.mapping(self.src, self.src, curve, key='curve', tolerance=0.01)
+        tile = next(m.tiles())
+        step, _ = m.mesh(tile)
+        self.assertTrue(step < gxwarp.MESH_STEP)
+        iy, ix = np.mgrid[0:tile[3], 0:tile[2]].astype(np.float64)
+        fx, fy = m.index(tile, ix, iy)
+        ex, ey = curve(ix, iy)
+        self.assertTrue(np.max(np.hypot(fx - ex, fy - ey)) <= 0.01)
+
+        # repeated warps reuse the cached mapping
+        first = gxwarp.warp(self.data, self.src, dst, transform=transform, key='rotate 30')
+        m = gxwarp.mapping(dst, self.src, transform, key='rotate 30')
+        transformed = m.transformed
+        second = gxwarp.warp(self.data, self.src, dst, transform=transform, key='rotate 30', threads=1)
+        self.assertEqual(m.transformed, transformed)
+        self.assertTrue(np.array_equal(first, second, equal_nan=True))
+
+        # no key is not cached
+        m = gxwarp.mapping(dst, self.src, transform)
+        self.assertFalse(m is gxwarp.mapping(dst, self.src, transform))
+
+        # the rotated surface matches the analytic surface
+        iy, ix = np.mgrid[0:dst['ny'], 0:dst['nx']].astype(np.float64)
+        x, y = transform(*gxgrdsmp.xy_from_index(dst, ix, iy))
+        valid = ~np.isnan(first)
+        self.assertTrue(valid.sum() > 50000)
+        inside = valid & (x > 2.) & (x < 297.) & (y > 2.) & (y < 197.)
+        self.assertTrue(np.max(np.abs(first[inside] - _surface(x[inside], y[inside]))) < 1.)
+        cubic = gxwarp.warp(self.data, self.src, dst, transform=transform, key='rotate 30',
+                            method=gxwarp.METHOD_CUBIC)
+        self.assertTrue(np.max(np.abs(cubic[inside] - _surface(x[inside], y[inside]))) <
+                        np.max(np.abs(first[inside] - _surface(x[inside], y[inside]))))
+
+    def test_average(self):
+        self.start()
+
+        # cells of 2x2 source points are the mean of the points
+        dst = {'nx': 150, 'ny': 100, 'x0': 0.5, 'y0': 0.5, 'dx': 2., 'dy': 2., 'rot': 0.}
+        data = gxwarp.warp(self.data, self.src, dst, method=gxwarp.METHOD_AVERAGE, tile_size=64)
+        expected = self.data.reshape((100, 2, 150, 2)).mean(axis=(1, 3))
+        self.assertTrue(np.allclose(data, expected))
+
+        # dummies are ignored
+        source = self.data.copy()
+        source[::2, ::2] = np.nan
+        data = gxwarp.warp(source, self.src, dst, method=gxwarp.METHOD_AVERAGE)
+        expected = np.nanmean(source.reshape((100, 2, 150, 2)), axis=(1, 3))
+        self.assertTrue(np.allclose(data, expected))
+
+        self.assertRaises(gxwarp.WarpException, gxwarp.warp, self.data, self.src, dst, method=9)
+
+    def test_color_and_read(self):
+        self.start()
+
+        color = (np.arange(300 * 200, dtype=np.int32)).reshape((200, 300))
+        dst = dict(self.src, x0=10.4, y0=5.6, nx=50, ny=40)
+        data = gxwarp.warp(color, self.src, dst, method=gxwarp.METHOD_LINEAR, is_color=True)
+        self.assertEqual(data.dtype, np.int32)
+        self.assertTrue(np.array_equal(data, color[6:46, 10:60]))
+
+        windows = []
+
+        def read(window):
+            windows.append(window)
+            x0, y0, nx, ny = window
+            return self.data[y0: y0 + ny, x0: x0 + nx]
+
+        data = gxwarp.warp(read, self.src, dst, tile_size=16, threads=1)
+        self.assertTrue(np.array_equal(data, gxwarp.warp(self.data, self.src, dst)))
+        self.assertTrue(all((w[2] <= 21) and (w[3] <= 21) for w in windows))
+
+        # the transform and read are only called on the calling thread, workers resample
+        calls = []
+        rotate = _rotate(20.)
+
+        def transform(x, y):
+            calls.append(threading.current_thread())
+            return rotate(x, y)
+
+        def thread_read(window):
+            calls.append(threading.current_thread())
+            return read(window)
+
+        dst = gxwarp.warp_properties(self.src, _rotate(-20.))
+        for method in (gxwarp.METHOD_CUBIC, gxwarp.METHOD_AVERAGE):
+            data = gxwarp.warp(thread_read, self.src, dst, transform=transform, method=method, tile_size=32,
+                               threads=4)
+            self.assertTrue(np.array_equal(data, gxwarp.warp(self.data, self.src, dst, transform=rotate,
+                                                             method=method, tile_size=32, threads=1),
+                                           equal_nan=True))
+        self.assertTrue(len(calls) > 0)
+        self.assertTrue(all(t is threading.current_thread() for t in calls))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.geometry as gxgeo
+import geosoft.gxpy.grid_sample as gxgrdsmp
+import geosoft.gxpy.tin as gxtin
+
+from base import GXPYTest
+
+
+def _plane(x, y):
+    return 2. * x - 3. * y + 10.
+
+
+class Test(GXPYTest):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        rng = np.random.RandomState(7)
+        cls.x = rng.rand(2000) * 200.
+        cls.y = rng.rand(2000) * 150.
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxtin.__version__, geosoft.__version__)
+
+    def test_triangulate(self):
+        self.start()
+
+        faces = gxtin.triangulate(self.x, self.y)
+
+        # Euler: a triangulation of n points with h on the convex hull has 2n - h - 2 triangles
+        self.assertTrue(len(faces) <= 2 * len(self.x) - 5)
+        self.assertEqual(len(np.unique(faces)), len(self.x))
+
+        # counter-clockwise triangles with no point inside a circumcircle
+        ax, ay = self.x[faces[:, 0]], self.y[faces[:, 0]]
+        bx, by = self.x[faces[:, 1]], self.y[faces[:, 1]]
+        cx, cy = self.x[faces[:, 2]], self.y[faces[:, 2]]
+        area = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+        self.assertTrue(np.all(area > 0.))
+        self.assertAlmostEqual(area.sum() / 2., 200. * 150., delta=200. * 150. * 0.05)
+        d = 2. * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        ux = ((ax ** 2 + ay ** 2) * (by - cy) + (bx ** 2 + by ** 2) * (cy - ay) + (cx ** 2 + cy ** 2) * (ay - by)) / d
+        uy = ((ax ** 2 + ay ** 2) * (cx - bx) + (bx ** 2 + by ** 2) * (ax - cx) + (cx ** 2 + cy ** 2) * (bx - ax)) / d
+        r = np.hypot(ax - ux, ay - uy)
+        for t in range(0, len(faces), 17):
+            inside = np.hypot(self.x - ux[t], self.y - uy[t]) < r[t] * (1. - 1e-9)
+            self.assertFalse(np.any(inside))
+
+        self.assertRaises(gxtin.TINException, gxtin.triangulate, [0., 1.], [0., 1.])
+        self.assertRaises(gxtin.TINException, gxtin.triangulate, [0., 1., 2.], [0., 1., 2.])
+
+    def test_rasterize(self):
+        self.start()
+
+        # a plane is reproduced exactly inside the triangles
+        tin = gxtin.TIN(self.x, self.y, _plane(self.x, self.y))
+        data, p = tin.rasterize(cs=1.)
+        self.assertEqual((p['x0'], p['dx'], p['rot']), (0., 1., 0.))
+        gy, gx = np.mgrid[0: p['ny'], 0: p['nx']]
+        error = data - _plane(p['x0'] + gx * p['dx'], p['y0'] + gy * p['dy'])
+        self.assertTrue(np.nanmax(np.abs(error)) < 1e-9)
+        self.assertTrue(np.mean(np.isnan(data)) < 0.05)
+
+        # grid points at the data are the data values, outside the data are dummies
+        x = np.array([0., 10., 0., 10., 5.])
+        y = np.array([0., 0., 10., 10., 5.])
+        z = np.array([1., 2., 3., 4., 10.])
+        data, p = gxtin.tin_grid(x, y, z, cs=1., area=(-2., -2., 12., 12.))
+        self.assertEqual((p['nx'], p['ny']), (15, 15))
+        self.assertEqual([data[2, 2], data[2, 12], data[12, 2], data[12, 12], data[7, 7]], [1., 2., 3., 4., 10.])
+        self.assertEqual(data[2, 7], 1.5)
+        self.assertTrue(np.all(np.isnan(data[:2, :])))
+        self.assertTrue(np.all(np.isnan(data[:, 13:])))
+
+        # rotated grid geometry
+        p = {'nx': 21, 'ny': 21, 'x0': 5., 'y0': 0., 'dx': 0.5, 'dy': 0.5, 'rot': -45.}
+        data, _ = gxtin.TIN(x, y, _plane(x, y)).rasterize(p)
+        gy, gx = np.mgrid[0: 21, 0: 21]
+        gx, gy = gxgrdsmp.xy_from_index(p, gx, gy)
+        inside = (gx > 1e-6) & (gx < 10. - 1e-6) & (gy > 1e-6) & (gy < 10. - 1e-6)
+        self.assertTrue(np.allclose(data[inside], _plane(gx, gy)[inside]))
+        self.assertTrue(np.all(np.isnan(data[(gx < -1e-6) | (gx > 10. + 1e-6) | (gy > 10. + 1e-6)])))
+        self.assertAlmostEqual(data[0, 0], _plane(5., 0.))
+
+    def test_max_edge(self):
+        self.start()
+
+        # two clusters of data, triangles across the gap are excluded
+        x = np.concatenate((self.x[:1000] * 0.25, self.x[1000:] * 0.25 + 150.))
+        tin = gxtin.TIN(x, self.y, _plane(x, self.y))
+        self.assertEqual(len(tin.faces()), len(tin))
+        self.assertTrue(np.all(tin.edge_lengths()[:, 0] > 0.))
+        short = tin.faces(max_edge=20.)
+        self.assertTrue(0 < len(short) < len(tin))
+
+        data, p = tin.rasterize(cs=1.)
+        self.assertFalse(np.any(np.isnan(data[50:100, 60:140])))
+        data, p = tin.rasterize(cs=1., max_edge=20.)
+        self.assertTrue(np.all(np.isnan(data[:, 60:140])))
+
+        data, p = tin.rasterize(cs=1., max_edge=0.)
+        self.assertTrue(np.all(np.isnan(data)))
+
+    def test_prepare(self):
+        self.start()
+
+        tin = gxtin.TIN([0., 1., 0., 0., np.nan], [0., 0., 1., 0., 3.], [1., 2., 3., 3., 4.])
+        self.assertEqual(len(tin), 1)
+        self.assertEqual(sorted(tin.z), [2., 2., 3.])
+        self.assertRaises(gxtin.TINException, gxtin.TIN, [1.], [1.], [np.nan])
+
+    def test_mesh(self):
+        self.start()
+
+        x = np.concatenate((self.x[:1000] * 0.25, [400.]))
+        y = np.concatenate((self.y[:1000], [75.]))
+        tin = gxtin.TIN(x, y, _plane(x, y))
+        mesh = tin.mesh(name='tin')
+        self.assertTrue(isinstance(mesh, gxgeo.Mesh))
+        self.assertEqual(mesh.name, 'tin')
+        self.assertEqual(len(mesh), len(tin))
+        self.assertEqual(len(mesh.verticies), 1001)
+
+        # the isolated point is not a vertex of the short triangles
+        mesh = tin.mesh(max_edge=50.)
+        self.assertEqual(len(mesh), len(tin.faces(max_edge=50.)))
+        self.assertEqual(len(mesh.verticies), 1000)
+        self.assertTrue(np.max(mesh.verticies[:, 0]) < 60.)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -149,6 +149,41 @@ class Test(GXPYTest):
             sum = npv[np.isfinite(npv)].sum()
             self.assertAlmostEqual(sum, 0.01212498417)
 
+    def test_iter_blocks(self):
+        self.start()
+
+        with gxvox.Vox.open(self.vox_file) as vox:
+            npv = vox.np()
+            planes = 0
+            for iz0, data, x, y, z in vox.iter_blocks(planes=4):
+                self.assertEqual(iz0, planes)
+                nz = data.shape[0]
+                self.assertTrue(np.array_equal(data, npv[iz0: iz0 + nz], equal_nan=True))
+                self.assertEqual(x.shape, data.shape)
+                self.assertEqual(x[0, 0, 1], vox.locations_x[1])
+                self.assertEqual(y[0, 2, 0], vox.locations_y[2])
+                self.assertEqual(z[-1, 0, 0], vox.locations_z[iz0 + nz - 1])
+                planes += nz
+            self.assertEqual(planes, vox.nz)
+
+            vox.is_depth = True
+            npv = vox.np()
+            for iz0, data in vox.iter_blocks(planes=5, with_coords=False):
+                self.assertTrue(np.array_equal(data, npv[iz0: iz0 + data.shape[0]], equal_nan=True))
+
+    def test_statistics(self):
+        self.start()
+
+        with gxvox.Vox.open(self.vox_file) as vox:
+            npv = vox.np(dtype=np.float64)
+            stats = vox.statistics(percentiles=(10, 50, 90), bins=20, planes=3, threads=2)
+            self.assertAlmostEqual(stats['mean'], np.nanmean(npv))
+            self.assertEqual(stats['num_data'] + stats['num_dummy'], npv.size)
+            self.assertAlmostEqual(stats['median'], np.nanmedian(npv))
+            for q, v in zip((10, 50, 90), np.nanpercentile(npv, (10, 50, 90))):
+                self.assertAlmostEqual(stats['percentiles'][q], v)
+            self.assertEqual(stats['histogram'][0].sum(), stats['num_data'])
+
     def test_metadata(self):
         self.start()
 
@@ -0,0 +1,421 @@
+"""
+Triangulated irregular network (TIN) surface models of located data.
+
+A `TIN` is the Delaunay triangulation of (x, y, z) data, a continuous linear surface suited to irregular
+and sparse data such as borehole collars and ground stations. A TIN is rasterised onto a grid by linear
+interpolation within the triangles, and exported as a `geosoft.gxpy.geometry.Mesh`. Long triangles across
+data gaps and around the edges of the data can be excluded by a maximum edge length.
+
+If scipy is installed the triangulation is calculated by `scipy.spatial.Delaunay`, otherwise points are
+inserted one at a time and triangles are flipped until they are Delaunay (Lawson, 1977). Rasterising
+calculates the barycentric coordinates of the grid points in the bounding box of each triangle together,
+so the work is proportional to the number of grid points covered by the triangles.
+
+:Constants:
+    :MAX_CELLS:     4194304, maximum number of grid points interpolated at once
+
+.. seealso:: `geosoft.gxpy.grid_local`, `geosoft.gxpy.geometry.Mesh`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_tin.py>`_
+
+.. versionadded:: 9.6
+"""
+import math
+import numpy as np
+
+try:
+    from scipy.spatial import Delaunay
+except ImportError:
+    Delaunay = None
+
+import geosoft
+from . import geometry as gxgeo
+from . import grid_local as gxgrdlcl
+from . import grid_mincurv as gxgrdmc
+from . import grid_sample as gxgrdsmp
+
+__version__ = geosoft.__version__
+
+
+def _t(s):
+    return geosoft.gxpy.system.translate(s)
+
+
+MAX_CELLS = 1 << 22
+
+# distance of the vertices of the enclosing triangle in units of the normalized data extent
+_SUPER = 1.0e4
+
+# barycentric coordinate tolerance of grid points on triangle edges
+_TOLERANCE = 1.0e-9
+
+
+class TINException(geosoft.GXRuntimeError):
+    """
+    Exceptions from `geosoft.gxpy.tin`.
+
+    .. versionadded:: 9.6
+    """
+    pass
+
+
+def _orient(ax, ay, bx, by, px, py):
+    """ > 0 if p is to the left of a->b"""
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+
+def _in_circle(ax, ay, bx, by, cx, cy, dx, dy):
+    """ > 0 if d is inside the circle through counter-clockwise a, b, c"""
+    adx = ax - dx
+    ady = ay - dy
+    bdx = bx - dx
+    bdy = by - dy
+    cdx = cx - dx
+    cdy = cy - dy
+    ad = adx * adx + ady * ady
+    bd = bdx * bdx + bdy * bdy
+    cd = cdx * cdx + cdy * cdy
+    return adx * (bdy * cd - bd * cdy) - ady * (bdx * cd - bd * cdx) + ad * (bdx * cdy - bdy * cdx)
+
+
+def _insertion_order(x, y):
+    """ points ordered in a snake through rows of cells, so that each point is near the last point"""
+
+    n = len(x)
+    rows = max(1, int(math.sqrt(n / 4.)))
+    row = np.minimum((y * rows).astype(np.int64), rows - 1)
+    key_x = np.where(row % 2 == 0, x, -x)
+    return np.lexsort((key_x, row))
+
+
+def triangulate(x, y):
+    """
+    Delaunay triangulation of points.
+
+    :param x:   point x locations, numpy array
+    :param y:   point y locations, numpy array
+    :returns:   faces, numpy int32 array shaped (n, 3) of the point indexes of the counter-clockwise
+                vertices of each triangle
+
+    Points must be unique. Use `geosoft.gxpy.grid_local.prepare` to combine points at the same location.
+
+    .. versionadded:: 9.6
+    """
+
+    x = np.asarray(x, dtype=np.float64).ravel()
+    y = np.asarray(y, dtype=np.float64).ravel()
+    n = len(x)
+    if n < 3:
+        raise TINException(_t('At least three points are required to triangulate.'))
+
+    # normalize to the unit square
+    x0, y0 = float(x.min()), float(y.min())
+    scale = max(float(x.max()) - x0, float(y.max()) - y0)
+    if scale <= 0.:
+        raise TINException(_t('Points must not all be on a line.'))
+    nx = (x - x0) / scale
+    ny = (y - y0) / scale
+
+    if Delaunay is not None:
+        try:
+            faces = Delaunay(np.column_stack((nx, ny))).simplices.astype(np.int32)
+        except Exception:
+            raise TINException(_t('Points must not all be on a line.'))
+    else:
+        faces = _lawson(nx, ny)
+
+    if len(faces) == 0:
+        raise TINException(_t('Points must not all be on a line.'))
+
+    # counter-clockwise, without degenerate triangles
+    a, b, c = faces[:, 0], faces[:, 1], faces[:, 2]
+    area = (nx[b] - nx[a]) * (ny[c] - ny[a]) - (ny[b] - ny[a]) * (nx[c] - nx[a])
+    faces = faces[area != 0.]
+    clockwise = area[area != 0.] < 0.
+    faces[clockwise] = faces[clockwise][:, ::-1]
+    return faces
+
+
+def _lawson(x, y):
+    """ incremental Delaunay triangulation by edge flips of points in the unit square"""
+
+    n = len(x)
+    px = x.tolist()
+    py = y.tolist()
+
+    # enclosing triangle
+    for angle in (90., 210., 330.):
+        px.append(0.5 + _SUPER * math.cos(math.radians(angle)))
+        py.append(0.5 + _SUPER * math.sin(math.radians(angle)))
+
+    # vertices of each triangle counter-clockwise, and the neighbour opposite each vertex
+    tv = [[n, n + 1, n + 2]]
+    tn = [[-1, -1, -1]]
+
+    def legalize(stack):
+        # the new point is vertex 0 of each triangle on the stack, the edge to test is opposite it
+        while stack:
+            t = stack.pop()
+            u = tn[t][0]
+            if u < 0:
+                continue
+            p, a, b = tv[t]
+            j = tn[u].index(t)
+            q = tv[u][j]
+            if _in_circle(px[p], py[p], px[a], py[a], px[b], py[b], px[q], py[q]) <= 0.:
+                continue
+
+            # flip edge a-b to p-q
+            n_bp = tn[t][1]
+            n_pa = tn[t][2]
+            u_aq = tn[u][(j + 1) % 3]
+            u_qb = tn[u][(j + 2) % 3]
+            tv[t] = [p, a, q]
+            tn[t] = [u_aq, u, n_pa]
+            tv[u] = [p, q, b]
+            tn[u] = [u_qb, n_bp, t]
+            if u_aq >= 0:
+                tn[u_aq][tn[u_aq].index(u)] = t
+            if n_bp >= 0:
+                tn[n_bp][tn[n_bp].index(t)] = u
+            stack.append(t)
+            stack.append(u)
+
+    t = 0
+    for i in _insertion_order(x, y).tolist():
+        x_i = px[i]
+        y_i = py[i]
+
+        # walk to the triangle that contains the point
+        start = 0
+        while True:
+            v = tv[t]
+            for k in range(3):
+                e = (start + k) % 3
+                a = v[(e + 1) % 3]
+                b = v[(e + 2) % 3]
+                if _orient(px[a], py[a], px[b], py[b], x_i, y_i) < 0.:
+                    t = tn[t][e]
+                    start = (start + 1) % 3
+                    break
+            else:
+                break
+
+        # split the triangle into three
+        a, b, c = tv[t]
+        na, nb, nc = tn[t]
+        t1 = len(tv)
+        t2 = t1 + 1
+        tv[t] = [i, b, c]
+        tn[t] = [na, t1, t2]
+        tv.append([i, c, a])
+        tn.append([nb, t2, t])
+        tv.append([i, a, b])
+        tn.append([nc, t, t1])
+        if nb >= 0:
+            tn[nb][tn[nb].index(t)] = t1
+        if nc >= 0:
+            tn[nc][tn[nc].index(t)] = t2
+        legalize([t, t1, t2])
+
+    faces = np.array(tv, dtype=np.int32)
+    return faces[np.all(faces < n, axis=1)]
+
+
+class TIN:
+    """
+    Delaunay triangulated irregular network of located data.
+
+    :param x:       data x locations, numpy array
+    :param y:       data y locations, numpy array
+    :param z:       data values, numpy array. Data with dummy locations or values are removed, and data at
+                    the same location are replaced by their mean.
+    :param coordinate_system:   coordinate system of the data locations, default `None`
+
+    .. versionadded:: 9.6
+    """
+
+    def __init__(self, x, y, z, coordinate_system=None):
+        try:
+            self._x, self._y, self._z = gxgrdlcl.prepare(x, y, z)
+        except gxgrdlcl.GridLocalException as e:
+            raise TINException(str(e))
+        self._faces = triangulate(self._x, self._y)
+        self._coordinate_system = coordinate_system
+
+    def __len__(self):
+        return len(self._faces)
+
+    @property
+    def x(self):
+        """vertex x locations"""
+        return self._x
+
+    @property
+    def y(self):
+        """vertex y locations"""
+        return self._y
+
+    @property
+    def z(self):
+        """vertex values"""
+        return self._z
+
+    @property
+    def coordinate_system(self):
+        """coordinate system of the vertex locations"""
+        return self._coordinate_system
+
+    @property
+    def spacing(self):
+        """nominal data spacing, see `geosoft.gxpy.grid_mincurv.nominal_spacing`"""
+        return gxgrdmc.nominal_spacing(self._x, self._y)
+
+    def edge_lengths(self):
+        """
+        Lengths of the triangle edges, numpy array shaped (number of triangles, 3), where edge i is
+        opposite vertex i.
+        """
+
+        vx = self._x[self._faces]
+        vy = self._y[self._faces]
+        return np.hypot(np.roll(vx, -1, axis=1) - np.roll(vx, 1, axis=1),
+                        np.roll(vy, -1, axis=1) - np.roll(vy, 1, axis=1))
+
+    def faces(self, max_edge=None):
+        """
+        Triangle faces.
+
+        :param max_edge:    maximum edge length, triangles with a longer edge are excluded. The default
+                            includes all triangles.
+        :returns:           numpy int32 array shaped (n, 3) of the vertex indexes of the counter-clockwise
+                            vertices of each triangle
+        """
+
+        if max_edge is None:
+            return self._faces
+        return self._faces[self.edge_lengths().max(axis=1) <= float(max_edge)]
+
+    def mesh(self, max_edge=None, **kwargs):
+        """
+        The TIN as a `geosoft.gxpy.geometry.Mesh`, with vertex elevations the data values.
+
+        :param max_edge:    maximum edge length, see `faces`
+        :param kwargs:      passed to `geosoft.gxpy.geometry.Mesh`, for example `name`
+        :returns:           `geosoft.gxpy.geometry.Mesh` instance
+        """
+
+        faces = self.faces(max_edge)
+        used = np.unique(faces)
+        index = np.full(len(self._x), -1, dtype=np.int32)
+        index[used] = np.arange(len(used), dtype=np.int32)
+        verticies = np.column_stack((self._x[used], self._y[used], self._z[used]))
+        return gxgeo.Mesh((index[faces], verticies), coordinate_system=self._coordinate_system, **kwargs)
+
+    def grid_properties(self, cs=None, area=None):
+        """
+        Properties of a grid that covers the TIN.
+
+        :param cs:      cell size, default is a quarter of the nominal data spacing
+        :param area:    (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+        :returns:       grid properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'
+        """
+
+        if cs is None:
+            cs = self.spacing / 4.
+        cs = float(cs)
+        if cs <= 0.:
+            raise TINException(_t('Cell size must be positive, found {}').format(cs))
+        x0, y0, nx, ny = gxgrdmc.grid_area(self._x, self._y, cs, area)
+        return {'nx': nx, 'ny': ny, 'x0': x0, 'y0': y0, 'dx': cs, 'dy': cs, 'rot': 0.}
+
+    def rasterize(self, properties=None, cs=None, area=None, max_edge=None):
+        """
+        Linear interpolation of the TIN at the points of a grid.
+
+        :param properties:  grid properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and optionally
+                            'rot'. The default is `grid_properties` for `cs` and `area`.
+        :param cs:          cell size if `properties` is not specified
+        :param area:        grid area if `properties` is not specified
+        :param max_edge:    maximum edge length, grid points in longer triangles are dummies
+        :returns:           (data, properties): numpy float64 array shaped (ny, nx) with dummies `numpy.nan`,
+                            and the grid properties dictionary.
+
+        Grid points outside the triangles are dummies.
+        """
+
+        if properties is None:
+            properties = self.grid_properties(cs, area)
+        nx = int(properties['nx'])
+        ny = int(properties['ny'])
+        data = np.full((ny, nx), np.nan)
+
+        faces = self.faces(max_edge)
+        if len(faces) == 0:
+            return data, properties
+
+        # triangles in grid index space, within the grid
+        fx, fy = gxgrdsmp.index_from_xy(properties, self._x, self._y)
+        tx = fx[faces]
+        ty = fy[faces]
+        ix0 = np.maximum(np.ceil(tx.min(axis=1) - _TOLERANCE), 0).astype(np.int64)
+        ix1 = np.minimum(np.floor(tx.max(axis=1) + _TOLERANCE), nx - 1).astype(np.int64)
+        iy0 = np.maximum(np.ceil(ty.min(axis=1) - _TOLERANCE), 0).astype(np.int64)
+        iy1 = np.minimum(np.floor(ty.max(axis=1) + _TOLERANCE), ny - 1).astype(np.int64)
+        w = ix1 - ix0 + 1
+        h = iy1 - iy0 + 1
+        covers = (w > 0) & (h > 0)
+        tx, ty, tz = tx[covers], ty[covers], self._z[faces[covers]]
+        ix0, iy0, w, h = ix0[covers], iy0[covers], w[covers], h[covers]
+        count = w * h
+
+        # barycentric coordinates of the grid points in the bounding box of each triangle
+        x1, x2, x3 = tx[:, 0], tx[:, 1], tx[:, 2]
+        y1, y2, y3 = ty[:, 0], ty[:, 1], ty[:, 2]
+        det = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+
+        end = np.cumsum(count)
+        first = 0
+        while first < len(count):
+            last = int(np.searchsorted(end, end[first] - count[first] + MAX_CELLS, side='right'))
+            last = max(last, first + 1)
+            tri = np.repeat(np.arange(first, last), count[first: last])
+            offset = np.arange(len(tri)) - np.repeat(end[first: last] - count[first: last] -
+                                                    (end[first] - count[first]), count[first: last])
+            ix = ix0[tri] + offset % w[tri]
+            iy = iy0[tri] + offset // w[tri]
+            dx = ix - x3[tri]
+            dy = iy - y3[tri]
+            d = det[tri]
+            l1 = ((y2 - y3)[tri] * dx + (x3 - x2)[tri] * dy) / d
+            l2 = ((y3 - y1)[tri] * dx + (x1 - x3)[tri] * dy) / d
+            l3 = 1. - l1 - l2
+            inside = (l1 >= -_TOLERANCE) & (l2 >= -_TOLERANCE) & (l3 >= -_TOLERANCE)
+            tri = tri[inside]
+            data[iy[inside], ix[inside]] = (l1[inside] * tz[tri, 0] + l2[inside] * tz[tri, 1] +
+                                            l3[inside] * tz[tri, 2])
+            first = last
+
+        return data, properties
+
+
+def tin_grid(x, y, z, cs=None, area=None, max_edge=None):
+    """
+    Grid located data by linear interpolation of its Delaunay triangulation.
+
+    :param x:           data x locations, numpy array
+    :param y:           data y locations, numpy array
+    :param z:           data values, numpy array, `numpy.nan` values are ignored
+    :param cs:          cell size, default is a quarter of the nominal data spacing
+    :param area:        (xmin, ymin, xmax, ymax) grid area, `None` entries default to the data limits
+    :param max_edge:    maximum triangle edge length, grid points in longer triangles are dummies
+    :returns:           (data, properties): numpy float64 array shaped (ny, nx) with dummies `numpy.nan`,
+                        and the grid properties dictionary with 'nx', 'ny', 'x0', 'y0', 'dx', 'dy' and 'rot'.
+
+    .. versionadded:: 9.6
+    """
+
+    return TIN(x, y, z).rasterize(cs=cs, area=area, max_edge=max_edge)
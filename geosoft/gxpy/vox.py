@@ -39,6 +39,7 @@ from . import utility as gxu
 from . import spatialdata as gxspd
 from . import geometry as gxgm
 from . import gdb as gxgdb
+from . import grid_statistics as gxgrdst
 
 __version__ = geosoft.__version__
 
@@ -779,6 +780,62 @@ class Vox(gxspd.SpatialData, Sequence):
 
         return npv
 
+    def iter_blocks(self, planes=16, with_coords=True, dtype=None):
+        """
+        Iterate over the vox in blocks of z planes as numpy arrays.
+
+        :param planes:      number of z planes in each block, default 16. The last block may have fewer planes.
+        :param with_coords: `True` (default) to also return the cell-center locations of the block.
+        :param dtype:       data type for the values, default is the vox dtype
+        :returns:           iterator of (iz0, data, x, y, z) if `with_coords` is `True`, otherwise (iz0, data).
+                            `iz0` is the index of the first plane in the block and `data` is shaped (nz, ny, nx)
+                            as returned by `np`. `x`, `y` and `z` are read-only arrays broadcast to the shape of
+                            the block (not including the vector dimension of a vector vox).
+                            The order of z depends on the `is_depth` property setting.
+
+        .. versionadded:: 9.6
+        """
+
+        planes = max(1, int(planes))
+        if with_coords:
+            lx = np.array(self.locations_x, dtype=np.float64).reshape((1, 1, self.nx))
+            ly = np.array(self.locations_y, dtype=np.float64).reshape((1, self.ny, 1))
+            lz = np.array(self.locations_z, dtype=np.float64).reshape((self.nz, 1, 1))
+
+        for iz0 in range(0, self.nz, planes):
+            nz = min(planes, self.nz - iz0)
+            data = self.np(subset=((0, 0, iz0), (self.nx, self.ny, nz)), dtype=dtype)
+            if with_coords:
+                shape = (nz, self.ny, self.nx)
+                yield (iz0, data,
+                       np.broadcast_to(lx, shape),
+                       np.broadcast_to(ly, shape),
+                       np.broadcast_to(lz[iz0: iz0 + nz], shape))
+            else:
+                yield iz0, data
+
+    def statistics(self, percentiles=None, bins=None, threads=None, planes=16):
+        """
+        Vox data statistics.
+
+        :param percentiles: list of percentiles (0 to 100) to calculate exactly, default none.
+        :param bins:        number of histogram bins on the data range, default no histogram.
+        :param threads:     maximum number of threads, default is the number of processors.
+        :param planes:      number of z planes read together, default 16.
+        :returns:           dictionary of statistics, see `geosoft.gxpy.grid.Grid.statistics`.
+                            Statistics of a vector vox are of the vector amplitude.
+
+        .. versionadded:: 9.6
+        """
+
+        def blocks():
+            for _, data in self.iter_blocks(planes=planes, with_coords=False, dtype=np.float64):
+                if self.is_vectorvox:
+                    data = np.sqrt((data * data).sum(axis=-1))
+                yield data
+
+        return gxgrdst.statistics(blocks, percentiles=percentiles, bins=bins, threads=threads)
+
     @classmethod
     def _rbf(cls, data,
             file_name=None, overwrite=False,